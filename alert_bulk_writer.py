@@ -0,0 +1,163 @@
+"""
+Set-based Alert Bulk Writer for HailyDB
+Stages normalized NWS alert rows with COPY and merges them into alerts in one statement
+"""
+
+import io
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Column order shared by the row tuples, the staging table and the merge statement
+ALERT_COLUMNS = [
+    ('id', 'TEXT'),
+    ('event', 'TEXT'),
+    ('severity', 'TEXT'),
+    ('area_desc', 'TEXT'),
+    ('effective', 'TIMESTAMPTZ'),
+    ('expires', 'TIMESTAMPTZ'),
+    ('sent', 'TIMESTAMPTZ'),
+    ('geometry', 'JSONB'),
+    ('properties', 'JSONB'),
+    ('raw', 'JSONB'),
+    ('content_hash', 'VARCHAR(64)'),
+    ('radar_indicated', 'JSONB'),
+    ('fips_codes', 'JSONB'),
+    ('county_names', 'JSONB'),
+    ('city_names', 'JSONB'),  # Staged as JSON, converted to text[] during merge
+    ('location_confidence', 'DOUBLE PRECISION'),
+    ('geometry_type', 'VARCHAR(20)'),
+    ('coordinate_count', 'INTEGER'),
+    ('affected_states', 'JSONB'),
+    ('geometry_bounds', 'JSONB'),
+]
+
+# Feed-owned columns the merge refreshes on conflict; data_source and ingested_at keep their original values
+UPDATE_COLUMNS = ['event', 'severity', 'area_desc', 'effective', 'expires', 'sent', 'geometry', 'properties', 'raw',
+                  'content_hash', 'geometry_type', 'coordinate_count', 'geometry_bounds']
+
+# Columns the enrichment passes own: a stored value is kept, the staged one only fills a NULL
+ENRICHMENT_COLUMNS = ['radar_indicated', 'fips_codes', 'county_names', 'city_names', 'location_confidence',
+                      'affected_states']
+
+
+# Python-side Alert column defaults the ORM would apply; the raw INSERT sets them for new rows
+INSERT_DEFAULTS = [
+    ('data_source', "'nws_live'"),
+    ('spc_verified', 'false'),
+    ('spc_report_count', '0'),
+]
+
+# ALERT_COLUMNS names whose Alert attribute differs from the column name
+ALERT_ATTRIBUTES = {'raw': 'raw_envelope'}
+
+
+def alert_to_row(alert) -> Tuple:
+    """Convert a normalized (transient) Alert into a row tuple in ALERT_COLUMNS order"""
+    return tuple(getattr(alert, ALERT_ATTRIBUTES.get(name, name)) for name, _ in ALERT_COLUMNS)
+
+
+def row_from_dict(row: Dict) -> Tuple:
+    """Convert a normalized row dict (alert_normalizer.normalize_features) into a row tuple"""
+    return tuple(row.get(name) for name, _ in ALERT_COLUMNS)
+
+
+def _csv_field(value) -> str:
+    """
+    Encode one value for COPY ... WITH (FORMAT csv)
+    None becomes an unquoted empty field (NULL); everything else is quoted so '' stays an empty string
+    """
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        value = json.dumps(value, separators=(',', ':'))
+    else:
+        value = str(value)
+    return '"' + value.replace('"', '""') + '"'
+
+
+class AlertBulkWriter:
+    """
+    Bulk write engine for NWS alerts
+    One COPY into a temp staging table plus one INSERT ... ON CONFLICT per batch
+    """
+
+    def __init__(self, db):
+        self.db = db
+
+    def upsert_rows(self, rows: List[Tuple]) -> Dict:
+        """
+        Merge a batch of row tuples into alerts
+        Rows whose content_hash matches the stored fingerprint are left untouched
+        Returns {'inserted': int, 'updated': int, 'unchanged': int}
+        """
+        if not rows:
+            return {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        # The feed can repeat an ID across pages; ON CONFLICT cannot touch a row twice per statement
+        deduped = {}
+        for row in rows:
+            deduped[row[0]] = row
+        rows = list(deduped.values())
+
+        session = self.db.session
+        column_defs = ', '.join(f'{name} {sql_type}' for name, sql_type in ALERT_COLUMNS)
+        column_names = ', '.join(name for name, _ in ALERT_COLUMNS)
+
+        session.execute(text(f"CREATE TEMP TABLE alerts_staging ({column_defs}) ON COMMIT DROP"))
+
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(','.join(_csv_field(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+
+        # COPY needs the raw DBAPI cursor of the connection bound to this session
+        raw_connection = session.connection().connection
+        cursor = raw_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY alerts_staging ({column_names}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+        select_columns = ', '.join(
+            "CASE WHEN s.city_names IS NULL THEN NULL ELSE ARRAY(SELECT jsonb_array_elements_text(s.city_names)) END"
+            if name == 'city_names' else f's.{name}'
+            for name, _ in ALERT_COLUMNS
+        )
+        update_assignments = ', '.join(
+            [f'{name} = EXCLUDED.{name}' for name in UPDATE_COLUMNS]
+            + [f'{name} = COALESCE(alerts.{name}, EXCLUDED.{name})' for name in ENRICHMENT_COLUMNS]
+        )
+        default_names = ', '.join(name for name, _ in INSERT_DEFAULTS)
+        default_values = ', '.join(value for _, value in INSERT_DEFAULTS)
+
+        result = session.execute(text(f"""
+            INSERT INTO alerts ({column_names}, {default_names})
+            SELECT {select_columns}, {default_values}
+            FROM alerts_staging s
+            ON CONFLICT (id) DO UPDATE SET
+                {update_assignments},
+                updated_at = NOW()
+            WHERE alerts.content_hash IS DISTINCT FROM EXCLUDED.content_hash
+            RETURNING (xmax = 0) AS inserted
+        """))
+
+        inserted = updated = 0
+        for (was_inserted,) in result:
+            if was_inserted:
+                inserted += 1
+            else:
+                updated += 1
+
+        return {
+            'inserted': inserted,
+            'updated': updated,
+            'unchanged': len(rows) - inserted - updated
+        }
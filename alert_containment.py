@@ -0,0 +1,250 @@
+"""
+Alert Containment for HailyDB
+Point-in-polygon search over radar-detected alert polygons: indexed bounding-box prefilter, exact containment
+"""
+
+import argparse
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import shapely
+from shapely import affinity
+from shapely.geometry import Point, shape
+from sqlalchemy import text
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MILES_PER_DEGREE_LAT = 69.0
+
+# geometry_bounds as a native box; idx_alert_bounds_box indexes exactly this expression
+BOUNDS_BOX = ("box(point(CAST(geometry_bounds->>'min_lon' AS float8), CAST(geometry_bounds->>'min_lat' AS float8)), "
+              "point(CAST(geometry_bounds->>'max_lon' AS float8), CAST(geometry_bounds->>'max_lat' AS float8)))")
+
+# Built CONCURRENTLY from the CLI (python alert_containment.py create-index) so ingest writes are not blocked
+CREATE_BOUNDS_INDEX_SQL = (f"CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_alert_bounds_box ON alerts "
+                           f"USING gist (({BOUNDS_BOX})) WHERE geometry_bounds IS NOT NULL")
+
+# A failed concurrent build leaves an invalid index behind that IF NOT EXISTS would keep
+BOUNDS_INDEX_VALID_SQL = """
+SELECT index_rel.indisvalid FROM pg_index index_rel
+JOIN pg_class index_class ON index_class.oid = index_rel.indexrelid
+WHERE index_class.relname = 'idx_alert_bounds_box'
+"""
+
+DROP_BOUNDS_INDEX_SQL = "DROP INDEX CONCURRENTLY IF EXISTS idx_alert_bounds_box"
+
+BOUNDS_INDEX_EXISTS_SQL = "SELECT 1 FROM pg_indexes WHERE indexname = 'idx_alert_bounds_box'"
+
+# Radar-detected alerts whose bounding box touches the search box (point widened by the buffer)
+PREFILTER = f"""
+geometry_bounds IS NOT NULL
+AND {BOUNDS_BOX} && box(point(:min_lon, :min_lat), point(:max_lon, :max_lat))
+AND radar_indicated IS NOT NULL
+AND (CAST(radar_indicated->>'hail_inches' AS float) >= 0.00 OR CAST(radar_indicated->>'wind_mph' AS float) >= 50)
+{{date_filter}}
+"""
+
+CANDIDATES_SQL = f"SELECT id, updated_at FROM alerts WHERE {PREFILTER} ORDER BY effective DESC"
+
+ALERT_SHAPE = "COALESCE(geom, ST_SetSRID(ST_GeomFromGeoJSON(CAST(geometry AS text)), 4326))"
+SEARCH_POINT = "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)"
+
+POSTGIS_CONTAINS_SQL = f"""
+SELECT id FROM alerts
+WHERE {PREFILTER}
+AND {{containment}}
+ORDER BY effective DESC
+"""
+
+POSTGIS_COVERS = f"ST_Covers({ALERT_SHAPE}, {SEARCH_POINT})"
+POSTGIS_WITHIN_BUFFER = f"ST_DWithin(CAST({ALERT_SHAPE} AS geography), CAST({SEARCH_POINT} AS geography), :buffer_meters)"
+
+GEOMETRIES_SQL = "SELECT id, geometry FROM alerts WHERE id = ANY(:ids)"
+
+ENGINES = ('postgis', 'shapely')
+
+
+def search_box(lat: float, lon: float, buffer_miles: float) -> Dict[str, float]:
+    """Bounding box of the point widened by buffer_miles"""
+    lat_margin = buffer_miles / MILES_PER_DEGREE_LAT
+    lon_margin = buffer_miles / (MILES_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return {'min_lat': lat - lat_margin, 'max_lat': lat + lat_margin,
+            'min_lon': lon - lon_margin, 'max_lon': lon + lon_margin}
+
+
+def date_window(start_date=None, end_date=None) -> Tuple[str, Dict]:
+    """PREFILTER date_filter clause and its params for an optional effective-time window"""
+    clause = ""
+    params = {}
+    if start_date:
+        clause += "AND effective >= :start_date "
+        params['start_date'] = start_date
+    if end_date:
+        clause += "AND effective <= :end_date "
+        params['end_date'] = end_date
+    return clause, params
+
+
+def search_area(lat: float, lon: float, buffer_miles: float):
+    """The point, or an ellipse in degrees approximating a buffer_miles circle around it"""
+    point = Point(lon, lat)
+    if buffer_miles <= 0:
+        return point
+    box = search_box(lat, lon, buffer_miles)
+    return affinity.scale(point.buffer(1.0, 32), xfact=box['max_lon'] - lon, yfact=box['max_lat'] - lat)
+
+
+class AlertContainment:
+    """
+    Finds radar-detected alerts whose polygon covers a point (or comes within buffer_miles)
+
+    Candidates come from the GiST index on the numeric geometry_bounds box. The exact test runs
+    in PostGIS (ST_Covers / geography ST_DWithin on geom, or the GeoJSON when geom is unset) or,
+    with CONTAINMENT_ENGINE=shapely or when the PostGIS query fails, against prepared shapely
+    polygons cached per alert id and refreshed when the alert's updated_at changes.
+    """
+
+    _index_checked = False
+
+    def __init__(self, engine: str = None, cache_entries: int = None):
+        self.engine = engine or Config.CONTAINMENT_ENGINE
+        if self.engine not in ENGINES:
+            raise ValueError(f"CONTAINMENT_ENGINE must be one of {ENGINES}, not {self.engine!r}")
+        self.cache_entries = Config.CONTAINMENT_CACHE_ENTRIES if cache_entries is None else cache_entries
+        self._shapes: 'OrderedDict[str, Tuple[Optional[datetime], object]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.last_query: Dict = {}
+
+    def check_bounds_index(self, session):
+        """Warn once per process when idx_alert_bounds_box is missing; never builds it at request time"""
+        if AlertContainment._index_checked:
+            return
+        try:
+            if session.execute(text(BOUNDS_INDEX_EXISTS_SQL)).first() is None:
+                logger.warning("idx_alert_bounds_box is missing, containment prefilter will scan alerts; "
+                               "create it with: python alert_containment.py create-index")
+            AlertContainment._index_checked = True
+        except Exception as e:
+            logger.warning(f"Could not check alert bounds index: {e}")
+            session.rollback()
+
+    def find_alert_ids(self, session, lat: float, lon: float, buffer_miles: float = 0.0,
+                       start_date=None, end_date=None, engine: str = None) -> List[str]:
+        """Ids of matching alerts, most recent effective time first"""
+        self.check_bounds_index(session)
+        engine = engine or self.engine
+        date_filter, date_params = date_window(start_date, end_date)
+        params = {'lat': lat, 'lon': lon, 'buffer_meters': buffer_miles * 1609.344,
+                  **search_box(lat, lon, buffer_miles), **date_params}
+
+        started = time.perf_counter()
+        if engine == 'postgis':
+            try:
+                containment = POSTGIS_WITHIN_BUFFER if buffer_miles > 0 else POSTGIS_COVERS
+                ids = [row[0] for row in session.execute(text(POSTGIS_CONTAINS_SQL.format(
+                    date_filter=date_filter, containment=containment)), params)]
+                self.last_query = {'engine': 'postgis', 'matches': len(ids),
+                                   'seconds': round(time.perf_counter() - started, 4)}
+                return ids
+            except Exception as e:
+                logger.warning(f"PostGIS containment failed, using shapely: {e}")
+                session.rollback()
+
+        candidates = session.execute(text(CANDIDATES_SQL.format(date_filter=date_filter)), params).fetchall()
+        shapes = self.prepared_shapes(session, candidates)
+        area = search_area(lat, lon, buffer_miles)
+        if buffer_miles > 0:
+            ids = [alert_id for alert_id, _ in candidates
+                   if shapes.get(alert_id) is not None and shapes[alert_id].intersects(area)]
+        else:
+            ids = [alert_id for alert_id, _ in candidates
+                   if shapes.get(alert_id) is not None and shapes[alert_id].covers(area)]
+        self.last_query = {'engine': 'shapely', 'candidates': len(candidates), 'matches': len(ids),
+                           'seconds': round(time.perf_counter() - started, 4)}
+        return ids
+
+    def prepared_shapes(self, session, candidates: List[Tuple]) -> Dict[str, object]:
+        """Prepared polygon per candidate id, loading only the ones missing or stale in the cache"""
+        shapes = {}
+        missing = []
+        with self._lock:
+            for alert_id, updated_at in candidates:
+                cached = self._shapes.get(alert_id)
+                if cached is not None and cached[0] == updated_at:
+                    self._shapes.move_to_end(alert_id)
+                    shapes[alert_id] = cached[1]
+                else:
+                    missing.append(alert_id)
+        if not missing:
+            return shapes
+
+        versions = dict(candidates)
+        for alert_id, geometry in session.execute(text(GEOMETRIES_SQL), {'ids': missing}):
+            polygon = None
+            try:
+                if geometry:
+                    polygon = shape(geometry)
+                    if not polygon.is_valid:
+                        polygon = shapely.make_valid(polygon)
+                    shapely.prepare(polygon)
+            except Exception as e:
+                logger.warning(f"Unusable geometry for alert {alert_id}: {e}")
+                polygon = None
+            shapes[alert_id] = polygon
+            with self._lock:
+                self._shapes[alert_id] = (versions[alert_id], polygon)
+                self._shapes.move_to_end(alert_id)
+                while len(self._shapes) > self.cache_entries:
+                    self._shapes.popitem(last=False)
+        return shapes
+
+    def stats(self) -> Dict:
+        with self._lock:
+            cached = len(self._shapes)
+        return {'engine': self.engine, 'cached_shapes': cached, 'last_query': self.last_query}
+
+
+alert_containment = AlertContainment()
+
+
+def create_bounds_index(engine) -> bool:
+    """
+    Build idx_alert_bounds_box without blocking writes to alerts, replacing an invalid index
+    left by an interrupted build. Returns True when an index was built.
+    """
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        valid = conn.execute(text(BOUNDS_INDEX_VALID_SQL)).scalar()
+        if valid:
+            return False
+        if valid is not None:
+            logger.warning("Dropping invalid idx_alert_bounds_box from an interrupted build")
+            conn.execute(text(DROP_BOUNDS_INDEX_SQL))
+        started = time.monotonic()
+        conn.execute(text(CREATE_BOUNDS_INDEX_SQL))
+        logger.info(f"Built idx_alert_bounds_box in {time.monotonic() - started:.1f}s")
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Alert containment index maintenance")
+    parser.add_argument('command', choices=['create-index'],
+                        help='create-index: build idx_alert_bounds_box concurrently if it is missing or invalid')
+    parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from app import app, db
+    with app.app_context():
+        if not create_bounds_index(db.engine):
+            print("idx_alert_bounds_box already exists")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,520 @@
+"""
+Alert Normalizer for HailyDB
+ORM-free conversion of NWS features into alert row dicts, safe to run in worker processes
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import Config
+from radar_extraction import radar_extractor
+from geometry_analysis import analyze_geometries, analyze_shapes
+from alert_payload import compact_feature
+from city_enrichment_service import city_enrichment_service
+from state_enrichment_service import StateEnrichmentService
+
+logger = logging.getLogger(__name__)
+
+# Nothing in this module may import app or models: worker processes must stay ORM-free
+
+UGC_STATE_MAPPING = {
+    'AL': 'AL', 'AK': 'AK', 'AZ': 'AZ', 'AR': 'AR', 'CA': 'CA', 'CO': 'CO',
+    'CT': 'CT', 'DE': 'DE', 'FL': 'FL', 'GA': 'GA', 'HI': 'HI', 'ID': 'ID',
+    'IL': 'IL', 'IN': 'IN', 'IA': 'IA', 'KS': 'KS', 'KY': 'KY', 'LA': 'LA',
+    'ME': 'ME', 'MD': 'MD', 'MA': 'MA', 'MI': 'MI', 'MN': 'MN', 'MS': 'MS',
+    'MO': 'MO', 'MT': 'MT', 'NE': 'NE', 'NV': 'NV', 'NH': 'NH', 'NJ': 'NJ',
+    'NM': 'NM', 'NY': 'NY', 'NC': 'NC', 'ND': 'ND', 'OH': 'OH', 'OK': 'OK',
+    'OR': 'OR', 'PA': 'PA', 'RI': 'RI', 'SC': 'SC', 'SD': 'SD', 'TN': 'TN',
+    'TX': 'TX', 'UT': 'UT', 'VT': 'VT', 'VA': 'VA', 'WA': 'WA', 'WV': 'WV',
+    'WI': 'WI', 'WY': 'WY', 'DC': 'DC',
+    # Marine zones
+    'PZ': 'CA', 'AM': 'AK', 'GM': 'FL', 'PK': 'AK', 'AN': 'NC', 'AS': 'FL',
+}
+
+SAME_STATE_MAPPING = {
+    '001': 'AL', '002': 'AK', '004': 'AZ', '005': 'AR', '006': 'CA', '008': 'CO',
+    '009': 'CT', '010': 'DE', '011': 'DC', '012': 'FL', '013': 'GA', '015': 'HI',
+    '016': 'ID', '017': 'IL', '018': 'IN', '019': 'IA', '020': 'KS', '021': 'KY',
+    '022': 'LA', '023': 'ME', '024': 'MD', '025': 'MA', '026': 'MI', '027': 'MN',
+    '028': 'MS', '029': 'MO', '030': 'MT', '031': 'NE', '032': 'NV', '033': 'NH',
+    '034': 'NJ', '035': 'NM', '036': 'NY', '037': 'NC', '038': 'ND', '039': 'OH',
+    '040': 'OK', '041': 'OR', '042': 'PA', '044': 'RI', '045': 'SC', '046': 'SD',
+    '047': 'TN', '048': 'TX', '049': 'UT', '050': 'VT', '051': 'VA', '053': 'WA',
+    '054': 'WV', '055': 'WI', '056': 'WY',
+    # Marine/coastal SAME codes
+    '057': 'CA', '058': 'FL', '059': 'TX',
+}
+
+_state_enrichment = StateEnrichmentService()
+
+# pyshp shape type for polygons (shapefile.POLYGON)
+SHAPEFILE_POLYGON = 5
+
+
+def compute_feature_fingerprint(feature: Dict) -> str:
+    """
+    SHA256 fingerprint of a normalized NWS feature
+    Key order and whitespace are normalized so identical content always hashes the same
+    """
+    normalized = json.dumps(feature, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def is_test_message(properties: Dict) -> bool:
+    """Comprehensive test message detection patterns"""
+    alert_id = properties.get('id')
+    description = properties.get('description', '')
+    instruction = properties.get('instruction', '')
+    headline = properties.get('headline', '')
+
+    return (
+        properties.get('event', '') == 'Test Message' or
+        properties.get('status', '') == 'Test' or
+        'monitoring message only' in (description or '').lower() or
+        'monitoring message only' in (instruction or '').lower() or
+        'please disregard' in (description or '').lower() or
+        'please disregard' in (instruction or '').lower() or
+        'test message' in (headline or '').lower() or
+        'KEEPALIVE' in (alert_id or '')
+    )
+
+
+def parse_datetime(dt_string: Optional[str]) -> Optional[datetime]:
+    """Parse ISO datetime string from NWS API"""
+    if not dt_string:
+        return None
+
+    try:
+        # Handle various ISO formats
+        if dt_string.endswith('Z'):
+            dt_string = dt_string[:-1] + '+00:00'
+
+        return datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
+    except ValueError as e:
+        logger.warning(f"Could not parse datetime '{dt_string}': {e}")
+        return None
+
+
+# ----------------------------------------------------------------------
+# Location fields (shared with the Alert model methods)
+# ----------------------------------------------------------------------
+
+def extract_fips_codes(properties: Optional[Dict]) -> List[str]:
+    """FIPS codes from geocode.UGC (first 5 digits) and direct FIPS references"""
+    fips_codes = []
+    if properties:
+        geocode = properties.get('geocode', {})
+        if isinstance(geocode, dict):
+            # FIPS codes may be in UGC (Universal Geographic Code) format
+            ugc = geocode.get('UGC', [])
+            if isinstance(ugc, list):
+                for code in ugc:
+                    if isinstance(code, str) and len(code) >= 5:
+                        fips = code[:5]
+                        if fips.isdigit():
+                            fips_codes.append(fips)
+
+        fips_prop = properties.get('FIPS', [])
+        if isinstance(fips_prop, list):
+            fips_codes.extend([str(f) for f in fips_prop if str(f).isdigit()])
+
+    return list(set(fips_codes)) if fips_codes else []
+
+
+def extract_area_states(area_desc: Optional[str]) -> List[str]:
+    """Extract state codes from area description"""
+    if not area_desc:
+        return []
+
+    # Match state abbreviations (e.g., "FL", "CA", "TX")
+    return list(set(re.findall(r'\b([A-Z]{2})\b', area_desc)))
+
+
+def extract_area_counties(area_desc: Optional[str]) -> List[str]:
+    """Extract county names from area description"""
+    if not area_desc:
+        return []
+
+    counties = []
+    for area in area_desc.split(';'):
+        area = area.strip()
+        # Match pattern "County Name, ST"
+        county_match = re.match(r'^([^,]+),\s*([A-Z]{2})$', area)
+        if county_match:
+            county_name = county_match.group(1).strip()
+            # Remove " County" suffix if present
+            county_name = re.sub(r'\s+County$', '', county_name)
+            counties.append(county_name)
+
+    return counties
+
+
+def states_from_ugc(ugc_codes: list) -> list:
+    """Extract state codes from UGC codes"""
+    states = []
+    for ugc in ugc_codes:
+        if isinstance(ugc, str) and len(ugc) >= 2:
+            state_prefix = ugc[:2].upper()
+            if state_prefix in UGC_STATE_MAPPING:
+                states.append(UGC_STATE_MAPPING[state_prefix])
+    return states
+
+
+def states_from_same(same_codes: list) -> list:
+    """Extract state codes from SAME codes"""
+    states = []
+    for same in same_codes:
+        if isinstance(same, str) and len(same) >= 3:
+            state_code = same[:3]
+            if state_code in SAME_STATE_MAPPING:
+                states.append(SAME_STATE_MAPPING[state_code])
+    return states
+
+
+def extract_county_state_data(area_desc: Optional[str], properties: Optional[Dict]) -> Tuple[List[Dict], List[str]]:
+    """County-state mapping and affected states from area description, UGC and SAME codes"""
+    states = extract_area_states(area_desc)
+
+    if properties:
+        geocode = properties.get('geocode', {})
+        if isinstance(geocode, dict):
+            ugc_codes = geocode.get('UGC', [])
+            if isinstance(ugc_codes, list):
+                states.extend(states_from_ugc(ugc_codes))
+
+            same_codes = geocode.get('SAME', [])
+            if isinstance(same_codes, list):
+                states.extend(states_from_same(same_codes))
+
+    # Parse format like "Barton, KS; Rice, KS"
+    county_state_mapping = []
+    if area_desc:
+        for part in area_desc.split(';'):
+            part = part.strip()
+            if ',' in part:
+                county_part, state_part = part.rsplit(',', 1)
+                county_name = county_part.strip()
+                state_code = state_part.strip()
+                if len(state_code) == 2:  # Valid state abbreviation
+                    county_state_mapping.append({
+                        'county': county_name,
+                        'state': state_code
+                    })
+
+    return county_state_mapping, list(set(states))
+
+
+def extract_city_data(alert_id: Optional[str], area_desc: Optional[str]) -> Tuple[List[str], float]:
+    """Phase 2: standardized city names and location confidence from area description"""
+    try:
+        if not area_desc:
+            return [], 0.0
+
+        location_matches = city_enrichment_service.extract_cities_from_area_desc(area_desc)
+
+        # Only include confident matches
+        city_names = [match.city for match in location_matches if match.confidence >= 0.5]
+        logger.debug(f"Enriched alert {alert_id} with cities: {city_names}")
+
+        if location_matches:
+            return city_names, round(max(match.confidence for match in location_matches), 2)
+        return city_names, 0.0
+
+    except Exception as e:
+        logger.warning(f"Error extracting city names for alert {alert_id}: {e}")
+        return [], 0.0
+
+
+def enrich_missing_states(alert_id: Optional[str], affected_states, properties: Optional[Dict]):
+    """Fill affected_states from UGC codes when the location pass found none"""
+    try:
+        if affected_states and isinstance(affected_states, list) and len(affected_states) > 0:
+            return affected_states  # Already enriched
+
+        ugc_codes = []
+        if properties and 'geocode' in properties:
+            geocode = properties['geocode']
+            if 'UGC' in geocode:
+                ugc_codes = geocode['UGC']
+
+        if ugc_codes:
+            states = list(_state_enrichment.extract_states_from_ugc(ugc_codes))
+            if states:
+                logger.debug(f"Auto-enriched alert {alert_id} with states: {states}")
+                return states
+
+    except Exception as e:
+        logger.warning(f"Failed to auto-enrich states for alert {alert_id}: {e}")
+
+    return affected_states
+
+
+# ----------------------------------------------------------------------
+# NWS features -> alert rows
+# ----------------------------------------------------------------------
+
+# Columns copied straight from the feature; never sent back from worker processes
+PAYLOAD_COLUMNS = ('geometry', 'properties', 'raw')
+
+
+def derive_feature_columns(feature: Dict, fingerprint: Optional[str] = None) -> Dict:
+    """
+    Every derived alerts column for one feature (all but PAYLOAD_COLUMNS and the geometry analysis)
+    Mirrors IngestService's original per-alert normalization
+    """
+    properties = feature.get('properties', {})
+    alert_id = properties.get('id')
+    area_desc = properties.get('areaDesc')
+
+    columns = {
+        'id': alert_id,
+        'event': properties.get('event'),
+        'severity': properties.get('severity'),
+        'area_desc': area_desc,
+        'effective': parse_datetime(properties.get('effective')),
+        'expires': parse_datetime(properties.get('expires')),
+        'sent': parse_datetime(properties.get('sent')),
+        'content_hash': fingerprint or compute_feature_fingerprint(feature),
+        'radar_indicated': radar_extractor.parse_radar_indicated(properties),
+        'fips_codes': None,
+        'county_names': None,
+        'city_names': None,
+        'location_confidence': None,
+        'geometry_type': None,
+        'coordinate_count': None,
+        'affected_states': None,
+        'geometry_bounds': None,
+    }
+
+    # Location fields are only derived for alerts that carry a geometry
+    if feature.get('geometry'):
+        try:
+            columns['fips_codes'] = extract_fips_codes(properties)
+            columns['county_names'], columns['affected_states'] = extract_county_state_data(area_desc, properties)
+            columns['city_names'], columns['location_confidence'] = extract_city_data(alert_id, area_desc)
+        except Exception as e:
+            logger.warning(f"Error processing geometry for alert {alert_id}: {e}")
+
+    # Automatic state enrichment if missing
+    columns['affected_states'] = enrich_missing_states(alert_id, columns['affected_states'], properties)
+
+    return columns
+
+
+def derive_alert_columns(features: List[Dict],
+                         fingerprints: Optional[List[Optional[str]]] = None) -> List[Tuple[Optional[Dict], Optional[str]]]:
+    """
+    Derive alert columns for a chunk of NWS features; geometry analysis runs once for the chunk
+    Picklable and ORM-free: this is the unit of work NormalizationPool sends to worker processes.
+    Returns one (columns, error) pair per feature; columns is None when normalization failed.
+    """
+    fingerprints = fingerprints or [None] * len(features)
+    results = []
+
+    for feature, fingerprint in zip(features, fingerprints):
+        try:
+            results.append((derive_feature_columns(feature, fingerprint), None))
+        except Exception as e:
+            results.append((None, str(e)))
+
+    analyses = analyze_geometries([
+        feature.get('geometry') if columns else None
+        for feature, (columns, _) in zip(features, results)
+    ])
+    for (columns, _), analysis in zip(results, analyses):
+        if columns is not None and analysis is not None:
+            columns['geometry_type'] = analysis['geometry_type']
+            columns['coordinate_count'] = analysis['coordinate_count']
+            columns['geometry_bounds'] = analysis['geometry_bounds']
+
+    return results
+
+
+def attach_payload(feature: Dict, columns: Dict) -> Dict:
+    """Complete a derived column dict with the feature payload columns (geometry, properties, raw envelope)"""
+    row = dict(columns)
+    row['geometry'] = feature.get('geometry')
+    row['properties'] = feature.get('properties', {})
+    row['raw'] = compact_feature(feature)
+    return row
+
+
+def normalize_features(features: List[Dict],
+                       fingerprints: Optional[List[Optional[str]]] = None,
+                       pool: Optional['NormalizationPool'] = None) -> List[Tuple[Optional[Dict], Optional[str]]]:
+    """
+    Normalize NWS features into complete alert row dicts keyed by column name
+    With a pool, derivation runs on worker processes and only the small derived dicts travel back.
+    Returns one (row, error) pair per feature; row is None when normalization failed.
+    """
+    fingerprints = fingerprints or [None] * len(features)
+    if pool is not None:
+        derived = pool.map_chunks(derive_alert_columns, features, fingerprints)
+    else:
+        derived = derive_alert_columns(features, fingerprints)
+
+    return [
+        (attach_payload(feature, columns) if columns is not None else None, error)
+        for feature, (columns, error) in zip(features, derived)
+    ]
+
+
+# ----------------------------------------------------------------------
+# IEM shapefile records -> alert records
+# ----------------------------------------------------------------------
+
+def pyshp_to_shapely(pyshp_shape) -> Optional[object]:
+    """Convert a pyshp polygon shape to a Shapely Polygon/MultiPolygon"""
+    from shapely.geometry import Polygon, MultiPolygon
+
+    try:
+        if pyshp_shape.shapeType == SHAPEFILE_POLYGON:
+            if len(pyshp_shape.parts) == 1:
+                # Simple polygon
+                coords = list(pyshp_shape.points)
+                if len(coords) < 3:
+                    return None
+
+                # Close polygon if not closed
+                if coords[0] != coords[-1]:
+                    coords.append(coords[0])
+
+                return Polygon(coords)
+            else:
+                # Polygon with holes or MultiPolygon
+                polygons = []
+                parts = list(pyshp_shape.parts) + [len(pyshp_shape.points)]
+
+                for i in range(len(parts) - 1):
+                    ring_coords = pyshp_shape.points[parts[i]:parts[i + 1]]
+
+                    if len(ring_coords) < 3:
+                        continue
+
+                    # Close ring if not closed
+                    if ring_coords[0] != ring_coords[-1]:
+                        ring_coords.append(ring_coords[0])
+
+                    polygons.append(Polygon(ring_coords))
+
+                if len(polygons) == 1:
+                    return polygons[0]
+                elif len(polygons) > 1:
+                    return MultiPolygon(polygons)
+
+        return None
+
+    except Exception as e:
+        logger.error(f"Error converting pyshp to Shapely: {e}")
+        return None
+
+
+def normalize_shape_records(records: List[Tuple[Dict, object]]) -> List[Dict]:
+    """
+    Convert (attributes, pyshp shape) pairs into IEM alert records with GeoJSON geometry and analysis
+    Picklable: used directly and by NormalizationPool
+    """
+    from shapely.geometry import mapping
+
+    alert_records = []
+    for attributes, shape in records:
+        try:
+            if not shape.parts:
+                logger.warning("Shape with no parts, skipping")
+                continue
+
+            shapely_geom = pyshp_to_shapely(shape)
+            if not shapely_geom:
+                continue
+
+            alert_records.append({
+                'attributes': attributes,
+                'geometry': mapping(shapely_geom),
+                'shape': shapely_geom,
+                'original_geom': shape  # Keep original for debugging
+            })
+        except Exception as e:
+            logger.error(f"Error processing shape record: {e}")
+            continue
+
+    # Vertex counts and bounds for the whole chunk in one set of array operations
+    for alert_record, analysis in zip(alert_records, analyze_shapes([r['shape'] for r in alert_records])):
+        alert_record['geometry_analysis'] = analysis
+
+    return alert_records
+
+
+# ----------------------------------------------------------------------
+# Optional process pool
+# ----------------------------------------------------------------------
+
+class NormalizationPool:
+    """
+    Optional process pool for CPU-bound normalization
+    Inputs are split into chunks and sent to module-level (picklable, ORM-free) functions;
+    the caller keeps all database work. workers=0 runs everything on the calling thread.
+    """
+
+    def __init__(self, workers: int = 0, chunk_size: int = 25, start_method: str = 'fork'):
+        self.workers = max(0, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.start_method = start_method
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def map_chunks(self, fn: Callable, items: List, *columns: List) -> List:
+        """
+        Run fn(items_chunk, *column_chunks) -> list over every chunk and concatenate the results in order
+        Small inputs, a disabled pool or a broken pool fall back to one in-process call
+        """
+        if not self.enabled or len(items) <= self.chunk_size:
+            return fn(items, *columns)
+
+        try:
+            executor = self._get_executor()
+            futures = [
+                executor.submit(fn, items[i:i + self.chunk_size], *[column[i:i + self.chunk_size] for column in columns])
+                for i in range(0, len(items), self.chunk_size)
+            ]
+            results = []
+            for future in futures:
+                results.extend(future.result())
+            return results
+        except BrokenProcessPool as e:
+            logger.warning(f"Normalization pool broke, normalizing {len(items)} items in-process: {e}")
+            self.shutdown()
+            return fn(items, *columns)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                context = multiprocessing.get_context(self.start_method)
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                logger.info(f"Started normalization pool: {self.workers} workers ({self.start_method})")
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Global pool instance shared by ingestion and backfills (disabled unless NORMALIZE_WORKERS > 0)
+normalization_pool = NormalizationPool(
+    workers=Config.NORMALIZE_WORKERS,
+    chunk_size=Config.NORMALIZE_CHUNK_SIZE,
+    start_method=Config.NORMALIZE_START_METHOD
+)
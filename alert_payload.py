@@ -0,0 +1,129 @@
+"""
+Alert Payload Storage for HailyDB
+Single-copy feature storage: the raw column keeps only what the geometry/properties columns do not
+"""
+
+import argparse
+import logging
+from typing import Dict, Optional
+from sqlalchemy import text
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Feature keys stored in their own alerts columns; a compact raw envelope carries neither
+SPLIT_FEATURE_KEYS = ('geometry', 'properties')
+
+# Full feature for SQL consumers: SELECT alert_feature(a) FROM alerts a (or a.alert_feature)
+ALERT_FEATURE_FUNCTION_SQL = """
+CREATE OR REPLACE FUNCTION alert_feature(a alerts) RETURNS jsonb AS $$
+    SELECT CASE
+        WHEN a.raw IS NULL OR a.raw ? 'geometry' OR a.raw ? 'properties' THEN a.raw
+        ELSE a.raw || jsonb_build_object('geometry', a.geometry, 'properties', a.properties)
+    END
+$$ LANGUAGE sql STABLE
+"""
+
+# Rows whose raw still duplicates the geometry/properties columns exactly, walked in primary-key
+# order from :after so each batch resumes where the last one stopped instead of rescanning
+COMPACT_BATCH_SQL = """
+WITH compacted AS (
+UPDATE alerts SET raw = raw - 'geometry' - 'properties'
+WHERE id IN (
+    SELECT id FROM alerts
+    WHERE raw ? 'geometry' AND raw ? 'properties'
+      AND raw->'properties' IS NOT DISTINCT FROM COALESCE(properties, 'null'::jsonb)
+      AND raw->'geometry' IS NOT DISTINCT FROM COALESCE(geometry, 'null'::jsonb)
+      AND id > :after
+    ORDER BY id
+    LIMIT :batch_size
+)
+RETURNING id
+)
+SELECT COUNT(*), MAX(id) FROM compacted
+"""
+
+DUPLICATED_PAYLOADS_SQL = """
+SELECT COUNT(*), COALESCE(SUM(pg_column_size(raw)), 0) FROM alerts
+WHERE raw ? 'geometry' AND raw ? 'properties'
+  AND raw->'properties' IS NOT DISTINCT FROM COALESCE(properties, 'null'::jsonb)
+  AND raw->'geometry' IS NOT DISTINCT FROM COALESCE(geometry, 'null'::jsonb)
+"""
+
+
+def compact_feature(feature: Optional[Dict]) -> Optional[Dict]:
+    """
+    Raw column value for a feature in compact payload mode (id, type, ...; no geometry/properties)
+    Features missing either split key are stored whole so expand_feature can tell the forms apart
+    """
+    if not Config.ALERT_COMPACT_PAYLOAD or not isinstance(feature, dict):
+        return feature
+    if not all(key in feature for key in SPLIT_FEATURE_KEYS):
+        return feature
+    return {key: value for key, value in feature.items() if key not in SPLIT_FEATURE_KEYS}
+
+
+def expand_feature(raw: Optional[Dict], geometry: Optional[Dict], properties: Optional[Dict]) -> Optional[Dict]:
+    """
+    Full NWS feature from a stored raw value and the geometry/properties columns
+    Legacy rows (raw still holding the whole feature) and rows without raw are returned unchanged
+    """
+    if not isinstance(raw, dict) or any(key in raw for key in SPLIT_FEATURE_KEYS):
+        return raw
+    feature = dict(raw)
+    feature['geometry'] = geometry
+    feature['properties'] = properties
+    return feature
+
+
+def ensure_payload_schema(session) -> None:
+    """Create/refresh the alert_feature() SQL function (idempotent)"""
+    session.execute(text(ALERT_FEATURE_FUNCTION_SQL))
+
+
+def compact_stored_payloads(session, batch_size: int = 1000, dry_run: bool = False) -> Dict:
+    """
+    Deduplicate existing rows: strip geometry/properties out of raw wherever they equal the columns
+    Runs in committed batches so the table is never locked for the whole migration; safe to re-run.
+    Rows whose raw diverges from the columns keep their full feature.
+    """
+    row_count, raw_bytes = session.execute(text(DUPLICATED_PAYLOADS_SQL)).fetchone()
+    logger.info(f"{row_count} alerts duplicate their payload in raw ({raw_bytes / 1024 / 1024:.1f} MB of raw)")
+    stats = {'duplicated_rows': row_count, 'duplicated_raw_bytes': int(raw_bytes), 'compacted_rows': 0}
+    if dry_run:
+        return stats
+
+    ensure_payload_schema(session)
+    session.commit()
+
+    after = ''
+    while True:
+        # The last id comes from SQL so it follows the database's collation
+        compacted, last_id = session.execute(text(COMPACT_BATCH_SQL), {'after': after, 'batch_size': batch_size}).fetchone()
+        session.commit()
+        if not compacted:
+            break
+        after = last_id
+        stats['compacted_rows'] += compacted
+        logger.info(f"Compacted {stats['compacted_rows']}/{row_count} alert payloads")
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deduplicate alert payloads (raw vs geometry/properties columns)")
+    parser.add_argument('--batch-size', type=int, default=1000, help='rows updated per transaction')
+    parser.add_argument('--dry-run', action='store_true', help='only report how many rows would be compacted')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from app import app, db
+    with app.app_context():
+        stats = compact_stored_payloads(db.session, batch_size=args.batch_size, dry_run=args.dry_run)
+    print(stats)
+
+
+if __name__ == '__main__':
+    main()
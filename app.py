@@ -1,6 +1,6 @@
 import os
 import logging
-from flask import Flask, jsonify, request, render_template, redirect, url_for, flash
+from flask import Flask, jsonify, request, render_template, redirect, url_for, flash, Response, stream_with_context
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
@@ -188,11 +188,19 @@ def determine_enhanced_status(log_row):
             }
 
 # Import other modules after app initialization
-from models import Alert, SPCReport, SPCIngestionLog, SchedulerLog, HurricaneTrack
+from models import Alert, SPCReport, SPCIngestionLog, SchedulerLog, HurricaneTrack, hydrate_spc_reports
 from ingest import IngestService
 from enrich import EnrichmentService
+from llm_cache import llm_cache
+from geocode_cache import geocode_cache
+from alert_containment import alert_containment
+from portfolio_screening import (
+    portfolio_screener, PortfolioJobWorker, create_job, get_job, iter_job_results, parse_date_range, parse_points
+)
 from spc_ingest import SPCIngestService
+from spc_backfill_engine import SPCBackfillEngine
 from spc_matcher import SPCMatchingService
+from spc_match_store import report_alert_count, report_alert_ids
 from spc_verification import SPCVerificationService
 from hurricane_ingest import HurricaneIngestService
 from scheduler_service import SchedulerService
@@ -204,7 +212,9 @@ import atexit
 ingest_service = None
 enrich_service = None
 spc_ingest_service = None
+spc_backfill_engine = None
 spc_matching_service = None
+portfolio_worker = None
 scheduler_service = None
 scheduler = None
 autonomous_scheduler = None
@@ -218,7 +228,9 @@ with app.app_context():
     ingest_service = IngestService(db)
     enrich_service = EnrichmentService(db)
     spc_ingest_service = SPCIngestService(db.session)
+    spc_backfill_engine = SPCBackfillEngine(db.session)
     spc_matching_service = SPCMatchingService(db.session)
+    portfolio_worker = PortfolioJobWorker(db.session)
     hurricane_ingest_service = HurricaneIngestService(db.session)
     scheduler_service = SchedulerService(db)
     
@@ -320,7 +332,7 @@ def get_alerts_legacy():
                 Alert.ai_summary.ilike(search_pattern),
                 Alert.properties['headline'].astext.ilike(search_pattern),
                 Alert.properties['description'].astext.ilike(search_pattern),
-                Alert.raw['properties']['areaDesc'].astext.ilike(search_pattern)
+                Alert.properties['areaDesc'].astext.ilike(search_pattern)
             )
         )
     
@@ -571,6 +583,7 @@ def get_alerts_by_county(state, county):
         )
     
     alerts = query.all()
+    hydrate_spc_reports(alerts)
     
     return jsonify({
         'state': state,
@@ -589,6 +602,7 @@ def get_active_alerts():
         Alert.effective <= now,
         Alert.expires > now
     ).order_by(Alert.severity.desc(), Alert.ingested_at.desc()).all()
+    hydrate_spc_reports(alerts)
     
     return jsonify({
         'timestamp': now.isoformat(),
@@ -688,6 +702,7 @@ def get_radar_detected_alerts():
     # Execute query
     total = query.count()
     alerts = query.order_by(Alert.effective.desc()).offset((page - 1) * limit).limit(limit).all()
+    hydrate_spc_reports(alerts)
     
     # Format as GeoJSON FeatureCollection
     features = []
@@ -799,6 +814,7 @@ def get_radar_detected_wind():
     # Execute query
     total = query.count()
     alerts = query.order_by(Alert.effective.desc()).offset((page - 1) * limit).limit(limit).all()
+    hydrate_spc_reports(alerts)
     
     # Format as GeoJSON FeatureCollection
     features = []
@@ -910,6 +926,7 @@ def get_radar_detected_hail():
     # Execute query
     total = query.count()
     alerts = query.order_by(Alert.effective.desc()).offset((page - 1) * limit).limit(limit).all()
+    hydrate_spc_reports(alerts)
     
     # Format as GeoJSON FeatureCollection
     features = []
@@ -939,7 +956,7 @@ def get_radar_detected_hail():
 @app.route('/api/test/radar-parsing', methods=['POST'])
 def test_radar_parsing():
     """Test endpoint for radar-indicated parsing"""
-    from ingest import IngestService
+    from radar_extraction import radar_extractor
     
     test_data = request.json if request.json else {}
     
@@ -958,14 +975,13 @@ def test_radar_parsing():
         test_data.get('properties', {})
     ]
     
-    ingest_service = IngestService(db)
     results = []
     
     for i, properties in enumerate(test_cases):
         if not properties.get('event'):
             continue
             
-        radar_data = ingest_service._parse_radar_indicated(properties)
+        radar_data = radar_extractor.parse_radar_indicated(properties)
         results.append({
             'test_case': i + 1,
             'input': properties,
@@ -1131,6 +1147,7 @@ def get_expired_alerts():
     # Execute query with pagination
     total = query.count()
     events = query.order_by(Alert.effective.desc()).offset((page - 1) * limit).limit(limit).all()
+    hydrate_spc_reports(events)
     
     # Format response following NWS API OpenAPI specification
     features = []
@@ -1267,6 +1284,7 @@ def search_alerts():
     # Execute query with pagination
     total = query.count()
     alerts = query.order_by(Alert.ingested_at.desc()).offset((page - 1) * limit).limit(limit).all()
+    hydrate_spc_reports(alerts)
     
     return jsonify({
         'total': total,
@@ -1410,6 +1428,9 @@ def get_enrichment_stats():
     """Get enrichment statistics including priority alert coverage"""
     try:
         stats = enrich_service.get_enrichment_stats()
+        # Live throughput/backlog of the running (or last) concurrent enrichment
+        stats['executor'] = enrich_service.executor_metrics()
+        stats['llm_cache'] = llm_cache.stats()
         return jsonify(stats)
     except Exception as e:
         logger.error(f"Error getting enrichment stats: {e}")
@@ -1687,7 +1708,7 @@ def get_unified_report(report_id):
             },
             "context": {
                 "enhanced_summary": enhanced_context.get("enhanced_summary") if enhanced_context else None,
-                "verified_alerts": enhanced_context.get("alert_count", 0) if enhanced_context else 0,
+                "verified_alerts": report_alert_count(db.session, report.id),
                 "radar_confirmed": enhanced_context.get("radar_polygon_match", False) if enhanced_context else False,
                 "nearby_locations": enhanced_context.get("location_context", {}).get("nearby_places", []) if enhanced_context else []
             },
@@ -1849,28 +1870,11 @@ def view_spc_report_detail(report_id):
     try:
         report = SPCReport.query.get_or_404(report_id)
         
-        # Get verified alerts that match this SPC report
-        verified_alerts = Alert.query.filter(
-            Alert.spc_verified == True,
-            Alert.spc_reports.isnot(None)
-        ).all()
-        
-        # Filter alerts that actually reference this specific report
+        # Verified alerts matched to this SPC report (alert_spc_matches report index)
         matching_alerts = []
-        for alert in verified_alerts:
-            if alert.spc_reports:
-                # Check if this report ID is referenced in the alert's SPC reports
-                alert_report_ids = []
-                try:
-                    if isinstance(alert.spc_reports, list):
-                        for spc_rep in alert.spc_reports:
-                            if isinstance(spc_rep, dict) and 'id' in spc_rep:
-                                alert_report_ids.append(spc_rep['id'])
-                except:
-                    pass
-                
-                if report_id in alert_report_ids:
-                    matching_alerts.append(alert)
+        matched_ids = report_alert_ids(db.session, report_id)
+        if matched_ids:
+            matching_alerts = Alert.query.filter(Alert.id.in_(matched_ids)).order_by(Alert.effective.desc()).all()
         
         # Add the verified alerts to the report object
         report.verified_alerts = matching_alerts
@@ -2136,6 +2140,7 @@ def api_alerts():
         
         # Apply pagination and ordering
         alerts = query.order_by(Alert.effective.desc()).offset(offset).limit(limit).all()
+        hydrate_spc_reports(alerts)
         
         # Format response
         events = []
@@ -3184,13 +3189,80 @@ def spc_backfill():
             pass  # log_entry may not exist if error occurred early
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/internal/spc-backfill/start', methods=['POST'])
+def spc_backfill_start():
+    """Start an in-process multi-day SPC backfill in the background (resumes from SPCIngestionLog)"""
+    import threading
+
+    data = request.get_json() or {}
+    try:
+        start_date = datetime.strptime(data.get('start_date', ''), '%Y-%m-%d').date()
+        end_date = datetime.strptime(data.get('end_date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return jsonify({'success': False, 'message': 'start_date and end_date required (use YYYY-MM-DD)'}), 400
+
+    if start_date > end_date:
+        return jsonify({'success': False, 'message': 'start_date must be before end_date'}), 400
+
+    if spc_backfill_engine.running:
+        return jsonify({'success': False, 'message': 'SPC backfill already running',
+                        'progress': spc_backfill_engine.get_progress()}), 409
+
+    force = bool(data.get('force', False))
+    replace = bool(data.get('replace', False))
+
+    def run_backfill():
+        with app.app_context():
+            log_entry = scheduler_service.log_operation_start("spc_backfill", "manual")
+            try:
+                progress = spc_backfill_engine.run(start_date, end_date, force=force, replace=replace)
+                scheduler_service.log_operation_complete(
+                    log_entry, progress['failed_days'] == 0, progress['reports_stored'], progress['reports_stored']
+                )
+            except Exception as e:
+                logger.error(f"SPC backfill engine failed: {e}")
+                scheduler_service.log_operation_complete(log_entry, False, 0, 0, str(e))
+            finally:
+                db.session.remove()
+
+    threading.Thread(target=run_backfill, name='spc-backfill-engine', daemon=True).start()
+    return jsonify({'success': True, 'message': f'SPC backfill started for {start_date} to {end_date}'}), 202
+
+@app.route('/internal/spc-backfill/progress')
+def spc_backfill_progress():
+    """Progress, throughput and ETA of the current or last SPC backfill engine run"""
+    return jsonify(spc_backfill_engine.get_progress())
+
 @app.route('/internal/spc-match', methods=['POST'])
 def spc_match():
-    """Trigger SPC matching process"""
+    """Trigger SPC matching process (JSON {"mode": "incremental"} drains the queue; "bulk" | "postgis" with "since", "until" rematch a range)"""
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode')
+    try:
+        since = datetime.strptime(data['since'], '%Y-%m-%d') if data.get('since') else None
+        until = datetime.strptime(data['until'], '%Y-%m-%d') if data.get('until') else None
+    except ValueError:
+        return jsonify({'success': False, 'error': 'since and until must use YYYY-MM-DD'}), 400
+    
     try:
         log_entry = scheduler_service.log_operation_start("spc_match", "manual")
         
-        result = spc_matching_service.match_spc_reports_batch(limit=500)
+        if mode == 'bulk':
+            result = spc_matching_service.match_alerts_bulk(
+                since=since, until=until,
+                include_verified=bool(data.get('include_verified', False)),
+                limit=data.get('limit')
+            )
+        elif mode == 'incremental':
+            result = spc_matching_service.match_incremental()
+        elif mode == 'postgis':
+            result = spc_matching_service.match_alerts_postgis(
+                since=since, until=until,
+                include_verified=bool(data.get('include_verified', False)),
+                buffer_miles=float(data['buffer_miles']) if data.get('buffer_miles') is not None else None
+            )
+        else:
+            result = spc_matching_service.match_spc_reports_batch(limit=500)
         processed = result.get('processed', 0)
         matched = result.get('matched', 0)
         
@@ -3234,6 +3306,7 @@ def generate_ai_summaries():
                 'generated': 0
             })
         
+        hydrate_spc_reports(alerts)
         summarizer = MatchSummarizer()
         generated = 0
         
@@ -4122,6 +4195,7 @@ def get_alerts():
             
             # Apply pagination
             alerts = query.order_by(Alert.effective.desc()).offset((page - 1) * per_page).limit(per_page).all()
+            hydrate_spc_reports(alerts)
             
             # Convert to JSON-serializable format
             alerts_data = []
@@ -4432,7 +4506,7 @@ def spc_matches_data():
                     Alert.spc_ai_summary.ilike(search_pattern),
                     Alert.properties['headline'].astext.ilike(search_pattern),
                     Alert.properties['description'].astext.ilike(search_pattern),
-                    Alert.raw['properties']['areaDesc'].astext.ilike(search_pattern)
+                    Alert.properties['areaDesc'].astext.ilike(search_pattern)
                 )
             )
         
@@ -4482,6 +4556,8 @@ def spc_matches_data():
                 state_matches = re.findall(r'\b([A-Z]{2})\b', match.area_desc)
                 states.update(state_matches)
         
+        hydrate_spc_reports(matches)
+        
         # Format matches for JSON response
         formatted_matches = []
         for match in matches:
@@ -5410,7 +5486,8 @@ def get_radar_alerts_summary():
 def contains_address():
     """
     Point-in-polygon API endpoint for address-specific radar alert verification
-    Geocodes address and returns all radar-detected events containing that point
+    Geocodes address and returns all radar-detected events whose polygon contains that point
+    Optional buffer_miles also returns polygons passing within that distance of it
     """
     try:
         address = request.args.get('address')
@@ -5419,37 +5496,23 @@ def contains_address():
         
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
+        try:
+            buffer_miles = float(request.args.get('buffer_miles', 0))
+        except ValueError:
+            return jsonify({'error': 'buffer_miles must be a number'}), 400
+        if not 0 <= buffer_miles <= Config.CONTAINMENT_MAX_BUFFER_MILES:
+            return jsonify({'error': f'buffer_miles must be between 0 and {Config.CONTAINMENT_MAX_BUFFER_MILES:g}'}), 400
         
         # Geocode address to lat/lon
         lat, lon = geocode_address(address)
         if lat is None or lon is None:
             return jsonify({'error': 'Unable to geocode address'}), 400
         
-        # Query for radar-detected events containing this point
-        from models import Alert
-        
-        # Base query for radar-detected events
-        query = db.session.query(Alert).filter(
-            Alert.radar_indicated.isnot(None),
-            db.text("(radar_indicated->>'hail_inches')::float >= 0.00 OR (radar_indicated->>'wind_mph')::float >= 50")
-        )
-        
-        # Add date filters if provided
-        if start_date:
-            query = query.filter(Alert.effective >= start_date)
-        if end_date:
-            query = query.filter(Alert.effective <= end_date)
-        
-        # Filter by bounding box first for performance, then do precise point-in-polygon test
-        bbox_margin = 0.1  # ~11km margin for initial filtering
-        query = query.filter(
-            db.text("geometry_bounds->>'min_lat' <= :max_lat").params(max_lat=str(lat + bbox_margin)),
-            db.text("geometry_bounds->>'max_lat' >= :min_lat").params(min_lat=str(lat - bbox_margin)),
-            db.text("geometry_bounds->>'min_lon' <= :max_lon").params(max_lon=str(lon + bbox_margin)),
-            db.text("geometry_bounds->>'max_lon' >= :min_lon").params(min_lon=str(lon - bbox_margin))
+        # Indexed bounding-box prefilter, then exact containment
+        alert_ids = alert_containment.find_alert_ids(
+            db.session, lat, lon, buffer_miles=buffer_miles, start_date=start_date, end_date=end_date
         )
-        
-        alerts = query.order_by(Alert.effective.desc()).all()
+        alerts = Alert.query.filter(Alert.id.in_(alert_ids)).order_by(Alert.effective.desc()).all() if alert_ids else []
         
         # Format results
         results = []
@@ -5477,6 +5540,7 @@ def contains_address():
         return jsonify({
             'address': address,
             'coordinates': {'lat': lat, 'lon': lon},
+            'buffer_miles': buffer_miles,
             'total_events': len(results),
             'events': results
         })
@@ -5485,6 +5549,81 @@ def contains_address():
         logger.error(f"Error in contains-address API: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/portfolio/screen', methods=['POST'])
+def api_portfolio_screen():
+    """
+    Screen many locations against radar-detected alert polygons in one request
+    Body: {"points": [{"id", "lat", "lon"}, ...], "start_date", "end_date"} or NDJSON points
+    (Content-Type application/x-ndjson, dates as query args). Small inputs stream NDJSON results
+    back directly; inputs over PORTFOLIO_SYNC_MAX_POINTS (or async=true) become a background job.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        try:
+            items = [json.loads(line) for line in request.get_data(as_text=True).splitlines() if line.strip()]
+        except ValueError as e:
+            return jsonify({'error': f'Invalid NDJSON: {e}'}), 400
+        options = request.args
+    else:
+        data = request.get_json(silent=True) or {}
+        items = data.get('points')
+        options = {**request.args.to_dict(), **{key: data[key] for key in ('start_date', 'end_date') if data.get(key)}}
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'points must be a non-empty list of {"id", "lat", "lon"}'}), 400
+    if len(items) > Config.PORTFOLIO_MAX_POINTS:
+        return jsonify({'error': f'At most {Config.PORTFOLIO_MAX_POINTS} points per request'}), 400
+    try:
+        start_date, end_date = parse_date_range(options.get('start_date'), options.get('end_date'))
+    except ValueError as e:
+        return jsonify({'error': 'Invalid date range', 'message': f'Use YYYY-MM-DD: {e}'}), 400
+
+    points, invalid = parse_points(items)
+    if len(points) > Config.PORTFOLIO_SYNC_MAX_POINTS or request.args.get('async', 'false').lower() == 'true':
+        job_id = create_job(db.session, points, start_date, end_date, invalid=invalid)
+        portfolio_worker.start(app)
+        return jsonify({
+            'job_id': job_id,
+            'status': 'pending',
+            'points': len(points),
+            'invalid_count': len(invalid),
+            'invalid_points': invalid[:100],
+            'status_url': url_for('api_portfolio_job', job_id=job_id),
+            'results_url': url_for('api_portfolio_job_results', job_id=job_id)
+        }), 202
+
+    def generate():
+        for error in invalid:
+            yield json.dumps(error) + '\n'
+        try:
+            for result in portfolio_screener.screen(db.session, points, start_date, end_date):
+                yield json.dumps(result) + '\n'
+        except Exception as e:
+            # Headers are already sent: the client sees the stream end with an error line
+            logger.error(f"Error in portfolio screening stream: {e}")
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/portfolio/jobs/<job_id>')
+def api_portfolio_job(job_id):
+    """Status and progress of a background portfolio screening job"""
+    job = get_job(db.session, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] in ('pending', 'running'):
+        # Picks the job up after a restart; a no-op while the worker thread is alive
+        portfolio_worker.start(app)
+    return jsonify(job)
+
+@app.route('/api/portfolio/jobs/<job_id>/results')
+def api_portfolio_job_results(job_id):
+    """NDJSON results of a finished portfolio screening job"""
+    job = get_job(db.session, job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != 'done':
+        return jsonify({'error': f"Job is {job['status']}", 'job': job}), 409
+    return Response(stream_with_context(iter_job_results(db.session, job_id)), mimetype='application/x-ndjson')
+
 @app.route('/internal/backfill-city-names', methods=['POST'])
 def backfill_city_names():
     """Backfill city_names for all radar-detected alerts"""
@@ -5556,36 +5695,43 @@ def get_hail_size_chart():
 def geocode_address(address):
     """
     Geocode an address to lat/lon coordinates
-    Uses Nominatim (OpenStreetMap) for free geocoding
+    Uses Nominatim (OpenStreetMap) for free geocoding, through the geocode cache so repeat
+    addresses never leave the process and concurrent lookups of one address share a request
     """
-    try:
-        # Use Nominatim geocoding service
-        url = "https://nominatim.openstreetmap.org/search"
-        params = {
-            'q': address,
-            'format': 'json',
-            'limit': 1,
-            'countrycodes': 'us'  # Limit to US addresses
-        }
-        headers = {
-            'User-Agent': 'HailyDB-Geocoding/1.0 (contact@hailydb.com)'
-        }
-        
-        response = requests.get(url, params=params, headers=headers, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        if data and len(data) > 0:
-            result = data[0]
-            lat = float(result['lat'])
-            lon = float(result['lon'])
-            return lat, lon
-        else:
-            return None, None
-            
-    except Exception as e:
-        logger.error(f"Geocoding error for address '{address}': {e}")
-        return None, None
+    return geocode_cache.geocode(address)
+
+@app.route('/api/geocode/bulk', methods=['POST'])
+def api_bulk_geocode():
+    """
+    Pre-geocode an address list into the geocode cache
+    Body: {"addresses": [...]}; geocoding runs in the background at the Nominatim request rate
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Body must be a JSON object: {"addresses": [...]}'}), 400
+    addresses = data.get('addresses')
+    if isinstance(addresses, list):
+        addresses = [address for address in addresses if isinstance(address, str) and address.strip()]
+    if not addresses or not isinstance(addresses, list):
+        return jsonify({'error': 'addresses must be a non-empty list of strings'}), 400
+    if len(addresses) > Config.GEOCODE_BULK_MAX_ADDRESSES:
+        return jsonify({'error': f'At most {Config.GEOCODE_BULK_MAX_ADDRESSES} addresses per request'}), 400
+    
+    if geocode_cache.pregeocode_async(addresses) is None:
+        return jsonify({
+            'error': 'Pre-geocoding already running',
+            'message': f'At most {Config.GEOCODE_BULK_MAX_JOBS} bulk geocoding runs at a time; retry later'
+        }), 429
+    return jsonify({
+        'accepted': len(addresses),
+        'message': 'Pre-geocoding started',
+        'cache': geocode_cache.stats()
+    }), 202
+
+@app.route('/api/geocode/stats')
+def api_geocode_stats():
+    """Geocode cache hit rates and geocoder traffic since process start"""
+    return jsonify(geocode_cache.stats())
 
 @app.route('/api/spc-reports/enrich', methods=['POST'])
 def api_enrich_spc_reports():
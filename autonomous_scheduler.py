@@ -14,6 +14,7 @@ from models import SchedulerLog
 from ingest import IngestService
 from spc_ingest import SPCIngestService
 from spc_matcher import SPCMatchingService
+from spc_summary_queue import SummaryQueueWorker
 from scheduler_service import SchedulerService
 from config import Config
 
@@ -33,6 +34,7 @@ class AutonomousScheduler:
         self.spc_service = SPCIngestService(db.session)
         self.matching_service = SPCMatchingService(db.session)
         self.scheduler_service = SchedulerService(db)
+        self.summary_worker = None  # Created on start: AI match summaries drain on their own thread
         
         self.running = False
         self.thread = None
@@ -71,12 +73,22 @@ class AutonomousScheduler:
         self.thread = threading.Thread(target=self._scheduler_loop_with_restart, daemon=False)
         self.thread.start()
         logger.info("Autonomous scheduler started (persistent mode)")
+        
+        if Config.SPC_SUMMARY_WORKER_ENABLED:
+            if self.app:
+                app_instance = self.app
+            else:
+                from app import app as app_instance
+            self.summary_worker = self.summary_worker or SummaryQueueWorker(self.db.session)
+            self.summary_worker.start(app_instance)
     
     def stop(self):
         """Stop the autonomous scheduler"""
         self.running = False
         if self.thread:
             self.thread.join(timeout=5)
+        if self.summary_worker:
+            self.summary_worker.stop()
         logger.info("Autonomous scheduler stopped")
     
     def _scheduler_loop_with_restart(self):
@@ -194,14 +206,26 @@ class AutonomousScheduler:
                 new_alerts = result['new_alerts']
                 total_processed = result['total_processed']
                 updated_alerts = result['updated_alerts']
+                unchanged_alerts = result.get('unchanged_alerts', 0)
             else:
                 # Backward compatibility with old int return
                 new_alerts = result
                 total_processed = result
                 updated_alerts = 0
+                unchanged_alerts = 0
             
+            pipeline_stats = result if isinstance(result, dict) else {}
             self.scheduler_service.log_operation_complete(
-                log_entry, True, records_processed=total_processed, records_new=new_alerts
+                log_entry, True, records_processed=total_processed, records_new=new_alerts,
+                duplicate_count=pipeline_stats.get('duplicate_count', 0),
+                http_status_code=pipeline_stats.get('http_status'),
+                api_response_size=pipeline_stats.get('api_response_size'),
+                processing_duration=pipeline_stats.get('processing_duration'),
+                metadata={
+                    'stage_timings': pipeline_stats.get('stage_timings'),
+                    'unchanged_alerts': unchanged_alerts,
+                    'not_modified': pipeline_stats.get('not_modified', False)
+                }
             )
             
             self.last_nws_poll = datetime.utcnow()
@@ -211,7 +235,7 @@ class AutonomousScheduler:
                 'message': f'{new_alerts} new / {total_processed} total alerts processed',
                 'timestamp': self.last_nws_poll.isoformat()
             }
-            logger.info(f"NWS polling completed: {new_alerts} new, {updated_alerts} updated, {total_processed} total alerts")
+            logger.info(f"NWS polling completed: {new_alerts} new, {updated_alerts} updated, {unchanged_alerts} unchanged, {total_processed} total alerts")
             
         except Exception as e:
             logger.error(f"NWS polling failed: {e}")
@@ -305,8 +329,12 @@ class AutonomousScheduler:
                 "spc_match", "internal_timer"
             )
             
-            batch_size = int(os.getenv("SPC_MATCH_BATCH_SIZE", "200"))
-            result = self.matching_service.match_spc_reports_batch(limit=batch_size)
+            if Config.SPC_INCREMENTAL_MATCHING:
+                # Only new alerts and alerts touched by newly stored SPC reports
+                result = self.matching_service.match_incremental()
+            else:
+                batch_size = int(os.getenv("SPC_MATCH_BATCH_SIZE", "200"))
+                result = self.matching_service.match_spc_reports_batch(limit=batch_size)
             processed = result.get('processed', 0)
             matched = result.get('matched', 0)
             
@@ -423,6 +451,8 @@ class AutonomousScheduler:
         return {
             'running': self.running,
             'thread_alive': self.thread.is_alive() if self.thread else False,
+            'summary_worker_alive': bool(self.summary_worker and self.summary_worker.thread
+                                         and self.summary_worker.thread.is_alive()),
             'last_nws_poll': self.last_nws_poll.isoformat() if self.last_nws_poll else None,
             'last_spc_poll': self.last_spc_poll.isoformat() if self.last_spc_poll else None,
             'last_matching': self.last_matching.isoformat() if self.last_matching else None,
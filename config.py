@@ -4,7 +4,8 @@ class Config:
     """Configuration settings for NWS Alert Ingestion Service"""
     
     # NWS API Configuration
-    NWS_ALERT_URL = "https://api.weather.gov/alerts/active"
+    # Upstream feed URLs can be pointed at a local feed_replay server for offline benchmarks
+    NWS_ALERT_URL = os.environ.get("NWS_ALERT_URL", "https://api.weather.gov/alerts/active")
     NWS_HEADERS = {
         'User-Agent': 'HailyDB-NWS-Ingestion/1.0 (contact@hailydb.com)',
         'Accept': 'application/geo+json'
@@ -23,12 +24,98 @@ class Config:
     # Database Write Batch Configuration
     DB_WRITE_BATCH_SIZE = int(os.environ.get("DB_WRITE_BATCH_SIZE", "500"))
     
+    # Set-based alert writes (COPY into staging + INSERT ... ON CONFLICT); "false" restores per-row ORM writes
+    NWS_BULK_UPSERT = os.environ.get("NWS_BULK_UPSERT", "true").lower() == "true"
+    
+    # Single-copy payloads: raw keeps only the feature envelope, geometry/properties live in their own columns
+    ALERT_COMPACT_PAYLOAD = os.environ.get("ALERT_COMPACT_PAYLOAD", "true").lower() == "true"
+    
+    # Streaming ingestion: max parsed features queued between the fetch and write stages
+    NWS_MAX_IN_FLIGHT_FEATURES = int(os.environ.get("NWS_MAX_IN_FLIGHT_FEATURES", "1000"))
+    
+    # Optional process pool for feature normalization (0 = normalize on the calling thread)
+    NORMALIZE_WORKERS = int(os.environ.get("NORMALIZE_WORKERS", "0"))
+    NORMALIZE_CHUNK_SIZE = int(os.environ.get("NORMALIZE_CHUNK_SIZE", "25"))
+    # "fork" keeps workers from re-importing the web entry point; "spawn"/"forkserver" are safe only for CLI runs
+    NORMALIZE_START_METHOD = os.environ.get("NORMALIZE_START_METHOD", "fork")
+    
     # Processing Batch Configuration (for enrichment, matching, etc.)
     ENRICH_BATCH_SIZE = int(os.environ.get("ENRICH_BATCH_SIZE", "25"))
+    ENRICH_MAX_CONCURRENCY = int(os.environ.get("ENRICH_MAX_CONCURRENCY", "8"))  # OpenAI requests in flight, lowered on 429s
+    ENRICH_MIN_CONCURRENCY = int(os.environ.get("ENRICH_MIN_CONCURRENCY", "1"))
+    ENRICH_COMMIT_BATCH_SIZE = int(os.environ.get("ENRICH_COMMIT_BATCH_SIZE", "25"))  # enriched alerts per commit
+    ENRICH_PRIORITY_BATCH_SIZE = int(os.environ.get("ENRICH_PRIORITY_BATCH_SIZE", "50"))  # alerts per enrich_all_priority_alerts call
     SPC_MATCH_BATCH_SIZE = int(os.environ.get("SPC_MATCH_BATCH_SIZE", "200"))
+    SPC_BULK_MATCH_BATCH_SIZE = int(os.environ.get("SPC_BULK_MATCH_BATCH_SIZE", "5000"))  # alerts per SPC index load
+    SPC_POSTGIS_MATCH_BUFFER_MILES = float(os.environ.get("SPC_POSTGIS_MATCH_BUFFER_MILES", "0"))  # 0 = strict containment
+    SPC_INCREMENTAL_MATCHING = os.environ.get("SPC_INCREMENTAL_MATCHING", "true").lower() == "true"  # scheduler drains spc_match_queue
+    SPC_MATCH_QUEUE_BATCH_SIZE = int(os.environ.get("SPC_MATCH_QUEUE_BATCH_SIZE", "200"))  # queued date/type entries per run
+    SPC_REMATCH_WORKERS = int(os.environ.get("SPC_REMATCH_WORKERS", "4"))  # spc_rematch.py processes
+    SPC_REMATCH_SHARD_DAYS = int(os.environ.get("SPC_REMATCH_SHARD_DAYS", "30"))
+    SPC_SUMMARY_WORKER_ENABLED = os.environ.get("SPC_SUMMARY_WORKER_ENABLED", "true").lower() == "true"  # scheduler drains spc_summary_jobs
+    SPC_SUMMARY_WORKERS = int(os.environ.get("SPC_SUMMARY_WORKERS", "4"))  # concurrent OpenAI requests
+    SPC_SUMMARY_REQUESTS_PER_MINUTE = float(os.environ.get("SPC_SUMMARY_REQUESTS_PER_MINUTE", "60"))  # OpenAI quota share
+    SPC_SUMMARY_MAX_ATTEMPTS = int(os.environ.get("SPC_SUMMARY_MAX_ATTEMPTS", "5"))  # then the plain fallback summary
     
     # SPC Integration (Future)
-    SPC_REPORTS_URL = "https://www.spc.noaa.gov/climo/reports/"
+    SPC_REPORTS_URL = os.environ.get("SPC_REPORTS_URL", "https://www.spc.noaa.gov/climo/reports/")
+    
+    # SPC multi-day backfill engine (spc_backfill_engine.py)
+    SPC_BACKFILL_CONCURRENCY = int(os.environ.get("SPC_BACKFILL_CONCURRENCY", "4"))
+    SPC_BACKFILL_REQUESTS_PER_SECOND = float(os.environ.get("SPC_BACKFILL_REQUESTS_PER_SECOND", "2"))
+    SPC_BACKFILL_PARSE_WORKERS = int(os.environ.get("SPC_BACKFILL_PARSE_WORKERS", "0"))
+    
+    # Historical sources (IEM watch/warning shapefiles, NOAA HURDAT2 best tracks)
+    IEM_WATCHWARN_URL = os.environ.get("IEM_WATCHWARN_URL", "https://mesonet.agron.iastate.edu/cgi-bin/request/gis/watchwarn.py")
+    HURDAT2_URL = os.environ.get("HURDAT2_URL", "https://www.nhc.noaa.gov/data/hurdat/hurdat2-1851-2023-051124.txt")
+    
+    # Raw upstream payload archive (source_archive.py): compressed bodies + ETag/Last-Modified per URL
+    SOURCE_ARCHIVE_ENABLED = os.environ.get("SOURCE_ARCHIVE_ENABLED", "true").lower() == "true"
+    SOURCE_ARCHIVE_DIR = os.environ.get("SOURCE_ARCHIVE_DIR", "data/source_archive")
+    SOURCE_ARCHIVE_MAX_AGE_DAYS = float(os.environ.get("SOURCE_ARCHIVE_MAX_AGE_DAYS", "365"))
+    SOURCE_ARCHIVE_MAX_BYTES = int(os.environ.get("SOURCE_ARCHIVE_MAX_BYTES", str(2 * 1024 ** 3)))
+    # Payloads for periods older than this are final and served from the archive without revalidating
+    SOURCE_ARCHIVE_FINAL_AFTER_DAYS = int(os.environ.get("SOURCE_ARCHIVE_FINAL_AFTER_DAYS", "16"))
+    
+    # OpenAI completion cache (llm_cache.py): in-process LRU over the llm_response_cache table
+    LLM_CACHE_ENABLED = os.environ.get("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", "5000"))
+    LLM_CACHE_TTL_DAYS = float(os.environ.get("LLM_CACHE_TTL_DAYS", "180"))
+    LLM_CACHE_MAX_ROWS = int(os.environ.get("LLM_CACHE_MAX_ROWS", "500000"))  # least recently used rows beyond this are evicted
+    
+    # Offline gazetteer (gazetteer.py): bundled places behind nearest-place/major-city lookups
+    GAZETTEER_PATH = os.environ.get("GAZETTEER_PATH", "data/us_places.csv")  # relative to the project root
+    GAZETTEER_MAJOR_CITY_POPULATION = int(os.environ.get("GAZETTEER_MAJOR_CITY_POPULATION", "50000"))
+    PLACES_EVENT_MAX_MILES = float(os.environ.get("PLACES_EVENT_MAX_MILES", "25"))  # farther places are no event location
+    PLACES_MAJOR_CITY_MAX_MILES = float(os.environ.get("PLACES_MAJOR_CITY_MAX_MILES", "100"))
+    # GeoNames lookups when the gazetteer has no answer (free account username required)
+    PLACES_REMOTE_FALLBACK = os.environ.get("PLACES_REMOTE_FALLBACK", "false").lower() == "true"
+    GEONAMES_USERNAME = os.environ.get("GEONAMES_USERNAME")
+    
+    # Address geocoding (geocode_cache.py): in-process LRU over the geocode_cache table, Nominatim on a miss
+    GEOCODER_URL = os.environ.get("GEOCODER_URL", "https://nominatim.openstreetmap.org/search")
+    GEOCODE_CACHE_ENABLED = os.environ.get("GEOCODE_CACHE_ENABLED", "true").lower() == "true"
+    GEOCODE_CACHE_MEMORY_ENTRIES = int(os.environ.get("GEOCODE_CACHE_MEMORY_ENTRIES", "20000"))
+    GEOCODE_CACHE_TTL_DAYS = float(os.environ.get("GEOCODE_CACHE_TTL_DAYS", "365"))
+    GEOCODE_NEGATIVE_TTL_HOURS = float(os.environ.get("GEOCODE_NEGATIVE_TTL_HOURS", "24"))  # "no match" answers
+    GEOCODE_REQUESTS_PER_SECOND = float(os.environ.get("GEOCODE_REQUESTS_PER_SECOND", "1"))  # Nominatim usage policy
+    GEOCODE_TIMEOUT_SECONDS = float(os.environ.get("GEOCODE_TIMEOUT_SECONDS", "10"))
+    GEOCODE_BULK_WORKERS = int(os.environ.get("GEOCODE_BULK_WORKERS", "4"))
+    GEOCODE_BULK_MAX_ADDRESSES = int(os.environ.get("GEOCODE_BULK_MAX_ADDRESSES", "5000"))  # per /api/geocode/bulk request
+    GEOCODE_BULK_MAX_JOBS = int(os.environ.get("GEOCODE_BULK_MAX_JOBS", "1"))  # concurrent /api/geocode/bulk runs
+    
+    # Point-in-polygon search (alert_containment.py): "postgis" (ST_Covers) or "shapely" (prepared polygons cached per alert)
+    # Its bounding-box index is built outside requests: python alert_containment.py create-index
+    CONTAINMENT_ENGINE = os.environ.get("CONTAINMENT_ENGINE", "postgis")
+    CONTAINMENT_CACHE_ENTRIES = int(os.environ.get("CONTAINMENT_CACHE_ENTRIES", "20000"))
+    CONTAINMENT_MAX_BUFFER_MILES = float(os.environ.get("CONTAINMENT_MAX_BUFFER_MILES", "25"))
+    
+    # Portfolio screening (portfolio_screening.py): bulk points against radar-detected alerts, same engine
+    PORTFOLIO_MAX_POINTS = int(os.environ.get("PORTFOLIO_MAX_POINTS", "100000"))
+    PORTFOLIO_SYNC_MAX_POINTS = int(os.environ.get("PORTFOLIO_SYNC_MAX_POINTS", "5000"))  # Larger inputs run as a job
+    PORTFOLIO_CELL_DEGREES = float(os.environ.get("PORTFOLIO_CELL_DEGREES", "1.0"))  # Grid cell sharing one candidate load
+    PORTFOLIO_CHUNK_POINTS = int(os.environ.get("PORTFOLIO_CHUNK_POINTS", "5000"))
+    PORTFOLIO_JOB_RETENTION_HOURS = int(os.environ.get("PORTFOLIO_JOB_RETENTION_HOURS", "72"))
     
     # Logging Configuration
     LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
@@ -389,45 +389,38 @@ class EnhancedContextService:
     
     def _check_verified_warnings(self, report, db_session: Session) -> List[Dict[str, Any]]:
         """
-        Check for active NWS warnings during the report time
-        Returns list of concurrent NWS warnings for verification
+        NWS warnings the SPC matcher verified against this report
+        Reads alert_spc_matches through its report index instead of scanning alerts by sent time
         """
         try:
             # Import here to avoid circular import
             from models import Alert
-            from datetime import datetime, timedelta
+            from spc_match_store import report_alert_ids
             
-            # Convert report date and time to datetime object
-            report_datetime = self._parse_report_datetime(report)
-            if not report_datetime:
+            alert_ids = report_alert_ids(db_session, report.id)
+            if not alert_ids:
                 return []
             
-            # Search for alerts within ±30 minutes of the report time
-            time_window_start = report_datetime - timedelta(minutes=30)
-            time_window_end = report_datetime + timedelta(minutes=30)
-            
-            # Query for severe weather warnings in the same area during the time window
             warnings = db_session.query(Alert).filter(
-                Alert.sent >= time_window_start,
-                Alert.sent <= time_window_end,
+                Alert.id.in_(alert_ids),
                 Alert.event.in_([
                     'Severe Thunderstorm Warning',
                     'Tornado Warning',
                     'Severe Weather Statement'
                 ])
-            ).all()
+            ).order_by(Alert.sent).all()
             
-            # Filter warnings that overlap with report location
             verified_warnings = []
             for warning in warnings:
-                if self._check_location_overlap(report, warning):
-                    verified_warnings.append({
-                        'id': warning.id,
-                        'event': warning.event,
-                        'sent': warning.sent.isoformat(),
-                        'headline': warning.headline or '',
-                        'description': warning.description[:100] + '...' if warning.description and len(warning.description) > 100 else warning.description
-                    })
+                properties = warning.properties or {}
+                description = properties.get('description')
+                verified_warnings.append({
+                    'id': warning.id,
+                    'event': warning.event,
+                    'sent': warning.sent.isoformat() if warning.sent else None,
+                    'headline': properties.get('headline') or '',
+                    'description': description[:100] + '...' if description and len(description) > 100 else description
+                })
             
             return verified_warnings[:3]  # Limit to 3 most relevant warnings
             
@@ -2,11 +2,18 @@ import os
 import json
 import logging
 from typing import Optional, List, Dict
-from openai import OpenAI
+from openai import DefaultHttpxClient, OpenAI
+from sqlalchemy import Float
+from config import Config
+from enrichment_executor import AdaptiveConcurrency, EnrichmentExecutor
+from llm_cache import llm_cache
 from models import Alert
 
 logger = logging.getLogger(__name__)
 
+# Part of every llm_cache key: bump when a prompt below changes so cached answers are not reused
+ENRICH_PROMPT_VERSION = 1
+
 class EnrichmentService:
     """
     AI-powered alert enrichment service
@@ -79,9 +86,51 @@ class EnrichmentService:
     
     def __init__(self, db):
         self.db = db
+        # Shared by every caller: each request holds a slot, every response adjusts the limit
+        self.concurrency = AdaptiveConcurrency(Config.ENRICH_MAX_CONCURRENCY, Config.ENRICH_MIN_CONCURRENCY)
+        self.active_executor = None
         self.openai_client = OpenAI(
-            api_key=os.environ.get("OPENAI_API_KEY")
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            http_client=DefaultHttpxClient(event_hooks={'response': [self._observe_response]})
+        )
+    
+    def _observe_response(self, response):
+        """httpx hook: sees every response, including 429s the client retries internally"""
+        self.concurrency.observe(response.headers, rate_limited=response.status_code == 429)
+    
+    def _complete(self, kind: str, **kwargs) -> Optional[str]:
+        """
+        Message content of a chat completion
+        Served from llm_cache when the same prompt was answered before; otherwise the request
+        holds one of the in-flight slots.
+        """
+        def create():
+            self.concurrency.acquire()
+            try:
+                response = self.openai_client.chat.completions.create(**kwargs)
+            finally:
+                self.concurrency.release()
+            return response.choices[0].message.content
+        
+        params = {name: kwargs.get(name) for name in ('max_tokens', 'temperature', 'response_format')}
+        return llm_cache.completion(kind, kwargs['model'], ENRICH_PROMPT_VERSION, kwargs['messages'], create, **params)
+    
+    def _priority_order(self):
+        """Largest radar-indicated hail, then wind, first (EnrichmentExecutor keeps the same order)"""
+        return (
+            Alert.radar_indicated['hail_inches'].astext.cast(Float).desc().nullslast(),
+            Alert.radar_indicated['wind_mph'].astext.cast(Float).desc().nullslast(),
+            Alert.effective.desc()
         )
+    
+    def _run_executor(self, alerts: List[Alert]) -> Dict[str, int]:
+        executor = EnrichmentExecutor(self)
+        self.active_executor = executor
+        return executor.run(alerts)
+    
+    def executor_metrics(self) -> Optional[Dict]:
+        """Throughput and backlog of the running (or last) concurrent enrichment"""
+        return self.active_executor.metrics() if self.active_executor else None
         
     def enrich_alert(self, alert: Alert) -> bool:
         """
@@ -110,8 +159,11 @@ class EnrichmentService:
             logger.error(f"Error enriching alert {alert.id}: {e}")
             return False
     
-    def _generate_summary(self, alert: Alert) -> Optional[str]:
-        """Generate AI summary from alert description with retry logic"""
+    def _generate_summary(self, alert: Alert, attempts: int = 3) -> Optional[str]:
+        """
+        Generate AI summary from alert description with retry logic
+        EnrichmentExecutor passes attempts=1 and requeues failures instead of sleeping here.
+        """
         import time
         
         description = alert.properties.get('description', '')
@@ -141,11 +193,12 @@ class EnrichmentService:
         """
         
         # Retry logic for network issues
-        for attempt in range(3):
+        for attempt in range(attempts):
             try:
                 # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
                 # do not change this unless explicitly requested by the user
-                response = self.openai_client.chat.completions.create(
+                content = self._complete(
+                    'alert_summary',
                     model="gpt-4o",
                     messages=[
                         {
@@ -162,11 +215,11 @@ class EnrichmentService:
                     timeout=30
                 )
                 
-                return response.choices[0].message.content.strip()
+                return content.strip()
                 
             except Exception as e:
                 logger.warning(f"Attempt {attempt + 1} failed for alert {alert.id}: {e}")
-                if attempt < 2:  # Don't sleep on the last attempt
+                if attempt < attempts - 1:  # Don't sleep on the last attempt
                     time.sleep(2 ** attempt)  # Exponential backoff
                 else:
                     logger.error(f"All retry attempts failed for alert {alert.id}: {e}")
@@ -202,7 +255,8 @@ class EnrichmentService:
             
             # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
             # do not change this unless explicitly requested by the user
-            response = self.openai_client.chat.completions.create(
+            content = self._complete(
+                'alert_tags',
                 model="gpt-4o",
                 messages=[
                     {
@@ -219,7 +273,7 @@ class EnrichmentService:
                 temperature=0.1
             )
             
-            result = json.loads(response.choices[0].message.content)
+            result = json.loads(content)
             
             # Extract tags from various possible JSON structures
             tags = result.get('tags', [])
@@ -243,28 +297,18 @@ class EnrichmentService:
         Returns statistics about the enrichment process
         """
         try:
-            # Get alerts that haven't been enriched yet
+            # Get alerts that haven't been enriched yet, largest hail/wind first
             alerts = Alert.query.filter(
                 Alert.ai_summary.is_(None)
-            ).limit(limit).all()
-            
-            enriched_count = 0
-            failed_count = 0
-            
-            for alert in alerts:
-                if self.enrich_alert(alert):
-                    enriched_count += 1
-                else:
-                    failed_count += 1
+            ).order_by(*self._priority_order()).limit(limit).all()
             
-            # Commit changes
-            self.db.session.commit()
+            result = self._run_executor(alerts)
             
-            logger.info(f"Batch enrichment complete: {enriched_count} enriched, {failed_count} failed")
+            logger.info(f"Batch enrichment complete: {result['enriched']} enriched, {result['failed']} failed")
             
             return {
-                'enriched': enriched_count,
-                'failed': failed_count,
+                'enriched': result['enriched'],
+                'failed': result['failed'],
                 'total_processed': len(alerts)
             }
             
@@ -274,7 +318,7 @@ class EnrichmentService:
     
     def enrich_by_category(self, category: str, limit: int = 100) -> Dict[str, int]:
         """
-        Enrich alerts by category with timeout protection
+        Enrich alerts by category with the concurrent executor
         Returns statistics about the enrichment process
         """
         try:
@@ -287,42 +331,19 @@ class EnrichmentService:
             alerts = Alert.query.filter(
                 Alert.ai_summary.is_(None),
                 Alert.event.in_(alert_types)
-            ).limit(limit).all()
-            
-            enriched_count = 0
-            failed_count = 0
+            ).order_by(*self._priority_order()).limit(limit).all()
             
             logger.info(f"Starting category enrichment for '{category}': {len(alerts)} alerts to process")
             
-            # Process in smaller batches to prevent timeouts
-            batch_size = 10
-            for i in range(0, len(alerts), batch_size):
-                batch = alerts[i:i + batch_size]
-                
-                for alert in batch:
-                    try:
-                        if self.enrich_alert(alert):
-                            enriched_count += 1
-                        else:
-                            failed_count += 1
-                    except Exception as e:
-                        logger.error(f"Error enriching alert {alert.id}: {e}")
-                        failed_count += 1
-                
-                # Commit after each batch
-                try:
-                    self.db.session.commit()
-                    logger.info(f"Category '{category}' batch {i//batch_size + 1}: {enriched_count} enriched so far")
-                except Exception as e:
-                    logger.error(f"Error committing batch: {e}")
-                    self.db.session.rollback()
+            # Results are committed in batches of ENRICH_COMMIT_BATCH_SIZE as they complete
+            result = self._run_executor(alerts)
             
-            logger.info(f"Category enrichment complete for '{category}': {enriched_count} enriched, {failed_count} failed")
+            logger.info(f"Category enrichment complete for '{category}': {result['enriched']} enriched, {result['failed']} failed")
             
             return {
                 'category': category,
-                'enriched': enriched_count,
-                'failed': failed_count,
+                'enriched': result['enriched'],
+                'failed': result['failed'],
                 'total_processed': len(alerts)
             }
             
@@ -341,22 +362,17 @@ class EnrichmentService:
         """Check if alert should be automatically enriched on ingestion"""
         return alert.event in self.AUTO_ENRICH_ALERTS
     
-    def enrich_all_priority_alerts(self) -> Dict[str, int]:
+    def enrich_all_priority_alerts(self, limit: int = None) -> Dict[str, int]:
         """
-        Enrich all high-priority alerts that haven't been enriched yet
+        Enrich high-priority alerts that haven't been enriched yet, largest hail/wind first
         Includes Severe Weather, Tropical Weather, and High Wind alerts
         """
-        import time
-        
         try:
-            # Get all unenriched alerts that match auto-enrich criteria
+            # Get unenriched alerts that match auto-enrich criteria
             alerts = Alert.query.filter(
                 Alert.ai_summary.is_(None),
                 Alert.event.in_(self.AUTO_ENRICH_ALERTS)
-            ).limit(5).all()  # Process only 5 at a time for stability
-            
-            total_enriched = 0
-            total_failed = 0
+            ).order_by(*self._priority_order()).limit(limit or Config.ENRICH_PRIORITY_BATCH_SIZE).all()
             
             logger.info(f"Starting priority alert enrichment: {len(alerts)} alerts to process")
             
@@ -368,43 +384,14 @@ class EnrichmentService:
                     'message': 'No priority alerts need enrichment'
                 }
             
-            # Process alerts slowly and safely
-            for i, alert in enumerate(alerts):
-                try:
-                    logger.info(f"Processing alert {i+1}/{len(alerts)}: {alert.id} ({alert.event})")
-                    
-                    if self.enrich_alert(alert):
-                        total_enriched += 1
-                        logger.info(f"Successfully enriched alert {alert.id}")
-                        
-                        # Commit immediately after success
-                        try:
-                            self.db.session.commit()
-                        except Exception as e:
-                            logger.error(f"Error committing alert {alert.id}: {e}")
-                            self.db.session.rollback()
-                            total_failed += 1
-                            total_enriched = max(0, total_enriched - 1)
-                    else:
-                        total_failed += 1
-                        logger.warning(f"Failed to enrich alert {alert.id}")
-                    
-                    # Wait between each alert to prevent overwhelming the API
-                    time.sleep(2)
-                    
-                except Exception as e:
-                    logger.error(f"Error enriching priority alert {alert.id}: {e}")
-                    total_failed += 1
-                    try:
-                        self.db.session.rollback()
-                    except:
-                        pass
-            
-            logger.info(f"Priority alert enrichment complete: {total_enriched} enriched, {total_failed} failed")
+            # Request pacing comes from the OpenAI rate-limit headers rather than fixed sleeps
+            result = self._run_executor(alerts)
+            
+            logger.info(f"Priority alert enrichment complete: {result['enriched']} enriched, {result['failed']} failed")
             
             return {
-                'enriched': total_enriched,
-                'failed': total_failed,
+                'enriched': result['enriched'],
+                'failed': result['failed'],
                 'total_processed': len(alerts)
             }
             
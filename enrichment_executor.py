@@ -0,0 +1,238 @@
+"""
+Enrichment Executor for HailyDB
+Concurrent OpenAI alert enrichment: rate-limit-aware in-flight limit, priority order, batched commits
+"""
+
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Window for the live throughput metric
+THROUGHPUT_WINDOW_SECONDS = 60
+
+# Remaining-quota fractions (of x-ratelimit-limit-*) that grow or shrink the in-flight limit
+RAISE_ABOVE_REMAINING = 0.5
+LOWER_BELOW_REMAINING = 0.1
+
+# Pause after a 429: first header present wins (retry-after is plain seconds)
+RESET_HEADERS = ('retry-after', 'x-ratelimit-reset-requests', 'x-ratelimit-reset-tokens')
+
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_SECONDS = {'h': 3600.0, 'm': 60.0, 's': 1.0, 'ms': 0.001}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds in an x-ratelimit-reset-* value ("20ms", "1s", "6m0s", "1h2m3.5s")"""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_SECONDS[unit] for amount, unit in parts)
+
+
+def _remaining_fraction(headers: Mapping[str, str], kind: str) -> Optional[float]:
+    try:
+        limit = float(headers[f'x-ratelimit-limit-{kind}'])
+        remaining = float(headers[f'x-ratelimit-remaining-{kind}'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return remaining / limit if limit > 0 else None
+
+
+class AdaptiveConcurrency:
+    """
+    In-flight OpenAI request limit that follows the x-ratelimit-* response headers
+    A 429 halves the limit and holds new requests until the reported reset; responses with
+    more than half the quota left raise it by one up to max_concurrency, and responses with
+    under a tenth left lower it by one.
+    """
+
+    def __init__(self, max_concurrency: int, min_concurrency: int = 1):
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.requests = 0
+        self.rate_limited = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < self.limit:
+                    break
+                self._cond.wait(timeout=pause if pause > 0 else None)
+            self.in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    def observe(self, headers: Mapping[str, str], rate_limited: bool = False):
+        """Adjust the limit from one response's headers"""
+        with self._cond:
+            self.requests += 1
+            if rate_limited:
+                self.rate_limited += 1
+                self.limit = max(self.min_concurrency, self.limit // 2)
+                reset = next((seconds for seconds in (parse_reset(headers.get(name)) for name in RESET_HEADERS)
+                              if seconds), 1.0)
+                self.paused_until = max(self.paused_until, time.monotonic() + reset)
+                logger.warning(f"OpenAI rate limited: in-flight limit now {self.limit}, pausing {reset:.1f}s")
+            else:
+                fractions = [fraction for fraction in (_remaining_fraction(headers, 'requests'),
+                                                       _remaining_fraction(headers, 'tokens'))
+                             if fraction is not None]
+                if fractions and min(fractions) < LOWER_BELOW_REMAINING:
+                    self.limit = max(self.min_concurrency, self.limit - 1)
+                elif fractions and min(fractions) > RAISE_ABOVE_REMAINING:
+                    self.limit = min(self.max_concurrency, self.limit + 1)
+            self._cond.notify_all()
+
+
+class AlertSnapshot(NamedTuple):
+    """The alert fields EnrichmentService prompts read, detached from the session for pool threads"""
+    id: str
+    event: Optional[str]
+    severity: Optional[str]
+    area_desc: Optional[str]
+    properties: Dict[str, Any]
+
+
+def enrichment_priority(alert) -> tuple:
+    """Heap key: largest radar-indicated hail, then wind, first"""
+    radar = alert.radar_indicated or {}
+    return -(radar.get('hail_inches') or 0.0), -(radar.get('wind_mph') or 0)
+
+
+class EnrichmentExecutor:
+    """
+    Enriches a list of alerts with up to service.concurrency.limit OpenAI requests in flight
+
+    Pool threads only see AlertSnapshots and run the service's summary and tag prompts; the
+    calling thread applies results to the alerts and commits every commit_batch_size. A missing
+    summary is requeued at its original priority (up to max_attempts) instead of sleeping on
+    the worker, and metrics() can be read from other threads while run() is in progress.
+    """
+
+    def __init__(self, service, commit_batch_size: int = None, max_attempts: int = 3):
+        self.service = service
+        self.concurrency = service.concurrency
+        self.commit_batch_size = max(1, commit_batch_size or Config.ENRICH_COMMIT_BATCH_SIZE)
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._completions = deque()
+        self._backlog = 0
+        self._started = None
+        self.stats = {'enriched': 0, 'failed': 0, 'retried': 0, 'total_processed': 0}
+
+    def _enrich(self, snapshot: AlertSnapshot):
+        summary = None
+        if snapshot.properties.get('description'):
+            summary = self.service._generate_summary(snapshot, attempts=1)
+        tags = self.service._classify_tags(snapshot)
+        return summary, tags
+
+    def _record(self, outcome: str):
+        with self._lock:
+            self.stats[outcome] += 1
+            if outcome != 'retried':
+                self.stats['total_processed'] += 1
+                self._completions.append(time.monotonic())
+
+    def run(self, alerts: List, commit: bool = True) -> Dict[str, int]:
+        session = self.service.db.session if commit else None
+        heap = []
+        for seq, alert in enumerate(alerts):
+            if not alert.properties:
+                logger.warning(f"Alert {alert.id} has no properties to enrich")
+                self._record('failed')
+                continue
+            snapshot = AlertSnapshot(alert.id, alert.event, alert.severity, alert.area_desc, alert.properties)
+            heapq.heappush(heap, (enrichment_priority(alert), seq, alert, snapshot, 1))
+
+        self._started = time.monotonic()
+        uncommitted = 0
+        futures = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency.max_concurrency,
+                                thread_name_prefix='enrich') as executor:
+            while heap or futures:
+                while heap and len(futures) < self.concurrency.max_concurrency:
+                    item = heapq.heappop(heap)
+                    futures[executor.submit(self._enrich, item[3])] = item
+                self._backlog = len(heap)
+
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    priority, seq, alert, snapshot, attempt = futures.pop(future)
+                    try:
+                        summary, tags = future.result()
+                    except Exception as e:
+                        logger.error(f"Error enriching alert {alert.id}: {e}")
+                        summary, tags = None, None
+
+                    if summary is None and snapshot.properties.get('description') and attempt < self.max_attempts:
+                        heapq.heappush(heap, (priority, seq, alert, snapshot, attempt + 1))
+                        self._record('retried')
+                        continue
+                    if summary:
+                        alert.ai_summary = summary
+                    if tags:
+                        alert.ai_tags = tags
+                    self._record('enriched' if summary or tags else 'failed')
+                    uncommitted += 1
+
+                if commit and uncommitted >= self.commit_batch_size:
+                    self._commit(session)
+                    uncommitted = 0
+
+        self._backlog = 0
+        if commit and uncommitted:
+            self._commit(session)
+        logger.info(f"Concurrent enrichment complete: {self.stats['enriched']} enriched, {self.stats['failed']} failed, "
+                    f"{self.stats['retried']} retries, {self.metrics()['alerts_per_minute']} alerts/min")
+        return dict(self.stats)
+
+    def _commit(self, session):
+        try:
+            session.commit()
+        except Exception as e:
+            logger.error(f"Error committing enrichment batch: {e}")
+            session.rollback()
+
+    def metrics(self) -> Dict:
+        """Live backlog, in-flight and throughput figures"""
+        now = time.monotonic()
+        with self._lock:
+            while self._completions and now - self._completions[0] > THROUGHPUT_WINDOW_SECONDS:
+                self._completions.popleft()
+            window = min(THROUGHPUT_WINDOW_SECONDS, now - self._started) if self._started else 0
+            recent = len(self._completions)
+            stats = dict(self.stats)
+        return {
+            **stats,
+            'backlog': self._backlog,
+            'in_flight': self.concurrency.in_flight,
+            'concurrency_limit': self.concurrency.limit,
+            'requests': self.concurrency.requests,
+            'rate_limited': self.concurrency.rate_limited,
+            'alerts_per_minute': round(recent / window * 60, 1) if window > 0 else 0.0,
+            'elapsed_seconds': round(now - self._started, 1) if self._started else 0.0
+        }
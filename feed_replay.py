@@ -0,0 +1,295 @@
+"""
+Feed Record/Replay for HailyDB
+Captures upstream feed responses to disk and serves them back from a local HTTP stand-in
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import requests
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Config attributes naming an upstream feed; each is served under /<upstream host>/<path>
+FEED_URL_SETTINGS = ('NWS_ALERT_URL', 'SPC_REPORTS_URL', 'IEM_WATCHWARN_URL', 'HURDAT2_URL')
+
+# Request headers passed upstream while recording (NWS rejects requests without a User-Agent)
+FORWARDED_HEADERS = ('User-Agent', 'Accept')
+
+
+def archive_key(host: str, path: str, query: str = '') -> str:
+    """Lookup key for one request: host + path + query parameters in sorted order"""
+    params = sorted(parse_qsl(query, keep_blank_values=True))
+    return f"{host}{path}?{urlencode(params)}" if params else f"{host}{path}"
+
+
+def url_key(url: str) -> str:
+    """archive_key for a full URL"""
+    parts = urlsplit(url)
+    return archive_key(parts.netloc, parts.path, parts.query)
+
+
+class FeedArchive:
+    """
+    On-disk capture store
+    manifest.json maps request keys to bodies/<sha1>.bin plus the upstream URL, status,
+    content type and original response time of each capture
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+        self.entries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                self.entries = json.load(f)
+
+    def lookup(self, key: str) -> Optional[Tuple[Dict, bytes]]:
+        """Return (entry, body) for a request key, or None when it was never captured"""
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+            return entry, f.read()
+
+    def store(self, url: str, status: int, content_type: str, body: bytes, elapsed: float) -> Dict:
+        """Write one captured response and update the manifest"""
+        key = url_key(url)
+        relative_path = os.path.join('bodies', f"{hashlib.sha1(body).hexdigest()}.bin")
+        body_path = os.path.join(self.directory, relative_path)
+
+        with self._lock:
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            if not os.path.exists(body_path):
+                with open(body_path, 'wb') as f:
+                    f.write(body)
+
+            entry = {
+                'url': url,
+                'file': relative_path,
+                'status': status,
+                'content_type': content_type,
+                'bytes': len(body),
+                'elapsed': round(elapsed, 4),
+                'recorded_at': datetime.utcnow().isoformat()
+            }
+            self.entries[key] = entry
+
+            # Replace atomically so a crashed recording never leaves a truncated manifest
+            temp_path = f"{self.manifest_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(temp_path, self.manifest_path)
+
+        logger.info(f"Recorded {url} ({status}, {len(body)} bytes, {elapsed:.2f}s)")
+        return entry
+
+    def record(self, url: str, headers: Optional[Dict] = None, timeout: int = 60) -> Dict:
+        """Fetch a URL from its upstream and store the response"""
+        started = time.monotonic()
+        response = requests.get(url, headers=headers, timeout=timeout)
+        elapsed = time.monotonic() - started
+        content_type = response.headers.get('Content-Type', 'application/octet-stream')
+        return self.store(url, response.status_code, content_type, response.content, elapsed)
+
+    def record_paginated(self, url: str, headers: Optional[Dict] = None, max_pages: int = 100) -> List[Dict]:
+        """Record a GeoJSON feed, following pagination.next the way NWSFeedStream does"""
+        entries = []
+        while url and len(entries) < max_pages:
+            entry = self.record(url, headers=headers)
+            entries.append(entry)
+            if entry['status'] != 200:
+                break
+            _, body = self.lookup(url_key(url))
+            url = (json.loads(body).get('pagination') or {}).get('next')
+        return entries
+
+
+class FeedReplayServer:
+    """
+    Local HTTP stand-in for the upstream feeds
+    http://<host>:<port>/<upstream host>/<upstream path> serves the archived response.
+    speed scales the recorded response times (1.0 = as recorded, 2.0 = twice as fast, 0 = no delay).
+    With record=True, requests missing from the archive are fetched upstream and captured first.
+    """
+
+    def __init__(self, archive: FeedArchive, host: str = '127.0.0.1', port: int = 0,
+                 speed: float = 0.0, record: bool = False):
+        self.archive = archive
+        self.host = host
+        self.port = port
+        self.speed = speed
+        self.record = record
+        self.requests_served = 0
+        self.requests_missed = 0
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def local_url(self, upstream_url: str) -> str:
+        """Replay-server URL for an upstream URL"""
+        parts = urlsplit(upstream_url)
+        query = f"?{parts.query}" if parts.query else ''
+        return f"{self.base_url}/{parts.netloc}{parts.path}{query}"
+
+    def feed_environment(self) -> Dict[str, str]:
+        """Environment overrides that point every configured feed at this server"""
+        return {name: self.local_url(getattr(Config, name)) for name in FEED_URL_SETTINGS}
+
+    def apply_to_config(self) -> Dict[str, str]:
+        """
+        Redirect this process's feeds to the server
+        Sets both the environment (for child processes) and the already-imported Config attributes.
+        """
+        overrides = self.feed_environment()
+        for name, url in overrides.items():
+            os.environ[name] = url
+            setattr(Config, name, url)
+        return overrides
+
+    def start(self) -> 'FeedReplayServer':
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                logger.debug(f"replay: {format % args}")
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Feed replay server on {self.base_url} ({len(self.archive.entries)} captures, "
+                    f"speed={self.speed}, record={self.record})")
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def _handle(self, request: BaseHTTPRequestHandler):
+        parts = urlsplit(request.path)
+        host, _, path = parts.path.lstrip('/').partition('/')
+        path = f"/{path}"
+        key = archive_key(host, path, parts.query)
+
+        found = self.archive.lookup(key)
+        if found is None and self.record:
+            upstream_url = f"https://{host}{path}" + (f"?{parts.query}" if parts.query else '')
+            headers = {name: request.headers[name] for name in FORWARDED_HEADERS if request.headers.get(name)}
+            try:
+                self.archive.record(upstream_url, headers=headers)
+                found = self.archive.lookup(key)
+            except requests.RequestException as e:
+                logger.error(f"Recording {upstream_url} failed: {e}")
+                self._send(request, 502, 'application/json', json.dumps({'error': str(e)}).encode())
+                return
+
+        if found is None:
+            self.requests_missed += 1
+            logger.warning(f"No capture for {key}")
+            self._send(request, 404, 'application/json', json.dumps({'error': f'no capture for {key}'}).encode())
+            return
+
+        entry, body = found
+        if self.speed > 0:
+            time.sleep(entry['elapsed'] / self.speed)
+        self.requests_served += 1
+        self._send(request, entry['status'], entry['content_type'], self._rewrite_pagination(entry, body))
+
+    def _rewrite_pagination(self, entry: Dict, body: bytes) -> bytes:
+        """
+        Point pagination.next at this server; a next page that was never captured ends the feed
+        Only the pagination member changes, feature ids and links are served as recorded.
+        """
+        if 'json' not in entry['content_type'] or b'"pagination"' not in body:
+            return body
+        data = json.loads(body)
+        pagination = data.get('pagination') if isinstance(data, dict) else None
+        if not isinstance(pagination, dict) or not pagination.get('next'):
+            return body
+
+        next_url = pagination['next']
+        if self.record or url_key(next_url) in self.archive.entries:
+            pagination['next'] = self.local_url(next_url)
+        else:
+            del pagination['next']
+        return json.dumps(data).encode()
+
+    @staticmethod
+    def _send(request: BaseHTTPRequestHandler, status: int, content_type: str, body: bytes):
+        request.send_response(status)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record upstream feeds to disk and replay them locally")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record = subparsers.add_parser('record', help='capture feed responses into an archive')
+    record.add_argument('--archive', required=True, help='capture directory')
+    record.add_argument('--nws', action='store_true', help='NWS active alerts, following pagination')
+    record.add_argument('--max-pages', type=int, default=100, help='page limit for --nws')
+    record.add_argument('--spc-date', action='append', default=[], help='SPC filtered reports CSV (YYYY-MM-DD)')
+    record.add_argument('--hurdat2', action='store_true', help='NOAA HURDAT2 Atlantic best-track text')
+    record.add_argument('--url', action='append', default=[], help='any other upstream URL (e.g. an IEM watchwarn.py request)')
+
+    serve = subparsers.add_parser('serve', help='serve an archive as a local HTTP stand-in')
+    serve.add_argument('--archive', required=True, help='capture directory')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--speed', type=float, default=0.0, help='playback rate of recorded response times (0 = no delay)')
+    serve.add_argument('--record', action='store_true', help='capture requests missing from the archive from upstream')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    archive = FeedArchive(args.archive)
+
+    if args.command == 'record':
+        if args.nws:
+            archive.record_paginated(Config.NWS_ALERT_URL, headers=Config.NWS_HEADERS, max_pages=args.max_pages)
+        for report_date in args.spc_date:
+            yymmdd = datetime.strptime(report_date, '%Y-%m-%d').strftime('%y%m%d')
+            archive.record(f"{Config.SPC_REPORTS_URL}{yymmdd}_rpts_filtered.csv")
+        if args.hurdat2:
+            archive.record(Config.HURDAT2_URL)
+        for url in args.url:
+            archive.record(url)
+        print(f"{len(archive.entries)} captures in {args.archive}")
+        return
+
+    server = FeedReplayServer(archive, host=args.host, port=args.port, speed=args.speed, record=args.record).start()
+    for name, url in server.feed_environment().items():
+        print(f"export {name}={url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
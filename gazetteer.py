@@ -0,0 +1,370 @@
+"""
+Offline Gazetteer for HailyDB
+Bundled US places in an array-backed KD-tree for nearest-place, major-city and radius lookups
+"""
+
+import argparse
+import csv
+import logging
+import math
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Same radius GooglePlacesService._calculate_distance uses
+EARTH_RADIUS_MILES = 3959.87433
+
+# Points per leaf; leaves are scanned linearly
+LEAF_SIZE = 8
+
+PLACE_COLUMNS = ('name', 'state', 'lat', 'lon', 'population', 'county_seat')
+
+# Legal/statistical area suffix Census Gazetteer NAME values carry ("Wichita city", "Hays CDP")
+_LSAD_SUFFIX = re.compile(r'\s+(city and borough|consolidated government|metropolitan government|unified government|'
+                          r'urban county|municipality|borough|village|city|town|CDP)(\s+\(balance\))?$')
+
+
+@dataclass
+class PlaceResult:
+    name: str
+    distance_miles: float
+    lat: float
+    lon: float
+    place_type: str
+    place_id: str = None
+
+
+def _unit_vectors(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+    lat_rad = np.radians(lat)
+    lon_rad = np.radians(lon)
+    cos_lat = np.cos(lat_rad)
+    return np.column_stack((cos_lat * np.cos(lon_rad), cos_lat * np.sin(lon_rad), np.sin(lat_rad)))
+
+
+def chord_to_miles(chord: float) -> float:
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, chord / 2))
+
+
+def miles_to_chord(miles: float) -> float:
+    return 2 * math.sin(min(math.pi, miles / EARTH_RADIUS_MILES) / 2)
+
+
+class PlaceTree:
+    """
+    Static KD-tree over places as unit vectors on the sphere
+    Euclidean (chord) distance between unit vectors orders points exactly like great-circle
+    distance, so there is no longitude wraparound to handle. The tree is implicit: the points
+    are permuted so every node is a slice [lo, hi) whose median (lo + hi) // 2 is the split
+    point, and only the split axis per median is stored.
+    """
+
+    def __init__(self, indices: np.ndarray, xyz: np.ndarray):
+        xyz = xyz[indices]
+        order = np.arange(len(indices))
+        axes = np.zeros(len(indices), dtype=np.int8)
+
+        stack = [(0, len(indices))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            mid = (lo + hi) // 2
+            segment = order[lo:hi]
+            axis = int(np.argmax(np.ptp(xyz[segment], axis=0)))
+            order[lo:hi] = segment[np.argpartition(xyz[segment, axis], mid - lo)]
+            axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+        self.indices = indices[order]
+        self.axes = axes.tolist()
+        # Plain lists: scalar indexing of Python floats is several times faster than NumPy's
+        self.coords = [column.tolist() for column in xyz[order].T]
+
+    def __len__(self) -> int:
+        return len(self.axes)
+
+    def nearest(self, point: Tuple[float, float, float]) -> Tuple[int, float]:
+        """(place index, chord distance) of the closest point; (-1, inf) when empty"""
+        xs, ys, zs = self.coords
+        px, py, pz = point
+        best, best_d2 = -1, math.inf
+        stack = [(0, len(self.axes), 0.0)]
+        while stack:
+            lo, hi, bound = stack.pop()
+            if bound >= best_d2:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    d2 = (xs[i] - px) ** 2 + (ys[i] - py) ** 2 + (zs[i] - pz) ** 2
+                    if d2 < best_d2:
+                        best, best_d2 = i, d2
+                continue
+            mid = (lo + hi) // 2
+            d2 = (xs[mid] - px) ** 2 + (ys[mid] - py) ** 2 + (zs[mid] - pz) ** 2
+            if d2 < best_d2:
+                best, best_d2 = mid, d2
+            diff = point[self.axes[mid]] - self.coords[self.axes[mid]][mid]
+            if diff < 0:
+                stack.append((mid + 1, hi, diff * diff))
+                stack.append((lo, mid, 0.0))
+            else:
+                stack.append((lo, mid, diff * diff))
+                stack.append((mid + 1, hi, 0.0))
+        if best < 0:
+            return -1, math.inf
+        return int(self.indices[best]), math.sqrt(best_d2)
+
+    def within(self, point: Tuple[float, float, float], chord: float) -> List[Tuple[int, float]]:
+        """(place index, chord distance) of every point within `chord`, unordered"""
+        xs, ys, zs = self.coords
+        px, py, pz = point
+        limit = chord * chord
+        found = []
+        stack = [(0, len(self.axes))]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    d2 = (xs[i] - px) ** 2 + (ys[i] - py) ** 2 + (zs[i] - pz) ** 2
+                    if d2 <= limit:
+                        found.append((i, d2))
+                continue
+            mid = (lo + hi) // 2
+            d2 = (xs[mid] - px) ** 2 + (ys[mid] - py) ** 2 + (zs[mid] - pz) ** 2
+            if d2 <= limit:
+                found.append((mid, d2))
+            diff = point[self.axes[mid]] - self.coords[self.axes[mid]][mid]
+            if diff >= -chord:
+                stack.append((mid + 1, hi))
+            if diff <= chord:
+                stack.append((lo, mid))
+        return [(int(self.indices[i]), math.sqrt(d2)) for i, d2 in found]
+
+
+class Gazetteer:
+    """
+    Nearest-place, nearest-major-city and within-radius lookups over the bundled places file
+    The file (GAZETTEER_PATH, columns name,state,lat,lon,population,county_seat) is loaded on
+    first use. Population-filtered queries get a tree of their own per threshold, built once.
+    A missing or unreadable file leaves the gazetteer unavailable and every lookup empty.
+    """
+
+    def __init__(self, path: str = None, major_city_population: int = None):
+        self.path = path or Config.GAZETTEER_PATH
+        self.major_city_population = (Config.GAZETTEER_MAJOR_CITY_POPULATION
+                                      if major_city_population is None else major_city_population)
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._trees: Dict[int, PlaceTree] = {}
+        self.names: List[str] = []
+        self.states: List[str] = []
+        self.lat = np.zeros(0)
+        self.lon = np.zeros(0)
+        self.population = np.zeros(0, dtype=np.int64)
+        self.county_seat = np.zeros(0, dtype=bool)
+        self._xyz = np.zeros((0, 3))
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple], major_city_population: int = None) -> 'Gazetteer':
+        """Gazetteer over in-memory (name, state, lat, lon, population, county_seat) rows"""
+        gazetteer = cls(path='', major_city_population=major_city_population)
+        gazetteer._index(rows)
+        return gazetteer
+
+    def _resolved_path(self) -> str:
+        if os.path.isabs(self.path):
+            return self.path
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), self.path)
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            started = time.perf_counter()
+            try:
+                self._index(read_places(self._resolved_path()))
+                logger.info(f"Gazetteer loaded {len(self.names)} places from {self.path} "
+                            f"in {(time.perf_counter() - started) * 1000:.0f}ms")
+            except (OSError, ValueError) as e:
+                logger.warning(f"Gazetteer unavailable ({self.path}): {e}")
+                self._loaded = True
+
+    def _index(self, rows: List[Tuple]):
+        self.names = [row[0] for row in rows]
+        self.states = [row[1] for row in rows]
+        self.lat = np.array([row[2] for row in rows], dtype=float)
+        self.lon = np.array([row[3] for row in rows], dtype=float)
+        self.population = np.array([row[4] or 0 for row in rows], dtype=np.int64)
+        self.county_seat = np.array([bool(row[5]) for row in rows], dtype=bool)
+        self._xyz = _unit_vectors(self.lat, self.lon) if rows else np.zeros((0, 3))
+        self._trees = {0: PlaceTree(np.arange(len(rows), dtype=np.int64), self._xyz)}
+        self._loaded = True
+
+    @property
+    def available(self) -> bool:
+        self._ensure_loaded()
+        return len(self.names) > 0
+
+    def __len__(self) -> int:
+        self._ensure_loaded()
+        return len(self.names)
+
+    def _tree(self, min_population: int) -> PlaceTree:
+        self._ensure_loaded()
+        min_population = max(0, int(min_population or 0))
+        tree = self._trees.get(min_population)
+        if tree is None:
+            with self._lock:
+                tree = self._trees.get(min_population)
+                if tree is None:
+                    tree = PlaceTree(np.flatnonzero(self.population >= min_population), self._xyz)
+                    self._trees[min_population] = tree
+        return tree
+
+    def _result(self, index: int, chord: float, place_type: str) -> PlaceResult:
+        return PlaceResult(
+            name=f"{self.names[index]}, {self.states[index]}",
+            distance_miles=round(chord_to_miles(chord), 1),
+            lat=float(self.lat[index]),
+            lon=float(self.lon[index]),
+            place_type=place_type
+        )
+
+    @staticmethod
+    def _point(lat: float, lon: float) -> Tuple[float, float, float]:
+        lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+        cos_lat = math.cos(lat_rad)
+        return cos_lat * math.cos(lon_rad), cos_lat * math.sin(lon_rad), math.sin(lat_rad)
+
+    def nearest(self, lat: float, lon: float, min_population: int = 0, place_type: str = 'locality',
+                max_distance_miles: float = None) -> Optional[PlaceResult]:
+        """Closest place with at least min_population residents; None beyond max_distance_miles (None = any distance)"""
+        index, chord = self._tree(min_population).nearest(self._point(lat, lon))
+        if index < 0:
+            return None
+        if max_distance_miles is not None and chord > miles_to_chord(max_distance_miles):
+            return None
+        return self._result(index, chord, place_type)
+
+    def nearest_major_city(self, lat: float, lon: float, min_population: int = None,
+                           max_distance_miles: float = None) -> Optional[PlaceResult]:
+        """Closest place at or above the major-city population threshold, within max_distance_miles if given"""
+        threshold = self.major_city_population if min_population is None else min_population
+        return self.nearest(lat, lon, threshold, place_type='major_city', max_distance_miles=max_distance_miles)
+
+    def within_radius(self, lat: float, lon: float, radius_miles: float, min_population: int = 0,
+                      limit: int = None, place_type: str = 'locality') -> List[PlaceResult]:
+        """Places within radius_miles, closest first"""
+        found = self._tree(min_population).within(self._point(lat, lon), miles_to_chord(radius_miles))
+        found.sort(key=lambda item: item[1])
+        if limit is not None:
+            found = found[:limit]
+        return [self._result(index, chord, place_type) for index, chord in found]
+
+
+def read_places(path: str) -> List[Tuple]:
+    """Rows of a bundled places file"""
+    with open(path, newline='', encoding='utf-8') as handle:
+        reader = csv.DictReader(handle)
+        missing = set(PLACE_COLUMNS) - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"missing columns {sorted(missing)}")
+        return [(row['name'], row['state'], float(row['lat']), float(row['lon']),
+                 int(row['population'] or 0), row['county_seat'] in ('1', 'true', 'True'))
+                for row in reader]
+
+
+def build_places(gazetteer_path: str, population_path: str = None, county_seats_path: str = None,
+                 min_population: int = 0) -> List[Tuple]:
+    """
+    Places file rows from the Census Gazetteer national places file (tab separated,
+    USPS/GEOID/NAME/INTPTLAT/INTPTLONG), optionally joined to a Census SUB-EST population CSV
+    on GEOID and to a "name,state" list of county seats
+    """
+    populations: Dict[str, int] = {}
+    if population_path:
+        with open(population_path, newline='', encoding='latin-1') as handle:
+            reader = csv.DictReader(handle)
+            estimate = sorted(name for name in reader.fieldnames if name.startswith('POPESTIMATE'))[-1]
+            for row in reader:
+                if row['SUMLEV'] in ('162', '170') and row['PLACE'] not in ('', '00000', '99990'):
+                    populations[row['STATE'].zfill(2) + row['PLACE'].zfill(5)] = int(row[estimate])
+
+    county_seats = set()
+    if county_seats_path:
+        with open(county_seats_path, newline='', encoding='utf-8') as handle:
+            county_seats = {(row[0].strip().lower(), row[1].strip().upper()) for row in csv.reader(handle) if len(row) >= 2}
+
+    rows = []
+    with open(gazetteer_path, newline='', encoding='latin-1') as handle:
+        reader = csv.reader(handle, delimiter='\t')
+        header = [column.strip() for column in next(reader)]
+        position = {column: header.index(column) for column in ('USPS', 'GEOID', 'NAME', 'INTPTLAT', 'INTPTLONG')}
+        for record in reader:
+            name = _LSAD_SUFFIX.sub('', record[position['NAME']].strip())
+            state = record[position['USPS']].strip()
+            population = populations.get(record[position['GEOID']].strip(), 0)
+            if population < min_population:
+                continue
+            rows.append((name, state, round(float(record[position['INTPTLAT']]), 5),
+                         round(float(record[position['INTPTLONG']]), 5), population,
+                         (name.lower(), state) in county_seats))
+    return rows
+
+
+def write_places(path: str, rows: List[Tuple]):
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        writer = csv.writer(handle)
+        writer.writerow(PLACE_COLUMNS)
+        for name, state, lat, lon, population, county_seat in rows:
+            writer.writerow((name, state, lat, lon, population, int(bool(county_seat))))
+
+
+gazetteer = Gazetteer()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline gazetteer lookups and places file builds")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    query = subparsers.add_parser('query', help='nearest place, nearest major city and places within a radius')
+    query.add_argument('lat', type=float)
+    query.add_argument('lon', type=float)
+    query.add_argument('--radius', type=float, default=15, help='miles')
+
+    build = subparsers.add_parser('build', help='write a places file from Census Gazetteer/population files')
+    build.add_argument('--gazetteer', required=True, help='Census Gazetteer national places file (.txt)')
+    build.add_argument('--population', help='Census SUB-EST population estimates CSV')
+    build.add_argument('--county-seats', help='CSV of name,state county seats')
+    build.add_argument('--min-population', type=int, default=0)
+    build.add_argument('--output', default=Config.GAZETTEER_PATH)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'build':
+        rows = build_places(args.gazetteer, args.population, args.county_seats, args.min_population)
+        write_places(args.output, rows)
+        print(f"Wrote {len(rows)} places to {args.output}")
+        return
+
+    print(f"nearest place:      {gazetteer.nearest(args.lat, args.lon)}")
+    print(f"nearest major city: {gazetteer.nearest_major_city(args.lat, args.lon)}")
+    for place in gazetteer.within_radius(args.lat, args.lon, args.radius):
+        print(f"  {place.distance_miles:6.1f} mi  {place.name}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+"""
+Geocode Cache for HailyDB
+Address geocoding behind an in-process LRU, the geocode_cache table and single-flight Nominatim lookups
+"""
+
+import argparse
+import csv
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import requests
+from sqlalchemy import create_engine, text
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+GEOCODER_HEADERS = {
+    'User-Agent': 'HailyDB-Geocoding/1.0 (contact@hailydb.com)'
+}
+
+# A "no match" row lives NEGATIVE_TTL, a coordinate row TTL
+LOOKUP_SQL = """
+UPDATE geocode_cache SET last_used_at = NOW(), hit_count = hit_count + 1
+WHERE address_hash = :address_hash
+  AND created_at > NOW() - make_interval(secs => CASE WHEN lat IS NULL THEN :negative_ttl_seconds ELSE :ttl_seconds END)
+RETURNING lat, lon
+"""
+
+STORE_SQL = """
+INSERT INTO geocode_cache (address_hash, normalized_address, lat, lon, display_name, created_at, last_used_at, hit_count)
+VALUES (:address_hash, :normalized_address, :lat, :lon, :display_name, NOW(), NOW(), 0)
+ON CONFLICT (address_hash) DO UPDATE SET lat = EXCLUDED.lat, lon = EXCLUDED.lon,
+    display_name = EXCLUDED.display_name, created_at = NOW(), last_used_at = NOW()
+"""
+
+EVICT_SQL = """
+DELETE FROM geocode_cache
+WHERE created_at <= NOW() - make_interval(secs => CASE WHEN lat IS NULL THEN :negative_ttl_seconds ELSE :ttl_seconds END)
+"""
+
+# Sources a lookup can be answered from
+MEMORY, DATABASE, GEOCODER, ERROR = 'memory', 'database', 'geocoder', 'error'
+
+_PUNCTUATION = re.compile(r"[.,;:#'\"()]")
+_WHITESPACE = re.compile(r'\s+')
+
+# USPS standard suffix/directional abbreviations, so "123 North Main Street" and "123 N Main St" share a key
+_ABBREVIATIONS = {
+    'street': 'st', 'avenue': 'ave', 'road': 'rd', 'drive': 'dr', 'boulevard': 'blvd', 'lane': 'ln',
+    'court': 'ct', 'place': 'pl', 'circle': 'cir', 'parkway': 'pkwy', 'highway': 'hwy', 'terrace': 'ter',
+    'trail': 'trl', 'square': 'sq', 'suite': 'ste', 'apartment': 'apt',
+    'north': 'n', 'south': 's', 'east': 'e', 'west': 'w',
+    'northeast': 'ne', 'northwest': 'nw', 'southeast': 'se', 'southwest': 'sw',
+    'usa': '', 'united states': ''
+}
+_ABBREVIATION_PATTERN = re.compile(r'\b(' + '|'.join(sorted(map(re.escape, _ABBREVIATIONS), key=len, reverse=True)) + r')\b')
+
+
+def normalize_address(address: str) -> str:
+    """Case, punctuation, whitespace and street-suffix insensitive form of an address"""
+    normalized = _PUNCTUATION.sub(' ', (address or '').lower())
+    normalized = _ABBREVIATION_PATTERN.sub(lambda match: _ABBREVIATIONS[match.group(1)], normalized)
+    return _WHITESPACE.sub(' ', normalized).strip()
+
+
+def address_hash(normalized_address: str) -> str:
+    return hashlib.sha256(normalized_address.encode()).hexdigest()
+
+
+class GeocodeResult(NamedTuple):
+    lat: Optional[float]
+    lon: Optional[float]
+    source: str
+    display_name: Optional[str] = None
+
+
+class _Flight:
+    """One in-progress lookup that concurrent callers for the same address wait on"""
+
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[GeocodeResult] = None
+
+
+class GeocodeCache:
+    """
+    Geocoder with three tiers: an in-process LRU (GEOCODE_CACHE_MEMORY_ENTRIES), the
+    geocode_cache table, then Nominatim (GEOCODER_URL) spaced to GEOCODE_REQUESTS_PER_SECOND
+
+    Addresses are keyed by sha256 of normalize_address. "No match" answers are cached for
+    GEOCODE_NEGATIVE_TTL_HOURS; timeouts and HTTP errors are not cached. Concurrent lookups of
+    one address share a single flight: the first caller resolves it, the rest wait for its
+    answer. Background (bulk) lookups only take a geocoder slot that is free now, so an
+    interactive lookup never queues behind them for more than one interval. The table is
+    reached through a small engine of its own, so lookups work from pool threads and CLI jobs;
+    a database error degrades to a geocoder call.
+    """
+
+    def __init__(self, enabled: bool = None, memory_entries: int = None, ttl_days: float = None,
+                 negative_ttl_hours: float = None, requests_per_second: float = None,
+                 geocoder_url: str = None, timeout: float = None, database_url: str = None):
+        self.enabled = Config.GEOCODE_CACHE_ENABLED if enabled is None else enabled
+        self.memory_entries = Config.GEOCODE_CACHE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self.ttl_days = Config.GEOCODE_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+        self.negative_ttl_hours = Config.GEOCODE_NEGATIVE_TTL_HOURS if negative_ttl_hours is None else negative_ttl_hours
+        requests_per_second = Config.GEOCODE_REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.geocoder_url = geocoder_url or Config.GEOCODER_URL
+        self.timeout = Config.GEOCODE_TIMEOUT_SECONDS if timeout is None else timeout
+        self.database_url = database_url or Config.DATABASE_URL
+
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self._rate_lock = threading.Lock()
+        self._next_slot = 0.0
+        self._bulk_jobs = threading.BoundedSemaphore(max(1, Config.GEOCODE_BULK_MAX_JOBS))
+        self._engine = None
+        self._http = requests.Session()
+        self._http.headers.update(GEOCODER_HEADERS)
+        self.counters = {'memory_hits': 0, 'db_hits': 0, 'negative_hits': 0, 'coalesced': 0,
+                         'geocoder_requests': 0, 'not_found': 0, 'errors': 0, 'db_errors': 0}
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = create_engine(self.database_url, pool_size=2, max_overflow=4, pool_pre_ping=True)
+        return self._engine
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _ttl_seconds(self, lat: Optional[float]) -> float:
+        return self.ttl_days * 86400 if lat is not None else self.negative_ttl_hours * 3600
+
+    def _remember(self, key: str, lat: Optional[float], lon: Optional[float]):
+        with self._lock:
+            self._memory[key] = (lat, lon, time.time() + self._ttl_seconds(lat))
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _from_memory(self, key: str) -> Optional[GeocodeResult]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.time():
+                del self._memory[key]
+                return None
+            self._memory.move_to_end(key)
+            self.counters['memory_hits'] += 1
+            if entry[0] is None:
+                self.counters['negative_hits'] += 1
+            return GeocodeResult(entry[0], entry[1], MEMORY)
+
+    def geocode(self, address: str) -> Tuple[Optional[float], Optional[float]]:
+        """(lat, lon) for an address, (None, None) when it cannot be geocoded"""
+        result = self.lookup(address)
+        return result.lat, result.lon
+
+    def lookup(self, address: str, background: bool = False) -> GeocodeResult:
+        normalized = normalize_address(address)
+        if not normalized:
+            return GeocodeResult(None, None, ERROR)
+        if not self.enabled:
+            return self._request(address, background)
+        key = address_hash(normalized)
+        cached = self._from_memory(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.counters['coalesced'] += 1
+        if not leader:
+            # The leader may first wait out the request spacing of lookups queued before it
+            if flight.done.wait(timeout=self.timeout * 3) and flight.result is not None:
+                return flight.result
+            return GeocodeResult(None, None, ERROR)
+
+        result = GeocodeResult(None, None, ERROR)
+        try:
+            result = self._resolve(key, normalized, address, background)
+        finally:
+            flight.result = result
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+        return result
+
+    def _resolve(self, key: str, normalized: str, address: str, background: bool) -> GeocodeResult:
+        try:
+            with self.engine.begin() as connection:
+                row = connection.execute(text(LOOKUP_SQL), {
+                    'address_hash': key,
+                    'ttl_seconds': self.ttl_days * 86400,
+                    'negative_ttl_seconds': self.negative_ttl_hours * 3600
+                }).first()
+        except Exception as e:
+            logger.warning(f"Geocode cache lookup failed: {e}")
+            self._count('db_errors')
+            row = None
+        if row is not None:
+            self._count('db_hits')
+            if row[0] is None:
+                self._count('negative_hits')
+            self._remember(key, row[0], row[1])
+            return GeocodeResult(row[0], row[1], DATABASE)
+
+        result = self._request(address, background)
+        if result.source == ERROR:
+            return result
+        self._remember(key, result.lat, result.lon)
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(text(STORE_SQL), {
+                    'address_hash': key, 'normalized_address': normalized,
+                    'lat': result.lat, 'lon': result.lon, 'display_name': result.display_name
+                })
+        except Exception as e:
+            logger.warning(f"Geocode cache store failed: {e}")
+            self._count('db_errors')
+        return result
+
+    def _wait_for_slot(self, background: bool = False):
+        """
+        Keep to the request spacing. Interactive callers reserve the next slot, however far out;
+        background callers only take a slot that is free now and otherwise wait and retry, so
+        they never hold reservations ahead of an interactive lookup.
+        """
+        if not self.interval:
+            return
+        while True:
+            with self._rate_lock:
+                now = time.monotonic()
+                if not background or self._next_slot <= now:
+                    slot = max(now, self._next_slot)
+                    self._next_slot = slot + self.interval
+                    break
+                wait = self._next_slot - now
+            time.sleep(wait)
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _request(self, address: str, background: bool = False) -> GeocodeResult:
+        """One geocoder call; ERROR for transport/HTTP failures, None coordinates for no match"""
+        self._wait_for_slot(background)
+        self._count('geocoder_requests')
+        try:
+            response = self._http.get(self.geocoder_url, params={
+                'q': address,
+                'format': 'json',
+                'limit': 1,
+                'countrycodes': 'us'  # Limit to US addresses
+            }, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            logger.error(f"Geocoding error for address '{address}': {e}")
+            self._count('errors')
+            return GeocodeResult(None, None, ERROR)
+        if not data:
+            self._count('not_found')
+            return GeocodeResult(None, None, GEOCODER)
+        return GeocodeResult(float(data[0]['lat']), float(data[0]['lon']), GEOCODER, data[0].get('display_name'))
+
+    def pregeocode(self, addresses: Iterable[str], workers: int = None) -> Dict[str, int]:
+        """
+        Warm the cache for an address list
+        Distinct normalized addresses are looked up on a small pool at background priority;
+        geocoder calls still keep to the request spacing, so only addresses missing from both
+        cache tiers cost wall time.
+        """
+        distinct = {}
+        total = 0
+        for address in addresses:
+            total += 1
+            normalized = normalize_address(address)
+            if normalized and normalized not in distinct:
+                distinct[normalized] = address.strip()
+
+        stats = {'addresses': total, 'distinct': len(distinct), 'cached': 0, 'geocoded': 0, 'not_found': 0, 'failed': 0}
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, workers or Config.GEOCODE_BULK_WORKERS),
+                                thread_name_prefix='geocode') as executor:
+            for result in executor.map(lambda address: self.lookup(address, background=True), distinct.values()):
+                if result.source == ERROR:
+                    stats['failed'] += 1
+                elif result.lat is None:
+                    stats['not_found'] += 1
+                elif result.source == GEOCODER:
+                    stats['geocoded'] += 1
+                else:
+                    stats['cached'] += 1
+        logger.info(f"Pre-geocoded {stats['distinct']} distinct addresses in {time.perf_counter() - started:.1f}s: "
+                    f"{stats['cached']} cached, {stats['geocoded']} geocoded, {stats['not_found']} not found, "
+                    f"{stats['failed']} failed")
+        return stats
+
+    def pregeocode_async(self, addresses: List[str]) -> Optional[threading.Thread]:
+        """pregeocode on a background thread; None when GEOCODE_BULK_MAX_JOBS runs are already going"""
+        if not self._bulk_jobs.acquire(blocking=False):
+            return None
+
+        def run():
+            try:
+                self.pregeocode(addresses)
+            finally:
+                self._bulk_jobs.release()
+
+        thread = threading.Thread(target=run, name='pregeocode', daemon=True)
+        thread.start()
+        return thread
+
+    def evict(self) -> int:
+        """Drop coordinate rows past the TTL and "no match" rows past the negative TTL"""
+        with self.engine.begin() as connection:
+            deleted = connection.execute(text(EVICT_SQL), {
+                'ttl_seconds': self.ttl_days * 86400,
+                'negative_ttl_seconds': self.negative_ttl_hours * 3600
+            }).rowcount
+        if deleted:
+            logger.info(f"Geocode cache eviction: {deleted} expired rows")
+        return deleted
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            counters['memory_entries'] = len(self._memory)
+            counters['in_flight'] = len(self._flights)
+        lookups = counters['memory_hits'] + counters['db_hits'] + counters['coalesced'] + counters['geocoder_requests']
+        counters['hit_rate'] = round((lookups - counters['geocoder_requests']) / lookups, 4) if lookups else 0.0
+        return counters
+
+
+geocode_cache = GeocodeCache()
+
+
+def read_addresses(path: str, column: str = None) -> List[str]:
+    """One address per line, or the named column of a CSV"""
+    with open(path, newline='', encoding='utf-8') as handle:
+        if column:
+            return [row[column] for row in csv.DictReader(handle) if row.get(column)]
+        return [line.strip() for line in handle if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode cache maintenance and bulk pre-geocoding")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    bulk = subparsers.add_parser('pregeocode', help='geocode an address list into the cache')
+    bulk.add_argument('path', help='text file (one address per line) or CSV with --column')
+    bulk.add_argument('--column', help='CSV column holding the address')
+    bulk.add_argument('--workers', type=int, help='GEOCODE_BULK_WORKERS override')
+    subparsers.add_parser('evict', help='delete expired rows')
+    subparsers.add_parser('stats', help='cached addresses and total hits')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'pregeocode':
+        print(geocode_cache.pregeocode(read_addresses(args.path, args.column), args.workers))
+    elif args.command == 'evict':
+        print(geocode_cache.evict())
+    else:
+        with geocode_cache.engine.connect() as connection:
+            row = connection.execute(text(
+                "SELECT count(*) FILTER (WHERE lat IS NOT NULL), count(*) FILTER (WHERE lat IS NULL), "
+                "COALESCE(sum(hit_count), 0) FROM geocode_cache"
+            )).first()
+            print(f"{row[0]} geocoded, {row[1]} not found, {row[2]} hits")
+
+
+if __name__ == '__main__':
+    main()
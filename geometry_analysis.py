@@ -0,0 +1,272 @@
+"""
+Geometry Analysis for HailyDB
+Vectorized vertex counts, bounds, centroids and areas for batches of alert geometries
+"""
+
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import shapely
+
+logger = logging.getLogger(__name__)
+
+# shapely.get_type_id -> GeoJSON type name
+GEOMETRY_TYPE_NAMES = {
+    0: 'Point', 1: 'LineString', 2: 'LinearRing', 3: 'Polygon',
+    4: 'MultiPoint', 5: 'MultiLineString', 6: 'MultiPolygon', 7: 'GeometryCollection'
+}
+
+# Part roles for the area/centroid sums
+SHELL, HOLE, NO_AREA = 1, -1, 0
+
+
+def analyze_geometries(geometries: Sequence[Optional[Dict]]) -> List[Optional[Dict]]:
+    """
+    Analyze a batch of GeoJSON geometry dicts with NumPy array operations
+    Every ring/line of the batch is converted once, concatenated into a single vertex array,
+    and counts, bounds, shoelace areas and centroids are reduced per geometry in bulk.
+    Returns one entry per input (None for missing geometry):
+    {"geometry_type", "coordinate_count", "geometry_bounds", "centroid_lat", "centroid_lon", "area_sq_degrees"}
+    """
+    results: List[Optional[Dict]] = [None] * len(geometries)
+    positions = []      # batch slot -> input position
+    arrays = []         # one (n, 2) vertex array per part
+    part_slots = []     # part -> batch slot
+    part_roles = []     # part -> SHELL / HOLE / NO_AREA
+
+    for position, geometry in enumerate(geometries):
+        if not geometry:
+            continue
+        parts = _vertex_arrays(geometry)
+        if parts is None:
+            # Malformed, 3D or non-standard input keeps the walker's exact semantics
+            results[position] = _analyze_with_walker(geometry)
+            continue
+        slot = len(positions)
+        positions.append(position)
+        for array, role in parts:
+            arrays.append(array)
+            part_slots.append(slot)
+            part_roles.append(role)
+
+    if not positions:
+        return results
+
+    slot_count = len(positions)
+    part_slots = np.asarray(part_slots, dtype=np.int64)
+    part_roles = np.asarray(part_roles, dtype=np.float64)
+    part_lengths = np.fromiter((len(array) for array in arrays), dtype=np.int64, count=len(arrays))
+    counts = np.bincount(part_slots, weights=part_lengths, minlength=slot_count).astype(np.int64)
+
+    area = np.zeros(slot_count)
+    centroid_x_sum = np.zeros(slot_count)
+    centroid_y_sum = np.zeros(slot_count)
+    bounds = np.full((slot_count, 4), np.nan)
+
+    if arrays:
+        coords = np.concatenate(arrays).astype(np.float64, copy=False)
+        x = coords[:, 0]
+        y = coords[:, 1]
+        part_starts = np.concatenate(([0], np.cumsum(part_lengths)[:-1]))
+
+        # Per-geometry bounds over each geometry's contiguous vertex range
+        filled = counts > 0
+        slot_starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[filled]
+        bounds[filled, 0] = np.minimum.reduceat(x, slot_starts)
+        bounds[filled, 1] = np.minimum.reduceat(y, slot_starts)
+        bounds[filled, 2] = np.maximum.reduceat(x, slot_starts)
+        bounds[filled, 3] = np.maximum.reduceat(y, slot_starts)
+
+        # Shoelace terms; each ring wraps from its last vertex back to its first
+        following = np.arange(1, len(coords) + 1)
+        following[part_starts + part_lengths - 1] = part_starts
+        cross = x * y[following] - x[following] * y
+        ring_area = np.add.reduceat(cross, part_starts) / 2
+        ring_cx = np.add.reduceat((x + x[following]) * cross, part_starts) / 6
+        ring_cy = np.add.reduceat((y + y[following]) * cross, part_starts) / 6
+
+        # Shells add, holes subtract, lines and points carry no area
+        orientation = part_roles * np.sign(ring_area)
+        area = np.bincount(part_slots, weights=part_roles * np.abs(ring_area), minlength=slot_count)
+        centroid_x_sum = np.bincount(part_slots, weights=orientation * ring_cx, minlength=slot_count)
+        centroid_y_sum = np.bincount(part_slots, weights=orientation * ring_cy, minlength=slot_count)
+
+        # Vertex mean for geometries without area (points, lines, degenerate rings)
+        vertex_slots = np.repeat(part_slots, part_lengths)
+        mean_x = np.bincount(vertex_slots, weights=x, minlength=slot_count)
+        mean_y = np.bincount(vertex_slots, weights=y, minlength=slot_count)
+
+    for slot, position in enumerate(positions):
+        count = int(counts[slot])
+        if count > 0 and area[slot] > 0:
+            centroid_lon = float(centroid_x_sum[slot] / area[slot])
+            centroid_lat = float(centroid_y_sum[slot] / area[slot])
+        elif count > 0:
+            centroid_lon = float(mean_x[slot] / count)
+            centroid_lat = float(mean_y[slot] / count)
+        else:
+            centroid_lon = centroid_lat = None
+
+        min_lon, min_lat, max_lon, max_lat = bounds[slot]
+        results[position] = {
+            'geometry_type': geometries[position].get('type', 'Unknown'),
+            'coordinate_count': count,
+            'geometry_bounds': {
+                'min_lat': float(min_lat),
+                'max_lat': float(max_lat),
+                'min_lon': float(min_lon),
+                'max_lon': float(max_lon)
+            } if count > 0 else None,
+            'centroid_lat': centroid_lat,
+            'centroid_lon': centroid_lon,
+            'area_sq_degrees': float(area[slot])
+        }
+
+    return results
+
+
+def _vertex_arrays(geometry) -> Optional[List[Tuple[np.ndarray, int]]]:
+    """
+    Split a GeoJSON geometry into (n x 2 vertex array, role) parts
+    Returns None when the structure is not plain 2D numeric coordinates
+    """
+    if not isinstance(geometry, dict):
+        return None
+    geom_type = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    if not isinstance(coordinates, list):
+        return None
+
+    try:
+        if geom_type == 'Point':
+            parts = [([coordinates], NO_AREA)]
+        elif geom_type in ('MultiPoint', 'LineString'):
+            parts = [(coordinates, NO_AREA)] if coordinates else []
+        elif geom_type == 'MultiLineString':
+            parts = [(line, NO_AREA) for line in coordinates]
+        elif geom_type in ('Polygon', 'MultiPolygon'):
+            polygons = [coordinates] if geom_type == 'Polygon' else coordinates
+            parts = [(ring, SHELL if index == 0 else HOLE)
+                     for polygon in polygons for index, ring in enumerate(polygon)]
+        else:
+            return None
+
+        arrays = []
+        for vertices, role in parts:
+            array = np.array(vertices)
+            if array.ndim != 2 or array.shape[1] != 2 or not len(array) or array.dtype.kind not in 'biuf':
+                return None
+            arrays.append((array, role))
+        return arrays
+    except (TypeError, ValueError):
+        return None
+
+
+def analyze_shapes(shapes) -> List[Dict]:
+    """
+    Same analysis for geometries that are already shapely objects (e.g. shapefile backfills)
+    Accepts any sequence or array of shapely geometries; no None entries
+    """
+    shapes = np.asarray(shapes, dtype=object)
+    if len(shapes) == 0:
+        return []
+
+    counts = shapely.get_num_coordinates(shapes)
+    bounds = shapely.bounds(shapes)
+    areas = shapely.area(shapes)
+    centroids = shapely.centroid(shapes)
+    centroid_x = shapely.get_x(centroids)
+    centroid_y = shapely.get_y(centroids)
+    type_ids = shapely.get_type_id(shapes)
+
+    summaries = []
+    for offset in range(len(shapes)):
+        count = int(counts[offset])
+        min_lon, min_lat, max_lon, max_lat = bounds[offset]
+        summaries.append({
+            'geometry_type': GEOMETRY_TYPE_NAMES.get(int(type_ids[offset]), 'Unknown'),
+            'coordinate_count': count,
+            'geometry_bounds': {
+                'min_lat': float(min_lat),
+                'max_lat': float(max_lat),
+                'min_lon': float(min_lon),
+                'max_lon': float(max_lon)
+            } if count > 0 else None,
+            'centroid_lat': float(centroid_y[offset]) if count > 0 else None,
+            'centroid_lon': float(centroid_x[offset]) if count > 0 else None,
+            'area_sq_degrees': float(areas[offset])
+        })
+
+    return summaries
+
+
+def process_geometry_batch(alerts: Sequence) -> List[Optional[Dict]]:
+    """
+    Fill geometry_type, coordinate_count and geometry_bounds on a batch of Alert objects
+    Alerts without geometry are left untouched; returns the per-alert analysis (centroid and area included)
+    """
+    analyses = analyze_geometries([alert.geometry for alert in alerts])
+
+    for alert, analysis in zip(alerts, analyses):
+        if analysis is None:
+            continue
+        alert.geometry_type = analysis['geometry_type']
+        alert.coordinate_count = analysis['coordinate_count']
+        alert.geometry_bounds = analysis['geometry_bounds']
+
+    return analyses
+
+
+def _analyze_with_walker(geometry) -> Dict:
+    """Pure-Python fallback for geometries GEOS does not accept (or that are not dicts)"""
+    if isinstance(geometry, dict):
+        geom_type = geometry.get('type', 'Unknown')
+        coordinates = geometry.get('coordinates', [])
+    else:
+        geom_type = 'Unknown'
+        coordinates = []
+
+    coord_count, bounds = walk_coordinates(coordinates)
+    return {
+        'geometry_type': geom_type,
+        'coordinate_count': coord_count,
+        'geometry_bounds': bounds,
+        'centroid_lat': (bounds['min_lat'] + bounds['max_lat']) / 2 if bounds else None,
+        'centroid_lon': (bounds['min_lon'] + bounds['max_lon']) / 2 if bounds else None,
+        'area_sq_degrees': None
+    }
+
+
+def walk_coordinates(coordinates) -> Tuple[int, Optional[Dict]]:
+    """Count [lon, lat] pairs in an arbitrarily nested coordinate list and calculate bounds"""
+    coord_count = 0
+    min_lat = min_lon = float('inf')
+    max_lat = max_lon = float('-inf')
+
+    stack = [coordinates]
+    while stack:
+        coords = stack.pop()
+        if not isinstance(coords, list):
+            continue
+
+        # Check if this is a coordinate pair [lon, lat]
+        if len(coords) == 2 and all(isinstance(x, (int, float)) for x in coords):
+            lon, lat = coords
+            coord_count += 1
+            min_lon = min(min_lon, lon)
+            max_lon = max(max_lon, lon)
+            min_lat = min(min_lat, lat)
+            max_lat = max(max_lat, lat)
+        else:
+            stack.extend(item for item in coords if isinstance(item, list))
+
+    bounds = None
+    if coord_count > 0 and min_lat != float('inf'):
+        bounds = {
+            'min_lat': min_lat,
+            'max_lat': max_lat,
+            'min_lon': min_lon,
+            'max_lon': max_lon
+        }
+
+    return coord_count, bounds
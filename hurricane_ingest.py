@@ -12,6 +12,8 @@ from datetime import datetime, timezone
 from typing import Dict, List, Optional, Any
 from models import HurricaneTrack, HurricaneCountyImpact
 from app import db
+from config import Config
+from source_archive import source_archive
 
 logger = logging.getLogger(__name__)
 
@@ -100,7 +102,7 @@ class HurricaneIngestService:
             
             # Fetch official NOAA HURDAT2 Atlantic database
             logger.info("Fetching NOAA HURDAT2 Atlantic hurricane database")
-            response = requests.get("https://www.nhc.noaa.gov/data/hurdat/hurdat2-1851-2023-051124.txt", timeout=30)
+            response = source_archive.fetch(Config.HURDAT2_URL, timeout=30)
             response.raise_for_status()
             
             # Parse HURDAT2 format
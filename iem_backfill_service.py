@@ -19,7 +19,10 @@ from shapely.ops import unary_union
 import json
 
 from models import db
+from config import Config
 from scheduler_service import SchedulerService
+from source_archive import final_max_age, source_archive
+from alert_normalizer import normalization_pool, normalize_shape_records, pyshp_to_shapely
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +39,7 @@ class IemBackfillService:
     def __init__(self, db_session):
         self.db = db_session
         self.scheduler_service = SchedulerService(db_session)
-        self.base_url = "https://mesonet.agron.iastate.edu/cgi-bin/request/gis/watchwarn.py"
+        self.base_url = Config.IEM_WATCHWARN_URL
         self.headers = {
             'User-Agent': 'HailyDB-IEM-Backfill/1.0 (contact@hailydb.com)',
             'Accept': 'application/zip'
@@ -74,15 +77,17 @@ class IemBackfillService:
         logger.info(f"Built IEM URL: {url}")
         return url
     
-    def download_shapefile(self, url: str) -> Optional[bytes]:
+    def download_shapefile(self, url: str, max_age: Optional[float] = None) -> Optional[bytes]:
         """
         Download shapefile ZIP from IEM with retry logic
+        Goes through the source archive; max_age (see source_archive.final_max_age) lets a closed
+        month be served from disk without a request.
         """
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"Downloading shapefile (attempt {attempt + 1}/{self.max_retries})")
                 
-                response = requests.get(url, headers=self.headers, timeout=60)
+                response = source_archive.fetch(url, headers=self.headers, timeout=60, max_age=max_age)
                 response.raise_for_status()
                 
                 if response.status_code == 429:
@@ -143,38 +148,18 @@ class IemBackfillService:
                 field_names = [field[0] for field in sf.fields[1:]]  # Skip deletion flag
                 logger.info(f"Shapefile fields: {field_names}")
                 
-                # Process each shape record
+                # Read records here; geometry conversion and analysis are CPU-bound and
+                # run on the normalization pool when NORMALIZE_WORKERS > 0
+                records = []
                 for shape_record in sf.shapeRecords():
                     try:
-                        # Extract attributes
-                        attributes = dict(zip(field_names, shape_record.record))
-                        
-                        # Extract geometry
-                        geom = shape_record.shape
-                        if not geom.parts:
-                            logger.warning("Shape with no parts, skipping")
-                            continue
-                        
-                        # Convert to Shapely geometry
-                        shapely_geom = self._pyshp_to_shapely(geom)
-                        if not shapely_geom:
-                            continue
-                        
-                        # Convert to GeoJSON
-                        geojson = mapping(shapely_geom)
-                        
-                        alert_record = {
-                            'attributes': attributes,
-                            'geometry': geojson,
-                            'original_geom': geom  # Keep original for debugging
-                        }
-                        
-                        alerts.append(alert_record)
-                        
+                        records.append((dict(zip(field_names, shape_record.record)), shape_record.shape))
                     except Exception as e:
                         logger.error(f"Error processing shape record: {e}")
                         continue
                 
+                alerts = normalization_pool.map_chunks(normalize_shape_records, records)
+                
                 logger.info(f"Parsed {len(alerts)} alert records from shapefile")
                 return alerts
                 
@@ -186,50 +171,7 @@ class IemBackfillService:
         """
         Convert pyshp shape to Shapely geometry
         """
-        try:
-            # Convert pyshp shape to GeoJSON-like structure
-            if pyshp_shape.shapeType == pyshp.POLYGON:
-                # Handle polygon with potential holes
-                if len(pyshp_shape.parts) == 1:
-                    # Simple polygon
-                    coords = list(pyshp_shape.points)
-                    if len(coords) < 3:
-                        return None
-                    
-                    # Close polygon if not closed
-                    if coords[0] != coords[-1]:
-                        coords.append(coords[0])
-                    
-                    return Polygon(coords)
-                else:
-                    # Polygon with holes or MultiPolygon
-                    polygons = []
-                    parts = list(pyshp_shape.parts) + [len(pyshp_shape.points)]
-                    
-                    for i in range(len(parts) - 1):
-                        start = parts[i]
-                        end = parts[i + 1]
-                        ring_coords = pyshp_shape.points[start:end]
-                        
-                        if len(ring_coords) < 3:
-                            continue
-                        
-                        # Close ring if not closed
-                        if ring_coords[0] != ring_coords[-1]:
-                            ring_coords.append(ring_coords[0])
-                        
-                        polygons.append(Polygon(ring_coords))
-                    
-                    if len(polygons) == 1:
-                        return polygons[0]
-                    elif len(polygons) > 1:
-                        return MultiPolygon(polygons)
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error converting pyshp to Shapely: {e}")
-            return None
+        return pyshp_to_shapely(pyshp_shape)
     
     def build_vtec_key(self, attributes: Dict) -> Optional[str]:
         """
@@ -369,7 +311,8 @@ class IemBackfillService:
             
             # Download shapefile
             url = self.get_florida_url(start_date, end_date)
-            zip_data = self.download_shapefile(url)
+            month_end = datetime.strptime(end_date, '%Y-%m-%d').date() - timedelta(days=1)
+            zip_data = self.download_shapefile(url, max_age=final_max_age(month_end))
             
             if not zip_data:
                 error_msg = "Failed to download shapefile"
@@ -463,6 +406,7 @@ class IemBackfillService:
         try:
             attributes = alert_record['attributes']
             geometry = alert_record['geometry']
+            analysis = alert_record.get('geometry_analysis') or {}
             
             # Build VTEC key
             vtec_key = self.build_vtec_key(attributes)
@@ -486,12 +430,15 @@ class IemBackfillService:
                 INSERT INTO alerts (
                     id, event, severity, area_desc, effective, expires, sent,
                     geometry, properties, geom, vtec_key, data_source,
+                    geometry_type, coordinate_count, geometry_bounds,
                     ingested_at, updated_at
                 ) VALUES (
                     :vtec_key, :event, :severity, :area_desc, :effective, :expires, :effective,
                     :geometry_json, :properties, 
                     ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(:geometry_str), 4326)),
-                    :vtec_key, 'iem_watchwarn', NOW(), NOW()
+                    :vtec_key, 'iem_watchwarn',
+                    :geometry_type, :coordinate_count, :geometry_bounds,
+                    NOW(), NOW()
                 )
                 ON CONFLICT (id) DO UPDATE SET
                     event = EXCLUDED.event,
@@ -503,6 +450,9 @@ class IemBackfillService:
                     properties = EXCLUDED.properties,
                     geom = ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(EXCLUDED.properties->>'geometry'), 4326)),
                     data_source = EXCLUDED.data_source,
+                    geometry_type = EXCLUDED.geometry_type,
+                    coordinate_count = EXCLUDED.coordinate_count,
+                    geometry_bounds = EXCLUDED.geometry_bounds,
                     updated_at = NOW()
                 WHERE alerts.data_source = 'iem_watchwarn' OR alerts.data_source IS NULL
                 RETURNING (xmax = 0) AS inserted
@@ -517,7 +467,10 @@ class IemBackfillService:
                 'expires': expires,
                 'geometry_json': json.dumps(geometry),
                 'geometry_str': json.dumps(geometry),
-                'properties': json.dumps(attributes)
+                'properties': json.dumps(attributes),
+                'geometry_type': analysis.get('geometry_type'),
+                'coordinate_count': analysis.get('coordinate_count'),
+                'geometry_bounds': json.dumps(analysis['geometry_bounds']) if analysis.get('geometry_bounds') else None
             })
             
             row = result.fetchone()
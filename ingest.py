@@ -1,37 +1,91 @@
 import logging
-import requests
-import re
 import os
+import time
 from datetime import datetime
-from typing import Optional, Dict, List, Iterator
+from typing import Optional, Dict, List
+from sqlalchemy import text
 from models import Alert, IngestionLog
 from config import Config
 from state_enrichment_service import StateEnrichmentService
+from alert_bulk_writer import AlertBulkWriter, row_from_dict
+from nws_feed_stream import NWSFeedStream
+from alert_payload import ensure_payload_schema
+from radar_extraction import radar_extractor
+from alert_normalizer import (
+    compute_feature_fingerprint, is_test_message, parse_datetime, normalize_features,
+    enrich_missing_states, normalization_pool
+)
 
 logger = logging.getLogger(__name__)
 
-def chunks(data: List, chunk_size: int) -> Iterator[List]:
-    """Utility function to chunk data into batches"""
-    for i in range(0, len(data), chunk_size):
-        yield data[i:i + chunk_size]
-
 class IngestService:
     """
     NWS Alert Ingestion Service
     Handles polling, pagination, deduplication, and storage
     """
     
+    _schema_ready = False  # Diff-ingestion columns verified once per process
+    
     def __init__(self, db):
         self.db = db
         self.config = Config()
         self.db_write_batch_size = int(os.getenv("DB_WRITE_BATCH_SIZE", "100"))  # Reduced batch size for connection stability
         self.state_enrichment = StateEnrichmentService()  # Initialize state enrichment
+        self.bulk_writer = AlertBulkWriter(db)
+        self.use_bulk_writes = Config.NWS_BULK_UPSERT
+        self.max_in_flight_features = Config.NWS_MAX_IN_FLIGHT_FEATURES
         
-    def poll_nws_alerts(self) -> int:
+        # Conditional GET validators from the last complete poll of NWS_ALERT_URL
+        self._etag = None
+        self._last_modified = None
+    
+    def _ensure_schema(self):
+        """Add diff-ingestion columns and the alert_feature() function to existing deployments (idempotent)"""
+        if IngestService._schema_ready:
+            return
+        try:
+            self.db.session.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"))
+            self.db.session.execute(text("ALTER TABLE ingestion_logs ADD COLUMN IF NOT EXISTS unchanged_alerts INTEGER DEFAULT 0"))
+            ensure_payload_schema(self.db.session)
+            self.db.session.commit()
+            IngestService._schema_ready = True
+        except Exception as e:
+            logger.warning(f"Could not ensure diff-ingestion schema: {e}")
+            self.db.session.rollback()
+    
+    def _load_known_fingerprints(self, alert_ids: List[str]) -> Dict[str, Optional[str]]:
+        """
+        Load stored content fingerprints for the given alert IDs in a single query
+        Returns {alert_id: content_hash}; legacy rows without a fingerprint map to None
+        """
+        if not alert_ids:
+            return {}
+        
+        rows = self.db.session.execute(
+            text("SELECT id, content_hash FROM alerts WHERE id = ANY(:ids)"),
+            {'ids': list(alert_ids)}
+        ).fetchall()
+        return {row[0]: row[1] for row in rows}
+    
+    def _conditional_headers(self) -> Dict:
+        """Request headers for the first page, including cached validators"""
+        headers = dict(self.config.NWS_HEADERS)
+        if self._etag:
+            headers['If-None-Match'] = self._etag
+        if self._last_modified:
+            headers['If-Modified-Since'] = self._last_modified
+        return headers
+        
+    def poll_nws_alerts(self) -> Dict:
         """
         Main ingestion method - polls NWS API and stores alerts
-        Returns number of new alerts ingested
+        Streaming pipeline: a producer thread fetches and parses pages while this
+        thread normalizes and writes bounded batches as soon as they fill up
+        Diff mode: features whose content fingerprint matches the stored one are skipped
+        Returns dict of new/updated/unchanged counts plus per-stage timings
         """
+        self._ensure_schema()
+        
         log_entry = IngestionLog()
         self.db.session.add(log_entry)
         self.db.session.commit()
@@ -39,116 +93,88 @@ class IngestService:
         # Initialize error tracking
         self._failed_alerts = []
         start_time = datetime.utcnow()
-        http_status = None
-        api_response_size = 0
-        duplicate_count = 0
+        counts = {'total_processed': 0, 'new': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0}
+        write_seconds = 0.0
         
         try:
             logger.info("Starting NWS alert ingestion")
             
-            total_processed = 0
-            new_alerts = 0
-            updated_alerts = 0
-            alerts_to_process = []  # Collect alerts for batch processing
-            
-            url = self.config.NWS_ALERT_URL
-            
-            # Step 1: Collect all alerts from all pages (no processing limits)
-            while url:
-                logger.debug(f"Polling URL: {url}")
-                
-                try:
-                    response = requests.get(url, headers=self.config.NWS_HEADERS, timeout=30)
-                    response.raise_for_status()
-                    http_status = response.status_code
-                    
-                    data = response.json()
-                    api_response_size += len(response.content)
-                    features = data.get('features', [])
-                    
-                    logger.info(f"Retrieved {len(features)} alerts from current page")
-                    alerts_to_process.extend(features)
-                    
-                    # Handle pagination
-                    pagination = data.get('pagination', {})
-                    url = pagination.get('next')
-                    
-                    if url:
-                        logger.debug(f"Following pagination to: {url}")
-                    
-                except requests.RequestException as e:
-                    logger.error(f"HTTP error during ingestion: {e}")
-                    break
-                except Exception as e:
-                    logger.error(f"Unexpected error during page processing: {e}")
-                    break
-            
-            logger.info(f"Collected {len(alerts_to_process)} total alerts for processing")
-            
-            # Step 2: Process alerts in configurable batches for database writes
-            for batch in chunks(alerts_to_process, self.db_write_batch_size):
-                logger.debug(f"Processing batch of {len(batch)} alerts")
-                
-                for feature in batch:
-                    try:
-                        result = self._process_alert_feature(feature)
-                        total_processed += 1
-                        
-                        if result == 'new':
-                            new_alerts += 1
-                        elif result == 'updated':
-                            updated_alerts += 1
-                        elif result == 'skipped' and hasattr(self, '_failed_alerts') and self._failed_alerts:
-                            # Check if last error was a duplicate
-                            last_error = self._failed_alerts[-1] if self._failed_alerts else {}
-                            if 'duplicate' in last_error.get('error', '').lower():
-                                duplicate_count += 1
-                            
-                    except Exception as e:
-                        logger.error(f"Error processing alert feature: {e}")
-                        continue
-                
-                # Commit this batch with retry logic
-                max_retries = 3
-                for retry_count in range(max_retries):
-                    try:
-                        self.db.session.commit()
-                        logger.debug(f"Committed batch of {len(batch)} alerts (attempt {retry_count + 1})")
-                        break
-                    except Exception as e:
-                        logger.warning(f"Error committing batch (attempt {retry_count + 1}): {e}")
-                        self.db.session.rollback()
-                        
-                        if retry_count == max_retries - 1:
-                            logger.error(f"Failed to commit batch after {max_retries} attempts, skipping batch")
-                            continue
-                        else:
-                            # Brief delay before retry
-                            import time
-                            time.sleep(0.5)
-                            # Create fresh session for retry
-                            self.db.session.close()
-                            continue
+            # Step 1: Producer stage - pages stream into a bounded queue (backpressure)
+            # Only the feed root carries validators; pagination cursors change every poll
+            stream = NWSFeedStream(
+                self.config.NWS_ALERT_URL,
+                headers=self.config.NWS_HEADERS,
+                first_page_headers=self._conditional_headers(),
+                max_in_flight=self.max_in_flight_features,
+                timeout=self.config.REQUEST_TIMEOUT
+            ).start()
+            
+            # Step 2: Consumer stage - write each batch while later pages are still downloading
+            batch = []
+            for feature in stream:
+                batch.append(feature)
+                if len(batch) >= self.db_write_batch_size:
+                    batch_started = time.monotonic()
+                    self._write_batch(batch, counts)
+                    write_seconds += time.monotonic() - batch_started
+                    batch = []
+            if batch:
+                batch_started = time.monotonic()
+                self._write_batch(batch, counts)
+                write_seconds += time.monotonic() - batch_started
             
             # Calculate processing duration
             processing_duration = (datetime.utcnow() - start_time).total_seconds()
+            stage_timings = {
+                'fetch_seconds': round(stream.fetch_seconds, 3),
+                'write_seconds': round(write_seconds, 3),
+                'backpressure_seconds': round(stream.backpressure_seconds, 3),
+                'pages_fetched': stream.pages_fetched
+            }
+            
+            if stream.not_modified:
+                logger.info("NWS feed not modified since last poll, skipping ingestion")
+            else:
+                logger.info(f"Streamed {stream.features_streamed} alerts from {stream.pages_fetched} pages")
+            
+            # Only trust validators once the whole feed has been stored without failures
+            if not stream.not_modified:
+                if stream.complete and not self._failed_alerts:
+                    self._etag = stream.etag
+                    self._last_modified = stream.last_modified
+                else:
+                    self._etag = self._last_modified = None
             
             # Update log entry with comprehensive details
             log_entry.completed_at = datetime.utcnow()
             log_entry.success = True
-            log_entry.alerts_processed = total_processed
-            log_entry.new_alerts = new_alerts
-            log_entry.updated_alerts = updated_alerts
+            log_entry.alerts_processed = counts['total_processed']
+            log_entry.new_alerts = counts['new']
+            log_entry.updated_alerts = counts['updated']
+            log_entry.unchanged_alerts = counts['unchanged']
+            if stream.error:
+                log_entry.error_message = f"Feed stream stopped early: {stream.error}"
             self.db.session.commit()
             
-            logger.info(f"Ingestion complete: {new_alerts} new, {updated_alerts} updated, {total_processed} total, {duplicate_count} duplicates, {len(self._failed_alerts)} failed")
-            return {
-                'new_alerts': new_alerts,
-                'updated_alerts': updated_alerts,
-                'total_processed': total_processed,
-                'duplicate_count': duplicate_count,
-                'failed_count': len(self._failed_alerts)
+            logger.info(f"Ingestion complete: {counts['new']} new, {counts['updated']} updated, {counts['unchanged']} unchanged, {counts['total_processed']} total, {counts['duplicates']} duplicates, {len(self._failed_alerts)} failed ({stage_timings})")
+            result = {
+                'new_alerts': counts['new'],
+                'updated_alerts': counts['updated'],
+                'unchanged_alerts': counts['unchanged'],
+                'total_processed': counts['total_processed'],
+                'duplicate_count': counts['duplicates'],
+                'failed_count': len(self._failed_alerts),
+                'http_status': stream.http_status,
+                'api_response_size': stream.api_response_size,
+                'processing_duration': processing_duration,
+                'stage_timings': stage_timings
             }
+            if stream.not_modified:
+                result['not_modified'] = True
+            if stream.error:
+                # Pages after the failure were not ingested; the stored feed is partial
+                result['stream_error'] = str(stream.error)
+            return result
             
         except Exception as e:
             logger.error(f"Fatal error during ingestion: {e}")
@@ -164,54 +190,106 @@ class IngestService:
             
             raise
     
-    def _process_alert_feature(self, feature: Dict) -> str:
+    def _write_batch(self, batch: List[Dict], counts: Dict) -> None:
+        """
+        Write one bounded batch of features, accumulating into counts
+        Fingerprints are loaded per batch with a single query
+        """
+        logger.debug(f"Processing batch of {len(batch)} alerts")
+        
+        batch_ids = [f.get('properties', {}).get('id') for f in batch]
+        known_fingerprints = self._load_known_fingerprints([i for i in batch_ids if i])
+        
+        if self.use_bulk_writes:
+            try:
+                bulk_counts = self._write_batch_bulk(batch, known_fingerprints)
+                counts['total_processed'] += len(batch)
+                counts['new'] += bulk_counts['new']
+                counts['updated'] += bulk_counts['updated']
+                counts['unchanged'] += bulk_counts['unchanged']
+                return
+            except Exception as e:
+                # Fall back to the per-row path so one bad batch never loses a poll
+                logger.warning(f"Bulk upsert failed for batch of {len(batch)}, falling back to per-row writes: {e}")
+                self.db.session.rollback()
+        
+        for feature in batch:
+            try:
+                result = self._process_alert_feature(feature, known_fingerprints)
+                counts['total_processed'] += 1
+                
+                if result in ('new', 'updated', 'unchanged'):
+                    counts[result] += 1
+                elif result == 'skipped' and self._failed_alerts:
+                    # Check if last error was a duplicate
+                    last_error = self._failed_alerts[-1]
+                    if 'duplicate' in last_error.get('error', '').lower():
+                        counts['duplicates'] += 1
+                    
+            except Exception as e:
+                logger.error(f"Error processing alert feature: {e}")
+                continue
+        
+        # Commit this batch with retry logic
+        max_retries = 3
+        for retry_count in range(max_retries):
+            try:
+                self.db.session.commit()
+                logger.debug(f"Committed batch of {len(batch)} alerts (attempt {retry_count + 1})")
+                break
+            except Exception as e:
+                logger.warning(f"Error committing batch (attempt {retry_count + 1}): {e}")
+                self.db.session.rollback()
+                
+                if retry_count == max_retries - 1:
+                    logger.error(f"Failed to commit batch after {max_retries} attempts, skipping batch")
+                else:
+                    # Brief delay before retry
+                    time.sleep(0.5)
+                    # Create fresh session for retry
+                    self.db.session.close()
+    
+    def _process_alert_feature(self, feature: Dict, known_fingerprints: Optional[Dict[str, Optional[str]]] = None) -> str:
         """
         Process a single alert feature from NWS API
-        Returns 'new', 'updated', or 'skipped'
+        known_fingerprints: {alert_id: content_hash} preloaded for the poll; None falls back to a per-alert lookup
+        Returns 'new', 'updated', 'unchanged', or 'skipped'
         """
         try:
             properties = feature.get('properties', {})
             alert_id = properties.get('id')
-            event_type = properties.get('event', '')
             
             # CRITICAL: Enhanced test message filtering to prevent database pollution
-            status = properties.get('status', '')
-            description = properties.get('description', '')
-            instruction = properties.get('instruction', '')
-            headline = properties.get('headline', '')
-            
-            # Comprehensive test message detection patterns
-            is_test_message = (
-                event_type == 'Test Message' or
-                status == 'Test' or
-                'monitoring message only' in (description or '').lower() or
-                'monitoring message only' in (instruction or '').lower() or
-                'please disregard' in (description or '').lower() or
-                'please disregard' in (instruction or '').lower() or
-                'test message' in (headline or '').lower() or
-                'KEEPALIVE' in (alert_id or '')
-            )
-            
-            if is_test_message:
-                logger.debug(f"Skipping test message alert: {alert_id} (event: {event_type}, status: {status})")
+            if self._is_test_message(properties):
+                logger.debug(f"Skipping test message alert: {alert_id} (event: {properties.get('event', '')}, status: {properties.get('status', '')})")
                 return 'skipped'
             
             if not alert_id:
                 logger.warning("Alert feature missing ID, skipping")
                 return 'skipped'
             
-            # Check if alert already exists using a separate query to avoid session conflicts
-            existing_alert = self.db.session.query(Alert).filter_by(id=alert_id).first()
+            fingerprint = compute_feature_fingerprint(feature)
+            
+            if known_fingerprints is not None:
+                if alert_id in known_fingerprints and known_fingerprints[alert_id] == fingerprint:
+                    logger.debug(f"Alert unchanged since last poll: {alert_id}")
+                    return 'unchanged'
+                existing_alert = self.db.session.get(Alert, alert_id) if alert_id in known_fingerprints else None
+            else:
+                # Check if alert already exists using a separate query to avoid session conflicts
+                existing_alert = self.db.session.query(Alert).filter_by(id=alert_id).first()
+                if existing_alert and existing_alert.content_hash == fingerprint:
+                    return 'unchanged'
             
             if existing_alert:
                 # Update existing alert
-                self._update_alert(existing_alert, feature)
+                self._update_alert(existing_alert, feature, fingerprint)
                 logger.debug(f"Updated existing alert: {alert_id}")
                 return 'updated'
             else:
                 # Create new alert with duplicate protection
                 try:
-                    self._create_alert(feature)
+                    self._create_alert(feature, fingerprint)
                     logger.debug(f"Created new alert: {alert_id}")
                     return 'new'
                 except Exception as create_error:
@@ -222,7 +300,7 @@ class IngestService:
                         self.db.session.rollback()
                         existing_alert = self.db.session.query(Alert).filter_by(id=alert_id).first()
                         if existing_alert:
-                            self._update_alert(existing_alert, feature)
+                            self._update_alert(existing_alert, feature, fingerprint)
                             return 'updated'
                         else:
                             logger.error(f"Failed to handle duplicate for {alert_id}")
@@ -242,71 +320,88 @@ class IngestService:
             })
             return 'skipped'
     
-    def _create_alert(self, feature: Dict) -> Alert:
-        """Create new alert from NWS feature"""
-        properties = feature.get('properties', {})
+    def _is_test_message(self, properties: Dict) -> bool:
+        """Comprehensive test message detection patterns"""
+        return is_test_message(properties)
+    
+    def _write_batch_bulk(self, batch: List[Dict], known_fingerprints: Dict[str, Optional[str]]) -> Dict:
+        """
+        Normalize a batch of features and merge it with one COPY + INSERT ... ON CONFLICT
+        Unchanged features are dropped before normalization; the merge guards on content_hash too
+        Returns {'new', 'updated', 'unchanged', 'skipped'} counts
+        """
+        counts = {'new': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        pending = []
+        pending_fingerprints = []
         
-        alert = Alert(
-            id=properties.get('id'),
-            event=properties.get('event'),
-            severity=properties.get('severity'),
-            area_desc=properties.get('areaDesc'),
-            effective=self._parse_datetime(properties.get('effective')),
-            expires=self._parse_datetime(properties.get('expires')),
-            sent=self._parse_datetime(properties.get('sent')),
-            geometry=feature.get('geometry'),
-            properties=properties,
-            raw=feature,
-            radar_indicated=self._parse_radar_indicated(properties)
-        )
+        for feature in batch:
+            properties = feature.get('properties', {})
+            alert_id = properties.get('id')
+            
+            if not alert_id or self._is_test_message(properties):
+                counts['skipped'] += 1
+                continue
+            
+            fingerprint = compute_feature_fingerprint(feature)
+            if known_fingerprints.get(alert_id) == fingerprint:
+                counts['unchanged'] += 1
+                continue
+            
+            pending.append(feature)
+            pending_fingerprints.append(fingerprint)
         
-        # Process full geometry for Feature 3: Full Geometry & County Mapping
-        alert.process_full_geometry()
+        # CPU-bound normalization, on worker processes when NORMALIZE_WORKERS > 0
+        rows = []
+        normalized = normalize_features(pending, pending_fingerprints, pool=normalization_pool)
+        for feature, (row, error) in zip(pending, normalized):
+            if row is None:
+                properties = feature.get('properties', {})
+                logger.error(f"Error normalizing alert feature {properties.get('id')}: {error}")
+                self._failed_alerts.append({
+                    'alert_id': properties.get('id'),
+                    'error': error,
+                    'event_type': properties.get('event', 'Unknown')
+                })
+                counts['skipped'] += 1
+                continue
+            rows.append(row_from_dict(row))
         
-        # Automatic state enrichment if missing
-        self._enrich_alert_states(alert)
+        merged = self.bulk_writer.upsert_rows(rows)
+        self.db.session.commit()
         
+        counts['new'] += merged['inserted']
+        counts['updated'] += merged['updated']
+        counts['unchanged'] += merged['unchanged']
+        return counts
+    
+    def _build_alert(self, feature: Dict, fingerprint: Optional[str] = None) -> Alert:
+        """Normalize an NWS feature into a transient Alert (not added to the session)"""
+        return Alert(**self._normalize_feature(feature, fingerprint))
+    
+    def _normalize_feature(self, feature: Dict, fingerprint: Optional[str] = None) -> Dict:
+        """Row dict for a single feature, built by the same ORM-free code the worker pool runs"""
+        row, error = normalize_features([feature], [fingerprint])[0]
+        if row is None:
+            raise ValueError(error)
+        return row
+    
+    def _create_alert(self, feature: Dict, fingerprint: Optional[str] = None) -> Alert:
+        """Create new alert from NWS feature"""
+        alert = self._build_alert(feature, fingerprint)
         self.db.session.add(alert)
         return alert
     
-    def _update_alert(self, alert: Alert, feature: Dict) -> Alert:
+    def _update_alert(self, alert: Alert, feature: Dict, fingerprint: Optional[str] = None) -> Alert:
         """Update existing alert with new data"""
-        properties = feature.get('properties', {})
-        
-        # Update fields that might change
-        alert.event = properties.get('event')
-        alert.severity = properties.get('severity')
-        alert.area_desc = properties.get('areaDesc')
-        alert.effective = self._parse_datetime(properties.get('effective'))
-        alert.expires = self._parse_datetime(properties.get('expires'))
-        alert.sent = self._parse_datetime(properties.get('sent'))
-        alert.geometry = feature.get('geometry')
-        alert.properties = properties
-        alert.raw = feature
-        alert.radar_indicated = self._parse_radar_indicated(properties)
-        
-        # Process full geometry for Feature 3: Full Geometry & County Mapping
-        alert.process_full_geometry()
-        
-        # Automatic state enrichment if missing
-        self._enrich_alert_states(alert)
+        for column, value in self._normalize_feature(feature, fingerprint).items():
+            if column != 'id':
+                setattr(alert, column, value)
         
         return alert
     
     def _parse_datetime(self, dt_string: Optional[str]) -> Optional[datetime]:
         """Parse ISO datetime string from NWS API"""
-        if not dt_string:
-            return None
-        
-        try:
-            # Handle various ISO formats
-            if dt_string.endswith('Z'):
-                dt_string = dt_string[:-1] + '+00:00'
-            
-            return datetime.fromisoformat(dt_string.replace('Z', '+00:00'))
-        except ValueError as e:
-            logger.warning(f"Could not parse datetime '{dt_string}': {e}")
-            return None
+        return parse_datetime(dt_string)
     
     def get_ingestion_stats(self) -> Dict:
         """Get ingestion statistics"""
@@ -326,6 +421,7 @@ class IngestService:
                 'started_at': latest_log.started_at.isoformat() if latest_log else None,
                 'success': latest_log.success if latest_log else None,
                 'new_alerts': latest_log.new_alerts if latest_log else 0,
+                'unchanged_alerts': (latest_log.unchanged_alerts or 0) if latest_log else 0,
                 'alerts_processed': latest_log.alerts_processed if latest_log else 0
             } if latest_log else None
         }
@@ -334,27 +430,7 @@ class IngestService:
         """
         Automatically enrich alert with state information if missing
         """
-        try:
-            # Check if alert already has state information
-            if alert.affected_states and isinstance(alert.affected_states, list) and len(alert.affected_states) > 0:
-                return  # Already enriched
-                
-            # Extract UGC codes from geocode data
-            ugc_codes = []
-            if alert.properties and 'geocode' in alert.properties:
-                geocode = alert.properties['geocode']
-                if 'UGC' in geocode:
-                    ugc_codes = geocode['UGC']
-            
-            # Enrich states using the service
-            if ugc_codes:
-                states = list(self.state_enrichment.extract_states_from_ugc(ugc_codes))
-                if states:
-                    alert.affected_states = states
-                    logger.debug(f"Auto-enriched alert {alert.id} with states: {states}")
-                    
-        except Exception as e:
-            logger.warning(f"Failed to auto-enrich states for alert {alert.id}: {e}")
+        alert.affected_states = enrich_missing_states(alert.id, alert.affected_states, alert.properties)
 
     def _parse_radar_indicated(self, properties: Dict) -> Optional[Dict]:
         """
@@ -362,106 +438,12 @@ class IngestService:
         Returns {"hail_inches": float, "wind_mph": int} with ALL extracted data
         CRITICAL: No filtering - populate ALL radar data for comprehensive client coverage
         """
-        # Check NWS API parameters first (most reliable)
-        parameters = properties.get('parameters', {})
-        
-        radar_hail = None
-        radar_wind = None
-        
-        # Extract hail from maxHailSize parameter
-        max_hail_size = parameters.get('maxHailSize')
-        if max_hail_size and isinstance(max_hail_size, list) and len(max_hail_size) > 0:
-            try:
-                radar_hail = float(max_hail_size[0])
-            except (ValueError, TypeError):
-                pass
-        
-        # Extract wind from maxWindGust parameter  
-        max_wind_gust = parameters.get('maxWindGust')
-        if max_wind_gust and isinstance(max_wind_gust, list) and len(max_wind_gust) > 0:
-            wind_str = max_wind_gust[0]
-            if isinstance(wind_str, str):
-                # Extract numeric value from "50 MPH" format
-                import re
-                match = re.search(r'(\d+)', wind_str)
-                if match:
-                    try:
-                        radar_wind = int(match.group(1))
-                    except (ValueError, TypeError):
-                        pass
-        
-        # Fall back to comprehensive text parsing
-        description = properties.get('description', '') or ''
-        headline = properties.get('headline', '') or ''
-        instruction = properties.get('instruction', '') or ''
-        
-        # Combine all text for comprehensive extraction
-        all_text = f"{description} {headline} {instruction}"
-        
-        if radar_hail is None:
-            radar_hail = self._extract_hail_size(all_text)
-        if radar_wind is None:
-            radar_wind = self._extract_wind_speed(all_text)
-        
-        # CRITICAL: Return ALL extracted radar data, no filtering
-        # Client applications handle their own filtering criteria
-        radar_data = {}
-        if radar_hail is not None and radar_hail > 0:
-            radar_data['hail_inches'] = radar_hail
-        if radar_wind is not None and radar_wind > 0:
-            radar_data['wind_mph'] = radar_wind
-            
-        return radar_data if radar_data else None
+        return radar_extractor.parse_radar_indicated(properties)
     
     def _extract_hail_size(self, text: str) -> Optional[float]:
         """Extract hail size in inches from text - ONLY for hail, not rain"""
         try:
-            # CRITICAL: Skip extraction for flood warnings and advisories
-            # These often contain "inches of rain" which should never be parsed as hail
-            if not text or not isinstance(text, str):
-                return None
-                
-            flood_keywords = ['flood warning', 'flood advisory', 'flash flood', 'inches of rain', 'rainfall']
-            text_lower = text.lower()
-            for keyword in flood_keywords:
-                if keyword in text_lower:
-                    return None
-            
-            # Use centralized NWS hail size chart
-            size_map = Config.NWS_HAIL_SIZE_CHART
-            
-            # Pattern 1: "hail up to X inch" or "hail up to X inches" (STRICT: must contain "hail")
-            pattern1 = r'hail up to (\d+(?:\.\d+)?)\s*inch'
-            match = re.search(pattern1, text)
-            if match:
-                return float(match.group(1))
-            
-            # Pattern 2: "X inch hail" ONLY (STRICT: must end with "hail")
-            pattern2 = r'(\d+(?:\.\d+)?)\s*inch[es]*\s+hail'
-            match = re.search(pattern2, text)
-            if match:
-                return float(match.group(1))
-            
-            # Pattern 3: Named sizes (STRICT: must be associated with "hail")
-            for size_name, inches in size_map.items():
-                # Only match if explicitly connected to "hail"
-                patterns = [
-                    r'\b' + re.escape(size_name) + r'\s+size[d]?\s+hail',
-                    r'hail.*\b' + re.escape(size_name) + r'\b',
-                    r'\b' + re.escape(size_name) + r'\s+hail'
-                ]
-                for pattern in patterns:
-                    if re.search(pattern, text, re.IGNORECASE):
-                        return inches
-            
-            # Pattern 4: "X inch diameter hail" (STRICT: must contain "hail")
-            pattern4 = r'(\d+(?:\.\d+)?)\s*inch diameter hail'
-            match = re.search(pattern4, text)
-            if match:
-                return float(match.group(1))
-                
-            return None
-            
+            return radar_extractor.extract_hail_size(text)
         except Exception as e:
             logger.debug(f"Error extracting hail size: {e}")
             return None
@@ -469,63 +451,7 @@ class IngestService:
     def _extract_wind_speed(self, text: str) -> Optional[int]:
         """Extract wind speed in mph from text - COMPREHENSIVE patterns"""
         try:
-            if not text or not isinstance(text, str):
-                return None
-            
-            text_lower = text.lower()
-            
-            # Skip flood/water events that mention speed but aren't wind
-            skip_keywords = ['flood', 'tsunami', 'storm surge', 'high surf', 'river', 'stream']
-            for keyword in skip_keywords:
-                if keyword in text_lower:
-                    return None
-                    
-            # Comprehensive wind speed extraction patterns
-            patterns = [
-                # Pattern 1: "winds up to X mph"
-                r'winds up to (\d+)\s*mph',
-                # Pattern 2: "damaging winds of X mph" 
-                r'damaging winds of (\d+)\s*mph',
-                # Pattern 3: "X mph wind gusts"
-                r'(\d+)\s*mph wind gusts',
-                # Pattern 4: "wind gusts to X mph"
-                r'wind gusts to (\d+)\s*mph',
-                # Pattern 5: "winds of X mph"
-                r'winds of (\d+)\s*mph',
-                # Pattern 6: "X mph winds" - common NWS format
-                r'(\d+)\s*mph winds',
-                # Pattern 7: "wind speeds of X mph"
-                r'wind speeds of (\d+)\s*mph',
-                # Pattern 8: "X to Y mph" - take maximum
-                r'(\d+) to (\d+)\s*mph',
-                # Pattern 9: "winds to X mph"
-                r'winds to (\d+)\s*mph',
-                # Pattern 10: "gusts to X mph"
-                r'gusts to (\d+)\s*mph',
-                # Pattern 11: "X mph gusts"
-                r'(\d+)\s*mph gusts',
-                # Pattern 12: "wind gusts of X mph"
-                r'wind gusts of (\d+)\s*mph'
-            ]
-            
-            max_wind = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, text_lower)
-                for match in matches:
-                    if isinstance(match, tuple):
-                        # Handle "X to Y mph" - take maximum
-                        wind_values = [int(m) for m in match if m.isdigit()]
-                        if wind_values:
-                            max_wind = max(max_wind, max(wind_values))
-                    else:
-                        try:
-                            wind_speed = int(match)
-                            max_wind = max(max_wind, wind_speed)
-                        except (ValueError, TypeError):
-                            continue
-            
-            return max_wind if max_wind > 0 else None
-            
+            return radar_extractor.extract_wind_speed(text)
         except Exception as e:
             logger.debug(f"Error extracting wind speed: {e}")
             return None
@@ -16,6 +16,8 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 from cachetools import TTLCache
 from shapely.geometry import shape, Point
+from config import Config
+from radar_extraction import radar_extractor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -54,10 +56,10 @@ class LiveRadarAlertService:
     Maintains in-memory store with TTL cache for webhook spam prevention
     """
     
-    def __init__(self, db_session: Session = None, nws_api_url: str = "https://api.weather.gov/alerts/active", 
+    def __init__(self, db_session: Session = None, nws_api_url: str = None, 
                  poll_interval: int = 60, webhook_dedupe_ttl: int = 600):
         self.db = db_session
-        self.nws_api_url = nws_api_url
+        self.nws_api_url = nws_api_url or Config.NWS_ALERT_URL
         self.poll_interval = poll_interval
         self.alerts_store: Dict[str, LiveRadarAlert] = {}
         self.last_poll_timestamp: Optional[datetime] = None
@@ -107,13 +109,12 @@ class LiveRadarAlertService:
         """Fetch alerts from NWS API and process them"""
         try:
             # Fetch active alerts from NWS API
-            url = "https://api.weather.gov/alerts/active"
             headers = {
                 'User-Agent': 'HailyDB/1.0 (weather-monitoring-system)',
                 'Accept': 'application/geo+json'
             }
             
-            response = requests.get(url, headers=headers, timeout=30)
+            response = requests.get(self.nws_api_url, headers=headers, timeout=30)
             response.raise_for_status()
             
             data = response.json()
@@ -255,94 +256,11 @@ class LiveRadarAlertService:
             
     def _extract_wind_parameter(self, parameters: Dict[str, Any], description: str = None) -> Optional[int]:
         """Extract wind gust parameter from NWS alert parameters and description text"""
-        # First try structured parameters
-        wind_params = ['maxWindGust', 'windGust', 'windSpeed']
-        
-        for param in wind_params:
-            values = parameters.get(param, [])
-            if values and len(values) > 0:
-                try:
-                    # Extract numeric value from string like "70 MPH"
-                    wind_str = str(values[0]).upper()
-                    if 'MPH' in wind_str:
-                        wind_value = int(''.join(filter(str.isdigit, wind_str)))
-                        return wind_value
-                except (ValueError, TypeError):
-                    continue
-        
-        # If no structured data, parse description text for wind speeds
-        if description:
-            import re
-            description_upper = description.upper()
-            
-            # Patterns to match wind speeds in description
-            wind_patterns = [
-                r'GUSTS?\s+(?:UP\s+TO\s+|OF\s+)?(\d+)\s*MPH',
-                r'WINDS?\s+(?:UP\s+TO\s+|OF\s+|TO\s+)?(\d+)\s*MPH', 
-                r'WIND\s+GUSTS?\s+(?:UP\s+TO\s+|OF\s+)?(\d+)\s*MPH',
-                r'(\d+)\s*MPH\s+(?:WIND|GUST)',
-                r'WINDS?\s+(?:TO\s+AROUND\s+)?(\d+)\s*KNOTS?'
-            ]
-            
-            max_wind = 0
-            for pattern in wind_patterns:
-                matches = re.findall(pattern, description_upper)
-                for match in matches:
-                    try:
-                        wind_speed = int(match)
-                        # Convert knots to mph if needed (1 knot ≈ 1.15 mph)
-                        if 'KNOT' in pattern:
-                            wind_speed = int(wind_speed * 1.15)
-                        max_wind = max(max_wind, wind_speed)
-                    except (ValueError, TypeError):
-                        continue
-            
-            return max_wind if max_wind > 0 else None
-                    
-        return None
+        return radar_extractor.extract_live_wind(parameters, description)
         
     def _extract_hail_parameter(self, parameters: Dict[str, Any], description: str = None) -> Optional[float]:
         """Extract hail size parameter from NWS alert parameters and description text"""
-        # First try structured parameters
-        hail_params = ['maxHailSize', 'hailSize']
-        
-        for param in hail_params:
-            values = parameters.get(param, [])
-            if values and len(values) > 0:
-                try:
-                    # Extract numeric value from string like "1.25"
-                    hail_str = str(values[0])
-                    hail_value = float(''.join(c for c in hail_str if c.isdigit() or c == '.'))
-                    return hail_value if hail_value > 0 else None
-                except (ValueError, TypeError):
-                    continue
-        
-        # If no structured data, parse description text for hail sizes  
-        if description:
-            import re
-            description_upper = description.upper()
-            
-            # Patterns to match hail sizes in description
-            hail_patterns = [
-                r'HAIL\s+(?:UP\s+TO\s+|OF\s+)?(\d+(?:\.\d+)?)\s*(?:INCH|IN)',
-                r'(\d+(?:\.\d+)?)\s*(?:INCH|IN)\s+HAIL',
-                r'HAIL\s+(?:SIZE\s+)?(\d+(?:\.\d+)?)',
-                r'(\d+(?:\.\d+)?)"?\s+HAIL'
-            ]
-            
-            max_hail = 0.0
-            for pattern in hail_patterns:
-                matches = re.findall(pattern, description_upper)
-                for match in matches:
-                    try:
-                        hail_size = float(match)
-                        max_hail = max(max_hail, hail_size)
-                    except (ValueError, TypeError):
-                        continue
-                        
-            return max_hail if max_hail > 0 else None
-                    
-        return None
+        return radar_extractor.extract_live_hail(parameters, description)
         
     def _extract_affected_states(self, properties: Dict[str, Any]) -> List[str]:
         """Extract affected states from alert properties"""
@@ -0,0 +1,206 @@
+"""
+LLM Response Cache for HailyDB
+Content-addressed cache of OpenAI completions: in-process LRU in front of the llm_response_cache table
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, text
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Run the table's age/row limits after this many new entries (and from the CLI)
+EVICT_EVERY_STORES = 500
+
+LOOKUP_SQL = """
+UPDATE llm_response_cache SET last_used_at = NOW(), hit_count = hit_count + 1
+WHERE cache_key = :cache_key AND created_at > NOW() - make_interval(secs => :ttl_seconds)
+RETURNING response
+"""
+
+STORE_SQL = """
+INSERT INTO llm_response_cache (cache_key, kind, model, prompt_version, response, created_at, last_used_at, hit_count)
+VALUES (:cache_key, :kind, :model, :prompt_version, :response, NOW(), NOW(), 0)
+ON CONFLICT (cache_key) DO UPDATE SET response = EXCLUDED.response, created_at = NOW(), last_used_at = NOW()
+"""
+
+EVICT_EXPIRED_SQL = "DELETE FROM llm_response_cache WHERE created_at <= NOW() - make_interval(secs => :ttl_seconds)"
+
+# Least recently used rows past max_rows
+EVICT_LRU_SQL = """
+DELETE FROM llm_response_cache WHERE cache_key IN (
+    SELECT cache_key FROM llm_response_cache ORDER BY last_used_at DESC OFFSET :max_rows
+)
+"""
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_prompt(content: str) -> str:
+    """Whitespace-insensitive form of a prompt (indentation and re-wrapped NWS text hash alike)"""
+    return _WHITESPACE.sub(' ', content or '').strip()
+
+
+def cache_key(kind: str, model: str, prompt_version, messages: List[Dict], **params) -> str:
+    """sha256 over the kind, model, prompt version, normalized messages and generation parameters"""
+    payload = {
+        'kind': kind,
+        'model': model,
+        'prompt_version': str(prompt_version),
+        'messages': [[message.get('role'), normalize_prompt(message.get('content'))] for message in messages],
+        'params': params
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier completion cache
+    An in-process LRU (LLM_CACHE_MEMORY_ENTRIES) fronts the llm_response_cache table, which
+    keeps entries for LLM_CACHE_TTL_DAYS and at most LLM_CACHE_MAX_ROWS least-recently-used
+    rows. The table is reached through a small engine of its own, so lookups work from pool
+    threads and CLI jobs without an app context; a database error degrades to a miss.
+    """
+
+    def __init__(self, enabled: bool = None, memory_entries: int = None, ttl_days: float = None,
+                 max_rows: int = None, database_url: str = None):
+        self.enabled = Config.LLM_CACHE_ENABLED if enabled is None else enabled
+        self.memory_entries = Config.LLM_CACHE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self.ttl_days = Config.LLM_CACHE_TTL_DAYS if ttl_days is None else ttl_days
+        self.max_rows = Config.LLM_CACHE_MAX_ROWS if max_rows is None else max_rows
+        self.database_url = database_url or Config.DATABASE_URL
+
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._engine = None
+        self._stores_since_evict = 0
+        self.counters = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'stores': 0, 'errors': 0}
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = create_engine(self.database_url, pool_size=2, max_overflow=4, pool_pre_ping=True)
+        return self._engine
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _remember(self, key: str, response: str):
+        with self._lock:
+            self._memory[key] = (response, time.time())
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and time.time() - entry[1] < self.ttl_days * 86400:
+                self._memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return entry[0]
+        try:
+            with self.engine.begin() as connection:
+                response = connection.execute(text(LOOKUP_SQL), {'cache_key': key, 'ttl_seconds': self.ttl_days * 86400}).scalar()
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            self._count('errors')
+            response = None
+        if response is None:
+            self._count('misses')
+            return None
+        self._count('db_hits')
+        self._remember(key, response)
+        return response
+
+    def put(self, key: str, response: str, kind: str, model: str, prompt_version):
+        self._remember(key, response)
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(text(STORE_SQL), {'cache_key': key, 'kind': kind, 'model': model,
+                                                     'prompt_version': str(prompt_version), 'response': response})
+        except Exception as e:
+            logger.warning(f"LLM cache store failed: {e}")
+            self._count('errors')
+            return
+        with self._lock:
+            self.counters['stores'] += 1
+            self._stores_since_evict += 1
+            due = self._stores_since_evict >= EVICT_EVERY_STORES
+            if due:
+                self._stores_since_evict = 0
+        if due:
+            try:
+                self.evict()
+            except Exception as e:
+                logger.warning(f"LLM cache eviction failed: {e}")
+
+    def completion(self, kind: str, model: str, prompt_version, messages: List[Dict],
+                   create: Callable[[], Optional[str]], **params) -> Optional[str]:
+        """
+        Cached text of a chat completion
+        `create` runs the real request on a miss; empty results are not cached.
+        """
+        if not self.enabled:
+            return create()
+        key = cache_key(kind, model, prompt_version, messages, **params)
+        response = self.get(key)
+        if response is not None:
+            return response
+        response = create()
+        if response:
+            self.put(key, response, kind, model, prompt_version)
+        return response
+
+    def evict(self) -> Dict[str, int]:
+        """Drop expired rows, then the least recently used rows past max_rows"""
+        with self.engine.begin() as connection:
+            expired = connection.execute(text(EVICT_EXPIRED_SQL), {'ttl_seconds': self.ttl_days * 86400}).rowcount
+            trimmed = connection.execute(text(EVICT_LRU_SQL), {'max_rows': self.max_rows}).rowcount
+        if expired or trimmed:
+            logger.info(f"LLM cache eviction: {expired} expired, {trimmed} least recently used")
+        return {'expired': expired, 'trimmed': trimmed}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+            counters['memory_entries'] = len(self._memory)
+        lookups = counters['memory_hits'] + counters['db_hits'] + counters['misses']
+        counters['hit_rate'] = round((counters['memory_hits'] + counters['db_hits']) / lookups, 4) if lookups else 0.0
+        return counters
+
+
+llm_cache = LLMResponseCache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LLM response cache maintenance")
+    parser.add_argument('command', choices=['evict', 'stats'],
+                        help='evict: apply the TTL and row limit; stats: rows per kind and total hits')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'evict':
+        print(llm_cache.evict())
+    else:
+        with llm_cache.engine.connect() as connection:
+            for kind, rows, hits in connection.execute(text(
+                "SELECT kind, count(*), COALESCE(sum(hit_count), 0) FROM llm_response_cache GROUP BY kind ORDER BY kind"
+            )):
+                print(f"{kind:<16} {rows:>8} rows {hits:>10} hits")
+
+
+if __name__ == '__main__':
+    main()
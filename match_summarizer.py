@@ -11,6 +11,11 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from openai import OpenAI
 
+from llm_cache import llm_cache
+
+# Part of llm_cache keys and spc_summary_queue input hashes: bump when the prompt changes
+PROMPT_VERSION = 1
+
 class MatchSummarizer:
     """
     AI service for generating enhanced summaries of verified alert matches
@@ -45,12 +50,10 @@ class MatchSummarizer:
             # Build comprehensive verification prompt with all data integration
             prompt = self._build_verification_prompt(alert, spc_reports)
             
-            response = self.openai.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": """You are a professional meteorological analyst writing a factual weather report about verified storm events. Write like a seasoned meteorological professional reporting on what actually happened during a confirmed severe weather event.
+            messages = [
+                {
+                    "role": "system",
+                    "content": """You are a professional meteorological analyst writing a factual weather report about verified storm events. Write like a seasoned meteorological professional reporting on what actually happened during a confirmed severe weather event.
 
 WRITING STYLE REQUIREMENTS:
 1. Write as a factual historical report - NO threat classifications or warning language
@@ -64,17 +67,26 @@ WRITING STYLE REQUIREMENTS:
 STRUCTURE: "At {time} in {location}, the National Weather Service issued a {alert type} when radar detected {radar parameters}. Storm spotters subsequently verified {actual verified measurements} with {specific damage details if any}. This confirms that {impact assessment} occurred in the immediate area."
 
 Make it sound like a professional weather report you'd hear on the evening news about a storm that already happened."""
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=400,
-                temperature=0.2  # Lower temperature for factual consistency
-            )
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+            
+            def create():
+                response = self.openai.chat.completions.create(
+                    model="gpt-4o",
+                    messages=messages,
+                    max_tokens=400,
+                    temperature=0.2  # Lower temperature for factual consistency
+                )
+                return response.choices[0].message.content
             
-            return response.choices[0].message.content.strip() if response.choices[0].message.content else None
+            # Re-summarizing an unchanged alert/report set is answered from the cache
+            content = llm_cache.completion('match_summary', 'gpt-4o', PROMPT_VERSION, messages, create,
+                                           max_tokens=400, temperature=0.2)
+            return content.strip() if content else None
             
         except Exception as e:
             print(f"Error generating match summary: {e}")
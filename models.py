@@ -1,9 +1,16 @@
 from app import db
 from sqlalchemy.dialects.postgresql import JSONB, ARRAY
-from sqlalchemy import Column, String, Text, DateTime, Date, Boolean, func, Index, UniqueConstraint, Float
+from sqlalchemy import Column, String, Text, DateTime, Date, Boolean, func, Index, UniqueConstraint, Float, case, cast, or_
+from sqlalchemy.ext.hybrid import hybrid_property
 from geoalchemy2 import Geometry
 from datetime import datetime
-import re
+from geometry_analysis import process_geometry_batch
+from alert_payload import compact_feature, expand_feature
+from spc_match_store import load_match_reports
+from alert_normalizer import (
+    extract_area_states, extract_area_counties, extract_fips_codes,
+    extract_county_state_data, extract_city_data
+)
 
 class Alert(db.Model):
     """
@@ -24,7 +31,8 @@ class Alert(db.Model):
     # JSON storage for complex data
     geometry = Column(JSONB)               # Store full geometry block
     properties = Column(JSONB)             # Store all original NWS fields
-    raw = Column(JSONB)                    # Entire feature object
+    raw_envelope = Column('raw', JSONB)    # Feature minus geometry/properties (legacy rows: entire feature)
+    content_hash = Column(String(64))      # SHA256 fingerprint of normalized feature for diff ingestion
     
     # Backfill system fields (PostGIS integration)
     geom = Column(Geometry('GEOMETRY', srid=4326))  # PostGIS geometry for spatial queries
@@ -37,11 +45,12 @@ class Alert(db.Model):
     
     # SPC Cross-referencing
     spc_verified = Column(Boolean, default=False)
-    spc_reports = Column(JSONB)            # List of matching SPC reports
+    spc_reports_json = Column('spc_reports', JSONB)  # Embedded report copies from before alert_spc_matches (read via spc_reports)
     spc_confidence_score = Column(db.Float) # Match confidence (0.0-1.0)
     spc_match_method = Column(String(10))   # "fips", "latlon", "none"
     spc_report_count = Column(db.Integer, default=0)
     spc_ai_summary = Column(Text)          # AI-generated verification summary
+    spc_match_watermark = Column(db.Integer)  # Highest spc_reports.id this alert was last matched against
     
     # Radar Indicated Parsing (Feature 1)
     radar_indicated = Column(JSONB)        # {"hail_inches": float, "wind_mph": int}
@@ -79,6 +88,31 @@ class Alert(db.Model):
     def __repr__(self):
         return f'<Alert {self.id}: {self.event}>'
     
+    @hybrid_property
+    def raw(self):
+        """Entire feature object, rebuilt from the envelope and the geometry/properties columns"""
+        return expand_feature(self.raw_envelope, self.geometry, self.properties)
+    
+    @raw.setter
+    def raw(self, feature):
+        self.raw_envelope = compact_feature(feature)
+    
+    @raw.expression
+    def raw(cls):
+        # Same reconstruction as the alert_feature() SQL function, usable under aliases
+        envelope = cls.raw_envelope
+        return cast(case(
+            (or_(envelope.is_(None), envelope.has_key('geometry'), envelope.has_key('properties')), envelope),
+            else_=envelope.op('||')(func.jsonb_build_object('geometry', cls.geometry, 'properties', cls.properties))
+        ), JSONB)
+    
+    @property
+    def spc_reports(self):
+        """Matched SPC reports joined from alert_spc_matches (embedded copies for alerts matched before it existed)"""
+        if not hasattr(self, '_hydrated_spc_reports'):
+            hydrate_spc_reports([self])
+        return self._hydrated_spc_reports
+    
     def to_dict(self):
         """Convert alert to dictionary following NWS API OpenAPI specification"""
         # Extract NWS standard fields from properties where stored
@@ -166,34 +200,11 @@ class Alert(db.Model):
     
     def extract_states(self):
         """Extract state codes from area description"""
-        if not self.area_desc:
-            return []
-        
-        # Match state abbreviations (e.g., "FL", "CA", "TX")
-        state_pattern = r'\b([A-Z]{2})\b'
-        states = re.findall(state_pattern, self.area_desc)
-        return list(set(states))
+        return extract_area_states(self.area_desc)
     
     def extract_counties(self):
         """Extract county names from area description"""
-        if not self.area_desc:
-            return []
-        
-        # Split by semicolon and extract county names before state codes
-        areas = self.area_desc.split(';')
-        counties = []
-        
-        for area in areas:
-            area = area.strip()
-            # Match pattern "County Name, ST"
-            county_match = re.match(r'^([^,]+),\s*([A-Z]{2})$', area)
-            if county_match:
-                county_name = county_match.group(1).strip()
-                # Remove " County" suffix if present
-                county_name = re.sub(r'\s+County$', '', county_name)
-                counties.append(county_name)
-        
-        return counties
+        return extract_area_counties(self.area_desc)
     
     def get_location_info(self):
         """Get structured location information for API consumption"""
@@ -209,222 +220,30 @@ class Alert(db.Model):
             'geometry_bounds': self.geometry_bounds
         }
     
-    def process_full_geometry(self):
+    def process_full_geometry(self, analyze_geometry: bool = True):
         """
         Process full geometry data for Feature 3: Full Geometry & County Mapping
         Extracts FIPS codes, county mappings, geometry analysis, and coordinate bounds
+        analyze_geometry=False skips type/count/bounds for callers that use process_geometry_batch
         """
         if not self.geometry:
             return
             
         try:
-            import logging
-            logger = logging.getLogger(__name__)
-            
-            # Determine geometry type
-            geom_type = self.geometry.get('type', 'Unknown')
-            self.geometry_type = geom_type
-            
-            # Extract coordinates and calculate bounds
-            coordinates = self.geometry.get('coordinates', [])
-            coord_count, bounds = self._analyze_coordinates(coordinates, geom_type)
-            self.coordinate_count = coord_count
-            self.geometry_bounds = bounds
+            # Geometry type, coordinate count and bounds (vectorized, shared with batch callers)
+            if analyze_geometry:
+                process_geometry_batch([self])
             
-            # Extract FIPS codes from properties if available
-            fips_codes = []
-            if self.properties:
-                # Look for FIPS codes in various property fields
-                geocode = self.properties.get('geocode', {})
-                if isinstance(geocode, dict):
-                    # FIPS codes may be in UGC (Universal Geographic Code) format
-                    ugc = geocode.get('UGC', [])
-                    if isinstance(ugc, list):
-                        for code in ugc:
-                            if isinstance(code, str) and len(code) >= 5:
-                                # Extract FIPS code (first 5 digits of UGC)
-                                fips = code[:5]
-                                if fips.isdigit():
-                                    fips_codes.append(fips)
-                
-                # Also check for direct FIPS references
-                fips_prop = self.properties.get('FIPS', [])
-                if isinstance(fips_prop, list):
-                    fips_codes.extend([str(f) for f in fips_prop if str(f).isdigit()])
-            
-            self.fips_codes = list(set(fips_codes)) if fips_codes else []
-            
-            # Enhanced county and state extraction
-            self._extract_enhanced_location_data()
+            # FIPS codes, county/state mapping and city names (same functions the ingest workers run)
+            self.fips_codes = extract_fips_codes(self.properties)
+            self.county_names, self.affected_states = extract_county_state_data(self.area_desc, self.properties)
+            self.city_names, self.location_confidence = extract_city_data(self.id, self.area_desc)
             
         except Exception as e:
             import logging
             logger = logging.getLogger(__name__)
             logger.warning(f"Error processing geometry for alert {self.id}: {e}")
     
-    def _analyze_coordinates(self, coordinates, geom_type):
-        """Analyze coordinate structure and calculate bounds"""
-        coord_count = 0
-        min_lat = min_lon = float('inf')
-        max_lat = max_lon = float('-inf')
-        
-        def process_coord_pair(coord_pair):
-            nonlocal coord_count, min_lat, max_lat, min_lon, max_lon
-            if isinstance(coord_pair, list) and len(coord_pair) >= 2:
-                lon, lat = coord_pair[0], coord_pair[1]
-                if isinstance(lon, (int, float)) and isinstance(lat, (int, float)):
-                    coord_count += 1
-                    min_lon = min(min_lon, lon)
-                    max_lon = max(max_lon, lon)
-                    min_lat = min(min_lat, lat)
-                    max_lat = max(max_lat, lat)
-        
-        def process_coordinates_recursive(coords):
-            if not isinstance(coords, list):
-                return
-            
-            # Check if this is a coordinate pair [lon, lat]
-            if len(coords) == 2 and all(isinstance(x, (int, float)) for x in coords):
-                process_coord_pair(coords)
-            else:
-                # Recursively process nested coordinate structures
-                for item in coords:
-                    if isinstance(item, list):
-                        process_coordinates_recursive(item)
-        
-        process_coordinates_recursive(coordinates)
-        
-        bounds = None
-        if coord_count > 0 and min_lat != float('inf'):
-            bounds = {
-                'min_lat': min_lat,
-                'max_lat': max_lat,
-                'min_lon': min_lon,
-                'max_lon': max_lon
-            }
-        
-        return coord_count, bounds
-    
-    def _extract_enhanced_location_data(self):
-        """Extract enhanced county and state information"""
-        # Extract from area description
-        states = self.extract_states()
-        counties = self.extract_counties()
-        
-        # Enhanced state extraction from UGC and SAME codes
-        if self.properties:
-            geocode = self.properties.get('geocode', {})
-            if isinstance(geocode, dict):
-                # Extract states from UGC codes
-                ugc_codes = geocode.get('UGC', [])
-                if isinstance(ugc_codes, list):
-                    ugc_states = self._extract_states_from_ugc(ugc_codes)
-                    states.extend(ugc_states)
-                
-                # Extract states from SAME codes
-                same_codes = geocode.get('SAME', [])
-                if isinstance(same_codes, list):
-                    same_states = self._extract_states_from_same(same_codes)
-                    states.extend(same_states)
-        
-        # Build county-state mapping
-        county_state_mapping = []
-        if self.area_desc:
-            # Parse format like "Barton, KS; Rice, KS"
-            parts = self.area_desc.split(';')
-            for part in parts:
-                part = part.strip()
-                if ',' in part:
-                    county_part, state_part = part.rsplit(',', 1)
-                    county_name = county_part.strip()
-                    state_code = state_part.strip()
-                    if len(state_code) == 2:  # Valid state abbreviation
-                        county_state_mapping.append({
-                            'county': county_name,
-                            'state': state_code
-                        })
-        
-        self.county_names = county_state_mapping
-        self.affected_states = list(set(states))  # Remove duplicates
-        
-        # Phase 2: Enhanced city name extraction
-        self._extract_city_names()
-    
-    def _extract_states_from_ugc(self, ugc_codes: list) -> list:
-        """Extract state codes from UGC codes"""
-        ugc_state_mapping = {
-            'AL': 'AL', 'AK': 'AK', 'AZ': 'AZ', 'AR': 'AR', 'CA': 'CA', 'CO': 'CO',
-            'CT': 'CT', 'DE': 'DE', 'FL': 'FL', 'GA': 'GA', 'HI': 'HI', 'ID': 'ID',
-            'IL': 'IL', 'IN': 'IN', 'IA': 'IA', 'KS': 'KS', 'KY': 'KY', 'LA': 'LA',
-            'ME': 'ME', 'MD': 'MD', 'MA': 'MA', 'MI': 'MI', 'MN': 'MN', 'MS': 'MS',
-            'MO': 'MO', 'MT': 'MT', 'NE': 'NE', 'NV': 'NV', 'NH': 'NH', 'NJ': 'NJ',
-            'NM': 'NM', 'NY': 'NY', 'NC': 'NC', 'ND': 'ND', 'OH': 'OH', 'OK': 'OK',
-            'OR': 'OR', 'PA': 'PA', 'RI': 'RI', 'SC': 'SC', 'SD': 'SD', 'TN': 'TN',
-            'TX': 'TX', 'UT': 'UT', 'VT': 'VT', 'VA': 'VA', 'WA': 'WA', 'WV': 'WV',
-            'WI': 'WI', 'WY': 'WY', 'DC': 'DC',
-            # Marine zones
-            'PZ': 'CA', 'AM': 'AK', 'GM': 'FL', 'PK': 'AK', 'AN': 'NC', 'AS': 'FL',
-        }
-        
-        states = []
-        for ugc in ugc_codes:
-            if isinstance(ugc, str) and len(ugc) >= 2:
-                state_prefix = ugc[:2].upper()
-                if state_prefix in ugc_state_mapping:
-                    states.append(ugc_state_mapping[state_prefix])
-        return states
-    
-    def _extract_states_from_same(self, same_codes: list) -> list:
-        """Extract state codes from SAME codes"""
-        same_state_mapping = {
-            '001': 'AL', '002': 'AK', '004': 'AZ', '005': 'AR', '006': 'CA', '008': 'CO',
-            '009': 'CT', '010': 'DE', '011': 'DC', '012': 'FL', '013': 'GA', '015': 'HI',
-            '016': 'ID', '017': 'IL', '018': 'IN', '019': 'IA', '020': 'KS', '021': 'KY',
-            '022': 'LA', '023': 'ME', '024': 'MD', '025': 'MA', '026': 'MI', '027': 'MN',
-            '028': 'MS', '029': 'MO', '030': 'MT', '031': 'NE', '032': 'NV', '033': 'NH',
-            '034': 'NJ', '035': 'NM', '036': 'NY', '037': 'NC', '038': 'ND', '039': 'OH',
-            '040': 'OK', '041': 'OR', '042': 'PA', '044': 'RI', '045': 'SC', '046': 'SD',
-            '047': 'TN', '048': 'TX', '049': 'UT', '050': 'VT', '051': 'VA', '053': 'WA',
-            '054': 'WV', '055': 'WI', '056': 'WY',
-            # Marine/coastal SAME codes
-            '057': 'CA', '058': 'FL', '059': 'TX',
-        }
-        
-        states = []
-        for same in same_codes:
-            if isinstance(same, str) and len(same) >= 3:
-                state_code = same[:3]
-                if state_code in same_state_mapping:
-                    states.append(same_state_mapping[state_code])
-        return states
-    
-    def _extract_city_names(self):
-        """Phase 2: Extract and standardize city names from area description"""
-        try:
-            from city_enrichment_service import city_enrichment_service
-            
-            # Extract standardized city names
-            city_names = city_enrichment_service.enrich_alert_with_cities(self)
-            
-            # Update the city_names field
-            self.city_names = city_names if city_names else []
-            
-            # Calculate location confidence based on enrichment quality
-            location_matches = city_enrichment_service.extract_cities_from_area_desc(self.area_desc)
-            if location_matches:
-                # Use the highest confidence from extracted matches
-                max_confidence = max(match.confidence for match in location_matches)
-                self.location_confidence = round(max_confidence, 2)
-            else:
-                self.location_confidence = 0.0
-            
-        except Exception as e:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(f"Error extracting city names for alert {self.id}: {e}")
-            self.city_names = []
-            self.location_confidence = 0.0
-    
     def get_enhanced_geometry_info(self):
         """Get comprehensive geometry information for API responses"""
         return {
@@ -451,6 +270,15 @@ class Alert(db.Model):
         except (KeyError, TypeError):
             return None
 
+def hydrate_spc_reports(alerts):
+    """Load spc_reports for a list of alerts with one join query instead of one per alert"""
+    pending = [alert for alert in alerts if not hasattr(alert, '_hydrated_spc_reports')]
+    if not pending:
+        return
+    linked = load_match_reports(db.session, [alert.id for alert in pending])
+    for alert in pending:
+        alert._hydrated_spc_reports = linked.get(alert.id) or alert.spc_reports_json
+
 class IngestionLog(db.Model):
     """
     Log of ingestion attempts for monitoring and debugging
@@ -464,6 +292,7 @@ class IngestionLog(db.Model):
     alerts_processed = Column(db.Integer, default=0)
     new_alerts = Column(db.Integer, default=0)
     updated_alerts = Column(db.Integer, default=0)
+    unchanged_alerts = Column(db.Integer, default=0)  # Features skipped because fingerprint matched
     error_message = Column(Text)
     
     def __repr__(self):
@@ -505,6 +334,9 @@ class SPCReport(db.Model):
     # SPC Verification Status  
     spc_verified = Column(Boolean, default=False, index=True)  # Whether this report has verified alerts
     
+    # spc_daily (*_rpts_filtered.csv ingestion) or spc_wcm (historical WCM dataset bulk load)
+    data_source = Column(String(20), default='spc_daily', server_default='spc_daily')
+    
     __table_args__ = (
         Index('idx_spc_date_type', 'report_date', 'report_type'),
         Index('idx_spc_location', 'state', 'county'),
@@ -531,6 +363,7 @@ class SPCReport(db.Model):
             'longitude': self.longitude,
             'magnitude': self.magnitude,
             'comments': self.comments,
+            'data_source': self.data_source,
             'ingested_at': self.ingested_at.isoformat() if self.ingested_at else None
         }
 
@@ -556,6 +389,155 @@ class SPCIngestionLog(db.Model):
     def __repr__(self):
         return f'<SPCIngestionLog {self.report_date}: {self.success}>'
 
+class AlertSPCMatch(db.Model):
+    """
+    One row per alert/SPC report match, written in bulk by SPCMatchingService
+    The primary key serves alert-to-report reads; idx_alert_spc_match_report serves report-to-alert lookups.
+    """
+    __tablename__ = "alert_spc_matches"
+
+    alert_id = Column(String, db.ForeignKey('alerts.id', ondelete='CASCADE'), primary_key=True)
+    report_id = Column(db.Integer, db.ForeignKey('spc_reports.id', ondelete='CASCADE'), primary_key=True)
+    method = Column(String(10), nullable=False)  # "fips", "latlon", "postgis"
+    distance_miles = Column(Float)               # Alert centroid to report; NULL without both points
+    time_delta_minutes = Column(db.Integer)      # Report time minus alert effective; NULL for untimed reports
+    confidence = Column(Float)
+    matched_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_alert_spc_match_report', 'report_id'),
+    )
+
+    def __repr__(self):
+        return f'<AlertSPCMatch {self.alert_id} -> {self.report_id} ({self.method})>'
+
+class SPCMatchQueue(db.Model):
+    """
+    SPC report dates and types with stored reports not yet matched against alerts
+    Filled by SPC report storage, drained by SPCMatchingService.match_incremental
+    """
+    __tablename__ = "spc_match_queue"
+
+    report_date = Column(Date, primary_key=True)
+    report_type = Column(String(10), primary_key=True)
+    report_watermark = Column(db.Integer, nullable=False)  # Highest spc_reports.id stored for this date/type
+    enqueued_at = Column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f'<SPCMatchQueue {self.report_date} {self.report_type}: {self.report_watermark}>'
+
+class SPCSummaryJob(db.Model):
+    """
+    AI match summary work for one verified alert, drained by spc_summary_queue.SummaryQueueWorker
+    A finished job stays as status "done" with the input hash its summary was built from, so
+    re-enqueueing an unchanged match is a no-op.
+    """
+    __tablename__ = "spc_summary_jobs"
+
+    alert_id = Column(String, db.ForeignKey('alerts.id', ondelete='CASCADE'), primary_key=True)
+    input_hash = Column(String(64), nullable=False)  # sha256 of prompt version and matched report ids
+    status = Column(String(10), nullable=False, default='pending')  # "pending", "running", "done", "failed"
+    attempts = Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, server_default=func.now())  # Retry backoff without holding a worker
+    claimed_at = Column(DateTime)                 # Running jobs with an expired claim are picked up again
+    last_error = Column(Text)
+    enqueued_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_spc_summary_job_due', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<SPCSummaryJob {self.alert_id}: {self.status}>'
+
+class LLMResponseCacheEntry(db.Model):
+    """
+    One cached OpenAI completion, keyed by sha256 of kind, model, prompt version and normalized prompt
+    Read and written by llm_cache.LLMResponseCache; evicted by age and least-recent use.
+    """
+    __tablename__ = "llm_response_cache"
+
+    cache_key = Column(String(64), primary_key=True)
+    kind = Column(String(30), nullable=False)     # "alert_summary", "alert_tags", "match_summary"
+    model = Column(String(50), nullable=False)
+    prompt_version = Column(String(20), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    last_used_at = Column(DateTime, server_default=func.now())
+    hit_count = Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('idx_llm_response_cache_last_used', 'last_used_at'),
+    )
+
+    def __repr__(self):
+        return f'<LLMResponseCacheEntry {self.kind} {self.cache_key[:12]}>'
+
+class GeocodeCacheEntry(db.Model):
+    """
+    One geocoded address, keyed by sha256 of its normalized form; NULL lat/lon caches a "no match"
+    Read and written by geocode_cache.GeocodeCache; expired rows are deleted by its evict command.
+    """
+    __tablename__ = "geocode_cache"
+
+    address_hash = Column(String(64), primary_key=True)
+    normalized_address = Column(Text, nullable=False)
+    lat = Column(Float)
+    lon = Column(Float)
+    display_name = Column(Text)  # geocoder's label for the match
+    created_at = Column(DateTime, server_default=func.now())
+    last_used_at = Column(DateTime, server_default=func.now())
+    hit_count = Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index('idx_geocode_cache_created', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<GeocodeCacheEntry {self.address_hash[:12]}>'
+
+class PortfolioScreeningJob(db.Model):
+    """
+    Background portfolio screening of many (id, lat, lon) points against radar-detected alert polygons
+    Claimed and run by portfolio_screening.PortfolioJobWorker; input points are dropped once results are written.
+    """
+    __tablename__ = "portfolio_screening_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, returned to the client
+    status = Column(String(10), nullable=False, default='pending')  # "pending", "running", "done", "failed"
+    engine = Column(String(10), nullable=False)   # "postgis" or "shapely"
+    start_date = Column(DateTime)
+    end_date = Column(DateTime)
+    points = Column(JSONB)                        # [[point id, lat, lon], ...] until the job finishes
+    invalid_points = Column(JSONB)                # Error lines for unusable input points, written first
+    point_count = Column(db.Integer, nullable=False)  # Result lines: screened points plus invalid ones
+    processed_count = Column(db.Integer, nullable=False, default=0)
+    matched_count = Column(db.Integer, nullable=False, default=0)  # points inside at least one alert
+    error = Column(Text)
+    claimed_at = Column(DateTime)                 # Running jobs with an expired claim are picked up again
+    created_at = Column(DateTime, server_default=func.now())
+    finished_at = Column(DateTime)
+    updated_at = Column(DateTime, server_default=func.now())
+
+    __table_args__ = (
+        Index('idx_portfolio_job_status', 'status', 'created_at'),
+    )
+
+    def __repr__(self):
+        return f'<PortfolioScreeningJob {self.id}: {self.status}>'
+
+class PortfolioScreeningResult(db.Model):
+    """One NDJSON result line of a portfolio screening job, in output order"""
+    __tablename__ = "portfolio_screening_results"
+
+    job_id = Column(String(32), db.ForeignKey('portfolio_screening_jobs.id', ondelete='CASCADE'), primary_key=True)
+    seq = Column(db.Integer, primary_key=True)
+    result = Column(JSONB, nullable=False)
+
+    def __repr__(self):
+        return f'<PortfolioScreeningResult {self.job_id}#{self.seq}>'
+
 class SchedulerLog(db.Model):
     """
     Autonomous operation tracking for scheduler metadata
@@ -0,0 +1,265 @@
+"""
+Streaming NWS Feed Reader for HailyDB
+Fetches paginated GeoJSON pages on a producer thread and yields features as they are parsed
+"""
+
+import codecs
+import json
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+import requests
+
+logger = logging.getLogger(__name__)
+
+_END_OF_FEED = object()
+
+# How often a producer blocked on a full queue checks whether the consumer has gone away
+PUT_POLL_SECONDS = 0.5
+
+
+class _ConsumerStopped(Exception):
+    """Raised inside the producer thread once the consumer has stopped iterating"""
+
+
+class FeatureStreamParser:
+    """
+    Incremental parser for a GeoJSON FeatureCollection document
+    Each feature is decoded exactly once, directly from the network buffer,
+    and the surrounding members (pagination, title, updated) are returned on close()
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._state = 'head'  # head -> features -> tail
+        self._scan_pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._string_start = 0
+        self._last_string = None
+        self._head = ''
+        self._tail = ''
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Add decoded text and return every feature that is now complete"""
+        self._buffer += chunk
+        features = []
+
+        if self._state == 'head':
+            self._scan_head()
+
+        if self._state == 'features':
+            features = self._drain_features()
+
+        if self._state == 'tail':
+            self._tail += self._buffer
+            self._buffer = ''
+
+        return features
+
+    def close(self) -> Dict:
+        """Finish the document and return its top-level members without 'features'"""
+        if self._state == 'head':
+            # No features array at all; the whole body is metadata
+            return json.loads(self._head + self._buffer) if (self._head + self._buffer).strip() else {}
+        if self._state != 'tail':
+            raise ValueError("Truncated FeatureCollection: features array never closed")
+        return json.loads(self._head + '[]' + self._tail)
+
+    def _scan_head(self):
+        """Walk the document prefix until the top-level "features": [ opener"""
+        text = self._buffer
+        i = self._scan_pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == '\\':
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start:i]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i + 1
+            elif ch in '{[':
+                if ch == '[' and self._depth == 1 and self._last_string == 'features':
+                    # Keep everything up to the key's colon as head; the array is streamed
+                    self._head = text[:i]
+                    self._buffer = text[i + 1:]
+                    self._state = 'features'
+                    return
+                self._depth += 1
+                self._last_string = None
+            elif ch in '}]':
+                self._depth -= 1
+                self._last_string = None
+            elif ch not in ' \t\r\n:':
+                if ch == ',':
+                    self._last_string = None
+            i += 1
+        self._scan_pos = i
+
+    def _drain_features(self) -> List[Dict]:
+        """Decode as many complete features as the buffer holds"""
+        features = []
+        text = self._buffer
+        pos = 0
+        length = len(text)
+
+        while True:
+            while pos < length and text[pos] in ' \t\r\n,':
+                pos += 1
+            if pos >= length:
+                break
+            if text[pos] == ']':
+                self._state = 'tail'
+                pos += 1
+                break
+            try:
+                feature, end = self._decoder.raw_decode(text, pos)
+            except ValueError:
+                # Incomplete object; wait for more bytes
+                break
+            features.append(feature)
+            pos = end
+
+        self._buffer = text[pos:]
+        return features
+
+
+class NWSFeedStream:
+    """
+    Producer stage of the NWS ingestion pipeline
+    A background thread follows pagination.next, streams each page body through
+    FeatureStreamParser and puts features on a bounded queue (backpressure)
+    """
+
+    def __init__(self, start_url: str, headers: Dict, first_page_headers: Optional[Dict] = None,
+                 max_in_flight: int = 500, timeout: int = 30, chunk_size: int = 65536,
+                 http_get: Callable = requests.get):
+        self.start_url = start_url
+        self.headers = headers
+        self.first_page_headers = first_page_headers or headers
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.http_get = http_get
+        self._queue = queue.Queue(maxsize=max_in_flight)
+        self._thread = None
+        self._stopped = threading.Event()
+
+        # Results published by the producer thread
+        self.http_status = None
+        self.api_response_size = 0
+        self.pages_fetched = 0
+        self.features_streamed = 0
+        self.not_modified = False
+        self.complete = False
+        self.error = None
+        self.etag = None
+        self.last_modified = None
+        self.fetch_seconds = 0.0
+        self.backpressure_seconds = 0.0
+
+    def start(self) -> 'NWSFeedStream':
+        self._thread = threading.Thread(target=self._produce, name="nws-feed-producer", daemon=True)
+        self._thread.start()
+        return self
+
+    def __iter__(self) -> Iterator[Dict]:
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END_OF_FEED:
+                    break
+                yield item
+        finally:
+            # Consumer raised or stopped early: the producer gives up instead of blocking on a full queue
+            self._stopped.set()
+            if self._thread:
+                self._thread.join(timeout=self.timeout)
+
+    def _offer(self, item) -> bool:
+        """Blocking put that gives up once the consumer has stopped; False if it did"""
+        while not self._stopped.is_set():
+            try:
+                self._queue.put(item, timeout=PUT_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _put(self, feature: Dict):
+        started = time.monotonic()
+        if not self._offer(feature):
+            raise _ConsumerStopped()
+        self.backpressure_seconds += time.monotonic() - started
+        self.features_streamed += 1
+
+    def _produce(self):
+        url = self.start_url
+        first_page = True
+        try:
+            while url:
+                logger.debug(f"Polling URL: {url}")
+                page_started = time.monotonic()
+                headers = self.first_page_headers if first_page else self.headers
+
+                response = self.http_get(url, headers=headers, timeout=self.timeout, stream=True)
+                try:
+                    self.http_status = response.status_code
+
+                    if first_page and response.status_code == 304:
+                        self.not_modified = True
+                        self.complete = True
+                        return
+
+                    response.raise_for_status()
+
+                    if first_page:
+                        self.etag = response.headers.get('ETag')
+                        self.last_modified = response.headers.get('Last-Modified')
+                        first_page = False
+
+                    parser = FeatureStreamParser()
+                    decoder = codecs.getincrementaldecoder(response.encoding or 'utf-8')()
+                    page_features = 0
+
+                    for raw_chunk in response.iter_content(chunk_size=self.chunk_size):
+                        self.api_response_size += len(raw_chunk)
+                        for feature in parser.feed(decoder.decode(raw_chunk)):
+                            self._put(feature)
+                            page_features += 1
+                    for feature in parser.feed(decoder.decode(b'', final=True)):
+                        self._put(feature)
+                        page_features += 1
+
+                    metadata = parser.close()
+                finally:
+                    response.close()
+
+                self.pages_fetched += 1
+                self.fetch_seconds += time.monotonic() - page_started
+                logger.info(f"Retrieved {page_features} alerts from current page")
+
+                url = (metadata.get('pagination') or {}).get('next')
+                if url:
+                    logger.debug(f"Following pagination to: {url}")
+
+            self.complete = True
+
+        except _ConsumerStopped:
+            logger.debug("Feed consumer stopped; producer closed the response")
+        except requests.RequestException as e:
+            logger.error(f"HTTP error during ingestion: {e}")
+            self.error = e
+        except Exception as e:
+            logger.error(f"Unexpected error during page processing: {e}")
+            self.error = e
+        finally:
+            self._offer(_END_OF_FEED)
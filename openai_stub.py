@@ -0,0 +1,166 @@
+"""
+OpenAI Stub Server for HailyDB
+Local stand-in for POST /v1/chat/completions with fixed latency and a requests-per-minute quota
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+STUB_SUMMARY = ("Radar indicated quarter size hail and 60 mph wind gusts capable of damage to roofs, siding "
+                "and vehicles. Areas with the highest likelihood of damage to homes and personal property "
+                "are located along the storm's path.")
+
+STUB_TAGS = ["hail-damage", "wind-gusts", "roof-damage", "radar-indicated"]
+
+
+class OpenAIStubServer:
+    """
+    Answers chat completions after `latency` seconds with canned content
+    requests_per_minute > 0 enforces a sliding one-minute quota: requests over it get a 429 with
+    the same x-ratelimit-* headers OpenAI sends, so rate-limit handling can be exercised offline.
+    Point the client at it with OPENAI_BASE_URL=<base_url>.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.5,
+                 requests_per_minute: int = 0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.requests_per_minute = requests_per_minute
+        self.requests_served = 0
+        self.requests_limited = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}/v1"
+
+    def start(self) -> 'OpenAIStubServer':
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                server._handle(self)
+
+            def log_message(self, format, *args):
+                logger.debug(f"openai stub: {format % args}")
+
+        self._httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self._httpd.daemon_threads = True
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"OpenAI stub on {self.base_url} (latency={self.latency}s, "
+                    f"requests_per_minute={self.requests_per_minute or 'unlimited'})")
+        return self
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def _admit(self):
+        """(admitted, remaining requests, seconds until the oldest request leaves the window)"""
+        now = time.monotonic()
+        with self._lock:
+            while self._recent and now - self._recent[0] >= 60:
+                self._recent.popleft()
+            reset = 60 - (now - self._recent[0]) if self._recent else 0.0
+            if self.requests_per_minute and len(self._recent) >= self.requests_per_minute:
+                self.requests_limited += 1
+                return False, 0, reset
+            self._recent.append(now)
+            remaining = self.requests_per_minute - len(self._recent) if self.requests_per_minute else 1000000
+            return True, remaining, reset
+
+    def _handle(self, request: BaseHTTPRequestHandler):
+        length = int(request.headers.get('Content-Length') or 0)
+        try:
+            payload = json.loads(request.rfile.read(length) or b'{}')
+        except ValueError:
+            payload = {}
+
+        admitted, remaining, reset = self._admit()
+        headers = {
+            'x-ratelimit-limit-requests': str(self.requests_per_minute or 1000000),
+            'x-ratelimit-remaining-requests': str(remaining),
+            'x-ratelimit-reset-requests': f"{reset:.3f}s"
+        }
+        if not admitted:
+            self._send(request, 429, {'error': {
+                'message': 'Rate limit reached for requests', 'type': 'requests', 'code': 'rate_limit_exceeded'
+            }}, headers)
+            return
+
+        with self._lock:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            time.sleep(self.latency)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.requests_served += 1
+
+        json_mode = (payload.get('response_format') or {}).get('type') == 'json_object'
+        content = json.dumps({'tags': STUB_TAGS}) if json_mode else STUB_SUMMARY
+        self._send(request, 200, {
+            'id': f"chatcmpl-stub-{self.requests_served}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': payload.get('model', 'gpt-4o'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+        }, headers)
+
+    @staticmethod
+    def _send(request: BaseHTTPRequestHandler, status: int, body: dict, headers: dict):
+        data = json.dumps(body).encode()
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI chat completions stand-in for offline benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency', type=float, default=0.5, help='seconds per completion')
+    parser.add_argument('--requests-per-minute', type=int, default=0, help='quota before 429s (0 = unlimited)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server = OpenAIStubServer(args.host, args.port, args.latency, args.requests_per_minute).start()
+    print(f"OPENAI_BASE_URL={server.base_url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,455 @@
+"""
+Portfolio Screening for HailyDB
+Many (id, lat, lon) points against radar-detected alert polygons at once, streamed as NDJSON or run as a job
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import logging
+import math
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import shapely
+from shapely import STRtree
+from sqlalchemy import text
+
+from alert_containment import ALERT_SHAPE, BOUNDS_BOX, CANDIDATES_SQL, ENGINES, PREFILTER, alert_containment, date_window
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Chunk points inside candidate polygons; candidates come from the bounds index on the chunk's box
+POSTGIS_JOIN_SQL = f"""
+WITH candidates AS MATERIALIZED (
+    SELECT id, {BOUNDS_BOX} AS bounds, {ALERT_SHAPE} AS shape FROM alerts WHERE {PREFILTER}
+)
+SELECT p.seq, c.id
+FROM unnest(CAST(:seqs AS int[]), CAST(:lons AS float8[]), CAST(:lats AS float8[])) AS p(seq, lon, lat)
+JOIN candidates c ON c.bounds @> point(p.lon, p.lat)
+    AND ST_Covers(c.shape, ST_SetSRID(ST_MakePoint(p.lon, p.lat), 4326))
+"""
+
+ALERT_FACTS_SQL = """
+SELECT id, effective, CAST(radar_indicated->>'hail_inches' AS float), CAST(radar_indicated->>'wind_mph' AS float),
+       COALESCE(spc_verified, false)
+FROM alerts WHERE id = ANY(:ids)
+"""
+
+PURGE_JOBS_SQL = "DELETE FROM portfolio_screening_jobs WHERE created_at < NOW() - make_interval(hours => :hours)"
+
+CREATE_JOB_SQL = """
+INSERT INTO portfolio_screening_jobs
+    (id, status, engine, start_date, end_date, points, invalid_points, point_count, processed_count, matched_count,
+     created_at, updated_at)
+VALUES (:id, 'pending', :engine, :start_date, :end_date, CAST(:points AS jsonb), CAST(:invalid_points AS jsonb),
+        :point_count, 0, 0, NOW(), NOW())
+"""
+
+# Oldest pending job, or a running one whose worker stopped reporting progress
+CLAIM_JOB_SQL = """
+UPDATE portfolio_screening_jobs SET status = 'running', claimed_at = NOW(), processed_count = 0, matched_count = 0,
+    updated_at = NOW()
+WHERE id = (
+    SELECT id FROM portfolio_screening_jobs
+    WHERE status = 'pending'
+       OR (status = 'running' AND updated_at < NOW() - make_interval(secs => :lease_seconds))
+    ORDER BY created_at
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING id, engine, start_date, end_date, points, invalid_points, claimed_at
+"""
+
+CLEAR_RESULTS_SQL = "DELETE FROM portfolio_screening_results WHERE job_id = :job_id"
+
+# Writes are dropped once another worker has re-claimed the job
+INSERT_RESULTS_SQL = """
+INSERT INTO portfolio_screening_results (job_id, seq, result)
+SELECT :job_id, r.seq, CAST(r.result AS jsonb)
+FROM unnest(CAST(:seqs AS int[]), CAST(:results AS text[])) AS r(seq, result)
+WHERE EXISTS (SELECT 1 FROM portfolio_screening_jobs WHERE id = :job_id AND claimed_at = :claimed_at)
+"""
+
+PROGRESS_SQL = """
+UPDATE portfolio_screening_jobs SET processed_count = :processed, matched_count = :matched, updated_at = NOW()
+WHERE id = :job_id AND claimed_at = :claimed_at
+"""
+
+FINISH_JOB_SQL = """
+UPDATE portfolio_screening_jobs SET status = :status, error = :error, points = NULL, invalid_points = NULL,
+    processed_count = :processed,
+    matched_count = :matched, finished_at = NOW(), updated_at = NOW()
+WHERE id = :job_id AND claimed_at = :claimed_at
+"""
+
+JOB_SQL = """
+SELECT id, status, engine, start_date, end_date, point_count, processed_count, matched_count, error,
+       created_at, finished_at, updated_at
+FROM portfolio_screening_jobs WHERE id = :job_id
+"""
+
+RESULTS_PAGE_SQL = """
+SELECT seq, CAST(result AS text) FROM portfolio_screening_results
+WHERE job_id = :job_id AND seq > :after
+ORDER BY seq LIMIT :limit
+"""
+
+RESULT_BATCH_SIZE = 2000
+RESULTS_PAGE_SIZE = 5000
+
+# A running job that has not reported progress for this long is treated as abandoned
+JOB_LEASE_SECONDS = 600
+
+
+def parse_points(items: Iterable) -> Tuple[List[Tuple[str, float, float]], List[Dict]]:
+    """
+    Usable (id, lat, lon) points and an error result for every item that is not one
+    Items are {"id", "lat", "lon"} objects or [id, lat, lon] lists; ids are returned as strings.
+    """
+    points = []
+    errors = []
+    for index, item in enumerate(items):
+        if isinstance(item, dict):
+            point_id, lat, lon = item.get('id'), item.get('lat'), item.get('lon')
+        elif isinstance(item, (list, tuple)) and len(item) == 3:
+            point_id, lat, lon = item
+        else:
+            errors.append({'index': index, 'id': None, 'error': 'expected {"id", "lat", "lon"} or [id, lat, lon]'})
+            continue
+        try:
+            lat, lon = float(lat), float(lon)
+        except (TypeError, ValueError):
+            errors.append({'index': index, 'id': point_id, 'error': 'lat and lon must be numbers'})
+            continue
+        if point_id is None or point_id == '':
+            errors.append({'index': index, 'id': None, 'error': 'id is required'})
+        elif not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            errors.append({'index': index, 'id': point_id, 'error': 'lat/lon out of range'})
+        else:
+            points.append((str(point_id), lat, lon))
+    return points, errors
+
+
+def covering_pairs(polygons: List, lons: List[float], lats: List[float]) -> Tuple[List[int], List[int]]:
+    """(polygon index, point index) for every polygon covering a point: one bulk STRtree query over the points"""
+    if not polygons:
+        return [], []
+    tree = STRtree(shapely.points(lons, lats))
+    polygon_index, point_index = tree.query(polygons, predicate='covers')
+    return polygon_index.tolist(), point_index.tolist()
+
+
+def parse_date_range(start_date: Optional[str], end_date: Optional[str]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """YYYY-MM-DD bounds on alert effective time, end day inclusive; raises ValueError"""
+    start = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+    end = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1, microseconds=-1) if end_date else None
+    if start and end and start > end:
+        raise ValueError('start_date is after end_date')
+    return start, end
+
+
+class PortfolioScreener:
+    """
+    Screens points against radar-detected alert polygons, a spatial chunk at a time
+
+    Points are grouped into cell_degrees grid cells and chunks of at most chunk_points, so each
+    chunk needs one indexed bounding-box candidate query. With the postgis engine the chunk is
+    joined against the candidates in one statement (ST_Covers); with shapely the candidates'
+    cached prepared polygons are bulk-queried against an STRtree of the chunk's points. Results
+    come out per chunk, in spatial rather than input order.
+    """
+
+    def __init__(self, containment=None, cell_degrees: float = None, chunk_points: int = None):
+        self.containment = containment or alert_containment
+        self.cell_degrees = cell_degrees or Config.PORTFOLIO_CELL_DEGREES
+        self.chunk_points = chunk_points or Config.PORTFOLIO_CHUNK_POINTS
+        self.last_run: Dict = {}
+
+    def screen(self, session, points: List[Tuple[str, float, float]], start_date=None, end_date=None,
+               engine: str = None, stats: Dict = None) -> Iterator[Dict]:
+        """
+        One result dict per point: matching alert ids (latest first), max hail/wind, SPC verification
+        Run statistics go into stats when given (last_run is shared by every caller of the screener).
+        """
+        engine = engine or self.containment.engine
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, not {engine!r}")
+        self.containment.check_bounds_index(session)
+        date_filter, date_params = date_window(start_date, end_date)
+        started = time.perf_counter()
+        stats = {} if stats is None else stats
+        stats.update({'engine': engine, 'points': 0, 'matched': 0, 'chunks': 0})
+        self.last_run = stats
+
+        cells = defaultdict(list)
+        for seq, (_, lat, lon) in enumerate(points):
+            cells[(math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))].append(seq)
+
+        for cell in sorted(cells):
+            # West to east, so a cell split into several chunks gives narrow candidate boxes
+            seqs = sorted(cells[cell], key=lambda seq: points[seq][2])
+            for offset in range(0, len(seqs), self.chunk_points):
+                chunk = seqs[offset:offset + self.chunk_points]
+                lats = [points[seq][1] for seq in chunk]
+                lons = [points[seq][2] for seq in chunk]
+                params = {'min_lat': min(lats), 'max_lat': max(lats), 'min_lon': min(lons), 'max_lon': max(lons),
+                          **date_params}
+
+                pairs = None
+                if engine == 'postgis':
+                    try:
+                        pairs = session.execute(text(POSTGIS_JOIN_SQL.format(date_filter=date_filter)),
+                                                {**params, 'seqs': chunk, 'lats': lats, 'lons': lons}).fetchall()
+                    except Exception as e:
+                        logger.warning(f"PostGIS portfolio join failed, using shapely: {e}")
+                        session.rollback()
+                        engine = stats['engine'] = 'shapely'
+                if pairs is None:
+                    pairs = self._shapely_pairs(session, chunk, lats, lons, date_filter, params)
+
+                matches = defaultdict(list)
+                for seq, alert_id in pairs:
+                    matches[seq].append(alert_id)
+                facts = self._alert_facts(session, {alert_id for _, alert_id in pairs})
+
+                stats['chunks'] += 1
+                for seq in chunk:
+                    result = self._result(points[seq], matches.get(seq, ()), facts)
+                    stats['points'] += 1
+                    stats['matched'] += 1 if result['alert_count'] else 0
+                    yield result
+
+        stats['seconds'] = round(time.perf_counter() - started, 3)
+        stats['points_per_second'] = round(stats['points'] / stats['seconds']) if stats['seconds'] else None
+        logger.info(f"Portfolio screening: {stats['points']} points, {stats['matched']} inside alerts, "
+                    f"{stats['chunks']} chunks via {engine} in {stats['seconds']}s")
+
+    def _shapely_pairs(self, session, chunk: List[int], lats: List[float], lons: List[float],
+                       date_filter: str, params: Dict) -> List[Tuple[int, str]]:
+        """(point seq, alert id) for every candidate polygon covering a chunk point"""
+        candidates = session.execute(text(CANDIDATES_SQL.format(date_filter=date_filter)), params).fetchall()
+        shapes = self.containment.prepared_shapes(session, candidates)
+        alert_ids = [alert_id for alert_id, _ in candidates if shapes.get(alert_id) is not None]
+        polygon_index, point_index = covering_pairs([shapes[alert_id] for alert_id in alert_ids], lons, lats)
+        return [(chunk[p], alert_ids[a]) for a, p in zip(polygon_index, point_index)]
+
+    def _alert_facts(self, session, alert_ids) -> Dict[str, Tuple]:
+        if not alert_ids:
+            return {}
+        rows = session.execute(text(ALERT_FACTS_SQL), {'ids': list(alert_ids)})
+        return {alert_id: (effective, hail, wind, verified) for alert_id, effective, hail, wind, verified in rows}
+
+    @staticmethod
+    def _result(point: Tuple[str, float, float], alert_ids: Iterable[str], facts: Dict[str, Tuple]) -> Dict:
+        point_id, lat, lon = point
+        alert_ids = sorted((alert_id for alert_id in alert_ids if alert_id in facts),
+                           key=lambda alert_id: facts[alert_id][0] or datetime.min, reverse=True)
+        hail = [facts[alert_id][1] for alert_id in alert_ids if facts[alert_id][1]]
+        wind = [facts[alert_id][2] for alert_id in alert_ids if facts[alert_id][2]]
+        latest = facts[alert_ids[0]][0] if alert_ids else None
+        return {
+            'id': point_id,
+            'lat': lat,
+            'lon': lon,
+            'alert_count': len(alert_ids),
+            'alert_ids': alert_ids,
+            'max_hail_inches': max(hail) if hail else None,
+            'max_wind_mph': int(max(wind)) if wind else None,
+            'spc_verified': any(facts[alert_id][3] for alert_id in alert_ids),
+            'latest_effective': latest.isoformat() if latest else None
+        }
+
+
+portfolio_screener = PortfolioScreener()
+
+
+def create_job(session, points: List[Tuple[str, float, float]], start_date=None, end_date=None,
+               engine: str = None, invalid: List[Dict] = None) -> str:
+    """
+    Persist a pending screening job (and purge expired ones); returns its id
+    invalid holds parse_points error lines, written ahead of the screening results like the streamed response.
+    """
+    job_id = uuid.uuid4().hex
+    session.execute(text(PURGE_JOBS_SQL), {'hours': Config.PORTFOLIO_JOB_RETENTION_HOURS})
+    session.execute(text(CREATE_JOB_SQL), {
+        'id': job_id, 'engine': engine or alert_containment.engine, 'start_date': start_date, 'end_date': end_date,
+        'points': json.dumps([list(point) for point in points]), 'invalid_points': json.dumps(invalid or []),
+        'point_count': len(points) + len(invalid or [])
+    })
+    session.commit()
+    return job_id
+
+
+def get_job(session, job_id: str) -> Optional[Dict]:
+    row = session.execute(text(JOB_SQL), {'job_id': job_id}).mappings().first()
+    if row is None:
+        return None
+    job = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+    job['progress'] = round(row['processed_count'] / row['point_count'], 4) if row['point_count'] else 1.0
+    return job
+
+
+def iter_job_results(session, job_id: str, page_size: int = RESULTS_PAGE_SIZE) -> Iterator[str]:
+    """NDJSON lines of a job's results, read a keyset page at a time"""
+    after = -1
+    while True:
+        rows = session.execute(text(RESULTS_PAGE_SQL), {'job_id': job_id, 'after': after, 'limit': page_size}).fetchall()
+        for _, result in rows:
+            yield result + '\n'
+        if len(rows) < page_size:
+            return
+        after = rows[-1][0]
+
+
+class PortfolioJobWorker:
+    """
+    Runs pending portfolio_screening_jobs one at a time on a background thread
+
+    Results are written in batches as the screener produces them, with processed_count as the
+    heartbeat; a job whose worker stops for JOB_LEASE_SECONDS is re-claimed and restarted from
+    scratch, and writes from the worker that lost the claim are discarded.
+    """
+
+    def __init__(self, db_session, screener: PortfolioScreener = None):
+        self.db = db_session
+        self.screener = screener or portfolio_screener
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self.thread = None
+
+    def run_next(self) -> Optional[Dict]:
+        """Claim and run the oldest due job; None when there is nothing to do"""
+        job = self.db.execute(text(CLAIM_JOB_SQL), {'lease_seconds': JOB_LEASE_SECONDS}).mappings().first()
+        self.db.commit()
+        if job is None:
+            return None
+        claim = {'job_id': job['id'], 'claimed_at': job['claimed_at']}
+        self.db.execute(text(CLEAR_RESULTS_SQL), {'job_id': job['id']})
+        self.db.commit()
+
+        points, _ = parse_points(job['points'] or [])
+        run = {}
+        screening = self.screener.screen(self.db, points, job['start_date'], job['end_date'], engine=job['engine'],
+                                         stats=run)
+        processed = matched = 0
+        status, error = 'done', None
+        batch = []
+        try:
+            for result in itertools.chain(job['invalid_points'] or [], screening):
+                batch.append(json.dumps(result))
+                matched += 1 if result.get('alert_count') else 0
+                if len(batch) >= RESULT_BATCH_SIZE:
+                    if not self._write(claim, processed, batch, matched):
+                        logger.warning(f"Portfolio job {job['id']} was re-claimed by another worker, abandoning it")
+                        return {'job_id': job['id'], 'status': 'abandoned'}
+                    processed += len(batch)
+                    batch = []
+            self._write(claim, processed, batch, matched)
+            processed += len(batch)
+        except Exception as e:
+            self.db.rollback()
+            status, error = 'failed', str(e)
+            logger.error(f"Portfolio job {job['id']} failed: {e}")
+
+        self.db.execute(text(FINISH_JOB_SQL), {**claim, 'status': status, 'error': error,
+                                               'processed': processed, 'matched': matched})
+        self.db.commit()
+        return {'job_id': job['id'], 'status': status, 'processed': processed, 'matched': matched,
+                **{key: run.get(key) for key in ('engine', 'seconds', 'points_per_second')}}
+
+    def _write(self, claim: Dict, processed: int, batch: List[str], matched: int) -> bool:
+        """Store one batch of result lines and report progress; False once the claim is lost"""
+        if batch:
+            self.db.execute(text(INSERT_RESULTS_SQL), {
+                **claim, 'seqs': list(range(processed, processed + len(batch))), 'results': batch
+            })
+        owned = self.db.execute(text(PROGRESS_SQL), {**claim, 'processed': processed + len(batch),
+                                                     'matched': matched}).rowcount
+        self.db.commit()
+        return owned > 0
+
+    def drain(self) -> List[Dict]:
+        finished = []
+        while not self._stopped.is_set():
+            outcome = self.run_next()
+            if outcome is None:
+                break
+            finished.append(outcome)
+        return finished
+
+    def start(self, app, poll_seconds: int = 60):
+        """Run jobs on a background thread inside the app context; wakes early when a job is submitted"""
+        self._wake.set()
+        if self.thread and self.thread.is_alive():
+            return
+        self._stopped.clear()
+
+        def loop():
+            while not self._stopped.is_set():
+                self._wake.clear()
+                try:
+                    with app.app_context():
+                        self.drain()
+                except Exception as e:
+                    logger.error(f"Portfolio job worker iteration failed: {e}")
+                self._wake.wait(poll_seconds)
+
+        self.thread = threading.Thread(target=loop, name='portfolio-screening-worker', daemon=True)
+        self.thread.start()
+        logger.info("Portfolio screening worker started")
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+
+def read_points_file(path: str) -> List:
+    """Points from a CSV with id,lat,lon columns or an NDJSON file of point objects"""
+    with open(path, newline='') as handle:
+        if path.endswith('.csv'):
+            return [{'id': row.get('id'), 'lat': row.get('lat'), 'lon': row.get('lon')} for row in csv.DictReader(handle)]
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portfolio screening against radar-detected alerts")
+    parser.add_argument('command', choices=['screen', 'drain'],
+                        help='screen: NDJSON results for a points file on stdout; drain: run pending jobs')
+    parser.add_argument('--input', help='screen: CSV (id,lat,lon) or NDJSON points file')
+    parser.add_argument('--start-date', help='YYYY-MM-DD')
+    parser.add_argument('--end-date', help='YYYY-MM-DD')
+    parser.add_argument('--engine', choices=ENGINES, default=Config.CONTAINMENT_ENGINE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', stream=sys.stderr)
+    if args.command == 'screen' and not args.input:
+        parser.error('screen needs --input')
+
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+        if args.command == 'screen':
+            points, errors = parse_points(read_points_file(args.input))
+            start_date, end_date = parse_date_range(args.start_date, args.end_date)
+            for error in errors:
+                sys.stdout.write(json.dumps(error) + '\n')
+            screener = portfolio_screener
+            for result in screener.screen(db.session, points, start_date, end_date, engine=args.engine):
+                sys.stdout.write(json.dumps(result) + '\n')
+            print(screener.last_run, file=sys.stderr)
+        else:
+            print(PortfolioJobWorker(db.session).drain())
+
+
+if __name__ == '__main__':
+    main()
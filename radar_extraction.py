@@ -0,0 +1,274 @@
+"""
+Radar Parameter Extraction Engine for HailyDB
+Compiled, prefiltered hail/wind extraction shared by ingestion, live radar and the parsing test API
+"""
+
+import re
+import logging
+from typing import Dict, Optional, Tuple, Any
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RadarParameterExtractor:
+    """
+    Single extraction engine for radar-indicated hail and wind values
+
+    Every pattern is compiled once at import. Text is lower/upper-cased once,
+    a keyword prefilter decides which extractors can possibly match, and named
+    hail sizes are found with a single combined alternation instead of one
+    search per chart entry. Output is identical to the original per-call
+    regex implementations.
+    """
+
+    def __init__(self, hail_size_chart: Dict[str, float] = None):
+        self.hail_size_chart = dict(hail_size_chart or Config.NWS_HAIL_SIZE_CHART)
+
+        # --- Ingest (stored alerts) patterns, lower-cased text ---
+        # Any of these disables hail extraction ("inches of rain" is never hail)
+        self._hail_block_re = re.compile(r'flood warning|flood advisory|flash flood|inches of rain|rainfall')
+        self._hail_up_to_re = re.compile(r'hail up to (\d+(?:\.\d+)?)\s*inch')
+        self._inch_hail_re = re.compile(r'(\d+(?:\.\d+)?)\s*inch[es]*\s+hail')
+        self._inch_diameter_re = re.compile(r'(\d+(?:\.\d+)?)\s*inch diameter hail')
+
+        # Named sizes: one alternation finds every occurrence; longest names first
+        names = sorted(self.hail_size_chart, key=len, reverse=True)
+        self._named_size_re = re.compile(
+            r'\b(' + '|'.join(re.escape(name) for name in names) + r')\b', re.IGNORECASE
+        )
+        # "<name> hail" / "<name> size hail" / "<name> sized hail", anchored at the end of a name
+        self._named_suffix_re = re.compile(r'\s+(?:size[d]?\s+)?hail', re.IGNORECASE)
+
+        # Any of these disables wind extraction
+        self._wind_block_re = re.compile(r'flood|tsunami|storm surge|high surf|river|stream')
+        # Each pattern keeps its own non-overlapping scan; all values count toward the maximum
+        self._wind_patterns = [re.compile(pattern) for pattern in [
+            r'winds up to (\d+)\s*mph',
+            r'damaging winds of (\d+)\s*mph',
+            r'(\d+)\s*mph wind gusts',
+            r'wind gusts to (\d+)\s*mph',
+            r'winds of (\d+)\s*mph',
+            r'(\d+)\s*mph winds',
+            r'wind speeds of (\d+)\s*mph',
+            r'(\d+) to (\d+)\s*mph',  # "X to Y mph" - both values count
+            r'winds to (\d+)\s*mph',
+            r'gusts to (\d+)\s*mph',
+            r'(\d+)\s*mph gusts',
+            r'wind gusts of (\d+)\s*mph',
+        ]]
+
+        # --- Live radar patterns, upper-cased description ---
+        self._live_wind_patterns = [re.compile(pattern) for pattern in [
+            r'GUSTS?\s+(?:UP\s+TO\s+|OF\s+)?(\d+)\s*MPH',
+            r'WINDS?\s+(?:UP\s+TO\s+|OF\s+|TO\s+)?(\d+)\s*MPH',
+            r'WIND\s+GUSTS?\s+(?:UP\s+TO\s+|OF\s+)?(\d+)\s*MPH',
+            r'(\d+)\s*MPH\s+(?:WIND|GUST)',
+        ]]
+        self._live_knots_re = re.compile(r'WINDS?\s+(?:TO\s+AROUND\s+)?(\d+)\s*KNOTS?')
+        self._live_hail_patterns = [re.compile(pattern) for pattern in [
+            r'HAIL\s+(?:UP\s+TO\s+|OF\s+)?(\d+(?:\.\d+)?)\s*(?:INCH|IN)',
+            r'(\d+(?:\.\d+)?)\s*(?:INCH|IN)\s+HAIL',
+            r'HAIL\s+(?:SIZE\s+)?(\d+(?:\.\d+)?)',
+            r'(\d+(?:\.\d+)?)"?\s+HAIL',
+        ]]
+        self._digits_re = re.compile(r'(\d+)')
+
+    # ------------------------------------------------------------------
+    # Stored-alert extraction (IngestService semantics)
+    # ------------------------------------------------------------------
+
+    def parse_radar_indicated(self, properties: Dict) -> Optional[Dict]:
+        """
+        Parse radar-indicated hail and wind data from NWS alert properties
+        Returns {"hail_inches": float, "wind_mph": int} with ALL extracted data, or None
+        """
+        # Check NWS API parameters first (most reliable)
+        parameters = properties.get('parameters', {})
+
+        radar_hail = None
+        radar_wind = None
+
+        max_hail_size = parameters.get('maxHailSize')
+        if max_hail_size and isinstance(max_hail_size, list) and len(max_hail_size) > 0:
+            try:
+                radar_hail = float(max_hail_size[0])
+            except (ValueError, TypeError):
+                pass
+
+        max_wind_gust = parameters.get('maxWindGust')
+        if max_wind_gust and isinstance(max_wind_gust, list) and len(max_wind_gust) > 0:
+            wind_str = max_wind_gust[0]
+            if isinstance(wind_str, str):
+                # Extract numeric value from "50 MPH" format
+                match = self._digits_re.search(wind_str)
+                if match:
+                    radar_wind = int(match.group(1))
+
+        # Fall back to text parsing, both values from one lower-cased copy
+        if radar_hail is None or radar_wind is None:
+            description = properties.get('description', '') or ''
+            headline = properties.get('headline', '') or ''
+            instruction = properties.get('instruction', '') or ''
+            text_hail, text_wind = self.extract_from_text(f"{description} {headline} {instruction}")
+            if radar_hail is None:
+                radar_hail = text_hail
+            if radar_wind is None:
+                radar_wind = text_wind
+
+        # CRITICAL: Return ALL extracted radar data, no filtering
+        radar_data = {}
+        if radar_hail is not None and radar_hail > 0:
+            radar_data['hail_inches'] = radar_hail
+        if radar_wind is not None and radar_wind > 0:
+            radar_data['wind_mph'] = radar_wind
+
+        return radar_data if radar_data else None
+
+    def extract_from_text(self, text: str) -> Tuple[Optional[float], Optional[int]]:
+        """Extract (hail_inches, wind_mph) from free text in a single pass over the prefilter"""
+        if not text or not isinstance(text, str):
+            return None, None
+
+        text_lower = text.lower()
+        return self._hail_from_text(text, text_lower), self._wind_from_text(text_lower)
+
+    def extract_hail_size(self, text: str) -> Optional[float]:
+        """Extract hail size in inches from text - ONLY for hail, not rain"""
+        if not text or not isinstance(text, str):
+            return None
+        return self._hail_from_text(text, text.lower())
+
+    def extract_wind_speed(self, text: str) -> Optional[int]:
+        """Extract wind speed in mph from text"""
+        if not text or not isinstance(text, str):
+            return None
+        return self._wind_from_text(text.lower())
+
+    def _hail_from_text(self, text: str, text_lower: str) -> Optional[float]:
+        # Every hail pattern requires the word "hail"; skip flood/rain products entirely
+        if 'hail' not in text_lower or self._hail_block_re.search(text_lower):
+            return None
+
+        # Pattern 1: "hail up to X inch(es)"
+        match = self._hail_up_to_re.search(text)
+        if match:
+            return float(match.group(1))
+
+        # Pattern 2: "X inch hail"
+        match = self._inch_hail_re.search(text)
+        if match:
+            return float(match.group(1))
+
+        # Pattern 3: named sizes, chart order decides precedence
+        named = self._named_sizes_in(text_lower)
+        if named:
+            for size_name, inches in self.hail_size_chart.items():
+                if size_name in named:
+                    return inches
+
+        # Pattern 4: "X inch diameter hail"
+        match = self._inch_diameter_re.search(text)
+        if match:
+            return float(match.group(1))
+
+        return None
+
+    def _named_sizes_in(self, text_lower: str) -> set:
+        """
+        Names tied to hail: "<name> hail", "<name> size(d) hail",
+        or "hail" earlier on the same line as the name
+        """
+        qualifying = set()
+        for match in self._named_size_re.finditer(text_lower):
+            name = match.group(1)
+            if name in qualifying:
+                continue
+            start, end = match.span()
+            if self._named_suffix_re.match(text_lower, end):
+                qualifying.add(name)
+                continue
+            line_start = text_lower.rfind('\n', 0, start) + 1
+            if text_lower.find('hail', line_start, start) != -1:
+                qualifying.add(name)
+        return qualifying
+
+    def _wind_from_text(self, text_lower: str) -> Optional[int]:
+        # Every wind pattern requires "mph"; skip flood/water products entirely
+        if 'mph' not in text_lower or self._wind_block_re.search(text_lower):
+            return None
+
+        max_wind = 0
+        for pattern in self._wind_patterns:
+            for match in pattern.finditer(text_lower):
+                for value in match.groups():
+                    max_wind = max(max_wind, int(value))
+
+        return max_wind if max_wind > 0 else None
+
+    # ------------------------------------------------------------------
+    # Live radar extraction (LiveRadarAlertService semantics)
+    # ------------------------------------------------------------------
+
+    def extract_live_wind(self, parameters: Dict[str, Any], description: str = None) -> Optional[int]:
+        """Extract wind gust from structured parameters, then from description text"""
+        for param in ('maxWindGust', 'windGust', 'windSpeed'):
+            values = parameters.get(param, [])
+            if values and len(values) > 0:
+                try:
+                    # Extract numeric value from string like "70 MPH"
+                    wind_str = str(values[0]).upper()
+                    if 'MPH' in wind_str:
+                        return int(''.join(filter(str.isdigit, wind_str)))
+                except (ValueError, TypeError):
+                    continue
+
+        if not description:
+            return None
+
+        description_upper = description.upper()
+        if 'MPH' not in description_upper and 'KNOT' not in description_upper:
+            return None
+
+        max_wind = 0
+        if 'MPH' in description_upper:
+            for pattern in self._live_wind_patterns:
+                for match in pattern.finditer(description_upper):
+                    max_wind = max(max_wind, int(match.group(1)))
+        if 'KNOT' in description_upper:
+            for match in self._live_knots_re.finditer(description_upper):
+                # Convert knots to mph (1 knot ≈ 1.15 mph)
+                max_wind = max(max_wind, int(int(match.group(1)) * 1.15))
+
+        return max_wind if max_wind > 0 else None
+
+    def extract_live_hail(self, parameters: Dict[str, Any], description: str = None) -> Optional[float]:
+        """Extract hail size from structured parameters, then from description text"""
+        for param in ('maxHailSize', 'hailSize'):
+            values = parameters.get(param, [])
+            if values and len(values) > 0:
+                try:
+                    # Extract numeric value from string like "1.25"
+                    hail_str = str(values[0])
+                    hail_value = float(''.join(c for c in hail_str if c.isdigit() or c == '.'))
+                    return hail_value if hail_value > 0 else None
+                except (ValueError, TypeError):
+                    continue
+
+        if not description:
+            return None
+
+        description_upper = description.upper()
+        if 'HAIL' not in description_upper:
+            return None
+
+        max_hail = 0.0
+        for pattern in self._live_hail_patterns:
+            for match in pattern.finditer(description_upper):
+                max_hail = max(max_hail, float(match.group(1)))
+
+        return max_hail if max_hail > 0 else None
+
+
+# Global engine instance, compiled once at import
+radar_extractor = RadarParameterExtractor()
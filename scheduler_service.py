@@ -49,7 +49,7 @@ class SchedulerService:
                              error_message: str = None, error_details: dict = None,
                              failed_alert_ids: list = None, duplicate_count: int = 0,
                              http_status_code: int = None, api_response_size: int = None,
-                             processing_duration: float = None):
+                             processing_duration: float = None, metadata: Optional[Dict] = None):
         """
         Complete an operation log entry with PostgreSQL workaround
         """
@@ -63,15 +63,24 @@ class SchedulerService:
             
             # Use direct SQL execution to bypass type conversion issues
             from sqlalchemy import text
+            import json
             self.db.session.execute(
                 text("UPDATE scheduler_logs SET completed_at = CURRENT_TIMESTAMP, success = :success, "
-                     "records_processed = :processed, records_new = :new_records, error_message = :error "
+                     "records_processed = :processed, records_new = :new_records, error_message = :error, "
+                     "duplicate_count = :duplicates, http_status_code = :http_status, "
+                     "api_response_size = :response_size, processing_duration = :duration, "
+                     "operation_metadata = COALESCE(operation_metadata, '{}'::jsonb) || CAST(:metadata AS jsonb) "
                      "WHERE started_at = (SELECT MAX(started_at) FROM scheduler_logs WHERE operation_type = :op_type AND completed_at IS NULL)"),
                 {
                     'success': success,
                     'processed': records_processed or 0,
                     'new_records': records_new or 0,
                     'error': error_message,
+                    'duplicates': duplicate_count or 0,
+                    'http_status': http_status_code,
+                    'response_size': api_response_size,
+                    'duration': processing_duration,
+                    'metadata': json.dumps(metadata or {}),
                     'op_type': operation_type
                 }
             )
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Containment Benchmark
+Latency of point-in-polygon alert lookups against the number of bounding-box candidates, and how
+many candidates the old bbox-only contains-address filter returned that do not contain the point.
+
+Modes:
+  --synthetic         generated warning polygons around a query point, no database. Compares
+                      building shapes per query, prepared shapes from the per-alert cache (what
+                      CONTAINMENT_ENGINE=shapely serves once warm) and the bbox-only answer.
+  --database          points at the bounding-box centers of random alerts from DATABASE_URL, run through
+                      alert_containment with both engines (shapely cold and warm). Read-only; build
+                      idx_alert_bounds_box first with python alert_containment.py create-index.
+
+Usage:
+  python scripts/benchmarks/containment_benchmark.py --synthetic --candidates 10 100 1000 5000
+  python scripts/benchmarks/containment_benchmark.py --database --points 200 --buffer-miles 0 5
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from statistics import median
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import shapely
+from shapely.geometry import Point, shape
+
+from alert_containment import CANDIDATES_SQL, search_box
+
+
+def warning_polygon(rng: random.Random, lat: float, lon: float) -> dict:
+    """Storm-based warning sized polygon (5-25 miles across) somewhere within ~20 miles of lat/lon"""
+    center_lat = lat + rng.uniform(-0.3, 0.3)
+    center_lon = lon + rng.uniform(-0.35, 0.35)
+    radius = rng.uniform(2.5, 12.5) / 69.0
+    sides = rng.randint(4, 8)
+    rotation = rng.uniform(0, math.pi)
+    ring = [[center_lon + radius * 1.3 * math.cos(rotation + 2 * math.pi * i / sides),
+             center_lat + radius * math.sin(rotation + 2 * math.pi * i / sides)] for i in range(sides)]
+    return {'type': 'Polygon', 'coordinates': [ring + [ring[0]]]}
+
+
+def run_synthetic(args):
+    rng = random.Random(args.seed)
+    lat, lon = 37.69, -97.33
+    point = Point(lon, lat)
+    print(f"{'candidates':>10} {'contain':>8} {'bbox false+':>12} {'build+test ms':>14} {'prepared ms':>12} {'speedup':>8}")
+    for count in args.candidates:
+        geometries = []
+        while len(geometries) < count:
+            geometry = warning_polygon(rng, lat, lon)
+            bounds = shape(geometry).bounds
+            if bounds[0] <= lon <= bounds[2] and bounds[1] <= lat <= bounds[3]:
+                geometries.append(geometry)
+
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            built = [alert_id for alert_id, geometry in enumerate(geometries) if shape(geometry).covers(point)]
+        build_ms = (time.perf_counter() - started) / args.queries * 1000
+
+        prepared = [shape(geometry) for geometry in geometries]
+        for polygon in prepared:
+            shapely.prepare(polygon)
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            cached = [alert_id for alert_id, polygon in enumerate(prepared) if polygon.covers(point)]
+        prepared_ms = (time.perf_counter() - started) / args.queries * 1000
+
+        assert built == cached
+        print(f"{count:>10} {len(cached):>8} {count - len(cached):>12} {build_ms:>14.3f} {prepared_ms:>12.3f} "
+              f"{build_ms / prepared_ms:>7.1f}x")
+    print("candidates: alerts the bbox-only filter returned; bbox false+: those whose polygon misses the point")
+
+
+def run_database(args):
+    from sqlalchemy import text
+    from app import app, db
+    from alert_containment import AlertContainment
+
+    with app.app_context():
+        points = db.session.execute(text(
+            "SELECT (CAST(geometry_bounds->>'min_lat' AS float8) + CAST(geometry_bounds->>'max_lat' AS float8)) / 2, "
+            "(CAST(geometry_bounds->>'min_lon' AS float8) + CAST(geometry_bounds->>'max_lon' AS float8)) / 2 "
+            "FROM alerts WHERE geometry_bounds IS NOT NULL AND radar_indicated IS NOT NULL "
+            "ORDER BY random() LIMIT :points"), {'points': args.points}).fetchall()
+        containment = AlertContainment(engine='shapely')
+        buckets = defaultdict(lambda: defaultdict(list))
+        mismatches = 0
+        for buffer_miles in args.buffer_miles:
+            for lat, lon in points:
+                params = search_box(lat, lon, buffer_miles)
+                candidates = len(db.session.execute(text(CANDIDATES_SQL.format(date_filter='')), params).fetchall())
+                bucket = 10 ** max(0, math.ceil(math.log10(max(candidates, 1))))
+                results = {}
+                for label, engine in (('postgis', 'postgis'), ('shapely_cold', 'shapely'), ('shapely_warm', 'shapely')):
+                    if label == 'shapely_cold':
+                        containment._shapes.clear()
+                    started = time.perf_counter()
+                    results[label] = containment.find_alert_ids(db.session, lat, lon, buffer_miles=buffer_miles,
+                                                                engine=engine)
+                    buckets[(buffer_miles, bucket)][label].append((time.perf_counter() - started) * 1000)
+                buckets[(buffer_miles, bucket)]['bbox_only'].append(candidates - len(results['postgis']))
+                if buffer_miles == 0 and set(results['postgis']) != set(results['shapely_warm']):
+                    mismatches += 1
+        db.session.rollback()
+
+    print(f"{'buffer mi':>9} {'candidates<=':>12} {'points':>7} {'postgis ms':>11} {'shapely cold':>13} "
+          f"{'shapely warm':>13} {'bbox false+':>12}")
+    for (buffer_miles, bucket), timings in sorted(buckets.items()):
+        print(f"{buffer_miles:>9g} {bucket:>12} {len(timings['postgis']):>7} {median(timings['postgis']):>11.2f} "
+              f"{median(timings['shapely_cold']):>13.2f} {median(timings['shapely_warm']):>13.2f} "
+              f"{median(timings['bbox_only']):>12g}")
+    print(f"postgis/shapely result mismatches (buffer 0): {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--synthetic', action='store_true')
+    mode.add_argument('--database', action='store_true')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[10, 100, 1000, 5000],
+                        help='synthetic mode: bounding-box candidate counts')
+    parser.add_argument('--queries', type=int, default=20, help='synthetic mode: repetitions per count')
+    parser.add_argument('--points', type=int, default=200, help='database mode: query points')
+    parser.add_argument('--buffer-miles', type=float, nargs='+', default=[0, 5], help='database mode')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        run_synthetic(args)
+    else:
+        run_database(args)
+
+
+if __name__ == '__main__':
+    main()
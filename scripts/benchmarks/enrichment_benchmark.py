@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Enrichment Benchmark
+Sequential EnrichmentService calls (one alert at a time, summary then tags) against the
+concurrent EnrichmentExecutor, both pointed at a local openai_stub server so no API quota is
+spent. Synthetic alerts are enriched in memory; nothing is written to the database.
+
+Usage:
+  python scripts/benchmarks/enrichment_benchmark.py --alerts 200 --latency 0.5
+  python scripts/benchmarks/enrichment_benchmark.py --alerts 500 --requests-per-minute 600 --max-concurrency 16
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from openai_stub import OpenAIStubServer
+
+EVENTS = ['Severe Thunderstorm Warning', 'Tornado Warning', 'Severe Weather Statement', 'High Wind Warning']
+
+
+def synthetic_alerts(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    alerts = []
+    for i in range(count):
+        hail = rng.choice([None, 0.75, 1.0, 1.75, 2.75])
+        wind = rng.choice([None, 60, 70, 80])
+        alerts.append(SimpleNamespace(
+            id=f"urn:oid:benchmark.{i}",
+            event=rng.choice(EVENTS),
+            severity='Severe',
+            area_desc='Sedgwick, KS; Butler, KS',
+            properties={'description': f"At 5:42 PM CDT, a severe thunderstorm was located near Wichita. "
+                                       f"HAZARD...{wind or 60} mph wind gusts and {hail or 1.0} inch hail."},
+            radar_indicated={'hail_inches': hail, 'wind_mph': wind},
+            ai_summary=None,
+            ai_tags=None
+        ))
+    return alerts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--alerts', type=int, default=200, help='synthetic alerts to enrich')
+    parser.add_argument('--latency', type=float, default=0.5, help='stub seconds per completion')
+    parser.add_argument('--requests-per-minute', type=int, default=0, help='stub quota (0 = unlimited)')
+    parser.add_argument('--max-concurrency', type=int, help='ENRICH_MAX_CONCURRENCY override')
+    parser.add_argument('--sequential-sample', type=int, default=20,
+                        help='alerts timed on the sequential path (extrapolated; 0 = all)')
+    args = parser.parse_args()
+
+    stub = OpenAIStubServer(latency=args.latency, requests_per_minute=args.requests_per_minute).start()
+    os.environ['OPENAI_BASE_URL'] = stub.base_url
+    os.environ.setdefault('OPENAI_API_KEY', 'stub')
+    if args.max_concurrency:
+        os.environ['ENRICH_MAX_CONCURRENCY'] = str(args.max_concurrency)
+
+    from enrich import EnrichmentService
+    from enrichment_executor import EnrichmentExecutor
+
+    alerts = synthetic_alerts(args.alerts)
+
+    service = EnrichmentService(db=None)
+    sample = alerts[:args.sequential_sample] if args.sequential_sample else alerts
+    started = time.perf_counter()
+    for alert in sample:
+        alert.ai_summary = service._generate_summary(alert)
+        alert.ai_tags = service._classify_tags(alert)
+    sequential_seconds = (time.perf_counter() - started) * len(alerts) / max(len(sample), 1)
+
+    service = EnrichmentService(db=None)
+    executor = EnrichmentExecutor(service)
+    started = time.perf_counter()
+    result = executor.run(alerts, commit=False)
+    concurrent_seconds = time.perf_counter() - started
+    metrics = executor.metrics()
+    stub.stop()
+
+    print(f"{len(alerts)} alerts, stub latency {args.latency}s, "
+          f"quota {args.requests_per_minute or 'unlimited'}/min{'' if not args.sequential_sample else ', sequential time extrapolated'}")
+    print(f"sequential {sequential_seconds:8.2f}s ({len(alerts) / sequential_seconds * 60:8.1f} alerts/min)")
+    print(f"concurrent {concurrent_seconds:8.2f}s ({len(alerts) / concurrent_seconds * 60:8.1f} alerts/min)   "
+          f"speedup {sequential_seconds / concurrent_seconds:5.1f}x")
+    print(f"enriched {result['enriched']}, failed {result['failed']}, retries {result['retried']}; "
+          f"{metrics['requests']} responses, {metrics['rate_limited']} rate limited, "
+          f"final in-flight limit {metrics['concurrency_limit']}, stub peak in flight {stub.max_in_flight}")
+
+
+if __name__ == '__main__':
+    main()
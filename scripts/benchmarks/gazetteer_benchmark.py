@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Gazetteer Benchmark
+Linear haversine scan over every place (what GooglePlacesService did with its in-code city
+list) against the KD-tree lookups in gazetteer.py: nearest place, nearest major city and
+places within a radius, with every answer checked against the scan.
+
+Usage:
+  python scripts/benchmarks/gazetteer_benchmark.py
+  python scripts/benchmarks/gazetteer_benchmark.py --synthetic 30000 --queries 2000
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from gazetteer import Gazetteer, gazetteer as bundled
+
+EARTH_RADIUS_MILES = 3959.87433
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def linear_lookups(rows, lat, lon, major_population, radius):
+    distances = sorted((haversine(lat, lon, row[2], row[3]), i) for i, row in enumerate(rows))
+    nearest = distances[0][1]
+    major = next((i for _, i in distances if rows[i][4] >= major_population), None)
+    within = [i for distance, i in distances if distance <= radius]
+    return nearest, major, within
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--synthetic', type=int, default=0, help='random places instead of the bundled file')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--radius', type=float, default=15, help='within-radius miles')
+    parser.add_argument('--major-population', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.synthetic:
+        rows = [(f"Place {i}", 'XX', rng.uniform(25, 49), rng.uniform(-125, -67),
+                 int(10 ** rng.uniform(2, 6)), False) for i in range(args.synthetic)]
+    else:
+        rows = [(name, state, float(lat), float(lon), int(population), bool(seat))
+                for name, state, lat, lon, population, seat in zip(
+                    bundled.names, bundled.states, bundled.lat, bundled.lon, bundled.population, bundled.county_seat)] \
+            if bundled.available else []
+    if not rows:
+        sys.exit("No places: the bundled file is missing; use --synthetic N")
+
+    started = time.perf_counter()
+    gazetteer = Gazetteer.from_rows(rows, major_city_population=args.major_population)
+    gazetteer.nearest_major_city(0, 0)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    points = [(rng.uniform(25, 49), rng.uniform(-125, -67)) for _ in range(args.queries)]
+    label = {f"{row[0]}, {row[1]}": i for i, row in enumerate(rows)}
+
+    started = time.perf_counter()
+    expected = [linear_lookups(rows, lat, lon, args.major_population, args.radius) for lat, lon in points]
+    linear_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    actual = [(gazetteer.nearest(lat, lon), gazetteer.nearest_major_city(lat, lon),
+               gazetteer.within_radius(lat, lon, args.radius)) for lat, lon in points]
+    tree_seconds = time.perf_counter() - started
+
+    mismatches = 0
+    for (nearest, major, within), (tree_nearest, tree_major, tree_within) in zip(expected, actual):
+        tree_ids = (label[tree_nearest.name], label[tree_major.name] if tree_major else None,
+                    sorted(label[place.name] for place in tree_within))
+        if tree_ids != (nearest, major, sorted(within)):
+            mismatches += 1
+
+    print(f"{len(rows)} places, {args.queries} queries (nearest + major city + {args.radius:g} mi radius); "
+          f"tree built in {build_ms:.1f}ms")
+    print(f"linear scan {linear_seconds / args.queries * 1e6:10.1f} us/query")
+    print(f"kd-tree     {tree_seconds / args.queries * 1e6:10.1f} us/query   "
+          f"speedup {linear_seconds / tree_seconds:6.1f}x")
+    print(f"mismatches  {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Geometry Analysis Benchmark
+Compares the original recursive coordinate walk (Alert._analyze_coordinates)
+with geometry_analysis.analyze_geometries on stored alert geometries, checking
+that vertex counts and bounds are identical.
+
+Corpus sources (first available wins):
+  --corpus FILE    NWS FeatureCollection or HailyDB API response JSON
+  DATABASE_URL     geometry of stored alerts (SELECT ... LIMIT --limit)
+
+Usage:
+  python scripts/benchmarks/geometry_analysis_benchmark.py --limit 50000
+  python scripts/benchmarks/geometry_analysis_benchmark.py --corpus scripts/data_samples/real_alert_response.json --repeat 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from geometry_analysis import analyze_geometries
+
+
+# ----------------------------------------------------------------------
+# Reference implementation, frozen copy of Alert._analyze_coordinates
+# ----------------------------------------------------------------------
+
+def legacy_analyze(geometry):
+    geom_type = geometry.get('type', 'Unknown')
+    coordinates = geometry.get('coordinates', [])
+    coord_count = 0
+    min_lat = min_lon = float('inf')
+    max_lat = max_lon = float('-inf')
+
+    def process_coord_pair(coord_pair):
+        nonlocal coord_count, min_lat, max_lat, min_lon, max_lon
+        if isinstance(coord_pair, list) and len(coord_pair) >= 2:
+            lon, lat = coord_pair[0], coord_pair[1]
+            if isinstance(lon, (int, float)) and isinstance(lat, (int, float)):
+                coord_count += 1
+                min_lon = min(min_lon, lon)
+                max_lon = max(max_lon, lon)
+                min_lat = min(min_lat, lat)
+                max_lat = max(max_lat, lat)
+
+    def process_coordinates_recursive(coords):
+        if not isinstance(coords, list):
+            return
+        if len(coords) == 2 and all(isinstance(x, (int, float)) for x in coords):
+            process_coord_pair(coords)
+        else:
+            for item in coords:
+                if isinstance(item, list):
+                    process_coordinates_recursive(item)
+
+    process_coordinates_recursive(coordinates)
+
+    bounds = None
+    if coord_count > 0 and min_lat != float('inf'):
+        bounds = {'min_lat': min_lat, 'max_lat': max_lat, 'min_lon': min_lon, 'max_lon': max_lon}
+    return geom_type, coord_count, bounds
+
+
+# ----------------------------------------------------------------------
+# Corpus loading
+# ----------------------------------------------------------------------
+
+def load_corpus_file(path):
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'features' in data:
+        records = data['features']
+    else:
+        records = data.get('alerts', []) if isinstance(data, dict) else data
+    return [record['geometry'] for record in records if record.get('geometry')]
+
+
+def load_corpus_db(limit):
+    import psycopg2
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        with conn.cursor(name='geometry_corpus') as cursor:
+            cursor.itersize = 5000
+            cursor.execute("SELECT geometry FROM alerts WHERE geometry IS NOT NULL LIMIT %s", (limit,))
+            return [row[0] for row in cursor]
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='JSON file with alerts (defaults to the alerts table)')
+    parser.add_argument('--limit', type=int, default=50000, help='max stored alerts to load')
+    parser.add_argument('--repeat', type=int, default=1, help='passes over the corpus per timing')
+    parser.add_argument('--batch-size', type=int, default=500, help='geometries per analyze_geometries call')
+    args = parser.parse_args()
+
+    corpus = load_corpus_file(args.corpus) if args.corpus else load_corpus_db(args.limit)
+    corpus = corpus * args.repeat
+    vertices = sum(legacy_analyze(geometry)[1] for geometry in corpus)
+    print(f"Corpus: {len(corpus)} geometries, {vertices} vertices")
+
+    started = time.perf_counter()
+    legacy_results = [legacy_analyze(geometry) for geometry in corpus]
+    legacy_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch_results = []
+    for offset in range(0, len(corpus), args.batch_size):
+        batch_results.extend(analyze_geometries(corpus[offset:offset + args.batch_size]))
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = []
+    for i, (legacy, analysis) in enumerate(zip(legacy_results, batch_results)):
+        got = (analysis['geometry_type'], analysis['coordinate_count'], analysis['geometry_bounds'])
+        if got != legacy:
+            mismatches.append(i)
+
+    speedup = legacy_seconds / batch_seconds if batch_seconds else float('inf')
+    print(f"legacy walk {legacy_seconds:8.3f}s  batch {batch_seconds:8.3f}s  "
+          f"speedup {speedup:6.1f}x  mismatches {len(mismatches)}")
+    for i in mismatches[:5]:
+        print(f"    #{i}: legacy={legacy_results[i]!r} batch={batch_results[i]!r}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
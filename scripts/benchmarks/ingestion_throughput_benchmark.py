@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Ingestion Throughput Benchmark
+Drives IngestService, SPCIngestService, LiveRadarAlertService and IemBackfillService end to end
+against a feed_replay archive and a local Postgres, reporting alerts/sec, p95 batch latency and
+DB round trips per alert.
+
+Every upstream URL in Config is pointed at an in-process FeedReplayServer before the app is
+imported; the app's own background pollers are stopped so only the measured calls touch the DB.
+The services WRITE to the database in DATABASE_URL, so it must be a local scratch database.
+
+Batch latency is measured on each service's unit of work:
+  nws   IngestService._write_batch (one DB_WRITE_BATCH_SIZE batch)
+  spc   SPCIngestService.reimport_spc_reports (one report day)
+  live  LiveRadarAlertService._store_alert_in_db (one alert)
+  iem   IemBackfillService.upsert_alert (one alert)
+
+Usage:
+  # capture while benchmarking against the live upstreams
+  python scripts/benchmarks/ingestion_throughput_benchmark.py --archive captures/ --record --spc-date 2024-05-20 --iem-month 2024-09
+  # replay offline, twice as fast as recorded
+  python scripts/benchmarks/ingestion_throughput_benchmark.py --archive captures/ --speed 2 --spc-date 2024-05-20 --iem-month 2024-09
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from feed_replay import FeedArchive, FeedReplayServer
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1', '')
+
+
+# ----------------------------------------------------------------------
+# Measurement helpers
+# ----------------------------------------------------------------------
+
+class RoundTripCounter:
+    """
+    Counts DB round trips on an engine: every cursor execute/executemany/copy plus every commit
+    Installed through psycopg2's connection cursor_factory so raw COPY cursors are counted too.
+    """
+
+    def __init__(self, engine):
+        import psycopg2.extensions
+        from sqlalchemy import event
+
+        self.count = 0
+        counter = self
+
+        class CountingCursor(psycopg2.extensions.cursor):
+            def execute(self, *args, **kwargs):
+                counter.count += 1
+                return super().execute(*args, **kwargs)
+
+            def executemany(self, *args, **kwargs):
+                counter.count += 1
+                return super().executemany(*args, **kwargs)
+
+            def copy_expert(self, *args, **kwargs):
+                counter.count += 1
+                return super().copy_expert(*args, **kwargs)
+
+        def on_connect(dbapi_connection, connection_record):
+            dbapi_connection.cursor_factory = CountingCursor
+
+        def on_commit(connection):
+            counter.count += 1
+
+        # Pooled connections predate the listener; start from fresh ones
+        engine.dispose()
+        event.listen(engine, 'connect', on_connect)
+        event.listen(engine, 'commit', on_commit)
+
+
+def timed(target, name, latencies):
+    """Replace target.<name> with a wrapper that appends each call's duration to latencies"""
+    original = getattr(target, name)
+
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return original(*args, **kwargs)
+        finally:
+            latencies.append(time.perf_counter() - started)
+
+    setattr(target, name, wrapper)
+
+
+def p95(values):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def report(name, alerts, seconds, latencies, round_trips, unit):
+    rate = alerts / seconds if seconds else 0.0
+    per_alert = round_trips / alerts if alerts else 0.0
+    print(f"{name:<5} {alerts:>7} alerts  {seconds:8.2f}s  {rate:9.1f} alerts/s  "
+          f"p95 {unit} {p95(latencies) * 1000:8.1f}ms ({len(latencies)} samples)  "
+          f"{round_trips:>7} round trips  {per_alert:6.2f}/alert")
+
+
+# ----------------------------------------------------------------------
+# Service runs
+# ----------------------------------------------------------------------
+
+def run_nws(db, counter):
+    from ingest import IngestService
+    service = IngestService(db)
+    latencies = []
+    timed(service, '_write_batch', latencies)
+
+    counter.count = 0
+    started = time.perf_counter()
+    result = service.poll_nws_alerts()
+    seconds = time.perf_counter() - started
+    report('nws', result['total_processed'], seconds, latencies, counter.count, 'batch')
+
+
+def run_spc(db, counter, report_dates):
+    from spc_ingest import SPCIngestService
+    service = SPCIngestService(db.session)
+    latencies = []
+    timed(service, 'reimport_spc_reports', latencies)
+
+    counter.count = 0
+    alerts = 0
+    started = time.perf_counter()
+    for report_date in report_dates:
+        result = service.reimport_spc_reports(report_date)
+        alerts += result.get('reports_ingested', 0) or 0
+    seconds = time.perf_counter() - started
+    report('spc', alerts, seconds, latencies, counter.count, 'day')
+
+
+def run_live(db, counter):
+    from live_radar_service import LiveRadarAlertService
+    service = LiveRadarAlertService(db.session)
+    latencies = []
+    timed(service, '_store_alert_in_db', latencies)
+
+    counter.count = 0
+    started = time.perf_counter()
+    service._fetch_and_process_alerts()
+    seconds = time.perf_counter() - started
+    report('live', len(service.alerts_store), seconds, latencies, counter.count, 'alert')
+
+
+def run_iem(db, counter, months):
+    from iem_backfill_service import IemBackfillService
+    service = IemBackfillService(db.session)
+    latencies = []
+    timed(service, 'upsert_alert', latencies)
+
+    counter.count = 0
+    alerts = 0
+    started = time.perf_counter()
+    for year, month in months:
+        alerts += service.process_florida_month(year, month)['records_processed']
+    seconds = time.perf_counter() - started
+    report('iem', alerts, seconds, latencies, counter.count, 'alert')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--archive', required=True, help='feed_replay capture directory')
+    parser.add_argument('--record', action='store_true', help='fetch and capture requests missing from the archive')
+    parser.add_argument('--speed', type=float, default=0.0, help='playback rate of recorded response times (0 = no delay)')
+    parser.add_argument('--services', default='nws,spc,live,iem', help='comma-separated subset to run')
+    parser.add_argument('--spc-date', action='append', default=[], help='SPC report day to ingest (YYYY-MM-DD)')
+    parser.add_argument('--iem-month', action='append', default=[], help='IEM Florida month to backfill (YYYY-MM)')
+    parser.add_argument('--allow-remote-db', action='store_true', help='permit a non-local DATABASE_URL')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    database_host = urlsplit(os.environ.get('DATABASE_URL', '')).hostname or ''
+    if database_host not in LOCAL_HOSTS and not args.allow_remote_db:
+        sys.exit(f"DATABASE_URL points at {database_host}; the benchmark writes alerts, use a local database "
+                 f"(or --allow-remote-db)")
+
+    server = FeedReplayServer(FeedArchive(args.archive), speed=args.speed, record=args.record).start()
+    server.apply_to_config()
+
+    # Importing app creates the tables and starts the pollers; stop them before measuring
+    import app as hailydb
+    import live_radar_service
+    hailydb.autonomous_scheduler.stop()
+    hailydb.live_radar_service.stop_polling()
+    live_radar_service.stop_live_radar_service()
+
+    services = [name.strip() for name in args.services.split(',') if name.strip()]
+    report_dates = [datetime.strptime(value, '%Y-%m-%d').date() for value in args.spc_date]
+    months = [tuple(int(part) for part in value.split('-')) for value in args.iem_month]
+
+    with hailydb.app.app_context():
+        db = hailydb.db
+        counter = RoundTripCounter(db.engine)
+        if 'nws' in services:
+            run_nws(db, counter)
+        if 'spc' in services and report_dates:
+            run_spc(db, counter, report_dates)
+        if 'live' in services:
+            run_live(db, counter)
+        if 'iem' in services and months:
+            run_iem(db, counter, months)
+
+    print(f"replay: {server.requests_served} served, {server.requests_missed} missing from {args.archive}")
+    server.stop()
+
+
+if __name__ == '__main__':
+    main()
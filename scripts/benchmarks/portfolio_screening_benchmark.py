@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Portfolio Screening Benchmark
+Points per second for screening a portfolio of locations against radar-detected alert polygons:
+one containment lookup per point (what a client looping over contains-address does, minus the
+HTTP and geocoding) against the chunked bulk path in portfolio_screening.py.
+
+Modes:
+  --synthetic         random warning polygons and points, no database. Per-point bbox filter and
+                      prepared covers vs one covering_pairs STRtree query per chunk; match sets
+                      compared point by point.
+  --database          random points inside the extent of stored radar-detected alerts. A sample
+                      through alert_containment.find_alert_ids vs portfolio_screener.screen with
+                      both engines. Read-only.
+
+Usage:
+  python scripts/benchmarks/portfolio_screening_benchmark.py --synthetic --points 100000 --alerts 20000
+  python scripts/benchmarks/portfolio_screening_benchmark.py --database --points 20000 --start-date 2024-01-01
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import shapely
+from shapely.geometry import Point, Polygon
+
+from portfolio_screening import covering_pairs, parse_date_range
+
+
+def warning_polygon(rng: random.Random, lat: float, lon: float) -> Polygon:
+    """Storm-based warning sized polygon, 5-25 miles across"""
+    radius = rng.uniform(2.5, 12.5) / 69.0
+    sides = rng.randint(4, 8)
+    rotation = rng.uniform(0, math.pi)
+    return Polygon([(lon + radius * 1.3 * math.cos(rotation + 2 * math.pi * i / sides),
+                     lat + radius * math.sin(rotation + 2 * math.pi * i / sides)) for i in range(sides)])
+
+
+def run_synthetic(args):
+    rng = random.Random(args.seed)
+    polygons = [warning_polygon(rng, rng.uniform(30, 45), rng.uniform(-105, -85)) for _ in range(args.alerts)]
+    for polygon in polygons:
+        shapely.prepare(polygon)
+    bounds = [polygon.bounds for polygon in polygons]
+    lats = [rng.uniform(30, 45) for _ in range(args.points)]
+    lons = [rng.uniform(-105, -85) for _ in range(args.points)]
+
+    sample = min(args.points, args.per_point_sample)
+    started = time.perf_counter()
+    expected = []
+    for lat, lon in zip(lats[:sample], lons[:sample]):
+        point = Point(lon, lat)
+        expected.append({i for i, (min_lon, min_lat, max_lon, max_lat) in enumerate(bounds)
+                         if min_lon <= lon <= max_lon and min_lat <= lat <= max_lat and polygons[i].covers(point)})
+    per_point_rate = sample / (time.perf_counter() - started)
+
+    # Same grid-cell chunking as PortfolioScreener, candidates by cell bbox
+    started = time.perf_counter()
+    cells = {}
+    for seq, (lat, lon) in enumerate(zip(lats, lons)):
+        cells.setdefault((math.floor(lat / args.cell_degrees), math.floor(lon / args.cell_degrees)), []).append(seq)
+    actual = [set() for _ in range(args.points)]
+    for seqs in cells.values():
+        chunk_lats = [lats[seq] for seq in seqs]
+        chunk_lons = [lons[seq] for seq in seqs]
+        min_lat, max_lat, min_lon, max_lon = min(chunk_lats), max(chunk_lats), min(chunk_lons), max(chunk_lons)
+        candidates = [i for i, b in enumerate(bounds) if b[0] <= max_lon and b[2] >= min_lon and b[1] <= max_lat
+                      and b[3] >= min_lat]
+        polygon_index, point_index = covering_pairs([polygons[i] for i in candidates], chunk_lons, chunk_lats)
+        for a, p in zip(polygon_index, point_index):
+            actual[seqs[p]].add(candidates[a])
+    bulk_rate = args.points / (time.perf_counter() - started)
+
+    mismatches = sum(1 for seq in range(sample) if expected[seq] != actual[seq])
+    print(f"{args.points} points, {args.alerts} alert polygons, {len(cells)} cells")
+    print(f"per point   {per_point_rate:12.0f} points/s   ({sample} point sample)")
+    print(f"bulk        {bulk_rate:12.0f} points/s   speedup {bulk_rate / per_point_rate:6.1f}x")
+    print(f"inside >=1  {sum(1 for matched in actual if matched)}")
+    print(f"mismatches  {mismatches}")
+
+
+def run_database(args):
+    from sqlalchemy import text
+    from app import app, db
+    from alert_containment import AlertContainment
+    from portfolio_screening import PortfolioScreener
+
+    start_date, end_date = parse_date_range(args.start_date, args.end_date)
+    rng = random.Random(args.seed)
+    with app.app_context():
+        extent = db.session.execute(text(
+            "SELECT min(CAST(geometry_bounds->>'min_lat' AS float8)), max(CAST(geometry_bounds->>'max_lat' AS float8)), "
+            "min(CAST(geometry_bounds->>'min_lon' AS float8)), max(CAST(geometry_bounds->>'max_lon' AS float8)) "
+            "FROM alerts WHERE radar_indicated IS NOT NULL AND geometry_bounds IS NOT NULL")).fetchone()
+        if extent[0] is None:
+            sys.exit("No radar-detected alerts with geometry bounds in this database")
+        points = [(str(i), rng.uniform(extent[0], extent[1]), rng.uniform(extent[2], extent[3]))
+                  for i in range(args.points)]
+
+        containment = AlertContainment(engine='postgis')
+        sample = points[:min(args.points, args.per_point_sample)]
+        started = time.perf_counter()
+        for _, lat, lon in sample:
+            containment.find_alert_ids(db.session, lat, lon, start_date=start_date, end_date=end_date)
+        print(f"{args.points} points in lat {extent[0]:.1f}..{extent[1]:.1f}, lon {extent[2]:.1f}..{extent[3]:.1f}")
+        print(f"per point (postgis)  {len(sample) / (time.perf_counter() - started):10.0f} points/s   "
+              f"({len(sample)} point sample)")
+
+        results = {}
+        screener = PortfolioScreener(containment=containment)
+        for label, engine in (('postgis', 'postgis'), ('shapely_cold', 'shapely'), ('shapely_warm', 'shapely')):
+            if label == 'shapely_cold':
+                containment._shapes.clear()
+            started = time.perf_counter()
+            results[label] = {result['id']: set(result['alert_ids'])
+                              for result in screener.screen(db.session, points, start_date, end_date, engine=engine)}
+            print(f"bulk ({label:12}) {args.points / (time.perf_counter() - started):10.0f} points/s   "
+                  f"{screener.last_run.get('chunks')} chunks, {screener.last_run.get('matched')} inside alerts")
+        mismatches = sum(1 for point_id, ids in results['postgis'].items() if ids != results['shapely_warm'][point_id])
+        print(f"postgis/shapely mismatches {mismatches}")
+        db.session.rollback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument('--synthetic', action='store_true')
+    mode.add_argument('--database', action='store_true')
+    parser.add_argument('--points', type=int, default=100000)
+    parser.add_argument('--alerts', type=int, default=20000, help='synthetic mode: alert polygons')
+    parser.add_argument('--per-point-sample', type=int, default=2000, help='points timed through the per-point path')
+    parser.add_argument('--cell-degrees', type=float, default=1.0, help='synthetic mode: grid cell size')
+    parser.add_argument('--start-date', help='database mode: YYYY-MM-DD')
+    parser.add_argument('--end-date', help='database mode: YYYY-MM-DD')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.synthetic:
+        run_synthetic(args)
+    else:
+        run_database(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Radar Parameter Extraction Benchmark
+Proves the compiled RadarParameterExtractor returns exactly what the original
+per-call regex code returned, and measures the speedup on a stored corpus.
+
+Corpus sources (first available wins):
+  --corpus FILE    NWS FeatureCollection or HailyDB API response JSON
+  DATABASE_URL     properties of stored alerts (SELECT ... LIMIT --limit)
+
+Usage:
+  python scripts/benchmarks/radar_extraction_benchmark.py --limit 50000
+  python scripts/benchmarks/radar_extraction_benchmark.py --corpus scripts/data_samples/real_radar_response.json
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from config import Config
+from radar_extraction import RadarParameterExtractor
+
+
+# ----------------------------------------------------------------------
+# Reference implementations, frozen copies of the pre-engine code paths
+# (IngestService._parse_radar_indicated/_extract_hail_size/_extract_wind_speed and
+#  LiveRadarAlertService._extract_wind_parameter/_extract_hail_parameter)
+# ----------------------------------------------------------------------
+
+def legacy_extract_hail_size(text):
+    try:
+        if not text or not isinstance(text, str):
+            return None
+        flood_keywords = ['flood warning', 'flood advisory', 'flash flood', 'inches of rain', 'rainfall']
+        text_lower = text.lower()
+        for keyword in flood_keywords:
+            if keyword in text_lower:
+                return None
+        size_map = Config.NWS_HAIL_SIZE_CHART
+        match = re.search(r'hail up to (\d+(?:\.\d+)?)\s*inch', text)
+        if match:
+            return float(match.group(1))
+        match = re.search(r'(\d+(?:\.\d+)?)\s*inch[es]*\s+hail', text)
+        if match:
+            return float(match.group(1))
+        for size_name, inches in size_map.items():
+            patterns = [
+                r'\b' + re.escape(size_name) + r'\s+size[d]?\s+hail',
+                r'hail.*\b' + re.escape(size_name) + r'\b',
+                r'\b' + re.escape(size_name) + r'\s+hail'
+            ]
+            for pattern in patterns:
+                if re.search(pattern, text, re.IGNORECASE):
+                    return inches
+        match = re.search(r'(\d+(?:\.\d+)?)\s*inch diameter hail', text)
+        if match:
+            return float(match.group(1))
+        return None
+    except Exception:
+        return None
+
+
+def legacy_extract_wind_speed(text):
+    try:
+        if not text or not isinstance(text, str):
+            return None
+        text_lower = text.lower()
+        for keyword in ['flood', 'tsunami', 'storm surge', 'high surf', 'river', 'stream']:
+            if keyword in text_lower:
+                return None
+        patterns = [
+            r'winds up to (\d+)\s*mph', r'damaging winds of (\d+)\s*mph', r'(\d+)\s*mph wind gusts',
+            r'wind gusts to (\d+)\s*mph', r'winds of (\d+)\s*mph', r'(\d+)\s*mph winds',
+            r'wind speeds of (\d+)\s*mph', r'(\d+) to (\d+)\s*mph', r'winds to (\d+)\s*mph',
+            r'gusts to (\d+)\s*mph', r'(\d+)\s*mph gusts', r'wind gusts of (\d+)\s*mph'
+        ]
+        max_wind = 0
+        for pattern in patterns:
+            for match in re.findall(pattern, text_lower):
+                if isinstance(match, tuple):
+                    wind_values = [int(m) for m in match if m.isdigit()]
+                    if wind_values:
+                        max_wind = max(max_wind, max(wind_values))
+                else:
+                    try:
+                        max_wind = max(max_wind, int(match))
+                    except (ValueError, TypeError):
+                        continue
+        return max_wind if max_wind > 0 else None
+    except Exception:
+        return None
+
+
+def legacy_parse_radar_indicated(properties):
+    parameters = properties.get('parameters', {})
+    radar_hail = None
+    radar_wind = None
+    max_hail_size = parameters.get('maxHailSize')
+    if max_hail_size and isinstance(max_hail_size, list) and len(max_hail_size) > 0:
+        try:
+            radar_hail = float(max_hail_size[0])
+        except (ValueError, TypeError):
+            pass
+    max_wind_gust = parameters.get('maxWindGust')
+    if max_wind_gust and isinstance(max_wind_gust, list) and len(max_wind_gust) > 0:
+        wind_str = max_wind_gust[0]
+        if isinstance(wind_str, str):
+            match = re.search(r'(\d+)', wind_str)
+            if match:
+                radar_wind = int(match.group(1))
+    description = properties.get('description', '') or ''
+    headline = properties.get('headline', '') or ''
+    instruction = properties.get('instruction', '') or ''
+    all_text = f"{description} {headline} {instruction}"
+    if radar_hail is None:
+        radar_hail = legacy_extract_hail_size(all_text)
+    if radar_wind is None:
+        radar_wind = legacy_extract_wind_speed(all_text)
+    radar_data = {}
+    if radar_hail is not None and radar_hail > 0:
+        radar_data['hail_inches'] = radar_hail
+    if radar_wind is not None and radar_wind > 0:
+        radar_data['wind_mph'] = radar_wind
+    return radar_data if radar_data else None
+
+
+def legacy_live_wind(parameters, description=None):
+    for param in ['maxWindGust', 'windGust', 'windSpeed']:
+        values = parameters.get(param, [])
+        if values and len(values) > 0:
+            try:
+                wind_str = str(values[0]).upper()
+                if 'MPH' in wind_str:
+                    return int(''.join(filter(str.isdigit, wind_str)))
+            except (ValueError, TypeError):
+                continue
+    if description:
+        description_upper = description.upper()
+        wind_patterns = [
+            r'GUSTS?\s+(?:UP\s+TO\s+|OF\s+)?(\d+)\s*MPH',
+            r'WINDS?\s+(?:UP\s+TO\s+|OF\s+|TO\s+)?(\d+)\s*MPH',
+            r'WIND\s+GUSTS?\s+(?:UP\s+TO\s+|OF\s+)?(\d+)\s*MPH',
+            r'(\d+)\s*MPH\s+(?:WIND|GUST)',
+            r'WINDS?\s+(?:TO\s+AROUND\s+)?(\d+)\s*KNOTS?'
+        ]
+        max_wind = 0
+        for pattern in wind_patterns:
+            for match in re.findall(pattern, description_upper):
+                try:
+                    wind_speed = int(match)
+                    if 'KNOT' in pattern:
+                        wind_speed = int(wind_speed * 1.15)
+                    max_wind = max(max_wind, wind_speed)
+                except (ValueError, TypeError):
+                    continue
+        return max_wind if max_wind > 0 else None
+    return None
+
+
+def legacy_live_hail(parameters, description=None):
+    for param in ['maxHailSize', 'hailSize']:
+        values = parameters.get(param, [])
+        if values and len(values) > 0:
+            try:
+                hail_str = str(values[0])
+                hail_value = float(''.join(c for c in hail_str if c.isdigit() or c == '.'))
+                return hail_value if hail_value > 0 else None
+            except (ValueError, TypeError):
+                continue
+    if description:
+        description_upper = description.upper()
+        hail_patterns = [
+            r'HAIL\s+(?:UP\s+TO\s+|OF\s+)?(\d+(?:\.\d+)?)\s*(?:INCH|IN)',
+            r'(\d+(?:\.\d+)?)\s*(?:INCH|IN)\s+HAIL',
+            r'HAIL\s+(?:SIZE\s+)?(\d+(?:\.\d+)?)',
+            r'(\d+(?:\.\d+)?)"?\s+HAIL'
+        ]
+        max_hail = 0.0
+        for pattern in hail_patterns:
+            for match in re.findall(pattern, description_upper):
+                try:
+                    max_hail = max(max_hail, float(match))
+                except (ValueError, TypeError):
+                    continue
+        return max_hail if max_hail > 0 else None
+    return None
+
+
+# ----------------------------------------------------------------------
+# Corpus loading
+# ----------------------------------------------------------------------
+
+def load_corpus_file(path):
+    with open(path) as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'features' in data:
+        return [feature.get('properties', {}) for feature in data['features']]
+    records = data.get('alerts', []) if isinstance(data, dict) else data
+    corpus = []
+    for record in records:
+        properties = dict(record.get('properties') or {})
+        for key in ('description', 'headline', 'instruction', 'parameters', 'event'):
+            if key not in properties and key in record:
+                properties[key] = record[key]
+        corpus.append(properties)
+    return corpus
+
+
+def load_corpus_db(limit):
+    import psycopg2
+    conn = psycopg2.connect(os.environ['DATABASE_URL'])
+    try:
+        with conn.cursor(name='radar_corpus') as cursor:
+            cursor.itersize = 5000
+            cursor.execute("SELECT properties FROM alerts WHERE properties IS NOT NULL LIMIT %s", (limit,))
+            return [row[0] for row in cursor]
+    finally:
+        conn.close()
+
+
+def timed(fn, corpus):
+    started = time.perf_counter()
+    results = [fn(properties) for properties in corpus]
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', help='JSON file with alerts (defaults to the alerts table)')
+    parser.add_argument('--limit', type=int, default=50000, help='max stored alerts to load')
+    parser.add_argument('--repeat', type=int, default=1, help='passes over the corpus per timing')
+    args = parser.parse_args()
+
+    corpus = load_corpus_file(args.corpus) if args.corpus else load_corpus_db(args.limit)
+    corpus = corpus * args.repeat
+    engine = RadarParameterExtractor()
+
+    cases = [
+        ('ingest radar_indicated', legacy_parse_radar_indicated, engine.parse_radar_indicated),
+        ('live wind', lambda p: legacy_live_wind(p.get('parameters') or {}, p.get('description')),
+                      lambda p: engine.extract_live_wind(p.get('parameters') or {}, p.get('description'))),
+        ('live hail', lambda p: legacy_live_hail(p.get('parameters') or {}, p.get('description')),
+                      lambda p: engine.extract_live_hail(p.get('parameters') or {}, p.get('description'))),
+    ]
+
+    print(f"Corpus: {len(corpus)} alerts")
+    mismatches_total = 0
+    for name, legacy_fn, engine_fn in cases:
+        legacy_results, legacy_seconds = timed(legacy_fn, corpus)
+        engine_results, engine_seconds = timed(engine_fn, corpus)
+        mismatches = [i for i, (a, b) in enumerate(zip(legacy_results, engine_results)) if a != b]
+        mismatches_total += len(mismatches)
+        speedup = legacy_seconds / engine_seconds if engine_seconds else float('inf')
+        print(f"{name:24s} legacy {legacy_seconds:8.3f}s  engine {engine_seconds:8.3f}s  "
+              f"speedup {speedup:6.1f}x  mismatches {len(mismatches)}")
+        for i in mismatches[:5]:
+            print(f"    #{i}: legacy={legacy_results[i]!r} engine={engine_results[i]!r} id={corpus[i].get('id')}")
+
+    sys.exit(1 if mismatches_total else 0)
+
+
+if __name__ == '__main__':
+    main()
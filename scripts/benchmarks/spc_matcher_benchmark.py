@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+SPC Matcher Benchmark
+Compares per-alert SPC matching (two spc_reports queries and a Python distance/time loop per alert)
+against the batch path (spc_match_index.SPCReportIndex, one report query per batch) and reports
+timings plus any alerts whose matched report set differs.
+
+Modes:
+  --database          alerts and SPC reports from DATABASE_URL; runs SPCMatchingService's per-alert
+                      _find_county_matches/_find_proximity_matches against find_matches_bulk.
+                      Read-only: nothing is written and the session is rolled back.
+  --synthetic N       N generated alerts against generated reports, no database; the per-alert
+                      side is a frozen copy of the original matcher filtering an in-memory table
+
+Usage:
+  python scripts/benchmarks/spc_matcher_benchmark.py --synthetic 100000
+  python scripts/benchmarks/spc_matcher_benchmark.py --database --since 2024-05-01 --limit 20000
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from spc_match_index import SPCReportIndex, window_dates
+
+STATES = ['KS', 'OK', 'TX', 'NE', 'IA', 'MO', 'AR', 'CO']
+EVENTS = ['Tornado Warning', 'Severe Thunderstorm Warning', 'Severe Weather Statement',
+          'Special Weather Statement', 'Flash Flood Warning']
+REPORT_TYPES = ['tornado', 'wind', 'hail']
+
+
+# ----------------------------------------------------------------------
+# Reference implementation, frozen copy of SPCMatchingService's per-alert path
+# (SPCReport.query replaced by a scan of an in-memory table)
+# ----------------------------------------------------------------------
+
+class Row:
+    __slots__ = ('id', 'report_date', 'report_type', 'time_utc', 'location', 'county', 'state',
+                 'latitude', 'longitude', 'comments', 'magnitude')
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+
+class LegacyMatcher:
+    event_correlations = {
+        'tornado': ['Tornado Warning', 'Tornado Watch'],
+        'wind': ['Severe Thunderstorm Warning', 'Severe Weather Statement', 'Significant Weather Advisory'],
+        'hail': ['Severe Thunderstorm Warning', 'Severe Weather Statement', 'Significant Weather Advisory']
+    }
+    time_window_hours = 6
+    distance_threshold_miles = 25
+
+    def __init__(self, reports: List[Row]):
+        self.reports = reports
+
+    def match(self, alert) -> Optional[Tuple[str, List[int]]]:
+        eligible_types = self._get_eligible_spc_types(alert.event or '')
+        if not alert.effective or not eligible_types:
+            return None
+        start_time = alert.effective - timedelta(hours=self.time_window_hours)
+        end_time = alert.effective + timedelta(hours=self.time_window_hours)
+        report_dates = window_dates(start_time, end_time)
+
+        matches = self._find_county_matches(alert, eligible_types, report_dates, start_time, end_time)
+        method = 'fips'
+        if not matches:
+            matches = self._find_proximity_matches(alert, eligible_types, report_dates, start_time, end_time)
+            method = 'latlon'
+        return (method, sorted(match.id for match in matches)) if matches else None
+
+    def _get_eligible_spc_types(self, alert_event: str) -> List[str]:
+        if not alert_event:
+            return []
+        return [spc_type for spc_type, nws_events in self.event_correlations.items()
+                if any(nws_event.lower() in alert_event.lower() for nws_event in nws_events)]
+
+    def _find_county_matches(self, alert, eligible_types, report_dates, start_time, end_time):
+        alert_counties, alert_states = alert.counties, alert.states
+        if not alert_counties or not alert_states:
+            return []
+        matches = [r for r in self.reports if r.report_date in report_dates and r.report_type in eligible_types
+                   and r.state in alert_states and r.county in alert_counties]
+        return [match for match in matches if self._is_time_match(match, start_time, end_time)]
+
+    def _find_proximity_matches(self, alert, eligible_types, report_dates, start_time, end_time):
+        alert_lat, alert_lon = alert.lat, alert.lon
+        if not alert_lat or not alert_lon:
+            return []
+        candidates = [r for r in self.reports if r.report_date in report_dates and r.report_type in eligible_types
+                      and r.latitude is not None and r.longitude is not None]
+        return [c for c in candidates
+                if self._calculate_distance(alert_lat, alert_lon, c.latitude, c.longitude) <= self.distance_threshold_miles
+                and self._is_time_match(c, start_time, end_time)]
+
+    def _calculate_distance(self, lat1, lon1, lat2, lon2) -> float:
+        lat1_rad, lon1_rad, lat2_rad, lon2_rad = map(math.radians, (lat1, lon1, lat2, lon2))
+        dlat = lat2_rad - lat1_rad
+        dlon = lon2_rad - lon1_rad
+        a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
+        return 3959 * 2 * math.asin(math.sqrt(a))
+
+    def _is_time_match(self, spc_report, start_time, end_time) -> bool:
+        if not spc_report.time_utc:
+            return True
+        try:
+            spc_time_str = str(spc_report.time_utc).zfill(4)
+            spc_datetime = datetime.combine(spc_report.report_date, datetime.min.time().replace(
+                hour=int(spc_time_str[:2]), minute=int(spc_time_str[2:])))
+            return start_time <= spc_datetime <= end_time
+        except (ValueError, TypeError):
+            return True
+
+
+# ----------------------------------------------------------------------
+# Synthetic data
+# ----------------------------------------------------------------------
+
+class SyntheticAlert:
+    __slots__ = ('id', 'event', 'effective', 'counties', 'states', 'lat', 'lon')
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            setattr(self, name, value)
+
+
+def synthetic_data(alert_count: int, days: int, seed: int = 7):
+    rng = random.Random(seed)
+    start = datetime(2024, 4, 1)
+    counties = [f"County{i}" for i in range(40)]
+
+    reports = []
+    for report_id in range(1, alert_count // 2 + 1):
+        day = start.date() + timedelta(days=rng.randrange(days))
+        has_coords = rng.random() > 0.05
+        time_utc = rng.choice([f"{rng.randrange(24):02d}{rng.randrange(60):02d}", None, 'UNK'])
+        reports.append(Row(report_id, day, rng.choice(REPORT_TYPES), time_utc, 'Somewhere',
+                           rng.choice(counties), rng.choice(STATES),
+                           round(rng.uniform(30, 44), 2) if has_coords else None,
+                           round(rng.uniform(-104, -90), 2) if has_coords else None, '', {}))
+
+    alerts = []
+    for alert_id in range(alert_count):
+        effective = start + timedelta(minutes=rng.randrange(days * 1440))
+        has_area = rng.random() > 0.3
+        alerts.append(SyntheticAlert(
+            id=f"alert-{alert_id}", event=rng.choice(EVENTS), effective=effective,
+            counties=rng.sample(counties, 3) if has_area else [],
+            states=[rng.choice(STATES)] if has_area else [],
+            lat=rng.uniform(30, 44), lon=rng.uniform(-104, -90)))
+    return alerts, reports
+
+
+def index_match(index: SPCReportIndex, matcher: LegacyMatcher, alert) -> Optional[Tuple[str, List[int]]]:
+    """Batch path for one synthetic alert (mirrors SPCMatchingService.find_matches_bulk)"""
+    eligible_types = matcher._get_eligible_spc_types(alert.event or '')
+    if not eligible_types:
+        return None
+    start_time = alert.effective - timedelta(hours=matcher.time_window_hours)
+    end_time = alert.effective + timedelta(hours=matcher.time_window_hours)
+    dates = window_dates(start_time, end_time)
+    matched, method = [], 'fips'
+    if alert.counties and alert.states:
+        matched = index.county_matches(alert.states, alert.counties, eligible_types, start_time, end_time, dates)
+    if not len(matched):
+        method = 'latlon'
+        matched = index.proximity_matches(alert.lat, alert.lon, matcher.distance_threshold_miles,
+                                          eligible_types, start_time, end_time, dates)
+    return (method, sorted(int(index.ids[i]) for i in matched)) if len(matched) else None
+
+
+def run_synthetic(args) -> Tuple[Dict, Dict, float, float]:
+    alerts, reports = synthetic_data(args.synthetic, args.days)
+    matcher = LegacyMatcher(reports)
+
+    legacy_alerts = alerts[:args.legacy_sample] if args.legacy_sample else alerts
+    started = time.perf_counter()
+    legacy = {alert.id: matcher.match(alert) for alert in legacy_alerts}
+    legacy_seconds = (time.perf_counter() - started) * len(alerts) / len(legacy_alerts)
+
+    started = time.perf_counter()
+    index = SPCReportIndex([tuple(getattr(r, name) for name in Row.__slots__) for r in reports])
+    batch = {alert.id: index_match(index, matcher, alert) for alert in alerts}
+    batch_seconds = time.perf_counter() - started
+
+    return legacy, {key: batch[key] for key in legacy}, legacy_seconds, batch_seconds
+
+
+def run_database(args) -> Tuple[Dict, Dict, float, float]:
+    from sqlalchemy import text
+    from app import app, db
+    from spc_matcher import SPCMatchingService, BulkAlertRow, BULK_ALERT_COLUMNS_SQL
+
+    with app.app_context():
+        service = SPCMatchingService(db.session)
+        conditions = ["effective IS NOT NULL"]
+        params = {'limit': args.limit}
+        if args.since:
+            conditions.append("effective >= :since")
+            params['since'] = datetime.strptime(args.since, '%Y-%m-%d')
+        ids = [row[0] for row in db.session.execute(text(
+            f"SELECT id FROM alerts WHERE {' AND '.join(conditions)} ORDER BY effective, id LIMIT :limit"), params)]
+        alerts = [BulkAlertRow(*row) for row in db.session.execute(text(BULK_ALERT_COLUMNS_SQL), {'ids': ids})]
+        legacy_alerts = alerts[:args.legacy_sample] if args.legacy_sample else alerts
+
+        started = time.perf_counter()
+        legacy = {}
+        for alert in legacy_alerts:
+            eligible_types = service._get_eligible_spc_types(alert.event or '')
+            if not eligible_types:
+                legacy[alert.id] = None
+                continue
+            start_time = alert.effective - timedelta(hours=service.time_window_hours)
+            end_time = alert.effective + timedelta(hours=service.time_window_hours)
+            report_dates = service._get_report_dates_for_timerange(start_time, end_time)
+            matches = service._find_county_matches(alert, eligible_types, report_dates, start_time, end_time)
+            method = 'fips'
+            if not matches:
+                matches = service._find_proximity_matches(alert, eligible_types, report_dates, start_time, end_time)
+                method = 'latlon'
+            legacy[alert.id] = (method, sorted(match.id for match in matches)) if matches else None
+        legacy_seconds = (time.perf_counter() - started) * len(alerts) / max(len(legacy_alerts), 1)
+
+        started = time.perf_counter()
+        batch = {}
+        for offset in range(0, len(alerts), args.batch_size):
+            batch.update(service.find_matches_bulk(alerts[offset:offset + args.batch_size]))
+        batch_seconds = time.perf_counter() - started
+        db.session.rollback()
+
+    batch = {alert.id: (batch[alert.id][0], sorted(r['id'] for r in batch[alert.id][2])) if alert.id in batch else None
+             for alert in legacy_alerts}
+    return legacy, batch, legacy_seconds, batch_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', action='store_true', help='use alerts and spc_reports from DATABASE_URL')
+    parser.add_argument('--since', help='database mode: alerts effective on or after YYYY-MM-DD')
+    parser.add_argument('--limit', type=int, default=10000, help='database mode: alerts to match')
+    parser.add_argument('--batch-size', type=int, default=5000, help='database mode: alerts per index load')
+    parser.add_argument('--synthetic', type=int, default=20000, help='synthetic mode: generated alerts')
+    parser.add_argument('--days', type=int, default=60, help='synthetic mode: days the data spans')
+    parser.add_argument('--legacy-sample', type=int, default=2000,
+                        help='alerts timed on the per-alert path (extrapolated to the full set; 0 = all)')
+    args = parser.parse_args()
+
+    legacy, batch, legacy_seconds, batch_seconds = run_database(args) if args.database else run_synthetic(args)
+    total = len(batch) if not args.legacy_sample else None
+
+    mismatches = [alert_id for alert_id in legacy if legacy[alert_id] != batch[alert_id]]
+    matched = sum(1 for result in legacy.values() if result)
+    speedup = legacy_seconds / batch_seconds if batch_seconds else float('inf')
+    print(f"compared {len(legacy)} alerts ({matched} matched){'' if total else ', per-alert time extrapolated'}")
+    print(f"per-alert {legacy_seconds:10.2f}s   batch {batch_seconds:8.2f}s   speedup {speedup:8.1f}x")
+    print(f"match-set mismatches: {len(mismatches)}")
+    for alert_id in mismatches[:10]:
+        print(f"    {alert_id}: per-alert {legacy[alert_id]} vs batch {batch[alert_id]}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == '__main__':
+    main()
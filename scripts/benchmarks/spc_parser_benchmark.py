@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+SPC CSV Parser Benchmark
+Compares the original multi-strategy parser (SPCIngestService._parse_spc_csv with its backward
+header scan) against spc_csv_parser.SPCCSVParser on large report days, and checks that both
+report counts match SPCVerificationService._count_reports_in_csv.
+
+Corpus sources (all given are used):
+  --csv FILE          local *_rpts_filtered.csv files
+  --archive DIR       every SPC CSV captured by feed_replay.py
+  --source-archive DIR  every SPC CSV in a source_archive.py directory (read offline)
+  --synthetic N       generated day with N reports per section (default 500 when nothing else is given)
+
+Usage:
+  python scripts/benchmarks/spc_parser_benchmark.py --archive captures/
+  python scripts/benchmarks/spc_parser_benchmark.py --synthetic 2000 --repeat 3
+"""
+
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import time
+from datetime import date
+from typing import Dict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from spc_csv_parser import SPCCSVParser
+
+logger = logging.getLogger('legacy_spc_parser')
+
+
+# ----------------------------------------------------------------------
+# Reference implementation, frozen copy of SPCIngestService's parser
+# ----------------------------------------------------------------------
+
+class LegacySPCParser:
+    def _parse_spc_csv(self, csv_content: str, report_date: date) -> Dict:
+        """
+        100% Perfect SPC CSV parser - guarantees every data row is captured
+        """
+        lines = csv_content.strip().split('\n')
+        
+        # Extract ALL data lines (lines starting with 4-digit time)
+        data_lines = []
+        for i, line in enumerate(lines):
+            line = line.strip()
+            if line and len(line) >= 4 and line[:4].isdigit() and not line.startswith('Time,'):
+                data_lines.append((i+1, line))
+        
+        logger.info(f"Found {len(data_lines)} data lines to parse")
+        
+        reports = []
+        failed_lines = []
+        tornado_count = wind_count = hail_count = 0
+        
+        for line_num, line in data_lines:
+            # Detect section type by scanning backwards for headers
+            section_type = self._detect_section_type(line, lines, line_num-1)
+            
+            # Multi-strategy parsing - guaranteed success
+            report = None
+            
+            # Strategy 1: Standard parsing
+            try:
+                report = self._parse_perfect_standard(line, section_type, report_date)
+            except Exception as e:
+                logger.debug(f"Standard parser failed line {line_num}: {e}")
+            
+            # Strategy 2: Force split parsing  
+            if not report:
+                try:
+                    report = self._parse_perfect_force_split(line, section_type, report_date)
+                except Exception as e:
+                    logger.debug(f"Force split parser failed line {line_num}: {e}")
+            
+            # Strategy 3: Emergency minimal parsing - always succeeds
+            if not report:
+                report = self._parse_perfect_emergency(line, section_type, report_date, line_num)
+                logger.warning(f"Emergency parser used for line {line_num}")
+            
+            # Count by section
+            if report:
+                reports.append(report)
+                if section_type == 'tornado':
+                    tornado_count += 1
+                elif section_type == 'wind':
+                    wind_count += 1
+                elif section_type == 'hail':
+                    hail_count += 1
+            else:
+                failed_lines.append((line_num, line[:100]))
+                logger.error(f"IMPOSSIBLE: All parsers failed for line {line_num}: {line[:100]}")
+        
+        success_rate = (len(reports) / len(data_lines)) * 100 if data_lines else 0
+        logger.info(f"Perfect parsing: {len(reports)}/{len(data_lines)} = {success_rate:.1f}%")
+        logger.info(f"Sections: tornado={tornado_count}, wind={wind_count}, hail={hail_count}")
+        
+        return {
+            'reports': reports,
+            'total_reports': len(reports),
+            'tornado_count': tornado_count,
+            'wind_count': wind_count,
+            'hail_count': hail_count,
+            'failed_lines': failed_lines
+        }
+    
+
+    def _parse_magnitude(self, mag_str: str, section_type: str) -> dict:
+        """Parse magnitude field based on section type"""
+        try:
+            if section_type == 'tornado':
+                return {'f_scale': mag_str} if mag_str != 'UNK' else {}
+            elif section_type == 'wind':
+                if mag_str == 'UNK':
+                    return {'speed_text': 'UNK', 'speed': None}
+                try:
+                    speed = int(mag_str)
+                    return {'speed': speed}
+                except ValueError:
+                    return {'speed_text': mag_str, 'speed': None}
+            elif section_type == 'hail':
+                try:
+                    size = int(mag_str)
+                    return {'size_hundredths': size, 'size_inches': size / 100.0}
+                except ValueError:
+                    return {}
+            return {}
+        except Exception:
+            return {}
+    
+    def _detect_section_type(self, line: str, all_lines: list, line_index: int) -> str:
+        """Detect section type by scanning backwards for headers"""
+        
+        # Look backwards for the most recent header
+        for i in range(line_index, -1, -1):
+            if i < len(all_lines):
+                header_line = all_lines[i]
+                if 'F_Scale' in header_line:
+                    return 'tornado'
+                elif 'Speed' in header_line:
+                    return 'wind'  
+                elif 'Size' in header_line:
+                    return 'hail'
+        
+        # Fallback: guess based on second field
+        parts = line.split(',')
+        if len(parts) > 1:
+            mag_field = parts[1].strip()
+            if mag_field in ['UNK', 'EF0', 'EF1', 'EF2', 'EF3', 'EF4', 'EF5'] or 'F' in mag_field:
+                return 'tornado'
+            elif mag_field.isdigit() and 50 <= int(mag_field) <= 200:
+                return 'wind'
+            elif mag_field.isdigit() and int(mag_field) >= 25:
+                return 'hail'
+        
+        return 'wind'  # default
+
+    def _parse_perfect_standard(self, line: str, section_type: str, report_date: date) -> Dict:
+        """Perfect standard SPC CSV parsing"""
+        parts = line.split(',')
+        
+        if len(parts) < 7:
+            raise ValueError("Insufficient fields")
+        
+        report = {
+            'report_date': report_date,
+            'report_type': section_type,
+            'time_utc': parts[0].strip(),
+            'location': parts[2].strip(),
+            'county': parts[3].strip(),
+            'state': parts[4].strip(),
+            'latitude': float(parts[5].strip()) if parts[5].strip() else None,
+            'longitude': float(parts[6].strip()) if parts[6].strip() else None,
+            'comments': ','.join(parts[7:]).strip() if len(parts) > 7 else '',
+            'magnitude': self._parse_magnitude(parts[1].strip(), section_type),
+            'raw_csv_line': line
+        }
+        
+        # Generate row_hash for duplicate detection
+        import hashlib
+        lat_str = str(report['latitude']) if report['latitude'] is not None else ''
+        lon_str = str(report['longitude']) if report['longitude'] is not None else ''
+        mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
+        hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
+        clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
+        report['row_hash'] = hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
+        
+        return report
+    
+    def _parse_perfect_force_split(self, line: str, section_type: str, report_date: date) -> Dict:
+        """Force split with flexible field handling"""
+        parts = [p.strip() for p in line.split(',')]
+        
+        # Extract what we can with defaults
+        time_utc = parts[0] if len(parts) > 0 else "0000"
+        magnitude_raw = parts[1] if len(parts) > 1 else "UNK"
+        location = parts[2] if len(parts) > 2 else "Unknown"
+        
+        # Find county and state
+        county = "Unknown"
+        state = "UNK"
+        latitude = None
+        longitude = None
+        
+        # Scan for state codes and coordinates
+        for i, part in enumerate(parts):
+            if len(part) == 2 and part.isalpha() and part.isupper():
+                state = part
+                if i > 0:
+                    county = parts[i-1]
+            
+            try:
+                coord_val = float(part)
+                if -90 <= coord_val <= 90 and latitude is None:
+                    latitude = coord_val
+                elif -180 <= coord_val <= 180 and longitude is None:
+                    longitude = coord_val
+            except ValueError:
+                pass
+        
+        report = {
+            'report_date': report_date,
+            'report_type': section_type,
+            'time_utc': time_utc,
+            'location': location,
+            'county': county,
+            'state': state,
+            'latitude': latitude,
+            'longitude': longitude,
+            'comments': ','.join(parts[7:]).strip() if len(parts) > 7 else '',
+            'magnitude': self._parse_magnitude(magnitude_raw, section_type),
+            'raw_csv_line': line
+        }
+        
+        # Generate row_hash for duplicate detection
+        import hashlib
+        lat_str = str(report['latitude']) if report['latitude'] is not None else ''
+        lon_str = str(report['longitude']) if report['longitude'] is not None else ''
+        mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
+        hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
+        clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
+        report['row_hash'] = hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
+        
+        return report
+    
+    def _parse_perfect_emergency(self, line: str, section_type: str, report_date: date, line_num: int) -> Dict:
+        """Emergency fallback - extract minimal viable data - always succeeds"""
+        
+        import re
+        time_match = re.match(r'^(\d{4})', line)
+        time_utc = time_match.group(1) if time_match else "0000"
+        
+        report = {
+            'report_date': report_date,
+            'report_type': section_type,
+            'time_utc': time_utc,
+            'location': f"Line_{line_num}_Recovery",
+            'county': "Recovery_Parse",
+            'state': "RP",
+            'latitude': None,
+            'longitude': None,
+            'comments': f"Emergency parsed: {line}",
+            'magnitude': {},
+            'raw_csv_line': line
+        }
+        
+        # Generate row_hash for duplicate detection
+        import hashlib
+        lat_str = str(report['latitude']) if report['latitude'] is not None else ''
+        lon_str = str(report['longitude']) if report['longitude'] is not None else ''
+        mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
+        hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
+        clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
+        report['row_hash'] = hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
+        
+        return report
+
+
+def verification_count(csv_content):
+    """Frozen copy of SPCVerificationService._count_reports_in_csv"""
+    lines = csv_content.strip().split('\n')
+    total_count = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('Time,'):
+            continue
+        if ',' in line:
+            fields = line.split(',')
+            if len(fields) >= 6:
+                first_field = fields[0].strip()
+                if first_field.isdigit() and len(first_field) == 4:
+                    total_count += 1
+    return total_count
+
+
+# ----------------------------------------------------------------------
+# Corpus loading
+# ----------------------------------------------------------------------
+
+SECTION_HEADERS = {
+    'tornado': 'Time,F_Scale,Location,County,State,Lat,Lon,Comments',
+    'wind': 'Time,Speed,Location,County,State,Lat,Lon,Comments',
+    'hail': 'Time,Size,Location,County,State,Lat,Lon,Comments',
+}
+
+
+def synthetic_day(per_section, seed=7):
+    """Outbreak-sized day with the usual oddities: commas and quotes in comments, UNK magnitudes"""
+    rng = random.Random(seed)
+    lines = []
+    for section, header in SECTION_HEADERS.items():
+        lines.append(header)
+        for i in range(per_section):
+            hhmm = f"{rng.randint(0, 23):02d}{rng.randint(0, 59):02d}"
+            if section == 'tornado':
+                mag = rng.choice(['UNK', 'EF0', 'EF1', 'EF2'])
+            elif section == 'wind':
+                mag = rng.choice(['UNK', '58', '65', '70'])
+            else:
+                mag = rng.choice(['100', '175', '250'])
+            comment = rng.choice([
+                'TREES DOWN. (OUN)',
+                'SEVERAL TREES AND POWER LINES DOWN, ROOF DAMAGE. (TSA)',
+                'REPORTED VIA SOCIAL MEDIA, "GOLF BALL" SIZE. (LZK)',
+            ])
+            lines.append(f"{hhmm},{mag},{rng.randint(1, 9)} N TOWN{i},COUNTY{i % 90},OK,"
+                         f"{rng.uniform(30, 45):.2f},{rng.uniform(-105, -85):.2f},{comment}")
+    return '\n'.join(lines) + '\n'
+
+
+def load_corpus(args):
+    corpus = []
+    for path in args.csv:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            corpus.append((os.path.basename(path), f.read()))
+    if args.archive:
+        from feed_replay import FeedArchive
+        archive = FeedArchive(args.archive)
+        for key in sorted(archive.entries):
+            if key.endswith('_rpts_filtered.csv') and archive.entries[key]['status'] == 200:
+                _, body = archive.lookup(key)
+                corpus.append((key.rsplit('/', 1)[-1], body.decode('utf-8', errors='replace')))
+    if args.source_archive:
+        from source_archive import SourceArchive
+        archive = SourceArchive(args.source_archive)
+        for entry in sorted(archive.iter_entries(), key=lambda entry: entry['key']):
+            if entry['key'].endswith('_rpts_filtered.csv'):
+                body = archive.read(entry['url'])
+                if body is not None:
+                    corpus.append((entry['key'].rsplit('/', 1)[-1], body.decode('utf-8', errors='replace')))
+    if args.synthetic or not corpus:
+        per_section = args.synthetic or 500
+        corpus.append((f"synthetic-{per_section}x3", synthetic_day(per_section)))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', nargs='*', default=[], help='SPC CSV files')
+    parser.add_argument('--archive', help='feed_replay capture directory')
+    parser.add_argument('--source-archive', help='source_archive directory (e.g. data/source_archive)')
+    parser.add_argument('--synthetic', type=int, default=0, help='generated reports per section')
+    parser.add_argument('--repeat', type=int, default=1, help='timed parses per day')
+    args = parser.parse_args()
+
+    legacy = LegacySPCParser()
+    streaming = SPCCSVParser()
+    report_date = date(2024, 5, 20)
+    failed = False
+
+    for name, content in load_corpus(args):
+        content = content.replace('\x00', '')
+        expected = verification_count(content)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            legacy_result = legacy._parse_spc_csv(content, report_date)
+        legacy_seconds = (time.perf_counter() - started) / args.repeat
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            result = streaming.parse(content, report_date)
+        streaming_seconds = (time.perf_counter() - started) / args.repeat
+
+        legacy_hashes = {report['row_hash'] for report in legacy_result['reports']}
+        new_hashes = {report['row_hash'] for report in result['reports']}
+        speedup = legacy_seconds / streaming_seconds if streaming_seconds else float('inf')
+        print(f"{name:<32} verify {expected:>6}  legacy {legacy_result['total_reports']:>6} {legacy_seconds:8.3f}s  "
+              f"streaming {result['total_reports']:>6} {streaming_seconds:8.3f}s  speedup {speedup:7.1f}x  "
+              f"hash diff {len(legacy_hashes ^ new_hashes)}")
+        if result['total_reports'] != expected:
+            print(f"    COUNT MISMATCH: streaming {result['total_reports']} vs _count_reports_in_csv {expected}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR)
+    main()
@@ -12,6 +12,7 @@ from sqlalchemy import func, and_
 from app import db
 from models import Alert, RadarAlert
 from city_parser import CityNameParser
+from geometry_analysis import process_geometry_batch
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -64,6 +65,11 @@ class RadarBackfillProcessor:
             for offset in range(0, total_alerts, batch_size):
                 batch_alerts = query.offset(offset).limit(batch_size).all()
                 
+                # Alerts stored without geometry analysis get bounds in one batch call
+                missing_bounds = [a for a in batch_alerts if a.geometry and not a.geometry_bounds]
+                if missing_bounds:
+                    process_geometry_batch(missing_bounds)
+                
                 for alert in batch_alerts:
                     try:
                         batch_stats = self._process_single_alert(alert)
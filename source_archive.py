@@ -0,0 +1,351 @@
+"""
+Raw Source Archive for HailyDB
+Content-addressed, gzip-compressed local store of upstream payloads with conditional revalidation
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+import requests
+from requests.utils import get_encoding_from_headers
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Enforce the size/age limits after this many new payloads (and from the CLI)
+EVICT_EVERY_STORES = 200
+
+
+def source_key(url: str) -> str:
+    """Archive key for a URL: host + path + query parameters in sorted order"""
+    parts = urlsplit(url)
+    params = sorted(parse_qsl(parts.query, keep_blank_values=True))
+    return f"{parts.netloc}{parts.path}?{urlencode(params)}" if params else f"{parts.netloc}{parts.path}"
+
+
+def final_max_age(period_end: date) -> Optional[float]:
+    """
+    max_age for a payload covering data up to period_end
+    Periods that closed more than SOURCE_ARCHIVE_FINAL_AFTER_DAYS ago (the SPC T-16 protection
+    window) are final, so any archived copy is served without revalidating; recent ones revalidate.
+    """
+    if (date.today() - period_end).days > Config.SOURCE_ARCHIVE_FINAL_AFTER_DAYS:
+        return float('inf')
+    return None
+
+
+class ArchivedResponse:
+    """
+    The subset of requests.Response the ingest services use, backed by archived or fresh bytes
+    from_archive is True when the body came from disk (a 304 or a fresh-enough copy).
+    """
+
+    def __init__(self, url: str, status_code: int, content: bytes, headers: Dict[str, str],
+                 from_archive: bool = False):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.from_archive = from_archive
+        self.encoding = get_encoding_from_headers({'content-type': headers.get('Content-Type', '')}) or 'utf-8'
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors='replace')
+
+    @property
+    def ok(self) -> bool:
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class SourceArchive:
+    """
+    On-disk archive of raw upstream payloads
+
+    objects/<sha256[:2]>/<sha256>.gz holds each distinct body once; urls/<sha1(key)>.json records
+    the URL, the body hash, ETag/Last-Modified and fetch/access times. Every file is replaced
+    atomically, so several processes can share one directory.
+    """
+
+    def __init__(self, directory: str, enabled: bool = True, max_age_days: float = 0, max_bytes: int = 0):
+        self.directory = directory
+        self.enabled = enabled
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._stores_since_evict = 0
+
+    # ------------------------------------------------------------------
+    # Paths and entries
+    # ------------------------------------------------------------------
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.directory, 'urls', f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.gz")
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    def entry(self, url: str) -> Optional[Dict]:
+        """Metadata for an archived URL, or None"""
+        try:
+            with open(self._entry_path(source_key(url))) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_entry(self, entry: Dict):
+        self._write_atomic(self._entry_path(entry['key']), json.dumps(entry, sort_keys=True).encode('utf-8'))
+
+    def iter_entries(self) -> Iterator[Dict]:
+        urls_dir = os.path.join(self.directory, 'urls')
+        if not os.path.isdir(urls_dir):
+            return
+        for name in sorted(os.listdir(urls_dir)):
+            if name.endswith('.json'):
+                try:
+                    with open(os.path.join(urls_dir, name)) as f:
+                        yield json.load(f)
+                except (OSError, ValueError):
+                    continue
+
+    def read(self, url: str) -> Optional[bytes]:
+        """Archived body for a URL without any network access, or None"""
+        entry = self.entry(url)
+        return self._load(entry) if entry else None
+
+    def _load(self, entry: Dict) -> Optional[bytes]:
+        try:
+            with gzip.open(self._object_path(entry['sha256']), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def store(self, url: str, content: bytes, headers: Dict[str, str]) -> Dict:
+        """Archive one 200 response body and its validators"""
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, gzip.compress(content, compresslevel=6))
+
+        now = datetime.utcnow().isoformat()
+        entry = {
+            'key': source_key(url),
+            'url': url,
+            'sha256': digest,
+            'bytes': len(content),
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'content_type': headers.get('Content-Type', 'application/octet-stream'),
+            'fetched_at': now,
+            'validated_at': now,
+            'accessed_at': now
+        }
+        self._save_entry(entry)
+
+        with self._lock:
+            self._stores_since_evict += 1
+            evict_now = self._stores_since_evict >= EVICT_EVERY_STORES
+            if evict_now:
+                self._stores_since_evict = 0
+        if evict_now:
+            self.evict()
+        return entry
+
+    # ------------------------------------------------------------------
+    # Fetch
+    # ------------------------------------------------------------------
+
+    def fetch(self, url: str, headers: Optional[Dict] = None, timeout: int = 30,
+              max_age: Optional[float] = None, session: Optional[requests.Session] = None) -> ArchivedResponse:
+        """
+        GET a URL through the archive
+        An archived copy validated within max_age seconds is returned without touching the network
+        (float('inf') = any archived copy). Otherwise the request carries If-None-Match /
+        If-Modified-Since and a 304 returns the archived bytes. Non-200 responses are passed
+        through unarchived; a network error falls back to the archived copy when there is one.
+        """
+        if not self.enabled:
+            response = (session or requests).get(url, headers=headers, timeout=timeout)
+            return ArchivedResponse(url, response.status_code, response.content, response.headers)
+
+        entry = self.entry(url)
+        content = self._load(entry) if entry else None
+        if content is None:
+            entry = None
+        elif max_age is not None:
+            age = (datetime.utcnow() - datetime.fromisoformat(entry['validated_at'])).total_seconds()
+            if age <= max_age:
+                return self._hit(entry, content, revalidated=False)
+
+        request_headers = dict(headers or {})
+        if entry:
+            if entry.get('etag'):
+                request_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                request_headers['If-Modified-Since'] = entry['last_modified']
+
+        try:
+            response = (session or requests).get(url, headers=request_headers, timeout=timeout)
+        except requests.RequestException as e:
+            if entry:
+                logger.warning(f"Fetching {url} failed ({e}); serving archived copy from {entry['fetched_at']}")
+                return self._hit(entry, content, revalidated=False)
+            raise
+
+        if response.status_code == 304 and entry:
+            logger.debug(f"Not modified: {url}")
+            return self._hit(entry, content, revalidated=True)
+
+        if response.status_code == 200:
+            if entry and entry['sha256'] == hashlib.sha256(response.content).hexdigest():
+                # Same bytes, but the upstream may have rotated its validators
+                entry['etag'] = response.headers.get('ETag')
+                entry['last_modified'] = response.headers.get('Last-Modified')
+                self._hit(entry, content, revalidated=True)
+            else:
+                self.store(url, response.content, response.headers)
+        return ArchivedResponse(url, response.status_code, response.content, response.headers)
+
+    def _hit(self, entry: Dict, content: bytes, revalidated: bool) -> ArchivedResponse:
+        now = datetime.utcnow().isoformat()
+        entry['accessed_at'] = now
+        if revalidated:
+            entry['validated_at'] = now
+        try:
+            self._save_entry(entry)
+        except OSError as e:
+            logger.debug(f"Could not update archive entry for {entry['url']}: {e}")
+        return ArchivedResponse(entry['url'], 200, content, {'Content-Type': entry['content_type']}, from_archive=True)
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict:
+        entries = list(self.iter_entries())
+        object_bytes = 0
+        object_count = 0
+        for root, _, files in os.walk(os.path.join(self.directory, 'objects')):
+            for name in files:
+                if name.endswith('.gz'):
+                    object_count += 1
+                    object_bytes += os.path.getsize(os.path.join(root, name))
+        return {
+            'urls': len(entries),
+            'objects': object_count,
+            'compressed_bytes': object_bytes,
+            'raw_bytes': sum(entry['bytes'] for entry in entries)
+        }
+
+    def evict(self, max_age_days: Optional[float] = None, max_bytes: Optional[int] = None) -> Dict:
+        """
+        Drop URLs not accessed within max_age_days, then least recently accessed URLs until the
+        compressed objects fit in max_bytes; objects no URL references are deleted (0 = no limit)
+        """
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.iter_entries(), key=lambda entry: entry['accessed_at'])
+        removed = []
+
+        if max_age_days:
+            cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).isoformat()
+            removed = [entry for entry in entries if entry['accessed_at'] < cutoff]
+            entries = entries[len(removed):]
+
+        object_sizes = {}
+        for entry in entries:
+            path = self._object_path(entry['sha256'])
+            if entry['sha256'] not in object_sizes and os.path.exists(path):
+                object_sizes[entry['sha256']] = os.path.getsize(path)
+
+        if max_bytes:
+            references = {}
+            for entry in entries:
+                references[entry['sha256']] = references.get(entry['sha256'], 0) + 1
+            total = sum(object_sizes.values())
+            while entries and total > max_bytes:
+                entry = entries.pop(0)
+                removed.append(entry)
+                references[entry['sha256']] -= 1
+                if not references[entry['sha256']]:
+                    total -= object_sizes.pop(entry['sha256'], 0)
+
+        for entry in removed:
+            try:
+                os.remove(self._entry_path(entry['key']))
+            except OSError:
+                pass
+
+        # Sweep objects that no remaining entry points at (also cleans up after crashed writers)
+        live = {entry['sha256'] for entry in entries}
+        freed = 0
+        for root, _, files in os.walk(os.path.join(self.directory, 'objects')):
+            for name in files:
+                if name.endswith('.gz') and name[:-3] not in live:
+                    path = os.path.join(root, name)
+                    try:
+                        freed += os.path.getsize(path)
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+        if removed or freed:
+            logger.info(f"Source archive eviction: {len(removed)} URLs, {freed / 1024 / 1024:.1f} MB freed")
+        return {'urls_evicted': len(removed), 'bytes_freed': freed}
+
+
+# Global archive instance used by the SPC, IEM and HURDAT2 fetchers
+source_archive = SourceArchive(
+    Config.SOURCE_ARCHIVE_DIR,
+    enabled=Config.SOURCE_ARCHIVE_ENABLED,
+    max_age_days=Config.SOURCE_ARCHIVE_MAX_AGE_DAYS,
+    max_bytes=Config.SOURCE_ARCHIVE_MAX_BYTES
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and evict the raw source archive")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', help='URL/object counts and sizes')
+    evict = subparsers.add_parser('evict', help='apply the age and size limits')
+    evict.add_argument('--max-age-days', type=float, help='override SOURCE_ARCHIVE_MAX_AGE_DAYS')
+    evict.add_argument('--max-bytes', type=int, help='override SOURCE_ARCHIVE_MAX_BYTES')
+    show = subparsers.add_parser('get', help='write an archived body to stdout')
+    show.add_argument('url')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == 'stats':
+        print(source_archive.stats())
+    elif args.command == 'evict':
+        print(source_archive.evict(max_age_days=args.max_age_days, max_bytes=args.max_bytes))
+    else:
+        body = source_archive.read(args.url)
+        if body is None:
+            raise SystemExit(f"{args.url} is not archived")
+        os.write(1, body)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,339 @@
+"""
+SPC Backfill Engine for HailyDB
+In-process multi-day SPC report backfill: concurrent fetch, pooled parsing, one transaction per day
+"""
+
+import argparse
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+import requests
+
+from alert_normalizer import NormalizationPool
+from config import Config
+from models import SPCIngestionLog, SPCReport
+from source_archive import final_max_age, source_archive
+from spc_csv_parser import spc_csv_parser
+from spc_ingest import SPC_REQUEST_HEADERS, SPCIngestService
+from spc_match_store import release_report_day
+
+logger = logging.getLogger(__name__)
+
+
+def parse_spc_days(days: List[Tuple[date, Optional[str]]]) -> List[Dict]:
+    """
+    Parse (report_date, csv text) pairs into spc_csv_parser summaries
+    Picklable: run directly and by NormalizationPool workers; days without text parse to None,
+    and a day whose parse raises becomes {'error': ...} so it cannot take the rest of the batch down
+    """
+    results = []
+    for report_date, content in days:
+        if content is None:
+            results.append(None)
+            continue
+        try:
+            results.append(spc_csv_parser.parse(content, report_date))
+        except Exception as e:
+            results.append({'error': f"parse failed: {e}"})
+    return results
+
+
+def date_range(start_date: date, end_date: date) -> List[date]:
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+
+class HostRateLimiter:
+    """
+    Spaces request starts per host at no more than requests_per_second
+    Threads reserve the next slot under a lock and sleep outside it; 0 disables limiting.
+    """
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class SPCBackfillEngine:
+    """
+    Backfills a date range of SPC daily reports on top of SPCIngestService
+
+    Up to `concurrency` CSV downloads run at once (rate limited per host) while earlier days are
+    parsed in a NormalizationPool and written. Each day is stored in its own transaction together
+    with its SPCIngestionLog row, so a successful log is the day's checkpoint: re-running a range
+    skips every day that already has one unless force=True.
+    """
+
+    def __init__(self, db_session, concurrency: int = None, requests_per_second: float = None,
+                 parse_workers: int = None):
+        self.db = db_session
+        self.ingest_service = SPCIngestService(db_session)
+        self.concurrency = max(1, concurrency or Config.SPC_BACKFILL_CONCURRENCY)
+        self.rate_limiter = HostRateLimiter(
+            Config.SPC_BACKFILL_REQUESTS_PER_SECOND if requests_per_second is None else requests_per_second
+        )
+        self.parse_pool = NormalizationPool(
+            workers=Config.SPC_BACKFILL_PARSE_WORKERS if parse_workers is None else parse_workers,
+            chunk_size=1,
+            start_method=Config.NORMALIZE_START_METHOD
+        )
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._progress = self._new_progress(None, None, 0)
+
+    # ------------------------------------------------------------------
+    # Progress
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _new_progress(start_date: Optional[date], end_date: Optional[date], total_days: int) -> Dict:
+        return {
+            'running': False,
+            'start_date': start_date.isoformat() if start_date else None,
+            'end_date': end_date.isoformat() if end_date else None,
+            'total_days': total_days,
+            'already_complete': 0,
+            'completed_days': 0,
+            'failed_days': 0,
+            'reports_stored': 0,
+            'duplicates_skipped': 0,
+            'current_date': None,
+            'failed_dates': [],
+            'started_at': None,
+            'finished_at': None
+        }
+
+    def _update(self, **changes):
+        with self._lock:
+            self._progress.update(changes)
+
+    def _record_day(self, report_date: date, stored: Optional[Dict], error: Optional[str] = None):
+        with self._lock:
+            progress = self._progress
+            progress['current_date'] = report_date.isoformat()
+            if error is None:
+                progress['completed_days'] += 1
+                progress['reports_stored'] += stored['total_stored']
+                progress['duplicates_skipped'] += stored['duplicates_skipped']
+            else:
+                progress['failed_days'] += 1
+                progress['failed_dates'].append({'date': report_date.isoformat(), 'error': error})
+
+    def get_progress(self) -> Dict:
+        """Snapshot of the current (or last) run with throughput and ETA"""
+        with self._lock:
+            progress = dict(self._progress)
+            progress['failed_dates'] = list(self._progress['failed_dates'])
+
+        pending = progress['total_days'] - progress['already_complete']
+        done = progress['completed_days'] + progress['failed_days']
+        elapsed = None
+        if progress['started_at']:
+            finished = datetime.fromisoformat(progress['finished_at']) if progress['finished_at'] else datetime.utcnow()
+            elapsed = (finished - datetime.fromisoformat(progress['started_at'])).total_seconds()
+
+        progress['remaining_days'] = max(0, pending - done)
+        progress['percent_complete'] = round(100.0 * done / pending, 1) if pending else 100.0
+        progress['elapsed_seconds'] = round(elapsed, 1) if elapsed is not None else None
+        progress['days_per_minute'] = round(60.0 * done / elapsed, 2) if elapsed and done else None
+        progress['eta_seconds'] = (round(elapsed / done * progress['remaining_days'], 1)
+                                   if elapsed and done and progress['running'] else None)
+        return progress
+
+    @property
+    def running(self) -> bool:
+        with self._lock:
+            return self._progress['running']
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def completed_dates(self, start_date: date, end_date: date) -> Set[date]:
+        """Days in the range with a successful SPCIngestionLog (the resume checkpoint)"""
+        rows = self.db.query(SPCIngestionLog.report_date).filter(
+            SPCIngestionLog.report_date >= start_date,
+            SPCIngestionLog.report_date <= end_date,
+            SPCIngestionLog.success == True
+        ).distinct().all()
+        return {row.report_date for row in rows}
+
+    def run(self, start_date: date, end_date: date, force: bool = False, replace: bool = False) -> Dict:
+        """
+        Backfill every day from start_date to end_date (inclusive)
+        force re-ingests days that already have a successful log; replace deletes a day's
+        existing reports inside its transaction before storing (reimport semantics).
+        """
+        if start_date > end_date:
+            raise ValueError("start_date must not be after end_date")
+
+        with self._lock:
+            if self._progress['running']:
+                raise RuntimeError("SPC backfill already running")
+            self._progress = self._new_progress(start_date, end_date, (end_date - start_date).days + 1)
+            self._progress['running'] = True
+            self._progress['started_at'] = datetime.utcnow().isoformat()
+
+        try:
+            days = date_range(start_date, end_date)
+            if not force:
+                done = self.completed_dates(start_date, end_date)
+                days = [day for day in days if day not in done]
+                self._update(already_complete=len(done))
+            self.db.rollback()  # release the checkpoint read before the long fetch phase
+
+            logger.info(f"SPC backfill {start_date} to {end_date}: {len(days)} days to ingest "
+                        f"(concurrency={self.concurrency}, parse_workers={self.parse_pool.workers})")
+            self._run_days(days, replace)
+        finally:
+            self.parse_pool.shutdown()
+            self._update(running=False, finished_at=datetime.utcnow().isoformat())
+
+        progress = self.get_progress()
+        logger.info(f"SPC backfill finished: {progress['completed_days']} days, {progress['reports_stored']} reports, "
+                    f"{progress['failed_days']} failed days in {progress['elapsed_seconds']}s")
+        return progress
+
+    def _run_days(self, days: List[date], replace: bool):
+        """Keep up to 2x concurrency downloads ahead of the writer; parse and write in date order"""
+        lookahead = self.concurrency * 2
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='spc-backfill') as executor:
+            pending = deque()
+            remaining = deque(days)
+
+            while remaining or pending:
+                while remaining and len(pending) < lookahead:
+                    report_date = remaining.popleft()
+                    pending.append((report_date, executor.submit(self._fetch_day, report_date)))
+
+                # Parse whatever prefix of the queue has finished downloading as one pool batch
+                window = [pending.popleft()]
+                while pending and pending[0][1].done() and len(window) < self.concurrency:
+                    window.append(pending.popleft())
+
+                fetched = [(report_date, future.result()) for report_date, future in window]
+                parsed = self.parse_pool.map_chunks(parse_spc_days, [(report_date, content)
+                                                                     for report_date, (_, content, _) in fetched])
+
+                for (report_date, (url, content, error)), result in zip(fetched, parsed):
+                    if result is not None and 'error' in result:
+                        # Logged as a failed day by _write_day, like a fetch error
+                        result, error = None, result['error']
+                    self._write_day(report_date, url, result, error, replace)
+
+    def _fetch_day(self, report_date: date) -> Tuple[str, Optional[str], Optional[str]]:
+        """Download one day's CSV on a pool thread: (url, text or None, error or None)"""
+        url = f"{self.ingest_service.base_url}{self.ingest_service.format_date_for_url(report_date)}_rpts_filtered.csv"
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+            session.headers.update(SPC_REQUEST_HEADERS)
+
+        max_age = final_max_age(report_date)
+        try:
+            if max_age is not None and source_archive.entry(url):
+                # Final day already archived: no request, so no rate-limit slot either
+                return url, source_archive.fetch(url, max_age=max_age).text.replace('\x00', ''), None
+
+            self.rate_limiter.wait(url)
+            response = source_archive.fetch(url, timeout=Config.REQUEST_TIMEOUT, max_age=max_age, session=session)
+            response.raise_for_status()
+            return url, response.text.replace('\x00', ''), None
+        except Exception as e:
+            # Archive read and decode errors fail this day only, like network errors
+            return url, None, str(e)
+
+    def _write_day(self, report_date: date, url: str, result: Optional[Dict], error: Optional[str], replace: bool):
+        """Store one day and its SPCIngestionLog in a single transaction; failures get a failed log"""
+        try:
+            if error is not None:
+                raise RuntimeError(error)
+
+            if replace:
+                release_report_day(self.db, report_date)
+                self.db.query(SPCReport).filter(SPCReport.report_date == report_date).delete(synchronize_session=False)
+            stored = self.ingest_service._store_reports(result['reports'], report_date, is_reimport=replace, commit=False)
+
+            log = SPCIngestionLog()
+            log.report_date = report_date
+            log.started_at = datetime.utcnow()
+            log.completed_at = datetime.utcnow()
+            log.url_attempted = url
+            log.success = True
+            log.tornado_reports = stored['tornado']
+            log.wind_reports = stored['wind']
+            log.hail_reports = stored['hail']
+            log.total_reports = stored['total_stored']
+            self.db.add(log)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"SPC backfill failed for {report_date}: {e}")
+            self._log_failure(report_date, url, str(e))
+            self._record_day(report_date, None, str(e))
+            return
+
+        self._record_day(report_date, stored)
+        logger.info(f"SPC backfill {report_date}: stored {stored['total_stored']} of "
+                    f"{result['total_reports']} reports ({stored['duplicates_skipped']} duplicates)")
+
+    def _log_failure(self, report_date: date, url: str, error: str):
+        try:
+            log = SPCIngestionLog()
+            log.report_date = report_date
+            log.started_at = datetime.utcnow()
+            log.completed_at = datetime.utcnow()
+            log.url_attempted = url
+            log.success = False
+            log.error_message = error
+            self.db.add(log)
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Could not log SPC backfill failure for {report_date}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill SPC storm reports for a date range")
+    parser.add_argument('--start', required=True, help='first report day (YYYY-MM-DD)')
+    parser.add_argument('--end', required=True, help='last report day (YYYY-MM-DD)')
+    parser.add_argument('--concurrency', type=int, default=Config.SPC_BACKFILL_CONCURRENCY,
+                        help='simultaneous CSV downloads')
+    parser.add_argument('--rate', type=float, default=Config.SPC_BACKFILL_REQUESTS_PER_SECOND,
+                        help='max requests per second per host (0 = unlimited)')
+    parser.add_argument('--parse-workers', type=int, default=Config.SPC_BACKFILL_PARSE_WORKERS,
+                        help='parser processes (0 = parse on the writer thread)')
+    parser.add_argument('--force', action='store_true', help='re-ingest days that already have a successful log')
+    parser.add_argument('--replace', action='store_true', help="delete each day's existing reports before storing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    start_date = datetime.strptime(args.start, '%Y-%m-%d').date()
+    end_date = datetime.strptime(args.end, '%Y-%m-%d').date()
+
+    from app import app, db
+    with app.app_context():
+        engine = SPCBackfillEngine(db.session, concurrency=args.concurrency, requests_per_second=args.rate,
+                                   parse_workers=args.parse_workers)
+        progress = engine.run(start_date, end_date, force=args.force, replace=args.replace)
+    print(progress)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+"""
+SPC CSV Parser for HailyDB
+Single-pass state machine over SPC daily storm report CSVs (tornado, wind and hail sections)
+"""
+
+import csv
+import hashlib
+import logging
+from datetime import date
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Header column that identifies each section of the daily CSV
+SECTION_HEADERS = (('F_Scale', 'tornado'), ('Speed', 'wind'), ('Size', 'hail'))
+
+TORNADO_MAGNITUDES = ('UNK', 'EF0', 'EF1', 'EF2', 'EF3', 'EF4', 'EF5')
+
+# Time,Mag,Location,County,State,Lat,Lon,Comments
+STANDARD_FIELD_COUNT = 7
+
+
+def parse_magnitude(mag_str: str, section_type: str) -> dict:
+    """Parse magnitude field based on section type"""
+    if section_type == 'tornado':
+        return {'f_scale': mag_str} if mag_str != 'UNK' else {}
+    elif section_type == 'wind':
+        if mag_str == 'UNK':
+            return {'speed_text': 'UNK', 'speed': None}
+        try:
+            return {'speed': int(mag_str)}
+        except ValueError:
+            return {'speed_text': mag_str, 'speed': None}
+    elif section_type == 'hail':
+        try:
+            size = int(mag_str)
+            return {'size_hundredths': size, 'size_inches': size / 100.0}
+        except ValueError:
+            return {}
+    return {}
+
+
+def report_row_hash(report: Dict) -> str:
+    """SHA256 duplicate-detection hash over date, type, time, place, coordinates and magnitude"""
+    lat_str = str(report['latitude']) if report['latitude'] is not None else ''
+    lon_str = str(report['longitude']) if report['longitude'] is not None else ''
+    mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
+    hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
+    clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
+    return hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
+
+
+def header_section(line: str) -> Optional[str]:
+    """Section type for a 'Time,...' header line, None for any other line"""
+    if not line.startswith('Time,'):
+        return None
+    for column, section_type in SECTION_HEADERS:
+        if column in line:
+            return section_type
+    return None
+
+
+def is_data_line(line: str) -> bool:
+    """Data records start with a 4-digit HHMM time"""
+    return len(line) >= 4 and line[:4].isdigit() and not line.startswith('Time,')
+
+
+def guess_section(mag_field: str) -> str:
+    """Section type from the magnitude alone, for data that precedes any header"""
+    if mag_field in TORNADO_MAGNITUDES or 'F' in mag_field:
+        return 'tornado'
+    elif mag_field.isdigit() and 50 <= int(mag_field) <= 200:
+        return 'wind'
+    elif mag_field.isdigit() and int(mag_field) >= 25:
+        return 'hail'
+    return 'wind'
+
+
+def _coordinate(value: str) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _is_state_code(value: str) -> bool:
+    return len(value) == 2 and value.isalpha() and value.isupper()
+
+
+class SPCCSVParser:
+    """
+    Streaming parser for one SPC *_rpts_filtered.csv day
+
+    Lines are visited once. Header lines switch the current section, quoted fields
+    (including quoted commas and newlines inside comments) are decoded by the csv
+    module, and an unquoted record that wraps onto following lines is joined back
+    together before it is parsed. Every data record yields exactly one report.
+    """
+
+    def iter_reports(self, csv_content: str, report_date: date) -> Iterator[Dict]:
+        """Yield one report dict per data record, in file order"""
+        for line_num, section_type, record in self._iter_records(csv_content):
+            yield self._build_report(record, section_type, report_date, line_num)
+
+    def parse(self, csv_content: str, report_date: date) -> Dict:
+        """Parse a whole day into the summary dict SPCIngestService works with"""
+        reports = []
+        counts = {'tornado': 0, 'wind': 0, 'hail': 0}
+
+        for report in self.iter_reports(csv_content, report_date):
+            reports.append(report)
+            if report['report_type'] in counts:
+                counts[report['report_type']] += 1
+
+        logger.info(f"Parsed {len(reports)} SPC reports: tornado={counts['tornado']}, "
+                    f"wind={counts['wind']}, hail={counts['hail']}")
+
+        return {
+            'reports': reports,
+            'total_reports': len(reports),
+            'tornado_count': counts['tornado'],
+            'wind_count': counts['wind'],
+            'hail_count': counts['hail'],
+            'failed_lines': []
+        }
+
+    def _iter_records(self, csv_content: str) -> Iterator[Tuple[int, Optional[str], str]]:
+        """
+        Walk the physical lines once, yielding (line number, section, record text) per data record
+        A record continues onto every following line until a blank line, a header or a line that
+        starts a new record; lines after a complete record are appended to its comments.
+        """
+        lines = csv_content.strip().split('\n')
+        section_type = None
+        index = 0
+
+        while index < len(lines):
+            line = lines[index].strip()
+            index += 1
+
+            header = header_section(line)
+            if header:
+                section_type = header
+                continue
+            if not is_data_line(line):
+                continue
+
+            line_num = index
+            record = line
+            while index < len(lines):
+                next_line = lines[index].strip()
+                if header_section(next_line) or is_data_line(next_line):
+                    # Also ends an unbalanced quote: SPC comments use " as an inch mark
+                    break
+                if record.count('"') % 2:
+                    # Quoted field spans the line break; keep the newline inside the field
+                    record += '\n' + lines[index].rstrip('\r')
+                    index += 1
+                    continue
+                if not next_line:
+                    break
+                if record.count(',') == STANDARD_FIELD_COUNT - 1:
+                    # Complete record without comments: the wrapped line is the comments field
+                    record += ',' + next_line
+                else:
+                    # Too few fields, or wrapped comments: the line continues the last field
+                    record += ' ' + next_line
+                index += 1
+
+            yield line_num, section_type, record
+
+    def _build_report(self, record: str, section_type: Optional[str], report_date: date, line_num: int) -> Dict:
+        try:
+            fields = [field.strip() for field in next(csv.reader([record], skipinitialspace=True), [])]
+        except csv.Error as e:
+            # Unterminated quote and the like: plain comma split, as the legacy parser did
+            logger.debug(f"CSV decode failed at line {line_num} ({e}), splitting on commas")
+            fields = [field.strip() for field in record.split(',')]
+        if len(fields) < STANDARD_FIELD_COUNT:
+            # Truncated record: keep what is there, same defaults as the old force-split parser
+            defaults = ['0000', 'UNK', 'Unknown', 'Unknown', 'UNK', '', '']
+            fields += defaults[len(fields):]
+
+        time_utc, mag, location, county, state, lat, lon = fields[:STANDARD_FIELD_COUNT]
+        comments = ','.join(fields[STANDARD_FIELD_COUNT:])
+        latitude, longitude = _coordinate(lat), _coordinate(lon)
+
+        # Unquoted comma in the location: Time,Mag,Location,ExtraState,County,State,Lat,Lon,Comments
+        if (latitude is None and len(fields) > STANDARD_FIELD_COUNT and _is_state_code(county)
+                and _is_state_code(lat) and longitude is not None and _coordinate(fields[7]) is not None):
+            location = f"{location} {county}"
+            county, state = state, lat
+            latitude, longitude = longitude, _coordinate(fields[7])
+            comments = ','.join(fields[STANDARD_FIELD_COUNT + 1:])
+            logger.debug(f"Merged extra state field at line {line_num}")
+
+        section_type = section_type or guess_section(mag)
+        report = {
+            'report_date': report_date,
+            'report_type': section_type,
+            'time_utc': time_utc,
+            'location': location,
+            'county': county,
+            'state': state,
+            'latitude': latitude,
+            'longitude': longitude,
+            'comments': comments.strip(),
+            'magnitude': parse_magnitude(mag, section_type),
+            'raw_csv_line': record
+        }
+        report['row_hash'] = report_row_hash(report)
+        return report
+
+
+# Global parser instance
+spc_csv_parser = SPCCSVParser()
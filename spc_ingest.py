@@ -6,7 +6,7 @@ Handles parsing of multi-section CSV files and cross-referencing with NWS alerts
 import csv
 import logging
 import requests
-import hashlib
+import json
 import os
 from datetime import datetime, date, timedelta
 from typing import Dict, List, Optional, Tuple, Iterator
@@ -14,9 +14,12 @@ from io import StringIO
 import re
 
 from config import Config
+from spc_csv_parser import spc_csv_parser
+from source_archive import final_max_age, source_archive
+from spc_match_queue import enqueue_reports
+from spc_match_store import release_report_day
 from models import SPCReport, SPCIngestionLog, Alert, db
-from sqlalchemy import and_, or_, func
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import and_, or_, func, text
 
 logger = logging.getLogger(__name__)
 
@@ -25,16 +28,89 @@ def chunks(data: List, chunk_size: int) -> Iterator[List]:
     for i in range(0, len(data), chunk_size):
         yield data[i:i + chunk_size]
 
+# Daily CSV request headers; compression is disabled because it truncated responses
+SPC_REQUEST_HEADERS = {
+    'User-Agent': 'HailyDB-SPC-Ingestion/2.0 (contact@hailydb.com)',
+    'Accept': 'text/csv,text/plain,*/*',
+    'Accept-Encoding': 'identity',
+    'Connection': 'keep-alive'
+}
+
+# Every key _store_reports deduplicates against, fetched once per report day
+EXISTING_DAY_KEYS_SQL = """
+SELECT row_hash, report_date, report_type, latitude, longitude, location
+FROM spc_reports WHERE report_date = :report_date
+"""
+
+SPC_INSERT_COLUMNS = ('report_date', 'report_type', 'time_utc', 'location', 'county', 'state', 'latitude',
+                      'longitude', 'comments', 'magnitude', 'raw_csv_line', 'row_hash',
+                      'spc_enrichment', 'enhanced_context')
+SPC_JSONB_COLUMNS = ('magnitude', 'spc_enrichment', 'enhanced_context')
+SPC_COLUMN_TYPES = {'report_date': 'date', 'latitude': 'float8', 'longitude': 'float8',
+                    **dict.fromkeys(SPC_JSONB_COLUMNS, 'jsonb')}  # everything else is text
+SPC_INSERT_ARRAYS = ', '.join(f"CAST(:{name} AS {SPC_COLUMN_TYPES.get(name, 'text')}[])" for name in SPC_INSERT_COLUMNS)
+
+# One array parameter per column, so the bind count does not grow with the batch; spc_verified and
+# the JSONB defaults live on the ORM model, so they are spelled out here
+INSERT_REPORTS_SQL = f"""
+INSERT INTO spc_reports ({', '.join(SPC_INSERT_COLUMNS)}, spc_verified)
+SELECT {', '.join(SPC_INSERT_COLUMNS)}, false
+FROM unnest({SPC_INSERT_ARRAYS}) AS r({', '.join(SPC_INSERT_COLUMNS)})
+ON CONFLICT (row_hash) DO NOTHING
+RETURNING id, report_type
+"""
+
+# A value longer than its column would fail the whole batch statement, so it is rejected up front
+SPC_COLUMN_LENGTHS = {name: SPCReport.__table__.c[name].type.length
+                      for name in ('report_type', 'time_utc', 'location', 'county', 'state')}
+
+
+def location_key(report) -> Tuple:
+    """(date, type, lat, lon, location) identity of a report dict or a prefetched row"""
+    if isinstance(report, dict):
+        return (report['report_date'], report['report_type'], report['latitude'], report['longitude'], report['location'])
+    return (report.report_date, report.report_type, report.latitude, report.longitude, report.location)
+
+
+def report_row(report: Dict) -> Dict:
+    """Insert parameters for one parsed report"""
+    magnitude = report['magnitude']
+    if isinstance(magnitude, str):
+        try:
+            magnitude = json.loads(magnitude)
+        except (json.JSONDecodeError, TypeError):
+            magnitude = {}
+    row = {name: report.get(name) for name in SPC_INSERT_COLUMNS}
+    row['magnitude'] = json.dumps(magnitude)
+    row['spc_enrichment'] = '{}'
+    row['enhanced_context'] = '{}'
+    return row
+
 class SPCIngestService:
     """
     SPC Report Ingestion Service
     Handles variable polling schedules and CSV parsing with header detection
     """
     
+    _schema_ready = False  # spc_reports.data_source verified once per process
+    
     def __init__(self, db_session):
         self.db = db_session
-        self.base_url = "https://www.spc.noaa.gov/climo/reports/"
+        self.base_url = Config.SPC_REPORTS_URL
         self.db_write_batch_size = int(os.getenv("DB_WRITE_BATCH_SIZE", "500"))
+        self._ensure_schema()
+    
+    def _ensure_schema(self):
+        """Add the data_source column to existing deployments (idempotent; existing rows become spc_daily)"""
+        if SPCIngestService._schema_ready:
+            return
+        try:
+            self.db.execute(text("ALTER TABLE spc_reports ADD COLUMN IF NOT EXISTS data_source VARCHAR(20) DEFAULT 'spc_daily'"))
+            self.db.commit()
+            SPCIngestService._schema_ready = True
+        except Exception as e:
+            logger.warning(f"Could not ensure SPC report schema: {e}")
+            self.db.rollback()
         
     def get_polling_schedule(self, report_date: date) -> int:
         """
@@ -182,13 +258,7 @@ class SPCIngestService:
             logger.info(f"Polling SPC reports from {url}")
             
             # Download CSV with proper headers to get complete data
-            headers = {
-                'User-Agent': 'HailyDB-SPC-Ingestion/2.0 (contact@hailydb.com)',
-                'Accept': 'text/csv,text/plain,*/*',
-                'Accept-Encoding': 'identity',  # Disable compression to avoid truncation
-                'Connection': 'keep-alive'
-            }
-            response = requests.get(url, headers=headers, timeout=Config.REQUEST_TIMEOUT)
+            response = source_archive.fetch(url, headers=SPC_REQUEST_HEADERS, timeout=Config.REQUEST_TIMEOUT)
             logger.info(f"Response status: {response.status_code}")
             logger.info(f"Response headers: {dict(response.headers)}")
             logger.info(f"Response encoding: {response.encoding}")
@@ -242,7 +312,7 @@ class SPCIngestService:
             log.tornado_reports = stored_counts['tornado']
             log.wind_reports = stored_counts['wind'] 
             log.hail_reports = stored_counts['hail']
-            log.total_reports = sum(stored_counts.values())
+            log.total_reports = stored_counts['total_stored']
             
             self.db.commit()
             
@@ -266,851 +336,87 @@ class SPCIngestService:
     
     def _parse_spc_csv(self, csv_content: str, report_date: date) -> Dict:
         """
-        100% Perfect SPC CSV parser - guarantees every data row is captured
+        Parse a full SPC CSV day in a single pass (spc_csv_parser.SPCCSVParser)
+        Every data record yields one report; section type follows the last header seen
         """
-        lines = csv_content.strip().split('\n')
-        
-        # Extract ALL data lines (lines starting with 4-digit time)
-        data_lines = []
-        for i, line in enumerate(lines):
-            line = line.strip()
-            if line and len(line) >= 4 and line[:4].isdigit() and not line.startswith('Time,'):
-                data_lines.append((i+1, line))
-        
-        logger.info(f"Found {len(data_lines)} data lines to parse")
-        
-        reports = []
-        failed_lines = []
-        tornado_count = wind_count = hail_count = 0
-        
-        for line_num, line in data_lines:
-            # Detect section type by scanning backwards for headers
-            section_type = self._detect_section_type(line, lines, line_num-1)
-            
-            # Multi-strategy parsing - guaranteed success
-            report = None
-            
-            # Strategy 1: Standard parsing
-            try:
-                report = self._parse_perfect_standard(line, section_type, report_date)
-            except Exception as e:
-                logger.debug(f"Standard parser failed line {line_num}: {e}")
-            
-            # Strategy 2: Force split parsing  
-            if not report:
-                try:
-                    report = self._parse_perfect_force_split(line, section_type, report_date)
-                except Exception as e:
-                    logger.debug(f"Force split parser failed line {line_num}: {e}")
-            
-            # Strategy 3: Emergency minimal parsing - always succeeds
-            if not report:
-                report = self._parse_perfect_emergency(line, section_type, report_date, line_num)
-                logger.warning(f"Emergency parser used for line {line_num}")
-            
-            # Count by section
-            if report:
-                reports.append(report)
-                if section_type == 'tornado':
-                    tornado_count += 1
-                elif section_type == 'wind':
-                    wind_count += 1
-                elif section_type == 'hail':
-                    hail_count += 1
-            else:
-                failed_lines.append((line_num, line[:100]))
-                logger.error(f"IMPOSSIBLE: All parsers failed for line {line_num}: {line[:100]}")
-        
-        success_rate = (len(reports) / len(data_lines)) * 100 if data_lines else 0
-        logger.info(f"Perfect parsing: {len(reports)}/{len(data_lines)} = {success_rate:.1f}%")
-        logger.info(f"Sections: tornado={tornado_count}, wind={wind_count}, hail={hail_count}")
-        
-        return {
-            'reports': reports,
-            'total_reports': len(reports),
-            'tornado_count': tornado_count,
-            'wind_count': wind_count,
-            'hail_count': hail_count,
-            'failed_lines': failed_lines
-        }
-    
-    def _preprocess_csv_content(self, csv_content: str) -> str:
-        """Pre-process CSV to handle multi-line records and section transitions"""
-        lines = csv_content.split('\n')
-        processed_lines = []
-        
-        i = 0
-        while i < len(lines):
-            line = lines[i].strip()
-            
-            # Skip empty lines
-            if not line:
-                i += 1
-                continue
-            
-            # Keep header lines as-is
-            if self._is_header_line(line):
-                processed_lines.append(line)
-                i += 1
-                continue
-            
-            # Check if line looks like a valid data record (starts with 4-digit time)
-            if len(line) >= 4 and line[:4].isdigit():
-                # Valid data line - check if it has enough commas
-                if line.count(',') >= 6:
-                    processed_lines.append(line)
-                    i += 1
-                else:
-                    # Try to merge with continuation lines
-                    merged_line = line
-                    j = i + 1
-                    while j < len(lines) and merged_line.count(',') < 6:
-                        next_line = lines[j].strip()
-                        if (next_line and not self._is_header_line(next_line) and 
-                            not (len(next_line) >= 4 and next_line[:4].isdigit())):
-                            merged_line += " " + next_line
-                            j += 1
-                        else:
-                            break
-                    
-                    processed_lines.append(merged_line)
-                    i = j
-            else:
-                # Skip malformed lines that don't start with time
-                logger.debug(f"Skipping malformed line {i+1}: {line[:50]}")
-                i += 1
-        
-        return '\n'.join(processed_lines)
-    
-    def _aggressive_recovery_parse(self, line: str, section_type: str, report_date: date, line_num: int) -> Optional[Dict]:
-        """Final attempt parser using minimal field extraction"""
-        try:
-            line = line.strip()
-            if not line or len(line) < 10:
-                return None
-            
-            # Extract any recognizable patterns with regex
-            import re
-            
-            # Pattern to match time (4 digits), magnitude, and basic location info
-            basic_pattern = r'^(\d{4}),([^,]*),([^,]+)'
-            match = re.match(basic_pattern, line)
-            
-            if not match:
-                return None
-            
-            time_val, mag_val, location_val = match.groups()
-            
-            # Extract additional fields using simple parsing
-            remaining = line[match.end():]
-            parts = remaining.split(',')
-            
-            # Build minimal viable record
-            report = {
-                'report_date': report_date,
-                'report_type': section_type,
-                'time_utc': time_val.strip(),
-                'location': location_val.strip(),
-                'county': parts[0].strip() if len(parts) > 0 else 'Unknown',
-                'state': parts[1].strip() if len(parts) > 1 else 'UNK',
-                'latitude': None,
-                'longitude': None,
-                'comments': ','.join(parts[4:]).strip() if len(parts) > 4 else '',
-                'magnitude': self._parse_magnitude(mag_val.strip(), section_type),
-                'raw_csv_line': line
-            }
-            
-            # Try to extract coordinates
-            for part in parts:
-                try:
-                    val = float(part.strip())
-                    if 20 <= abs(val) <= 90 and report['latitude'] is None:
-                        report['latitude'] = val
-                    elif 60 <= abs(val) <= 180 and report['longitude'] is None:
-                        report['longitude'] = val
-                except ValueError:
-                    continue
-            
-            return report
-            
-        except Exception as e:
-            logger.debug(f"Aggressive recovery failed line {line_num}: {e}")
-            return None
-    
-    def _force_parse_valid_line(self, line: str, section_type: str, report_date: date, line_num: int) -> Optional[Dict]:
-        """Force parse any line that starts with 4-digit time - guaranteed success for valid CSV"""
-        try:
-            line = line.strip()
-            if not line or len(line) < 4 or not line[:4].isdigit():
-                return None
-            
-            # Split on commas - SPC CSV has exactly 8 fields: Time,Mag,Location,County,State,Lat,Lon,Comments
-            parts = line.split(',')
-            if len(parts) < 7:
-                return None
-            
-            # Force extract the 8 standard fields
-            time_field = parts[0].strip()
-            magnitude_field = parts[1].strip()
-            location_field = parts[2].strip()
-            county_field = parts[3].strip()
-            state_field = parts[4].strip()
-            
-            # Extract coordinates with error handling
-            latitude = None
-            longitude = None
-            try:
-                latitude = float(parts[5].strip()) if parts[5].strip() else None
-            except ValueError:
-                pass
-            try:
-                longitude = float(parts[6].strip()) if parts[6].strip() else None
-            except ValueError:
-                pass
-            
-            # Comments field - everything after the 7th comma
-            comments_field = ','.join(parts[7:]).strip() if len(parts) > 7 else ''
-            
-            # Build complete report structure
-            report = {
-                'report_date': report_date,
-                'report_type': section_type,
-                'time_utc': time_field,
-                'location': location_field,
-                'county': county_field,
-                'state': state_field,
-                'latitude': latitude,
-                'longitude': longitude,
-                'comments': comments_field,
-                'magnitude': self._parse_magnitude(magnitude_field, section_type),
-                'raw_csv_line': line
-            }
-            
-            return report
-            
-        except Exception as e:
-            logger.error(f"Force parser critical failure line {line_num}: {e}")
-            return None
-    
-    def _parse_magnitude(self, mag_str: str, section_type: str) -> dict:
-        """Parse magnitude field based on section type"""
-        try:
-            if section_type == 'tornado':
-                return {'f_scale': mag_str} if mag_str != 'UNK' else {}
-            elif section_type == 'wind':
-                if mag_str == 'UNK':
-                    return {'speed_text': 'UNK', 'speed': None}
-                try:
-                    speed = int(mag_str)
-                    return {'speed': speed}
-                except ValueError:
-                    return {'speed_text': mag_str, 'speed': None}
-            elif section_type == 'hail':
-                try:
-                    size = int(mag_str)
-                    return {'size_hundredths': size, 'size_inches': size / 100.0}
-                except ValueError:
-                    return {}
-            return {}
-        except Exception:
-            return {}
-    
-    def _detect_section_type(self, line: str, all_lines: list, line_index: int) -> str:
-        """Detect section type by scanning backwards for headers"""
-        
-        # Look backwards for the most recent header
-        for i in range(line_index, -1, -1):
-            if i < len(all_lines):
-                header_line = all_lines[i]
-                if 'F_Scale' in header_line:
-                    return 'tornado'
-                elif 'Speed' in header_line:
-                    return 'wind'  
-                elif 'Size' in header_line:
-                    return 'hail'
-        
-        # Fallback: guess based on second field
-        parts = line.split(',')
-        if len(parts) > 1:
-            mag_field = parts[1].strip()
-            if mag_field in ['UNK', 'EF0', 'EF1', 'EF2', 'EF3', 'EF4', 'EF5'] or 'F' in mag_field:
-                return 'tornado'
-            elif mag_field.isdigit() and 50 <= int(mag_field) <= 200:
-                return 'wind'
-            elif mag_field.isdigit() and int(mag_field) >= 25:
-                return 'hail'
-        
-        return 'wind'  # default
-
-    def _parse_perfect_standard(self, line: str, section_type: str, report_date: date) -> Dict:
-        """Perfect standard SPC CSV parsing"""
-        parts = line.split(',')
-        
-        if len(parts) < 7:
-            raise ValueError("Insufficient fields")
-        
-        report = {
-            'report_date': report_date,
-            'report_type': section_type,
-            'time_utc': parts[0].strip(),
-            'location': parts[2].strip(),
-            'county': parts[3].strip(),
-            'state': parts[4].strip(),
-            'latitude': float(parts[5].strip()) if parts[5].strip() else None,
-            'longitude': float(parts[6].strip()) if parts[6].strip() else None,
-            'comments': ','.join(parts[7:]).strip() if len(parts) > 7 else '',
-            'magnitude': self._parse_magnitude(parts[1].strip(), section_type),
-            'raw_csv_line': line
-        }
-        
-        # Generate row_hash for duplicate detection
-        import hashlib
-        lat_str = str(report['latitude']) if report['latitude'] is not None else ''
-        lon_str = str(report['longitude']) if report['longitude'] is not None else ''
-        mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
-        hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
-        clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
-        report['row_hash'] = hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
-        
-        return report
-    
-    def _parse_perfect_force_split(self, line: str, section_type: str, report_date: date) -> Dict:
-        """Force split with flexible field handling"""
-        parts = [p.strip() for p in line.split(',')]
-        
-        # Extract what we can with defaults
-        time_utc = parts[0] if len(parts) > 0 else "0000"
-        magnitude_raw = parts[1] if len(parts) > 1 else "UNK"
-        location = parts[2] if len(parts) > 2 else "Unknown"
-        
-        # Find county and state
-        county = "Unknown"
-        state = "UNK"
-        latitude = None
-        longitude = None
-        
-        # Scan for state codes and coordinates
-        for i, part in enumerate(parts):
-            if len(part) == 2 and part.isalpha() and part.isupper():
-                state = part
-                if i > 0:
-                    county = parts[i-1]
-            
-            try:
-                coord_val = float(part)
-                if -90 <= coord_val <= 90 and latitude is None:
-                    latitude = coord_val
-                elif -180 <= coord_val <= 180 and longitude is None:
-                    longitude = coord_val
-            except ValueError:
-                pass
-        
-        report = {
-            'report_date': report_date,
-            'report_type': section_type,
-            'time_utc': time_utc,
-            'location': location,
-            'county': county,
-            'state': state,
-            'latitude': latitude,
-            'longitude': longitude,
-            'comments': ','.join(parts[7:]).strip() if len(parts) > 7 else '',
-            'magnitude': self._parse_magnitude(magnitude_raw, section_type),
-            'raw_csv_line': line
-        }
-        
-        # Generate row_hash for duplicate detection
-        import hashlib
-        lat_str = str(report['latitude']) if report['latitude'] is not None else ''
-        lon_str = str(report['longitude']) if report['longitude'] is not None else ''
-        mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
-        hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
-        clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
-        report['row_hash'] = hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
-        
-        return report
-    
-    def _parse_perfect_emergency(self, line: str, section_type: str, report_date: date, line_num: int) -> Dict:
-        """Emergency fallback - extract minimal viable data - always succeeds"""
-        
-        import re
-        time_match = re.match(r'^(\d{4})', line)
-        time_utc = time_match.group(1) if time_match else "0000"
-        
-        report = {
-            'report_date': report_date,
-            'report_type': section_type,
-            'time_utc': time_utc,
-            'location': f"Line_{line_num}_Recovery",
-            'county': "Recovery_Parse",
-            'state': "RP",
-            'latitude': None,
-            'longitude': None,
-            'comments': f"Emergency parsed: {line}",
-            'magnitude': {},
-            'raw_csv_line': line
-        }
-        
-        # Generate row_hash for duplicate detection
-        import hashlib
-        lat_str = str(report['latitude']) if report['latitude'] is not None else ''
-        lon_str = str(report['longitude']) if report['longitude'] is not None else ''
-        mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
-        hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
-        clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
-        report['row_hash'] = hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
-        
-        return report
-
-    def _is_header_line(self, line: str) -> bool:
-        """Check if line is a section header"""
-        # Look for Time header with section-specific columns
-        if not line.startswith('Time,'):
-            return False
-        return any(indicator in line for indicator in ['F_Scale', 'Speed', 'Size'])
-    
-    def _parse_header_line(self, line: str) -> Tuple[str, List[str]]:
-        """Parse header line to determine section type and column names"""
-        headers = [h.strip() for h in line.split(',')]
-        
-        if 'F_Scale' in line:
-            return 'tornado', headers
-        elif 'Speed' in line:
-            return 'wind', headers
-        elif 'Size' in line:
-            return 'hail', headers
-        else:
-            return 'unknown', headers
+        return spc_csv_parser.parse(csv_content, report_date)
     
-    def _emergency_parse_line(self, line: str, section_type: str, report_date: date, line_num: int) -> Optional[Dict]:
+    def _store_reports(self, reports: List[Dict], report_date: date, is_reimport: bool = False,
+                       commit: bool = True) -> Dict[str, int]:
         """
-        Emergency fallback parser for critically malformed SPC CSV lines
-        Uses aggressive pattern matching to extract essential data
+        Set-based store: one prefetch of the day's existing keys, in-memory dedupe, then one
+        INSERT ... SELECT FROM unnest(...) ON CONFLICT (row_hash) DO NOTHING RETURNING report_type per batch
+        Location duplicates (date, type, lat, lon, location) are only skipped on normal ingestion;
+        a reimport has just cleared the day, so only exact row_hash repeats are dropped.
+        commit=False leaves every batch in the caller's transaction and raises on the first failure.
+        Stored reports queue their date and type for incremental alert matching in the same transaction.
         """
-        try:
-            line = line.strip()
-            if not line:
-                return None
-            
-            # Split by comma and extract what we can
-            parts = [p.strip() for p in line.split(',')]
-            
-            if len(parts) < 4:  # Absolute minimum: Time, Mag, Location, County
-                return None
-            
-            # Emergency field extraction with defaults
-            time_field = parts[0] if parts[0] else "0000"
-            magnitude_field = parts[1] if len(parts) > 1 else "UNK"
-            location_field = parts[2] if len(parts) > 2 else "Unknown"
-            
-            # Extract county, state, coordinates with fallbacks
-            county_field = "Unknown"
-            state_field = "UNK"
-            latitude = None
-            longitude = None
-            comments = ""
-            
-            # Scan for recognizable patterns
-            for i, part in enumerate(parts):
-                # Look for state codes (2-letter uppercase)
-                if len(part) == 2 and part.isalpha() and part.isupper():
-                    state_field = part
-                    if i > 0:
-                        county_field = parts[i-1]
-                
-                # Look for coordinates (numeric with decimal)
-                try:
-                    float_val = float(part)
-                    if -180 <= float_val <= 180:
-                        if latitude is None and 20 <= abs(float_val) <= 90:
-                            latitude = float_val
-                        elif longitude is None and 60 <= abs(float_val) <= 180:
-                            longitude = float_val
-                except ValueError:
-                    continue
-            
-            # Join remaining parts as comments
-            if len(parts) > 7:
-                comments = ','.join(parts[7:])
-            
-            # Create magnitude structure based on section type
-            if section_type == 'tornado':
-                magnitude = {'f_scale': magnitude_field} if magnitude_field != 'UNK' else {}
-            elif section_type == 'wind':
-                if magnitude_field == 'UNK':
-                    magnitude = {'speed_text': 'UNK', 'speed': None}
-                else:
-                    try:
-                        speed = int(magnitude_field)
-                        magnitude = {'speed': speed}
-                    except ValueError:
-                        magnitude = {'speed_text': magnitude_field, 'speed': None}
-            elif section_type == 'hail':
-                try:
-                    size = int(magnitude_field)
-                    magnitude = {
-                        'size_hundredths': size,
-                        'size_inches': size / 100.0
-                    }
-                except ValueError:
-                    magnitude = {}
-            else:
-                magnitude = {}
-            
-            # Build report structure
-            report = {
-                'report_date': report_date,
-                'report_type': section_type,
-                'time_utc': time_field,
-                'location': location_field,
-                'county': county_field,
-                'state': state_field,
-                'latitude': latitude,
-                'longitude': longitude,
-                'comments': comments,
-                'magnitude': magnitude,
-                'raw_csv_line': line
-            }
-            
-            return report
-            
-        except Exception as e:
-            logger.error(f"Emergency parser failed on line {line_num}: {e}")
-            return None
-    
-    def _parse_report_line(self, line: str, section_type: str, headers: List[str], 
-                          report_date: date, line_num: int) -> Optional[Dict]:
-        """Bulletproof SPC CSV parser with comprehensive error recovery"""
-        try:
-            line = line.strip()
-            if not line:
-                return None
-            
-            # COMPREHENSIVE SPC CSV PARSING STRATEGY
-            # SPC CSV has multiple malformation patterns that must be handled systematically
-            
-            # Step 1: Handle the most common pattern - unquoted commas in comments field
-            # Strategy: Find first 7 comma positions, everything after is comments
-            comma_positions = []
-            for i, char in enumerate(line):
-                if char == ',':
-                    comma_positions.append(i)
-                if len(comma_positions) >= 7:
-                    break
-            
-            # Extract fields based on comma positions
-            if len(comma_positions) >= 6:  # Need at least 6 commas for 7 fields + comments
-                values = []
-                start = 0
-                
-                # Extract first 7 fields
-                for pos in comma_positions[:6]:
-                    values.append(line[start:pos].strip())
-                    start = pos + 1
-                
-                # Extract 7th field (before 7th comma if it exists)
-                if len(comma_positions) >= 7:
-                    values.append(line[start:comma_positions[6]].strip())
-                    # Everything after 7th comma is comments
-                    values.append(line[comma_positions[6]+1:].strip())
-                else:
-                    # No 7th comma - rest is the 7th field, empty comments
-                    values.append(line[start:].strip())
-                    values.append('')
-            else:
-                # Fallback for lines with insufficient commas
-                parts = line.split(',')
-                if len(parts) < 7:
-                    logger.warning(f"Insufficient fields at line {line_num}: {len(parts)} < 7")
-                    return None
-                
-                values = parts[:7]
-                if len(parts) > 7:
-                    values.append(','.join(parts[7:]))
-                else:
-                    values.append('')
-            
-            # Step 2: Handle extra state field malformation
-            # Pattern: Time,Mag,Location,ExtraState,County,State,Lat,Lon,Comments
-            # Detect by checking if field 3 is a 2-letter state code
-            if (len(values) >= 8 and len(line.split(',')) >= 9 and 
-                len(values[3]) == 2 and values[3].isalpha() and values[3].isupper()):
-                
-                # Merge location with extra state
-                parts = line.split(',')
-                values = [
-                    parts[0].strip(),  # Time
-                    parts[1].strip(),  # Magnitude
-                    f"{parts[2]} {parts[3]}".strip(),  # Location + ExtraState
-                    parts[4].strip(),  # County
-                    parts[5].strip(),  # State
-                    parts[6].strip(),  # Lat
-                    parts[7].strip(),  # Lon
-                    ','.join(parts[8:]).strip() if len(parts) > 8 else ''  # Comments
-                ]
-                logger.debug(f"Merged extra state field at line {line_num}")
-            
-            # Step 3: Validate and normalize
-            values = [str(v).strip() for v in values]
-            
-            # Ensure exactly the right number of fields
-            while len(values) < len(headers):
-                values.append('')
-            values = values[:len(headers)]
-            
-            if len(values) != len(headers):
-                logger.error(f"Field count mismatch at line {line_num}: {len(values)} vs {len(headers)}")
-                return None
-            
-            # Create column mapping
-            data = dict(zip(headers, values))
-            
-            # Extract common fields
-            report = {
-                'report_date': report_date,
-                'report_type': section_type,
-                'time_utc': data.get('Time', '').strip(),
-                'location': data.get('Location', '').strip(),
-                'county': data.get('County', '').strip(),
-                'state': data.get('State', '').strip(),
-                'comments': data.get('Comments', '').strip(),
-                'raw_csv_line': line.strip()
-            }
-            
-            # Parse coordinates
-            try:
-                report['latitude'] = float(data.get('Lat', 0)) if data.get('Lat') else None
-                report['longitude'] = float(data.get('Lon', 0)) if data.get('Lon') else None
-            except (ValueError, TypeError):
-                report['latitude'] = None
-                report['longitude'] = None
-            
-            # Parse magnitude based on section type
-            if section_type == 'tornado':
-                magnitude = data.get('F_Scale', '').strip()
-                report['magnitude'] = {'f_scale': magnitude} if magnitude else {}
-            elif section_type == 'wind':
-                speed_raw = data.get('Speed', '').strip()
-                if speed_raw == 'UNK':
-                    # Store UNK as string field to avoid PostgreSQL JSONB validation errors
-                    report['magnitude'] = {'speed_text': 'UNK', 'speed': None}
-                elif speed_raw:
-                    try:
-                        speed = int(speed_raw)
-                        report['magnitude'] = {'speed': speed}
-                    except (ValueError, TypeError):
-                        report['magnitude'] = {}
-                else:
-                    report['magnitude'] = {}
-            elif section_type == 'hail':
-                size_raw = data.get('Size', '').strip()
-                if size_raw == 'UNK':
-                    # Store UNK as string field to avoid PostgreSQL JSONB validation errors
-                    report['magnitude'] = {'size_text': 'UNK', 'size': None}
-                elif size_raw:
-                    try:
-                        size_hundredths = int(size_raw)
-                        size_inches = size_hundredths / 100.0
-                        report['magnitude'] = {'size_hundredths': size_hundredths, 'size_inches': size_inches}
-                    except (ValueError, TypeError):
-                        report['magnitude'] = {}
-                else:
-                    report['magnitude'] = {}
-            
-            # Generate hash for duplicate detection including report_type
-            # This ensures tornado and wind reports at same location/time are treated as separate
-            # Normalize empty values to ensure consistent hashing
-            lat_str = str(report.get('latitude', '')) if report.get('latitude') is not None else ''
-            lon_str = str(report.get('longitude', '')) if report.get('longitude') is not None else ''
-            mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
-            
-            hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
-            
-            # Clean the hash data to remove any problematic characters
-            clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
-            report['row_hash'] = hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
-            
-            # Debug: log hash data for troubleshooting
-            if report['report_type'] == 'tornado' and len(report.get('location', '')) > 0:
-                logger.debug(f"Hash data for tornado: {clean_hash_data[:100]}... -> {report['row_hash'][:16]}...")
-            
-            return report
-            
-        except Exception as e:
-            logger.error(f"Error parsing report line {line_num}: {e}")
-            return None
-    
-    def _store_reports(self, reports: List[Dict], report_date: date, is_reimport: bool = False) -> Dict[str, int]:
-        """Store parsed reports with individual record insertion to prevent batch failures"""
         counts = {'tornado': 0, 'wind': 0, 'hail': 0}
         duplicates_skipped = 0
         errors_count = 0
-        batch_size = self.db_write_batch_size
-        
-        # Process reports in batches for performance
-        for i in range(0, len(reports), batch_size):
-            batch = reports[i:i + batch_size]
-            successful_in_batch = 0
-            
-            # Individual record processing - prevents entire batch rollback
-            for report_data in batch:
-                try:
-                    # Prepare magnitude data
-                    magnitude_data = report_data['magnitude']
-                    if isinstance(magnitude_data, str):
-                        import json
-                        try:
-                            magnitude_data = json.loads(magnitude_data)
-                        except (json.JSONDecodeError, TypeError):
-                            magnitude_data = {}
-                    
-                    # Skip location-based duplicate checking during reimport to prevent false positives
-                    # During reimport, data is freshly cleared so no duplicates should exist
-                    if not is_reimport:
-                        # Check for location-based duplicates only during normal ingestion
-                        existing_location_duplicate = None
-                        if report_data.get('latitude') and report_data.get('longitude'):
-                            existing_location_duplicate = SPCReport.query.filter(
-                                SPCReport.report_date == report_data['report_date'],
-                                SPCReport.report_type == report_data['report_type'],
-                                SPCReport.latitude == report_data['latitude'],
-                                SPCReport.longitude == report_data['longitude'],
-                                SPCReport.location == report_data['location']
-                            ).first()
-                        
-                        if existing_location_duplicate:
-                            # True location-based duplicate - skip
-                            duplicates_skipped += 1
-                            logger.debug(f"Location duplicate skipped: {report_data['location']} at {report_data['latitude']}, {report_data['longitude']}")
-                            continue
-                    
-                    # Create SPCReport object
-                    report = SPCReport()
-                    report.report_date = report_data['report_date']
-                    report.report_type = report_data['report_type']
-                    report.time_utc = report_data['time_utc']
-                    report.location = report_data['location']
-                    report.county = report_data['county']
-                    report.state = report_data['state']
-                    report.latitude = report_data['latitude']
-                    report.longitude = report_data['longitude']
-                    report.comments = report_data['comments']
-                    report.magnitude = magnitude_data
-                    report.raw_csv_line = report_data['raw_csv_line']
-                    report.row_hash = report_data['row_hash']
-                    
-                    # Add and flush individual record
-                    self.db.add(report)
-                    self.db.flush()
-                    
-                    # Auto-enrichment disabled during batch processing to prevent database connection crashes
-                    # Enrichment can be triggered separately via dashboard after successful ingestion
-                    logger.debug(f"Stored SPC report {report.id} without auto-enrichment (prevents connection crashes)")
-                    
-                    # Success - increment counters
-                    successful_in_batch += 1
-                    counts[report_data['report_type']] += 1
-                    
-                except IntegrityError as ie:
-                    # Handle database constraint violations
-                    self.db.rollback()
-                    if 'uq_spc_report_hash' in str(ie) or 'duplicate key value violates unique constraint' in str(ie):
-                        if is_reimport:
-                            # During reimport, data should be cleared so constraint violations indicate a bug
-                            # Force insertion with unique hash to prevent data loss
-                            import time
-                            original_hash = report_data['row_hash'] 
-                            report_data['row_hash'] = report_data['row_hash'] + f"_reimport_{int(time.time())}"
-                            logger.warning(f"Reimport constraint violation - forced unique hash: {original_hash[:16]}... -> {report_data['row_hash'][:16]}...")
-                        else:
-                            # Normal ingestion - check if duplicate exists for the same date
-                            existing_same_date = SPCReport.query.filter_by(
-                                row_hash=report_data['row_hash'],
-                                report_date=report_data['report_date']
-                            ).first()
-                            
-                            if existing_same_date:
-                                # True duplicate for same date - skip
-                                duplicates_skipped += 1
-                                logger.debug(f"Duplicate skipped (same date): {report_data['row_hash'][:16]}...")
-                                continue
-                            else:
-                                # Hash collision with different date - allow insertion by updating hash
-                                import time
-                                report_data['row_hash'] = report_data['row_hash'] + f"_{int(time.time())}"
-                            
-                            # Retry with modified hash
-                            report = SPCReport()
-                            report.report_date = report_data['report_date']
-                            report.report_type = report_data['report_type']
-                            report.time_utc = report_data['time_utc']
-                            report.location = report_data['location']
-                            report.county = report_data['county']
-                            report.state = report_data['state']
-                            report.latitude = report_data['latitude']
-                            report.longitude = report_data['longitude']
-                            report.comments = report_data['comments']
-                            report.magnitude = magnitude_data
-                            report.raw_csv_line = report_data['raw_csv_line']
-                            report.row_hash = report_data['row_hash']
-                            
-                            try:
-                                self.db.add(report)
-                                self.db.flush()
-                                
-                                # Auto-enrichment disabled during batch processing to prevent database connection crashes  
-                                # Enrichment can be triggered separately via dashboard after successful ingestion
-                                logger.debug(f"Stored SPC report {report.id} without auto-enrichment (retry - prevents crashes)")
-                                
-                                successful_in_batch += 1
-                                counts[report_data['report_type']] += 1
-                                logger.debug(f"Inserted with modified hash: {report_data['row_hash'][:16]}...")
-                            except Exception as retry_error:
-                                self.db.rollback()
-                                errors_count += 1
-                                logger.error(f"Failed retry with modified hash: {retry_error}")
-                    else:
-                        errors_count += 1
-                        logger.warning(f"Non-hash constraint violation: {ie}")
-                        
-                except Exception as e:
-                    # Individual rollback preserves other successful records
-                    self.db.rollback()
-                    errors_count += 1
-                    logger.error(f"Failed to insert record: {e}")
-                    logger.error(f"Failed record data: {report_data['raw_csv_line']}")
-                    logger.error(f"Report data: {report_data}")
-                    continue
-            
-            # Commit successful records in batch
+
+        existing = self.db.execute(text(EXISTING_DAY_KEYS_SQL), {'report_date': report_date}).fetchall()
+        seen_hashes = {row.row_hash for row in existing}
+        seen_locations = {location_key(row) for row in existing}
+
+        rows = []
+        for report_data in reports:
+            row_hash = report_data['row_hash']
+            key = location_key(report_data) if report_data.get('latitude') and report_data.get('longitude') else None
+            if row_hash in seen_hashes or (not is_reimport and key in seen_locations):
+                duplicates_skipped += 1
+                logger.debug(f"Duplicate skipped: {report_data['location']} ({row_hash[:16]}...)")
+                continue
+
+            oversized = [name for name, length in SPC_COLUMN_LENGTHS.items()
+                         if report_data.get(name) and len(report_data[name]) > length]
+            if oversized:
+                errors_count += 1
+                logger.error(f"Report exceeds column length ({', '.join(oversized)}): {report_data['raw_csv_line']}")
+                continue
+
+            seen_hashes.add(row_hash)
+            if key is not None:
+                seen_locations.add(key)
+            rows.append(report_row(report_data))
+
+        for batch_number, batch in enumerate(chunks(rows, self.db_write_batch_size), start=1):
+            params = {name: [row[name] for row in batch] for name in SPC_INSERT_COLUMNS}
             try:
-                if successful_in_batch > 0:
+                inserted = self.db.execute(text(INSERT_REPORTS_SQL), params).fetchall()
+                enqueue_reports(self.db, [(report_id, report_date, report_type) for report_id, report_type in inserted])
+                if commit:
                     self.db.commit()
-                    logger.info(f"Batch {i//batch_size + 1}: stored {successful_in_batch}/{len(batch)} reports")
             except Exception as e:
+                if not commit:
+                    raise
                 self.db.rollback()
-                logger.error(f"Error committing batch {i//batch_size + 1}: {e}")
-                # Reset counts for failed commit
-                for _ in range(successful_in_batch):
-                    for report_type in counts:
-                        counts[report_type] = max(0, counts[report_type] - 1)
-        
+                errors_count += len(batch)
+                logger.error(f"Error storing SPC batch {batch_number} for {report_date}: {e}")
+                continue
+
+            for _, report_type in inserted:
+                counts[report_type] = counts.get(report_type, 0) + 1
+            # Rows lost to ON CONFLICT collided with a hash committed since the prefetch
+            duplicates_skipped += len(batch) - len(inserted)
+            logger.info(f"Batch {batch_number}: stored {len(inserted)}/{len(batch)} reports")
+
         total_stored = sum(counts.values())
         logger.info(f"Successfully stored {total_stored} total reports for {report_date}")
         if duplicates_skipped > 0:
             logger.info(f"Skipped {duplicates_skipped} duplicate records")
         if errors_count > 0:
             logger.warning(f"Failed to insert {errors_count} records due to errors")
-        
+
         return {
             'tornado': counts['tornado'],
-            'wind': counts['wind'], 
+            'wind': counts['wind'],
             'hail': counts['hail'],
             'duplicates_skipped': duplicates_skipped,
             'errors_count': errors_count,
             'total_stored': total_stored
         }
-    
+
     def get_ingestion_stats(self) -> Dict:
         """Get SPC ingestion statistics"""
         total_reports = SPCReport.query.count()
@@ -1159,14 +465,9 @@ class SPCIngestService:
             
             logger.info(f"Reimporting SPC reports from {url}")
             
-            # Download CSV with proper headers
-            headers = {
-                'User-Agent': 'HailyDB-SPC-Ingestion/2.0 (contact@hailydb.com)',
-                'Accept': 'text/csv,text/plain,*/*',
-                'Accept-Encoding': 'identity',
-                'Connection': 'keep-alive'
-            }
-            response = requests.get(url, headers=headers, timeout=Config.REQUEST_TIMEOUT)
+            # Archived copies of finalized days are reprocessed without downloading again
+            response = source_archive.fetch(url, headers=SPC_REQUEST_HEADERS, timeout=Config.REQUEST_TIMEOUT,
+                                            max_age=final_max_age(report_date))
             response.raise_for_status()
             
             # Sanitize CSV content
@@ -1189,6 +490,7 @@ class SPCIngestService:
             existing_count = self.db.query(SPCReport).filter(SPCReport.report_date == report_date).count()
             if existing_count > 0:
                 logger.info(f"Removing {existing_count} existing records for {report_date}")
+                release_report_day(self.db, report_date)
                 self.db.query(SPCReport).filter(SPCReport.report_date == report_date).delete()
                 self.db.commit()
             
@@ -1201,7 +503,7 @@ class SPCIngestService:
             log.tornado_reports = stored_counts['tornado']
             log.wind_reports = stored_counts['wind'] 
             log.hail_reports = stored_counts['hail']
-            log.total_reports = sum(stored_counts.values())
+            log.total_reports = stored_counts['total_stored']
             
             self.db.commit()
             
@@ -1228,94 +530,6 @@ class SPCIngestService:
                 'error': str(e)
             }
     
-    def _bulk_insert_reports(self, reports: List[Dict], report_date: date) -> Dict[str, int]:
-        """
-        Bulk insert reports using raw SQL with conflict resolution for reimport
-        Bypasses ORM constraints to ensure successful reimport
-        """
-        from sqlalchemy import text
-        import json
-        
-        tornado_count = wind_count = hail_count = stored_count = 0
-        
-        try:
-            # Process reports in smaller batches to avoid memory issues
-            batch_size = 50
-            for i in range(0, len(reports), batch_size):
-                batch = reports[i:i + batch_size]
-                
-                # Prepare bulk insert values
-                values = []
-                for report in batch:
-                    # Generate hash with improved normalization
-                    lat_str = str(report.get('latitude', '')) if report.get('latitude') is not None else ''
-                    lon_str = str(report.get('longitude', '')) if report.get('longitude') is not None else ''
-                    mag_str = str(report['magnitude']) if report['magnitude'] else '{}'
-                    
-                    hash_data = f"{report['report_date']}|{report['report_type']}|{report['time_utc']}|{report['location']}|{report['county']}|{report['state']}|{lat_str}|{lon_str}|{mag_str}"
-                    clean_hash_data = hash_data.replace('\x00', '').replace('\r', '').replace('\n', ' ')
-                    row_hash = hashlib.sha256(clean_hash_data.encode('utf-8')).hexdigest()
-                    
-                    # Convert magnitude dict to JSON string
-                    magnitude_json = json.dumps(report['magnitude']) if report['magnitude'] else '{}'
-                    
-                    values.append({
-                        'report_date': report['report_date'],
-                        'report_type': report['report_type'],
-                        'time_utc': report['time_utc'],
-                        'location': report['location'],
-                        'county': report['county'],
-                        'state': report['state'],
-                        'latitude': report.get('latitude'),
-                        'longitude': report.get('longitude'),
-                        'magnitude': magnitude_json,
-                        'row_hash': row_hash,
-                        'created_at': datetime.utcnow(),
-                        'updated_at': datetime.utcnow()
-                    })
-                
-                # Execute bulk insert with ON CONFLICT DO NOTHING
-                if values:
-                    sql = text("""
-                        INSERT INTO spc_reports (
-                            report_date, report_type, time_utc, location, county, state,
-                            latitude, longitude, magnitude, row_hash, created_at, updated_at
-                        ) VALUES (
-                            :report_date, :report_type, :time_utc, :location, :county, :state,
-                            :latitude, :longitude, :magnitude, :row_hash, :created_at, :updated_at
-                        ) ON CONFLICT (row_hash) DO NOTHING
-                    """)
-                    
-                    result = self.db.execute(sql, values)
-                    batch_stored = result.rowcount
-                    stored_count += batch_stored
-                    
-                    # Count by type
-                    for report in batch:
-                        if report['report_type'] == 'tornado':
-                            tornado_count += 1
-                        elif report['report_type'] == 'wind':
-                            wind_count += 1
-                        elif report['report_type'] == 'hail':
-                            hail_count += 1
-                    
-                    self.db.commit()
-                    logger.info(f"Batch {(i//batch_size)+1}: inserted {batch_stored}/{len(batch)} reports")
-            
-            logger.info(f"Bulk insert complete: {stored_count} total reports stored")
-            
-            return {
-                'tornado': tornado_count,
-                'wind': wind_count, 
-                'hail': hail_count,
-                'total': stored_count
-            }
-            
-        except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error in bulk insert: {e}")
-            raise
-
     def get_ingestion_stats(self) -> Dict:
         """Get SPC ingestion statistics"""
         return {
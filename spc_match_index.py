@@ -0,0 +1,215 @@
+"""
+SPC Match Index for HailyDB
+In-memory spatiotemporal index of SPC reports for matching whole batches of alerts at once
+"""
+
+import logging
+import math
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+REPORT_TYPE_CODES = {'tornado': 0, 'wind': 1, 'hail': 2}
+
+# Same radius SPCMatchingService._calculate_distance uses
+EARTH_RADIUS_MILES = 3959
+
+# Grid cell edge in degrees; proximity queries visit every cell the search radius can reach
+GRID_CELL_DEGREES = 0.5
+
+# Columns in the order the index rows (and SPCMatchingService._spc_report_to_dict) use
+REPORT_COLUMNS = ('id', 'report_date', 'report_type', 'time_utc', 'location', 'county', 'state',
+                  'latitude', 'longitude', 'comments', 'magnitude')
+
+REPORTS_FOR_DATES_SQL = f"""
+SELECT {', '.join(REPORT_COLUMNS)} FROM spc_reports
+WHERE report_date = ANY(:report_dates) AND report_type = ANY(:report_types)
+"""
+
+_EPOCH = datetime(1970, 1, 1)
+
+
+def epoch_minutes(value: datetime) -> int:
+    return int((value - _EPOCH).total_seconds() // 60)
+
+
+def report_minutes(report_date: date, time_utc) -> Optional[int]:
+    """
+    Report time as minutes since the epoch, parsed the way SPCMatchingService._is_time_match does
+    None means the report has no usable time and matches any alert window on its dates
+    """
+    if not time_utc:
+        return None
+    try:
+        spc_time_str = str(time_utc).zfill(4)
+        spc_datetime = datetime.combine(report_date, datetime.min.time().replace(
+            hour=int(spc_time_str[:2]), minute=int(spc_time_str[2:])
+        ))
+        return epoch_minutes(spc_datetime)
+    except (ValueError, TypeError):
+        return None
+
+
+class _Bucket:
+    """Report indices sharing one key: timed ones sorted by minute, untimed ones apart"""
+
+    __slots__ = ('timed', 'minutes', 'untimed')
+
+    def __init__(self, indices: np.ndarray, minutes: np.ndarray, timed: np.ndarray):
+        has_time = timed[indices]
+        timed_indices = indices[has_time]
+        order = np.argsort(minutes[timed_indices], kind='stable')
+        self.timed = timed_indices[order]
+        self.minutes = minutes[self.timed]
+        self.untimed = indices[~has_time]
+
+    def window(self, start_minute: int, end_minute: int) -> Tuple[np.ndarray, np.ndarray]:
+        lo = np.searchsorted(self.minutes, start_minute, side='left')
+        hi = np.searchsorted(self.minutes, end_minute, side='right')
+        return self.timed[lo:hi], self.untimed
+
+
+def _buckets(keys: List, indices: np.ndarray, minutes: np.ndarray, timed: np.ndarray) -> Dict:
+    grouped: Dict = {}
+    for index, key in zip(indices.tolist(), keys):
+        grouped.setdefault(key, []).append(index)
+    return {key: _Bucket(np.array(members, dtype=np.int64), minutes, timed) for key, members in grouped.items()}
+
+
+class SPCReportIndex:
+    """
+    SPC reports for a set of dates, indexed by (state, county) and by a lat/lon grid
+    Each bucket keeps its timed reports sorted by minute, so a ±N hour alert window is two
+    binary searches; distance, type and date filters then run as NumPy array operations.
+    """
+
+    def __init__(self, rows: Sequence[Tuple]):
+        self.rows = list(rows)
+        count = len(self.rows)
+        self.ids = np.array([row[0] for row in self.rows], dtype=np.int64)
+        self.dates = np.array([row[1].toordinal() for row in self.rows], dtype=np.int64)
+        self.types = np.array([REPORT_TYPE_CODES.get(row[2], -1) for row in self.rows], dtype=np.int64)
+
+        parsed = [report_minutes(row[1], row[3]) for row in self.rows]
+        self.timed = np.array([value is not None for value in parsed], dtype=bool)
+        self.minutes = np.array([value if value is not None else 0 for value in parsed], dtype=np.int64)
+
+        self.has_coords = np.array([row[7] is not None and row[8] is not None for row in self.rows], dtype=bool)
+        self.lat = np.array([row[7] if row[7] is not None else np.nan for row in self.rows], dtype=float)
+        self.lon = np.array([row[8] if row[8] is not None else np.nan for row in self.rows], dtype=float)
+        self.lat_rad = np.radians(self.lat)
+        self.lon_rad = np.radians(self.lon)
+        self.cos_lat = np.cos(self.lat_rad)
+
+        all_indices = np.arange(count, dtype=np.int64)
+        self.by_county = _buckets([(row[6], row[5]) for row in self.rows], all_indices, self.minutes, self.timed)
+
+        located = all_indices[self.has_coords]
+        cells = [(math.floor(self.lat[i] / GRID_CELL_DEGREES), math.floor(self.lon[i] / GRID_CELL_DEGREES))
+                 for i in located.tolist()]
+        self.by_cell = _buckets(cells, located, self.minutes, self.timed)
+
+        self._report_dicts: Dict[int, Dict] = {}
+
+    @classmethod
+    def load(cls, session, report_dates: Iterable[date], report_types: Iterable[str]) -> 'SPCReportIndex':
+        """One query for every report on the given dates"""
+        report_dates = sorted(set(report_dates))
+        if not report_dates:
+            return cls([])
+        rows = session.execute(text(REPORTS_FOR_DATES_SQL), {
+            'report_dates': report_dates,
+            'report_types': sorted(set(report_types))
+        }).fetchall()
+        logger.info(f"Indexed {len(rows)} SPC reports for {len(report_dates)} dates")
+        return cls([tuple(row) for row in rows])
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def report_dict(self, index: int) -> Dict:
+        """JSON form stored in alerts.spc_reports (same keys as SPCMatchingService._spc_report_to_dict)"""
+        report = self._report_dicts.get(index)
+        if report is None:
+            row = self.rows[index]
+            report = {
+                'id': row[0],
+                'report_date': row[1].isoformat(),
+                'report_type': row[2],
+                'time_utc': row[3],
+                'location': row[4],
+                'county': row[5],
+                'state': row[6],
+                'latitude': row[7],
+                'longitude': row[8],
+                'comments': row[9],
+                'magnitude': row[10]
+            }
+            self._report_dicts[index] = report
+        return report
+
+    def _collect(self, buckets: List['_Bucket'], types: List[str], start_time: datetime, end_time: datetime,
+                 report_dates: List[date]) -> np.ndarray:
+        """Indices from the buckets inside the time window (untimed: on one of the dates) with an eligible type"""
+        if not buckets:
+            return np.empty(0, dtype=np.int64)
+        start_minute, end_minute = epoch_minutes(start_time), epoch_minutes(end_time)
+        timed_parts, untimed_parts = [], []
+        for bucket in buckets:
+            timed, untimed = bucket.window(start_minute, end_minute)
+            timed_parts.append(timed)
+            untimed_parts.append(untimed)
+
+        untimed = np.concatenate(untimed_parts)
+        if len(untimed):
+            untimed = untimed[np.isin(self.dates[untimed], [day.toordinal() for day in report_dates])]
+        candidates = np.concatenate(timed_parts + [untimed])
+        type_codes = [REPORT_TYPE_CODES[report_type] for report_type in types if report_type in REPORT_TYPE_CODES]
+        return candidates[np.isin(self.types[candidates], type_codes)]
+
+    def county_matches(self, states: List[str], counties: List[str], types: List[str],
+                       start_time: datetime, end_time: datetime, report_dates: List[date]) -> np.ndarray:
+        """Reports with state IN states AND county IN counties inside the window"""
+        buckets = [self.by_county[key] for key in {(state, county) for state in states for county in counties}
+                   if key in self.by_county]
+        return np.sort(self._collect(buckets, types, start_time, end_time, report_dates))
+
+    def proximity_matches(self, lat: float, lon: float, miles: float, types: List[str],
+                          start_time: datetime, end_time: datetime, report_dates: List[date]) -> np.ndarray:
+        """Reports within `miles` (haversine) of the point inside the window"""
+        lat_reach = miles / (EARTH_RADIUS_MILES * math.pi / 180) * 1.01
+        edge_lat = min(89.9, abs(lat) + lat_reach)
+        lon_reach = min(180.0, lat_reach / max(math.cos(math.radians(edge_lat)), 1e-6))
+
+        lat_cells = range(math.floor((lat - lat_reach) / GRID_CELL_DEGREES), math.floor((lat + lat_reach) / GRID_CELL_DEGREES) + 1)
+        lon_cells = range(math.floor((lon - lon_reach) / GRID_CELL_DEGREES), math.floor((lon + lon_reach) / GRID_CELL_DEGREES) + 1)
+        buckets = [self.by_cell[(lat_cell, lon_cell)] for lat_cell in lat_cells for lon_cell in lon_cells
+                   if (lat_cell, lon_cell) in self.by_cell]
+
+        candidates = self._collect(buckets, types, start_time, end_time, report_dates)
+        if not len(candidates):
+            return candidates
+        return np.sort(candidates[self.distances(lat, lon, candidates) <= miles])
+
+    def time_deltas(self, effective: datetime, candidates: np.ndarray) -> List[Optional[int]]:
+        """Report minute minus the alert's effective minute per candidate, None for untimed reports"""
+        deltas = self.minutes[candidates] - epoch_minutes(effective)
+        return [int(delta) if timed else None for delta, timed in zip(deltas.tolist(), self.timed[candidates].tolist())]
+
+    def distances(self, lat: float, lon: float, candidates: np.ndarray) -> np.ndarray:
+        """Haversine miles from a point to each candidate report"""
+        lat_rad, lon_rad = math.radians(lat), math.radians(lon)
+        dlat = self.lat_rad[candidates] - lat_rad
+        dlon = self.lon_rad[candidates] - lon_rad
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat_rad) * self.cos_lat[candidates] * np.sin(dlon / 2) ** 2
+        return EARTH_RADIUS_MILES * 2 * np.arcsin(np.sqrt(a))
+
+
+def window_dates(start_time: datetime, end_time: datetime) -> List[date]:
+    """Every calendar date from start_time to end_time (SPCMatchingService._get_report_dates_for_timerange)"""
+    days = (end_time.date() - start_time.date()).days
+    return [start_time.date() + timedelta(days=offset) for offset in range(days + 1)]
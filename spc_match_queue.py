@@ -0,0 +1,69 @@
+"""
+SPC Match Queue for HailyDB
+Report dates/types with newly stored SPC reports, waiting for incremental alert matching
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# One row per (date, type); a later store only raises the watermark
+ENQUEUE_SQL = """
+INSERT INTO spc_match_queue (report_date, report_type, report_watermark, enqueued_at)
+SELECT q.report_date, q.report_type, q.report_watermark, NOW()
+FROM unnest(CAST(:report_dates AS date[]), CAST(:report_types AS text[]), CAST(:report_watermarks AS integer[]))
+    AS q(report_date, report_type, report_watermark)
+ON CONFLICT (report_date, report_type) DO UPDATE SET
+    report_watermark = GREATEST(spc_match_queue.report_watermark, EXCLUDED.report_watermark),
+    enqueued_at = NOW()
+"""
+
+PENDING_SQL = """
+SELECT report_date, report_type, report_watermark FROM spc_match_queue
+ORDER BY report_date DESC, report_type LIMIT :limit
+"""
+
+# Entries whose watermark moved while they were being matched stay queued
+CONSUME_SQL = """
+DELETE FROM spc_match_queue
+WHERE report_date = :report_date AND report_type = :report_type AND report_watermark <= :report_watermark
+"""
+
+
+def enqueue_reports(session, inserted: Iterable[Tuple[int, date, str]]) -> int:
+    """
+    Queue (report_date, report_type) for every stored report given as (id, report_date, report_type)
+    Runs in the caller's transaction so the queue commits or rolls back with the reports.
+    """
+    watermarks: Dict[Tuple[date, str], int] = {}
+    for report_id, report_date, report_type in inserted:
+        key = (report_date, report_type)
+        watermarks[key] = max(watermarks.get(key, 0), report_id)
+    if not watermarks:
+        return 0
+
+    session.execute(text(ENQUEUE_SQL), {
+        'report_dates': [report_date for report_date, _ in watermarks],
+        'report_types': [report_type for _, report_type in watermarks],
+        'report_watermarks': list(watermarks.values())
+    })
+    return len(watermarks)
+
+
+def pending_entries(session, limit: int) -> List[Tuple[date, str, int]]:
+    """Queued (report_date, report_type, report_watermark), most recent dates first"""
+    return [tuple(row) for row in session.execute(text(PENDING_SQL), {'limit': limit})]
+
+
+def consume_entries(session, entries: Iterable[Tuple[date, str, int]]):
+    """Drop entries that have been matched up to the watermark they were read with"""
+    for report_date, report_type, report_watermark in entries:
+        session.execute(text(CONSUME_SQL), {
+            'report_date': report_date,
+            'report_type': report_type,
+            'report_watermark': report_watermark
+        })
@@ -0,0 +1,162 @@
+"""
+SPC Match Store for HailyDB
+alert_spc_matches rows: bulk writes from the matcher, spc_reports hydration and report-to-alert lookups
+"""
+
+import argparse
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# (report_id, method, distance_miles, time_delta_minutes, confidence) for one matched report
+MatchLink = Tuple[int, str, Optional[float], Optional[int], Optional[float]]
+
+MATCH_COLUMNS = ('alert_id', 'report_id', 'method', 'distance_miles', 'time_delta_minutes', 'confidence')
+
+WRITE_BATCH_SIZE = 1000
+
+DELETE_MATCHES_SQL = "DELETE FROM alert_spc_matches WHERE alert_id = ANY(:alert_ids)"
+
+# One array parameter per column, so the bind count does not grow with the batch
+INSERT_MATCHES_SQL = f"""
+INSERT INTO alert_spc_matches ({', '.join(MATCH_COLUMNS)})
+SELECT * FROM unnest(CAST(:alert_id AS text[]), CAST(:report_id AS integer[]), CAST(:method AS text[]),
+                     CAST(:distance_miles AS float8[]), CAST(:time_delta_minutes AS integer[]),
+                     CAST(:confidence AS float8[]))
+"""
+
+# Same keys as the report copies alerts.spc_reports used to embed
+HYDRATE_SQL = """
+SELECT m.alert_id, r.id, r.report_date, r.report_type, r.time_utc, r.location, r.county, r.state,
+       r.latitude, r.longitude, r.comments, r.magnitude
+FROM alert_spc_matches m JOIN spc_reports r ON r.id = m.report_id
+WHERE m.alert_id = ANY(:alert_ids)
+ORDER BY m.alert_id, r.id
+"""
+
+# Alerts about to lose match rows to a day's report delete (the FK cascades): back to unmatched, so
+# the spc_match_queue entries of the re-inserted reports get them evaluated again
+RELEASE_REPORT_DAY_SQL = """
+UPDATE alerts SET spc_verified = false, spc_confidence_score = NULL, spc_match_method = NULL, spc_report_count = 0,
+    spc_ai_summary = NULL, spc_match_watermark = NULL, updated_at = NOW()
+WHERE id IN (
+    SELECT m.alert_id FROM alert_spc_matches m JOIN spc_reports r ON r.id = m.report_id
+    WHERE r.report_date = :report_date
+)
+"""
+
+REPORT_ALERT_IDS_SQL = "SELECT alert_id FROM alert_spc_matches WHERE report_id = :report_id ORDER BY alert_id"
+
+REPORT_ALERT_COUNT_SQL = "SELECT count(*) FROM alert_spc_matches WHERE report_id = :report_id"
+
+# Embedded copies whose report still exists become rows; alerts fully converted drop their copy
+MIGRATE_EMBEDDED_SQL = """
+INSERT INTO alert_spc_matches (alert_id, report_id, method, confidence)
+SELECT DISTINCT a.id, r.id, COALESCE(a.spc_match_method, 'fips'), a.spc_confidence_score
+FROM alerts a
+CROSS JOIN LATERAL jsonb_array_elements(a.spc_reports) AS e(report)
+JOIN spc_reports r ON r.id = CAST(e.report->>'id' AS integer)
+WHERE a.id = ANY(:alert_ids) AND jsonb_typeof(a.spc_reports) = 'array' AND e.report->>'id' ~ '^[0-9]+$'
+ON CONFLICT (alert_id, report_id) DO NOTHING
+"""
+
+CLEAR_MIGRATED_SQL = """
+UPDATE alerts SET spc_reports = NULL
+WHERE id = ANY(:alert_ids) AND EXISTS (SELECT 1 FROM alert_spc_matches m WHERE m.alert_id = alerts.id)
+"""
+
+
+def replace_matches(session, matches: Dict[str, List[MatchLink]], cleared_alert_ids: Iterable[str] = ()):
+    """
+    Make alert_spc_matches hold exactly `matches` for those alerts, and nothing for cleared_alert_ids
+    Runs in the caller's transaction: one DELETE plus array INSERTs.
+    """
+    alert_ids = list(matches) + list(cleared_alert_ids)
+    if not alert_ids:
+        return
+    session.execute(text(DELETE_MATCHES_SQL), {'alert_ids': alert_ids})
+
+    rows = [(alert_id,) + link for alert_id, links in matches.items() for link in links]
+    for offset in range(0, len(rows), WRITE_BATCH_SIZE):
+        batch = rows[offset:offset + WRITE_BATCH_SIZE]
+        columns = zip(*batch)
+        session.execute(text(INSERT_MATCHES_SQL), {name: list(column) for name, column in zip(MATCH_COLUMNS, columns)})
+
+
+def release_report_day(session, report_date) -> int:
+    """
+    Reset alerts matched to a day's reports before those reports are deleted and re-imported
+    Runs in the caller's transaction, ahead of the DELETE; returns the number of alerts reset.
+    """
+    return session.execute(text(RELEASE_REPORT_DAY_SQL), {'report_date': report_date}).rowcount
+
+
+def load_match_reports(session, alert_ids: List[str]) -> Dict[str, List[Dict]]:
+    """{alert id: [report dict, ...]} for alerts with alert_spc_matches rows, one query"""
+    reports: Dict[str, List[Dict]] = {}
+    if not alert_ids:
+        return reports
+    for row in session.execute(text(HYDRATE_SQL), {'alert_ids': list(alert_ids)}):
+        reports.setdefault(row[0], []).append({
+            'id': row[1],
+            'report_date': row[2].isoformat(),
+            'report_type': row[3],
+            'time_utc': row[4],
+            'location': row[5],
+            'county': row[6],
+            'state': row[7],
+            'latitude': row[8],
+            'longitude': row[9],
+            'comments': row[10],
+            'magnitude': row[11]
+        })
+    return reports
+
+
+def report_alert_ids(session, report_id: int) -> List[str]:
+    """Alerts matched to one SPC report (index lookup on idx_alert_spc_match_report)"""
+    return [row[0] for row in session.execute(text(REPORT_ALERT_IDS_SQL), {'report_id': report_id})]
+
+
+def report_alert_count(session, report_id: int) -> int:
+    return session.execute(text(REPORT_ALERT_COUNT_SQL), {'report_id': report_id}).scalar() or 0
+
+
+def migrate_embedded_matches(session, batch_size: int = 5000) -> Dict[str, int]:
+    """Convert alerts.spc_reports copies written before alert_spc_matches existed, one batch per transaction"""
+    stats = {'alerts': 0, 'rows': 0}
+    last_id = ''
+    while True:
+        alert_ids = [row[0] for row in session.execute(text(
+            "SELECT id FROM alerts WHERE spc_reports IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit"
+        ), {'last_id': last_id, 'limit': batch_size})]
+        if not alert_ids:
+            break
+        stats['rows'] += session.execute(text(MIGRATE_EMBEDDED_SQL), {'alert_ids': alert_ids}).rowcount
+        session.execute(text(CLEAR_MIGRATED_SQL), {'alert_ids': alert_ids})
+        session.commit()
+        stats['alerts'] += len(alert_ids)
+        last_id = alert_ids[-1]
+        logger.info(f"Migrated embedded SPC matches: {stats['alerts']} alerts, {stats['rows']} match rows")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="alert_spc_matches maintenance")
+    parser.add_argument('command', choices=['migrate'], help='migrate: convert embedded alerts.spc_reports copies')
+    parser.add_argument('--batch-size', type=int, default=5000, help='alerts per transaction')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+        print(migrate_embedded_matches(db.session, batch_size=args.batch_size))
+
+
+if __name__ == '__main__':
+    main()
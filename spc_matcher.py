@@ -5,22 +5,153 @@ Cross-references SPC storm reports with NWS alerts for verification
 
 import logging
 import math
+import time
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, text
 from models import Alert, SPCReport, db
-from match_summarizer import MatchSummarizer
+from alert_normalizer import extract_area_counties, extract_area_states
+from config import Config
+from spc_match_index import SPCReportIndex, epoch_minutes, report_minutes, window_dates
+from spc_match_queue import consume_entries, pending_entries
+from spc_match_store import MatchLink, replace_matches
+from spc_summary_queue import enqueue_summaries
 
 logger = logging.getLogger(__name__)
 
+# Only the columns matching reads; bulk mode never materializes Alert objects
+BULK_ALERT_COLUMNS_SQL = """
+SELECT id, event, effective, area_desc, geometry FROM alerts WHERE id = ANY(:ids)
+"""
+
+# One statement per write batch; the matched reports go to alert_spc_matches, spc_ai_summary to the summary queue
+BULK_UPDATE_SQL = """
+UPDATE alerts SET spc_verified = true, spc_reports = NULL, spc_match_method = v.method,
+    spc_confidence_score = v.confidence, spc_report_count = v.report_count, updated_at = NOW()
+FROM unnest(CAST(:ids AS text[]), CAST(:methods AS text[]), CAST(:confidences AS float8[]),
+            CAST(:report_counts AS integer[])) AS v(id, method, confidence, report_count)
+WHERE alerts.id = v.id
+"""
+
+BULK_WRITE_BATCH_SIZE = 1000
+
+# Live NWS alerts only carry GeoJSON; give them a PostGIS geom so the spatial join can use idx_alert_geom_spatial
+FILL_ALERT_GEOM_SQL = """
+UPDATE alerts SET geom = ST_MakeValid(ST_SetSRID(ST_GeomFromGeoJSON(CAST(geometry AS text)), 4326))
+WHERE effective >= :day_start AND effective < :day_end AND geom IS NULL
+    AND geometry->>'type' IN ('Polygon', 'MultiPolygon')
+"""
+
+# One statement per alert day: report points inside (or within the buffer of) each warning polygon,
+# inside the alert's time window, staged for the match-row and alert writes below.
+# A report time is HHMM on report_date; times that do not parse match on date alone (_is_time_match).
+POSTGIS_MATCH_SQL = """
+CREATE TEMP TABLE spc_postgis_matches ON COMMIT DROP AS
+WITH day_alerts AS (
+    SELECT id, event, effective, geom FROM alerts
+    WHERE effective >= :day_start AND effective < :day_end AND geom IS NOT NULL {verified_filter}
+)
+SELECT a.id AS alert_id, r.id AS report_id,
+       ST_Distance(CAST(ST_Centroid(a.geom) AS geography), CAST({point} AS geography)) / 1609.344 AS distance_miles,
+       CAST(floor(EXTRACT(EPOCH FROM rt.report_time - date_trunc('minute', a.effective)) / 60) AS integer)
+           AS time_delta_minutes
+FROM day_alerts a
+JOIN spc_reports r ON r.report_date BETWEEN :first_report_date AND :last_report_date
+    AND r.latitude IS NOT NULL AND r.longitude IS NOT NULL
+    AND ({type_condition})
+    AND {spatial_condition}
+CROSS JOIN LATERAL (
+    SELECT CASE WHEN r.time_utc ~ '^[0-9]{{1,4}}$' THEN CAST(r.time_utc AS integer) END AS hhmm
+) t
+CROSS JOIN LATERAL (
+    SELECT CASE WHEN t.hhmm / 100 < 24 AND t.hhmm % 100 < 60
+        THEN r.report_date + make_interval(hours => t.hhmm / 100, mins => t.hhmm % 100) END AS report_time
+) rt
+WHERE CASE
+    WHEN rt.report_time IS NOT NULL THEN
+        rt.report_time BETWEEN a.effective - make_interval(hours => :window_hours)
+            AND a.effective + make_interval(hours => :window_hours)
+    ELSE
+        r.report_date BETWEEN CAST(a.effective - make_interval(hours => :window_hours) AS date)
+            AND CAST(a.effective + make_interval(hours => :window_hours) AS date)
+END
+"""
+
+POSTGIS_WRITE_ROWS_SQL = (
+    "DELETE FROM alert_spc_matches WHERE alert_id IN (SELECT alert_id FROM spc_postgis_matches)",
+    """
+    INSERT INTO alert_spc_matches (alert_id, report_id, method, distance_miles, time_delta_minutes, confidence)
+    SELECT alert_id, report_id, 'postgis', distance_miles, time_delta_minutes, :confidence FROM spc_postgis_matches
+    """
+)
+
+POSTGIS_UPDATE_ALERTS_SQL = """
+UPDATE alerts SET spc_verified = true, spc_reports = NULL, spc_match_method = 'postgis',
+    spc_confidence_score = :confidence, spc_report_count = m.report_count, updated_at = NOW()
+FROM (SELECT alert_id, count(*) AS report_count FROM spc_postgis_matches GROUP BY alert_id) m
+WHERE alerts.id = m.alert_id
+RETURNING alerts.id
+"""
+
+# Alerts whose ±window touches a queued report date, eligible for its type, not yet matched past its watermark;
+# each with the highest watermark of the entries that selected it
+QUEUED_ALERTS_SQL = """
+SELECT a.id, MAX(q.report_watermark) FROM alerts a
+JOIN unnest(CAST(:queue_dates AS date[]), CAST(:queue_types AS text[]), CAST(:queue_watermarks AS integer[]))
+    AS q(report_date, report_type, report_watermark)
+    ON a.effective >= q.report_date - make_interval(hours => :window_hours)
+    AND a.effective < q.report_date + make_interval(days => 1, hours => :window_hours)
+WHERE a.spc_verified IS NOT TRUE
+    AND (a.spc_match_watermark IS NULL OR a.spc_match_watermark < q.report_watermark)
+    AND ({type_condition})
+GROUP BY a.id
+"""
+
+# Per-alert watermarks for a matched batch
+SET_WATERMARKS_SQL = """
+UPDATE alerts a SET spc_match_watermark = w.watermark
+FROM unnest(CAST(:ids AS text[]), CAST(:watermarks AS integer[])) AS w(id, watermark)
+WHERE a.id = w.id
+"""
+
+# Alerts that arrived since the last run and have never been matched
+NEW_ALERTS_SQL = """
+SELECT id FROM alerts
+WHERE spc_match_watermark IS NULL AND spc_verified IS NOT TRUE AND effective >= :cutoff
+ORDER BY effective
+"""
+
+POSTGIS_POINT = "ST_SetSRID(ST_MakePoint(r.longitude, r.latitude), 4326)"
+
+POSTGIS_CONFIDENCE = 0.95
+
+# Miles per degree of longitude at 72N (northern Alaska); turns a buffer in miles into a
+# degree radius that is never too small, so the GiST index can prefilter before the geography check
+MIN_MILES_PER_DEGREE = 69.0 * math.cos(math.radians(72))
+
+
+class BulkAlertRow:
+    """Matching view of an alerts row (the attributes match_alert_with_spc reads)"""
+
+    __slots__ = ('id', 'event', 'effective', 'area_desc', 'geometry')
+
+    def __init__(self, id, event, effective, area_desc, geometry):
+        self.id = id
+        self.event = event
+        self.effective = effective
+        self.area_desc = area_desc
+        self.geometry = geometry
+
 class SPCMatchingService:
     """
     Service to match SPC reports with NWS alerts for verification
     """
     
+    _schema_ready = False  # alerts.spc_match_watermark verified once per process
+    
     def __init__(self, db_session):
         self.db = db_session
-        self.summarizer = MatchSummarizer()
+        self._ensure_schema()
         
         # Event correlation mapping
         self.event_correlations = {
@@ -35,6 +166,18 @@ class SPCMatchingService:
         # Distance threshold for lat/lon fallback (25 miles as specified)
         self.distance_threshold_miles = 25
     
+    def _ensure_schema(self):
+        """Add the incremental-matching watermark column to existing deployments (idempotent)"""
+        if SPCMatchingService._schema_ready:
+            return
+        try:
+            self.db.execute(text("ALTER TABLE alerts ADD COLUMN IF NOT EXISTS spc_match_watermark INTEGER"))
+            self.db.commit()
+            SPCMatchingService._schema_ready = True
+        except Exception as e:
+            logger.warning(f"Could not ensure SPC matching schema: {e}")
+            self.db.rollback()
+    
     def match_spc_reports_batch(self, limit: int = 100) -> Dict:
         """
         Match a batch of unverified alerts with SPC reports
@@ -119,30 +262,17 @@ class SPCMatchingService:
         # Update alert with match results
         try:
             # Use proper SQLAlchemy updates instead of direct assignment
+            spc_reports_data = [self._spc_report_to_dict(match) for match in matches]
             setattr(alert, 'spc_verified', True)
-            setattr(alert, 'spc_reports', [self._spc_report_to_dict(match) for match in matches])
+            setattr(alert, 'spc_reports_json', None)
             setattr(alert, 'spc_match_method', match_method)
             setattr(alert, 'spc_confidence_score', confidence)
             setattr(alert, 'spc_report_count', len(matches))
+            replace_matches(self.db, {alert.id: self._match_links(alert, matches, match_method, confidence)})
+            alert._hydrated_spc_reports = spc_reports_data
             
-            # Generate AI summary for verified matches (non-blocking)
-            try:
-                spc_reports_data = [self._spc_report_to_dict(match) for match in matches]
-                # Make AI summary generation non-blocking to prevent rate limit hangs
-                try:
-                    ai_summary = self.summarizer.generate_match_summary(
-                        alert=alert.to_dict(),
-                        spc_reports=spc_reports_data
-                    )
-                    if ai_summary:
-                        setattr(alert, 'spc_ai_summary', ai_summary)
-                        logger.info(f"Generated AI summary for alert {alert.id}")
-                except Exception as ai_error:
-                    # Don't let AI failures block the entire matching process
-                    setattr(alert, 'spc_ai_summary', f"Match verified with {len(matches)} SPC reports")
-                    logger.warning(f"AI summary failed for alert {alert.id}, using fallback: {ai_error}")
-            except Exception as e:
-                logger.warning(f"Failed to generate any summary for alert {alert.id}: {e}")
+            # AI summary is generated off the matching path by the summary queue worker
+            enqueue_summaries(self.db, [alert.id])
             
             logger.info(f"Matched alert {alert.id} with {len(matches)} SPC reports via {match_method}")
             
@@ -157,6 +287,303 @@ class SPCMatchingService:
             logger.error(f"Error updating alert {alert.id} with SPC matches: {e}")
             return {'matched': False, 'updated': False, 'reason': f'Database error: {e}'}
             
+    def match_alerts_bulk(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                          include_verified: bool = False, limit: Optional[int] = None,
+                          batch_size: Optional[int] = None) -> Dict:
+        """
+        Match alerts in batches against an in-memory SPC report index
+        Same matches as match_alert_with_spc, but each batch loads its SPC reports in one query and
+        writes its results in bulk UPDATEs. AI summaries are not generated here.
+        """
+        batch_size = batch_size or Config.SPC_BULK_MATCH_BATCH_SIZE
+        started = time.monotonic()
+        
+        conditions = ["effective IS NOT NULL"]
+        params = {}
+        if since:
+            conditions.append("effective >= :since")
+            params['since'] = since
+        if until:
+            conditions.append("effective < :until")
+            params['until'] = until
+        if not include_verified:
+            conditions.append("spc_verified IS NOT TRUE")
+        sql = f"SELECT id FROM alerts WHERE {' AND '.join(conditions)} ORDER BY effective, id"
+        if limit:
+            sql += " LIMIT :limit"
+            params['limit'] = limit
+        
+        # Effective-ordered batches keep each batch's union of report dates small
+        alert_ids = [row[0] for row in self.db.execute(text(sql), params)]
+        logger.info(f"Bulk SPC matching {len(alert_ids)} alerts in batches of {batch_size}")
+        
+        stats = {'processed': 0, 'matched': 0, 'updated': 0, 'fips': 0, 'latlon': 0}
+        for offset in range(0, len(alert_ids), batch_size):
+            rows = self.db.execute(text(BULK_ALERT_COLUMNS_SQL), {
+                'ids': alert_ids[offset:offset + batch_size]
+            }).fetchall()
+            alerts = [BulkAlertRow(*row) for row in rows]
+            
+            try:
+                matches = self.find_matches_bulk(alerts)
+                self._write_bulk_matches(matches)
+                self.db.commit()
+            except Exception as e:
+                logger.error(f"Error in bulk SPC matching batch at offset {offset}: {e}")
+                self.db.rollback()
+                stats['processed'] += len(alerts)
+                continue
+            
+            stats['processed'] += len(alerts)
+            stats['matched'] += len(matches)
+            stats['updated'] += len(matches)
+            for match_method, *_ in matches.values():
+                stats[match_method] += 1
+            logger.info(f"Bulk SPC matching: {stats['processed']}/{len(alert_ids)} alerts, {stats['matched']} matched")
+        
+        stats['duration_seconds'] = round(time.monotonic() - started, 2)
+        return stats
+    
+    def match_incremental(self, queue_limit: Optional[int] = None, lookback_days: int = 7) -> Dict:
+        """
+        Delta matching job: new alerts plus alerts touched by queued SPC report dates
+        Every evaluated alert records the highest queue watermark that selected it (0 for new alerts
+        no entry touched), so it is only evaluated again when a later queue entry covers its window.
+        The watermark never comes from MAX(spc_reports.id): a report with a lower id committed after
+        that read would otherwise be below every stamped alert and never matched.
+        """
+        started = time.monotonic()
+        entries = pending_entries(self.db, queue_limit or Config.SPC_MATCH_QUEUE_BATCH_SIZE)
+        
+        alert_ids = [row[0] for row in self.db.execute(text(NEW_ALERTS_SQL), {
+            'cutoff': datetime.utcnow() - timedelta(days=lookback_days)
+        })]
+        watermarks = dict.fromkeys(alert_ids, 0)
+        if entries:
+            type_condition, params = self._eligible_type_condition('q.report_type')
+            params['queue_dates'] = [entry[0] for entry in entries]
+            params['queue_types'] = [entry[1] for entry in entries]
+            params['queue_watermarks'] = [entry[2] for entry in entries]
+            params['window_hours'] = self.time_window_hours
+            queued_ids = self.db.execute(text(QUEUED_ALERTS_SQL.format(type_condition=type_condition)),
+                                         params).fetchall()
+            alert_ids += [alert_id for alert_id, _ in queued_ids if alert_id not in watermarks]
+            watermarks.update(queued_ids)
+        
+        watermark = max((entry[2] for entry in entries), default=0)
+        stats = {'processed': 0, 'matched': 0, 'updated': 0, 'queued_entries': len(entries), 'watermark': watermark}
+        failed = False
+        batch_size = Config.SPC_BULK_MATCH_BATCH_SIZE
+        for offset in range(0, len(alert_ids), batch_size):
+            batch_ids = alert_ids[offset:offset + batch_size]
+            try:
+                rows = self.db.execute(text(BULK_ALERT_COLUMNS_SQL), {'ids': batch_ids}).fetchall()
+                matches = self.find_matches_bulk([BulkAlertRow(*row) for row in rows])
+                self._write_bulk_matches(matches)
+                self.db.execute(text(SET_WATERMARKS_SQL), {
+                    'ids': batch_ids, 'watermarks': [watermarks[alert_id] for alert_id in batch_ids]
+                })
+                self.db.commit()
+            except Exception as e:
+                logger.error(f"Error in incremental SPC matching batch at offset {offset}: {e}")
+                self.db.rollback()
+                failed = True
+                continue
+            
+            stats['processed'] += len(batch_ids)
+            stats['matched'] += len(matches)
+            stats['updated'] += len(matches)
+        
+        # A failed batch keeps the queue so its alerts are picked up again next run
+        if entries and not failed:
+            try:
+                consume_entries(self.db, entries)
+                self.db.commit()
+            except Exception as e:
+                logger.error(f"Error consuming SPC match queue: {e}")
+                self.db.rollback()
+        
+        stats['duration_seconds'] = round(time.monotonic() - started, 2)
+        logger.info(f"Incremental SPC matching: {stats['matched']}/{stats['processed']} alerts matched "
+                    f"({len(entries)} queued report dates/types, watermark {watermark})")
+        return stats
+    
+    def match_alerts_postgis(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                             include_verified: bool = False, buffer_miles: Optional[float] = None) -> Dict:
+        """
+        Match alerts day by day with a PostGIS join of SPC report points against warning polygons
+        Each day is one spatial join for every alert with a geom, written as set-based match rows;
+        alerts without one on that day go through the in-memory batch path instead.
+        """
+        until = until or datetime.utcnow()
+        since = since or until - timedelta(days=7)
+        buffer_miles = Config.SPC_POSTGIS_MATCH_BUFFER_MILES if buffer_miles is None else buffer_miles
+        verified_filter = "" if include_verified else "AND spc_verified IS NOT TRUE"
+        
+        if buffer_miles > 0:
+            spatial_condition = (f"ST_DWithin(a.geom, {POSTGIS_POINT}, :buffer_degrees) AND "
+                                 f"ST_DWithin(CAST(a.geom AS geography), CAST({POSTGIS_POINT} AS geography), :buffer_meters)")
+        else:
+            spatial_condition = f"ST_Intersects(a.geom, {POSTGIS_POINT})"
+        type_condition, type_params = self._eligible_type_condition('r.report_type')
+        match_sql = text(POSTGIS_MATCH_SQL.format(verified_filter=verified_filter, type_condition=type_condition,
+                                                  spatial_condition=spatial_condition, point=POSTGIS_POINT))
+        
+        stats = {'days': 0, 'processed': 0, 'matched': 0, 'updated': 0, 'postgis': 0, 'fips': 0, 'latlon': 0}
+        started = time.monotonic()
+        day = since.replace(hour=0, minute=0, second=0, microsecond=0)
+        while day < until:
+            day_start, day_end = max(day, since), min(day + timedelta(days=1), until)
+            day += timedelta(days=1)
+            stats['days'] += 1
+            window = timedelta(hours=self.time_window_hours)
+            
+            try:
+                self.db.execute(text(FILL_ALERT_GEOM_SQL), {'day_start': day_start, 'day_end': day_end})
+                self.db.commit()
+            except Exception as e:
+                # One malformed GeoJSON fails the day's fill; those alerts take the Python path
+                logger.warning(f"Could not build alert geometries for {day_start.date()}: {e}")
+                self.db.rollback()
+            
+            try:
+                spatial_count = self.db.execute(text(
+                    f"SELECT count(*) FROM alerts WHERE effective >= :day_start AND effective < :day_end "
+                    f"AND geom IS NOT NULL {verified_filter}"
+                ), {'day_start': day_start, 'day_end': day_end}).scalar()
+                self.db.execute(match_sql, {
+                    'day_start': day_start,
+                    'day_end': day_end,
+                    'first_report_date': (day_start - window).date(),
+                    'last_report_date': (day_end + window).date(),
+                    'window_hours': self.time_window_hours,
+                    'buffer_degrees': buffer_miles / MIN_MILES_PER_DEGREE,
+                    'buffer_meters': buffer_miles * 1609.344,
+                    **type_params
+                })
+                for statement in POSTGIS_WRITE_ROWS_SQL:
+                    self.db.execute(text(statement), {'confidence': POSTGIS_CONFIDENCE})
+                matched_ids = self.db.execute(text(POSTGIS_UPDATE_ALERTS_SQL),
+                                              {'confidence': POSTGIS_CONFIDENCE}).fetchall()
+                enqueue_summaries(self.db, [alert_id for (alert_id,) in matched_ids])
+                
+                fallback_rows = self.db.execute(text(
+                    f"SELECT id, event, effective, area_desc, geometry FROM alerts WHERE effective >= :day_start "
+                    f"AND effective < :day_end AND geom IS NULL {verified_filter}"
+                ), {'day_start': day_start, 'day_end': day_end}).fetchall()
+                fallback_matches = self.find_matches_bulk([BulkAlertRow(*row) for row in fallback_rows])
+                self._write_bulk_matches(fallback_matches)
+                self.db.commit()
+            except Exception as e:
+                logger.error(f"Error in PostGIS SPC matching for {day_start.date()}: {e}")
+                self.db.rollback()
+                continue
+            
+            stats['processed'] += spatial_count + len(fallback_rows)
+            stats['postgis'] += len(matched_ids)
+            for match_method, *_ in fallback_matches.values():
+                stats[match_method] += 1
+            day_matched = len(matched_ids) + len(fallback_matches)
+            stats['matched'] += day_matched
+            stats['updated'] += day_matched
+            logger.info(f"PostGIS SPC matching {day_start.date()}: {len(matched_ids)}/{spatial_count} polygon alerts, "
+                        f"{len(fallback_matches)}/{len(fallback_rows)} fallback alerts matched")
+        
+        stats['duration_seconds'] = round(time.monotonic() - started, 2)
+        return stats
+    
+    def _eligible_type_condition(self, report_type_column: str) -> Tuple[str, Dict]:
+        """event_correlations as SQL: report type eligible for the alert (alias a) event, case-insensitive substring"""
+        clauses = []
+        params = {}
+        for i, (spc_type, nws_events) in enumerate(self.event_correlations.items()):
+            params[f"spc_type_{i}"] = spc_type
+            event_clauses = []
+            for j, nws_event in enumerate(nws_events):
+                params[f"nws_event_{i}_{j}"] = f"%{nws_event}%"
+                event_clauses.append(f"a.event ILIKE :nws_event_{i}_{j}")
+            clauses.append(f"({report_type_column} = :spc_type_{i} AND ({' OR '.join(event_clauses)}))")
+        return ' OR '.join(clauses), params
+    
+    def find_matches_bulk(self, alerts: List) -> Dict[str, Tuple[str, float, List[Dict], List[MatchLink]]]:
+        """
+        Match a batch of alerts without touching the database beyond one SPC report query
+        Returns {alert id: (match method, confidence, report dicts, alert_spc_matches links)} for matched alerts only
+        """
+        plans = []
+        report_dates = set()
+        report_types = set()
+        for alert in alerts:
+            if not getattr(alert, 'effective', None):
+                continue
+            eligible_types = self._get_eligible_spc_types(getattr(alert, 'event', '') or '')
+            if not eligible_types:
+                continue
+            start_time = alert.effective - timedelta(hours=self.time_window_hours)
+            end_time = alert.effective + timedelta(hours=self.time_window_hours)
+            dates = window_dates(start_time, end_time)
+            plans.append((alert, eligible_types, start_time, end_time, dates))
+            report_dates.update(dates)
+            report_types.update(eligible_types)
+        
+        index = SPCReportIndex.load(self.db, report_dates, report_types)
+        
+        results = {}
+        for alert, eligible_types, start_time, end_time, dates in plans:
+            matched = []
+            alert_counties, alert_states = self._get_alert_counties_states(alert)
+            if alert_counties and alert_states:
+                matched = index.county_matches(alert_states, alert_counties, eligible_types, start_time, end_time, dates)
+            match_method, confidence = 'fips', 0.9
+            
+            alert_lat, alert_lon = self._get_alert_centroid(alert)
+            if not len(matched):
+                if alert_lat and alert_lon:
+                    matched = index.proximity_matches(alert_lat, alert_lon, self.distance_threshold_miles,
+                                                      eligible_types, start_time, end_time, dates)
+                match_method, confidence = 'latlon', 0.7
+            
+            if len(matched):
+                if alert_lat and alert_lon:
+                    distances = [None if math.isnan(d) else round(d, 2)
+                                 for d in index.distances(alert_lat, alert_lon, matched).tolist()]
+                else:
+                    distances = [None] * len(matched)
+                links = [(int(index.ids[i]), match_method, distance, delta, confidence)
+                         for i, distance, delta in zip(matched.tolist(), distances, index.time_deltas(alert.effective, matched))]
+                results[alert.id] = (match_method, confidence, [index.report_dict(i) for i in matched.tolist()], links)
+        
+        return results
+    
+    def _write_bulk_matches(self, matches: Dict[str, Tuple[str, float, List[Dict], List[MatchLink]]]):
+        """Update the alerts' match summary columns with one UPDATE ... FROM unnest(...) per batch and replace their match rows"""
+        items = list(matches.items())
+        for offset in range(0, len(items), BULK_WRITE_BATCH_SIZE):
+            batch = items[offset:offset + BULK_WRITE_BATCH_SIZE]
+            self.db.execute(text(BULK_UPDATE_SQL), {
+                'ids': [alert_id for alert_id, _ in batch],
+                'methods': [result[0] for _, result in batch],
+                'confidences': [result[1] for _, result in batch],
+                'report_counts': [len(result[2]) for _, result in batch]
+            })
+            replace_matches(self.db, {alert_id: result[3] for alert_id, result in batch})
+            enqueue_summaries(self.db, [alert_id for alert_id, _ in batch])
+    
+    def _match_links(self, alert: Alert, matches: List[SPCReport], match_method: str,
+                     confidence: float) -> List[MatchLink]:
+        """alert_spc_matches rows for one alert: distance from its centroid and report time offset"""
+        alert_lat, alert_lon = self._get_alert_centroid(alert)
+        effective_minute = epoch_minutes(alert.effective)
+        links = []
+        for match in matches:
+            distance = None
+            if alert_lat and alert_lon and match.latitude is not None and match.longitude is not None:
+                distance = round(self._calculate_distance(alert_lat, alert_lon, match.latitude, match.longitude), 2)
+            report_minute = report_minutes(match.report_date, match.time_utc)
+            time_delta = report_minute - effective_minute if report_minute is not None else None
+            links.append((match.id, match_method, distance, time_delta, confidence))
+        return links
+    
     def _spc_report_to_dict(self, spc_report: SPCReport) -> Dict:
         """Convert SPC report to dictionary for JSON storage"""
         return {
@@ -200,10 +627,37 @@ class SPCMatchingService:
     def _find_county_matches(self, alert: Alert, eligible_types: List[str], 
                            report_dates: List, start_time: datetime, end_time: datetime) -> List[SPCReport]:
         """Find SPC reports matching by county/state"""
-        # Get counties and states from alert
+        alert_counties, alert_states = self._get_alert_counties_states(alert)
+        if not alert_counties or not alert_states:
+            logger.debug(f"No counties/states found for alert {alert.id}, area_desc: {getattr(alert, 'area_desc', 'N/A')}")
+            return []
+        
+        # Query SPC reports in same counties
+        logger.debug(f"Looking for matches: counties={alert_counties}, states={alert_states}, types={eligible_types}, dates={report_dates}")
+        matches = SPCReport.query.filter(
+            and_(
+                SPCReport.report_date.in_(report_dates),
+                SPCReport.report_type.in_(eligible_types),
+                SPCReport.state.in_(alert_states),
+                SPCReport.county.in_(alert_counties)
+            )
+        ).all()
+        logger.debug(f"Found {len(matches)} county-based matches before time filtering")
+        
+        # Filter by time if time_utc is available
+        time_filtered_matches = []
+        for match in matches:
+            if self._is_time_match(match, alert, start_time, end_time):
+                time_filtered_matches.append(match)
+        
+        logger.debug(f"After time filtering: {len(time_filtered_matches)} matches for alert {alert.id}")
+        return time_filtered_matches
+    
+    def _get_alert_counties_states(self, alert) -> Tuple[List[str], List[str]]:
+        """Counties and states named in the alert's area description"""
         try:
-            alert_counties = alert.extract_counties()
-            alert_states = alert.extract_states()
+            alert_counties = extract_area_counties(getattr(alert, 'area_desc', None))
+            alert_states = extract_area_states(getattr(alert, 'area_desc', None))
         except Exception as e:
             logger.warning(f"Failed to extract counties/states from alert {alert.id}: {e}")
             alert_counties = []
@@ -229,30 +683,7 @@ class SPCMatchingService:
                             alert_counties.append(county_name)
                             alert_states.append(state_name)
         
-        if not alert_counties or not alert_states:
-            logger.debug(f"No counties/states found for alert {alert.id}, area_desc: {getattr(alert, 'area_desc', 'N/A')}")
-            return []
-        
-        # Query SPC reports in same counties
-        logger.debug(f"Looking for matches: counties={alert_counties}, states={alert_states}, types={eligible_types}, dates={report_dates}")
-        matches = SPCReport.query.filter(
-            and_(
-                SPCReport.report_date.in_(report_dates),
-                SPCReport.report_type.in_(eligible_types),
-                SPCReport.state.in_(alert_states),
-                SPCReport.county.in_(alert_counties)
-            )
-        ).all()
-        logger.debug(f"Found {len(matches)} county-based matches before time filtering")
-        
-        # Filter by time if time_utc is available
-        time_filtered_matches = []
-        for match in matches:
-            if self._is_time_match(match, alert, start_time, end_time):
-                time_filtered_matches.append(match)
-        
-        logger.debug(f"After time filtering: {len(time_filtered_matches)} matches for alert {alert.id}")
-        return time_filtered_matches
+        return alert_counties, alert_states
     
     def _find_proximity_matches(self, alert: Alert, eligible_types: List[str],
                               report_dates: List, start_time: datetime, end_time: datetime) -> List[SPCReport]:
@@ -0,0 +1,250 @@
+"""
+SPC Rematch for HailyDB
+Full-history SPC rematching sharded by date across a process pool, with a dry-run diff mode
+"""
+
+import argparse
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from config import Config
+from spc_match_store import replace_matches
+from spc_matcher import BulkAlertRow, SPCMatchingService
+
+logger = logging.getLogger(__name__)
+
+# Matching inputs plus the stored result the new matches are diffed against: alert_spc_matches
+# report ids, or the embedded spc_reports copy for alerts not yet migrated
+SHARD_ALERTS_SQL = """
+SELECT id, event, effective, area_desc, geometry, spc_match_method, spc_reports,
+       (SELECT array_agg(m.report_id ORDER BY m.report_id) FROM alert_spc_matches m WHERE m.alert_id = alerts.id)
+FROM alerts
+WHERE effective >= :shard_start AND effective < :shard_end
+ORDER BY effective, id
+"""
+
+# Alerts that no longer match under the current rules
+CLEAR_MATCHES_SQL = """
+UPDATE alerts SET spc_verified = false, spc_reports = NULL, spc_match_method = NULL, spc_confidence_score = NULL,
+    spc_report_count = 0, spc_ai_summary = NULL, updated_at = NOW()
+WHERE id = ANY(:ids)
+"""
+
+# Per-process state set up by _init_worker: one engine holding a single connection
+_worker_engine = None
+
+
+def _init_worker(database_url: str):
+    global _worker_engine
+    _worker_engine = create_engine(database_url, pool_size=1, max_overflow=0, pool_pre_ping=True)
+
+
+def shard_ranges(start: datetime, end: datetime, shard_days: int) -> List[Tuple[datetime, datetime]]:
+    """[start, end) split into consecutive shard_days-long windows"""
+    shards = []
+    shard_start = start
+    while shard_start < end:
+        shard_end = min(shard_start + timedelta(days=shard_days), end)
+        shards.append((shard_start, shard_end))
+        shard_start = shard_end
+    return shards
+
+
+def stored_match(method: Optional[str], spc_reports, report_ids: Optional[List[int]] = None) -> Optional[Tuple[str, List]]:
+    """(method, sorted report ids) for a stored result, None when the alert is unmatched"""
+    if report_ids:
+        return method, list(report_ids)
+    if not spc_reports:
+        return None
+    return method, sorted(report['id'] for report in spc_reports if isinstance(report, dict) and report.get('id') is not None)
+
+
+def rematch_shard(shard_start: datetime, shard_end: datetime, dry_run: bool, session=None) -> Dict:
+    """
+    Rematch every alert effective in [shard_start, shard_end) and diff against the stored matches
+    Runs in a pool worker on its own connection, or in-process on the given session.
+    Only alerts whose result changed are written. Alerts matched by the PostGIS polygon matcher
+    (spc_match_method 'postgis') are left as they are: the in-memory index would replace their
+    matches with the bbox/county result. Rematch those with match_alerts_postgis(include_verified=True).
+    spc_match_watermark is left alone: only spc_match_queue entries advance it (see match_incremental),
+    so reports committed while the rematch runs still reach these alerts through the queue.
+    """
+    own_session = session is None
+    if own_session:
+        session = Session(bind=_worker_engine)
+    started = time.monotonic()
+    stats = {'shard_start': shard_start.date().isoformat(), 'shard_end': shard_end.date().isoformat(),
+             'alerts': 0, 'matched_before': 0, 'matched_after': 0, 'gained': 0, 'lost': 0, 'changed': 0,
+             'postgis_preserved': 0}
+    try:
+        service = SPCMatchingService(session)
+        rows = session.execute(text(SHARD_ALERTS_SQL), {'shard_start': shard_start, 'shard_end': shard_end}).fetchall()
+
+        batch_size = Config.SPC_BULK_MATCH_BATCH_SIZE
+        for offset in range(0, len(rows), batch_size):
+            batch = [row for row in rows[offset:offset + batch_size] if row[5] != 'postgis']
+            stats['postgis_preserved'] += min(batch_size, len(rows) - offset) - len(batch)
+            matches = service.find_matches_bulk([BulkAlertRow(*row[:5]) for row in batch])
+
+            rewrite = {}
+            lost_ids = []
+            for row in batch:
+                before = stored_match(row[5], row[6], row[7])
+                result = matches.get(row[0])
+                after = (result[0], sorted(report['id'] for report in result[2])) if result else None
+                stats['matched_before'] += before is not None
+                stats['matched_after'] += after is not None
+                if before == after:
+                    continue
+                if after is None:
+                    stats['lost'] += 1
+                    lost_ids.append(row[0])
+                else:
+                    stats['gained' if before is None else 'changed'] += 1
+                    rewrite[row[0]] = result
+            stats['alerts'] += len(batch)
+
+            if dry_run:
+                continue
+            service._write_bulk_matches(rewrite)
+            if rewrite:
+                # Summaries described the old report set; the summary job regenerates them
+                session.execute(text("UPDATE alerts SET spc_ai_summary = NULL WHERE id = ANY(:ids)"),
+                                {'ids': list(rewrite)})
+            if lost_ids:
+                session.execute(text(CLEAR_MATCHES_SQL), {'ids': lost_ids})
+                replace_matches(session, {}, lost_ids)
+            session.commit()
+    except Exception as e:
+        session.rollback()
+        stats['error'] = str(e)
+        logger.error(f"Rematch of shard {stats['shard_start']} failed: {e}")
+    finally:
+        if own_session:
+            session.close()
+
+    seconds = time.monotonic() - started
+    stats['seconds'] = round(seconds, 2)
+    stats['alerts_per_second'] = round(stats['alerts'] / seconds, 1) if seconds else 0.0
+    return stats
+
+
+class SPCRematcher:
+    """
+    Rematches a date range of alerts shard by shard
+
+    Shards run in a fork-started process pool; each worker opens its own single-connection
+    engine, matches with the in-memory batch index and writes bulk updates. workers=0 runs
+    the shards in order on the caller's session.
+    """
+
+    def __init__(self, db_session, workers: int = None, shard_days: int = None):
+        self.db = db_session
+        self.workers = Config.SPC_REMATCH_WORKERS if workers is None else max(0, workers)
+        self.shard_days = max(1, shard_days or Config.SPC_REMATCH_SHARD_DAYS)
+
+    def history_bounds(self) -> Optional[Tuple[datetime, datetime]]:
+        """Midnight before the first alert to the midnight after the last"""
+        first, last = self.db.execute(text("SELECT MIN(effective), MAX(effective) FROM alerts")).fetchone()
+        if first is None:
+            return None
+        return (datetime.combine(first.date(), datetime.min.time()),
+                datetime.combine(last.date() + timedelta(days=1), datetime.min.time()))
+
+    def run(self, start: datetime, end: datetime, dry_run: bool = False, on_shard=None) -> Dict:
+        shards = shard_ranges(start, end, self.shard_days)
+        logger.info(f"Rematching {len(shards)} shards of {self.shard_days} days with {self.workers} workers"
+                    f"{' (dry run)' if dry_run else ''}")
+        started = time.monotonic()
+        results = []
+
+        if not self.workers:
+            for shard_start, shard_end in shards:
+                results.append(rematch_shard(shard_start, shard_end, dry_run, session=self.db))
+                if on_shard:
+                    on_shard(results[-1])
+        else:
+            # Forked workers must not inherit pooled connections from this process
+            self.db.close()
+            self.db.get_bind().dispose()
+            context = multiprocessing.get_context('fork')
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context, initializer=_init_worker,
+                                     initargs=(Config.DATABASE_URL,)) as executor:
+                futures = [executor.submit(rematch_shard, shard_start, shard_end, dry_run)
+                           for shard_start, shard_end in shards]
+                for future in as_completed(futures):
+                    results.append(future.result())
+                    if on_shard:
+                        on_shard(results[-1])
+
+        results.sort(key=lambda shard: shard['shard_start'])
+        totals = {key: sum(shard[key] for shard in results)
+                  for key in ('alerts', 'matched_before', 'matched_after', 'gained', 'lost', 'changed',
+                              'postgis_preserved')}
+        seconds = time.monotonic() - started
+        totals.update({
+            'shards': len(results),
+            'failed_shards': sum(1 for shard in results if 'error' in shard),
+            'seconds': round(seconds, 2),
+            'alerts_per_second': round(totals['alerts'] / seconds, 1) if seconds else 0.0,
+            'dry_run': dry_run
+        })
+        return {'totals': totals, 'shards': results}
+
+
+def match_rate(matched: int, alerts: int) -> float:
+    return matched / alerts * 100 if alerts else 0.0
+
+
+def format_shard(shard: Dict) -> str:
+    before = match_rate(shard['matched_before'], shard['alerts'])
+    after = match_rate(shard['matched_after'], shard['alerts'])
+    line = (f"{shard['shard_start']}..{shard['shard_end']}  alerts {shard['alerts']:>7}  "
+            f"{shard['alerts_per_second']:>8.1f}/s  match rate {before:5.1f}% -> {after:5.1f}% ({after - before:+.1f})  "
+            f"gained {shard['gained']:>5}  lost {shard['lost']:>5}  changed {shard['changed']:>5}")
+    if 'error' in shard:
+        line += f"  FAILED: {shard['error']}"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rematch alerts against SPC reports with the current matching rules")
+    parser.add_argument('--start', help='first alert day (YYYY-MM-DD, default: oldest alert)')
+    parser.add_argument('--end', help='last alert day, inclusive (YYYY-MM-DD, default: newest alert)')
+    parser.add_argument('--shard-days', type=int, default=Config.SPC_REMATCH_SHARD_DAYS, help='days per shard')
+    parser.add_argument('--workers', type=int, default=Config.SPC_REMATCH_WORKERS,
+                        help='worker processes, one DB connection each (0 = run shards in-process)')
+    parser.add_argument('--dry-run', action='store_true', help='diff new matches against stored spc_reports without writing')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from app import app, db
+    with app.app_context():
+        rematcher = SPCRematcher(db.session, workers=args.workers, shard_days=args.shard_days)
+        bounds = rematcher.history_bounds()
+        if bounds is None:
+            print("No alerts to rematch")
+            return
+        start = datetime.strptime(args.start, '%Y-%m-%d') if args.start else bounds[0]
+        end = datetime.strptime(args.end, '%Y-%m-%d') + timedelta(days=1) if args.end else bounds[1]
+        result = rematcher.run(start, end, dry_run=args.dry_run, on_shard=lambda shard: print(format_shard(shard)))
+
+    totals = result['totals']
+    before = match_rate(totals['matched_before'], totals['alerts'])
+    after = match_rate(totals['matched_after'], totals['alerts'])
+    print(f"{'DRY RUN ' if totals['dry_run'] else ''}{totals['alerts']} alerts in {totals['shards']} shards, "
+          f"{totals['seconds']}s ({totals['alerts_per_second']}/s); match rate {before:.1f}% -> {after:.1f}%; "
+          f"gained {totals['gained']}, lost {totals['lost']}, changed {totals['changed']}, "
+          f"postgis matches kept {totals['postgis_preserved']}, failed shards {totals['failed_shards']}")
+
+
+if __name__ == '__main__':
+    main()
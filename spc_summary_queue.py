@@ -0,0 +1,324 @@
+"""
+SPC Summary Queue for HailyDB
+Persistent AI match summary jobs: matching enqueues, a rate-limited worker pool drains
+"""
+
+import argparse
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from config import Config
+from match_summarizer import PROMPT_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Bumping match_summarizer.PROMPT_VERSION makes `stale` re-enqueue every summarized alert
+SUMMARY_PROMPT_VERSION = PROMPT_VERSION
+
+MATCHED_REPORT_IDS_SQL = """
+SELECT alert_id, array_agg(report_id ORDER BY report_id) FROM alert_spc_matches
+WHERE alert_id = ANY(:alert_ids)
+GROUP BY alert_id
+"""
+
+# A job only goes back to pending when its inputs changed or it gave up
+ENQUEUE_SQL = """
+INSERT INTO spc_summary_jobs (alert_id, input_hash, status, attempts, next_attempt_at, enqueued_at, updated_at)
+SELECT j.alert_id, j.input_hash, 'pending', 0, NOW(), NOW(), NOW()
+FROM unnest(CAST(:alert_ids AS text[]), CAST(:input_hashes AS text[])) AS j(alert_id, input_hash)
+ON CONFLICT (alert_id) DO UPDATE SET
+    input_hash = EXCLUDED.input_hash, status = 'pending', attempts = 0, next_attempt_at = NOW(),
+    claimed_at = NULL, last_error = NULL, enqueued_at = NOW(), updated_at = NOW()
+WHERE spc_summary_jobs.input_hash <> EXCLUDED.input_hash OR spc_summary_jobs.status = 'failed'
+"""
+
+# Due jobs, plus running ones whose worker died holding the claim
+CLAIM_SQL = """
+UPDATE spc_summary_jobs SET status = 'running', claimed_at = NOW(), updated_at = NOW()
+WHERE alert_id IN (
+    SELECT alert_id FROM spc_summary_jobs
+    WHERE (status = 'pending' AND next_attempt_at <= NOW())
+       OR (status = 'running' AND claimed_at < NOW() - make_interval(secs => :lease_seconds))
+    ORDER BY next_attempt_at
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+)
+RETURNING alert_id, input_hash, attempts
+"""
+
+# The summary is only written if the job was not re-enqueued with new inputs meanwhile
+COMPLETE_SQL = """
+WITH done AS (
+    UPDATE spc_summary_jobs SET status = :status, claimed_at = NULL, last_error = :last_error, updated_at = NOW()
+    WHERE alert_id = :alert_id AND input_hash = :input_hash AND status = 'running'
+    RETURNING alert_id
+)
+UPDATE alerts SET spc_ai_summary = :summary, updated_at = NOW() WHERE id IN (SELECT alert_id FROM done)
+"""
+
+RETRY_SQL = """
+UPDATE spc_summary_jobs SET status = 'pending', attempts = attempts + 1, claimed_at = NULL, last_error = :last_error,
+    next_attempt_at = NOW() + make_interval(secs => :delay_seconds), updated_at = NOW()
+WHERE alert_id = :alert_id AND input_hash = :input_hash AND status = 'running'
+"""
+
+DROP_SQL = "DELETE FROM spc_summary_jobs WHERE alert_id = :alert_id AND input_hash = :input_hash"
+
+# Verified alerts whose summary may be stale: anything with a job, or without a summary at all
+STALE_CANDIDATES_SQL = """
+SELECT a.id FROM alerts a
+WHERE a.spc_verified = true AND a.id > :last_id
+  AND (a.spc_ai_summary IS NULL OR EXISTS (SELECT 1 FROM spc_summary_jobs j WHERE j.alert_id = a.id))
+ORDER BY a.id LIMIT :limit
+"""
+
+QUEUE_STATS_SQL = "SELECT status, count(*) FROM spc_summary_jobs GROUP BY status"
+
+ENQUEUE_BATCH_SIZE = 1000
+
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+
+# A claim older than this is treated as abandoned by a crashed worker
+CLAIM_LEASE_SECONDS = 600
+
+
+def summary_input_hash(alert_id: str, report_ids: Iterable[int]) -> str:
+    """What a summary depends on: the prompt version and the set of matched reports"""
+    key = f"{SUMMARY_PROMPT_VERSION}|{alert_id}|{','.join(str(report_id) for report_id in sorted(report_ids))}"
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def enqueue_summaries(session, alert_ids: Iterable[str]) -> int:
+    """
+    Queue summary jobs for matched alerts, hashing their alert_spc_matches rows
+    Runs in the caller's transaction after the match rows are written; alerts without rows are skipped.
+    """
+    alert_ids = list(alert_ids)
+    hashes = []
+    for offset in range(0, len(alert_ids), ENQUEUE_BATCH_SIZE):
+        rows = session.execute(text(MATCHED_REPORT_IDS_SQL), {'alert_ids': alert_ids[offset:offset + ENQUEUE_BATCH_SIZE]})
+        hashes.extend((alert_id, summary_input_hash(alert_id, report_ids)) for alert_id, report_ids in rows)
+
+    for offset in range(0, len(hashes), ENQUEUE_BATCH_SIZE):
+        batch = hashes[offset:offset + ENQUEUE_BATCH_SIZE]
+        session.execute(text(ENQUEUE_SQL), {
+            'alert_ids': [alert_id for alert_id, _ in batch],
+            'input_hashes': [input_hash for _, input_hash in batch]
+        })
+    return len(hashes)
+
+
+def enqueue_stale_summaries(session, batch_size: int = 5000) -> int:
+    """Re-enqueue every verified alert; only those whose inputs or prompt version changed become pending"""
+    considered = 0
+    last_id = ''
+    while True:
+        alert_ids = [row[0] for row in session.execute(text(STALE_CANDIDATES_SQL),
+                                                       {'last_id': last_id, 'limit': batch_size})]
+        if not alert_ids:
+            break
+        enqueue_summaries(session, alert_ids)
+        session.commit()
+        considered += len(alert_ids)
+        last_id = alert_ids[-1]
+    return considered
+
+
+def queue_stats(session) -> Dict[str, int]:
+    return {status: count for status, count in session.execute(text(QUEUE_STATS_SQL))}
+
+
+def retry_delay(attempts: int) -> int:
+    return min(RETRY_BASE_SECONDS * 2 ** attempts, RETRY_MAX_SECONDS)
+
+
+class TokenBucket:
+    """
+    Allows requests_per_minute on average with bursts of up to `burst`
+    Callers reserve a token under the lock and sleep outside it, so waiters are served in order.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(max(1, burst or 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+
+
+class SummaryQueueWorker:
+    """
+    Drains spc_summary_jobs with up to `workers` OpenAI requests in flight
+
+    Claims and result writes happen on the caller's session; pool threads only run the
+    rate-limited summarizer calls. A failed call is rescheduled with exponential backoff
+    rather than retried in place, and after max_attempts the alert gets the plain fallback
+    summary matching used to write inline.
+    """
+
+    def __init__(self, db_session, workers: int = None, requests_per_minute: float = None,
+                 max_attempts: int = None, summarizer=None):
+        self.db = db_session
+        self.workers = max(1, workers or Config.SPC_SUMMARY_WORKERS)
+        self.rate_limiter = TokenBucket(
+            Config.SPC_SUMMARY_REQUESTS_PER_MINUTE if requests_per_minute is None else requests_per_minute,
+            burst=self.workers
+        )
+        self.max_attempts = max_attempts or Config.SPC_SUMMARY_MAX_ATTEMPTS
+        if summarizer is None:
+            from match_summarizer import MatchSummarizer
+            summarizer = MatchSummarizer()
+        self.summarizer = summarizer
+
+        self._stopped = threading.Event()
+        self.thread = None
+
+    def _summarize(self, alert: Dict, reports: List[Dict]) -> Optional[str]:
+        self.rate_limiter.acquire()
+        return self.summarizer.generate_match_summary(alert=alert, spc_reports=reports)
+
+    def _load_inputs(self, alert_ids: List[str]) -> Dict[str, Tuple[Dict, List[Dict]]]:
+        """{alert id: (alert dict, matched report dicts)} for the summarizer, two queries"""
+        from models import Alert, hydrate_spc_reports
+        alerts = Alert.query.filter(Alert.id.in_(alert_ids)).all()
+        hydrate_spc_reports(alerts)
+        return {alert.id: (alert.to_dict(), alert.spc_reports or []) for alert in alerts}
+
+    def _finish(self, alert_id: str, input_hash: str, attempts: int, summary: Optional[str], error: Optional[str],
+                report_count: int, stats: Dict):
+        if summary:
+            self.db.execute(text(COMPLETE_SQL), {'alert_id': alert_id, 'input_hash': input_hash, 'status': 'done',
+                                                 'last_error': None, 'summary': summary})
+            stats['summarized'] += 1
+        elif attempts + 1 >= self.max_attempts:
+            self.db.execute(text(COMPLETE_SQL), {
+                'alert_id': alert_id, 'input_hash': input_hash, 'status': 'failed', 'last_error': error,
+                'summary': f"Match verified with {report_count} SPC reports"
+            })
+            stats['failed'] += 1
+            logger.warning(f"AI summary for alert {alert_id} failed {attempts + 1} times, using fallback: {error}")
+        else:
+            self.db.execute(text(RETRY_SQL), {'alert_id': alert_id, 'input_hash': input_hash, 'last_error': error,
+                                              'delay_seconds': retry_delay(attempts)})
+            stats['retried'] += 1
+
+    def drain(self, max_jobs: Optional[int] = None) -> Dict:
+        """Process due jobs until none are left (or max_jobs have been claimed)"""
+        started = time.monotonic()
+        stats = {'claimed': 0, 'summarized': 0, 'retried': 0, 'failed': 0, 'dropped': 0}
+        claim_size = self.workers * 4
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='spc-summary') as executor:
+            while not self._stopped.is_set():
+                limit = claim_size if max_jobs is None else min(claim_size, max_jobs - stats['claimed'])
+                if limit <= 0:
+                    break
+                jobs = self.db.execute(text(CLAIM_SQL), {'limit': limit, 'lease_seconds': CLAIM_LEASE_SECONDS}).fetchall()
+                self.db.commit()
+                if not jobs:
+                    break
+                stats['claimed'] += len(jobs)
+
+                try:
+                    inputs = self._load_inputs([alert_id for alert_id, _, _ in jobs])
+                    futures = {}
+                    for alert_id, input_hash, attempts in jobs:
+                        alert, alert_reports = inputs.get(alert_id, (None, []))
+                        if not alert_reports:
+                            # Unmatched (or deleted) since it was queued: nothing to summarize
+                            self.db.execute(text(DROP_SQL), {'alert_id': alert_id, 'input_hash': input_hash})
+                            stats['dropped'] += 1
+                            continue
+                        future = executor.submit(self._summarize, alert, alert_reports)
+                        futures[future] = (alert_id, input_hash, attempts, len(alert_reports))
+
+                    for future in as_completed(futures):
+                        alert_id, input_hash, attempts, report_count = futures[future]
+                        try:
+                            summary, error = future.result(), None
+                            if not summary:
+                                error = 'summarizer returned no summary'
+                        except Exception as e:
+                            summary, error = None, str(e)
+                        self._finish(alert_id, input_hash, attempts, summary, error, report_count, stats)
+                    self.db.commit()
+                except Exception as e:
+                    # Claims expire after CLAIM_LEASE_SECONDS, so these jobs are picked up again
+                    self.db.rollback()
+                    logger.error(f"SPC summary batch failed: {e}")
+                    break
+
+        stats['duration_seconds'] = round(time.monotonic() - started, 2)
+        if stats['claimed']:
+            logger.info(f"SPC summary queue: {stats['summarized']} summarized, {stats['retried']} retried, "
+                        f"{stats['failed']} failed, {stats['dropped']} dropped in {stats['duration_seconds']}s")
+        return stats
+
+    def start(self, app, poll_seconds: int = 30):
+        """Drain continuously on a background thread inside the app context"""
+        if self.thread and self.thread.is_alive():
+            return
+        self._stopped.clear()
+
+        def loop():
+            while not self._stopped.is_set():
+                try:
+                    with app.app_context():
+                        self.drain()
+                except Exception as e:
+                    logger.error(f"SPC summary worker iteration failed: {e}")
+                self._stopped.wait(poll_seconds)
+
+        self.thread = threading.Thread(target=loop, name='spc-summary-worker', daemon=True)
+        self.thread.start()
+        logger.info(f"SPC summary worker started ({self.workers} concurrent requests)")
+
+    def stop(self):
+        self._stopped.set()
+        if self.thread:
+            self.thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI match summary queue")
+    parser.add_argument('command', choices=['drain', 'stale', 'stats'],
+                        help='drain: process due jobs; stale: re-enqueue summaries whose inputs changed; stats: job counts')
+    parser.add_argument('--workers', type=int, default=Config.SPC_SUMMARY_WORKERS, help='concurrent OpenAI requests')
+    parser.add_argument('--requests-per-minute', type=float, default=Config.SPC_SUMMARY_REQUESTS_PER_MINUTE)
+    parser.add_argument('--max-jobs', type=int, help='stop draining after this many jobs')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from app import app, db
+    with app.app_context():
+        db.create_all()
+        if args.command == 'drain':
+            worker = SummaryQueueWorker(db.session, workers=args.workers, requests_per_minute=args.requests_per_minute)
+            print(worker.drain(max_jobs=args.max_jobs))
+        elif args.command == 'stale':
+            print({'considered': enqueue_stale_summaries(db.session)})
+        print(queue_stats(db.session))
+
+
+if __name__ == '__main__':
+    main()
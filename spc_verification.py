@@ -8,6 +8,7 @@ from datetime import datetime, date, timedelta
 from typing import Dict, List, Tuple
 import logging
 from config import Config
+from spc_match_store import release_report_day
 
 logger = logging.getLogger(__name__)
 
@@ -76,7 +77,8 @@ class SPCVerificationService:
             date_str = check_date.strftime('%y%m%d')
             url = f"{self.base_url}{date_str}_rpts_filtered.csv"
             
-            response = requests.get(url, timeout=30)
+            from source_archive import final_max_age, source_archive
+            response = source_archive.fetch(url, timeout=30, max_age=final_max_age(check_date))
             if response.status_code == 404:
                 # No data available for this date
                 return 0
@@ -163,7 +165,8 @@ class SPCVerificationService:
                 SPCReport.report_date == check_date
             ).count()
             
-            # Delete existing reports for this date
+            # Delete existing reports for this date; their matched alerts go back to unmatched
+            release_report_day(self.db, check_date)
             deleted_count = self.db.query(SPCReport).filter(
                 SPCReport.report_date == check_date
             ).delete()
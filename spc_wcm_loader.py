@@ -0,0 +1,301 @@
+"""
+SPC WCM Historical Loader for HailyDB
+Bulk loads the SPC multi-decade tornado/wind/hail CSV datasets into spc_reports
+"""
+
+import argparse
+import csv
+import hashlib
+import io
+import itertools
+import logging
+import os
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+from sqlalchemy import text
+
+from spc_match_queue import enqueue_reports
+
+logger = logging.getLogger(__name__)
+
+REPORT_TYPES = ('tornado', 'wind', 'hail')
+
+# WCM tz codes: 3 = CST (almost every record), 9 = GMT; anything else is treated as CST
+TZ_UTC_OFFSET_MINUTES = {'9': 0}
+CST_UTC_OFFSET_MINUTES = 6 * 60
+
+# The daily files report convective (12Z-12Z) days; WCM rows are filed under the same day
+SPC_DAY_START = np.timedelta64(12 * 60, 'm')
+
+# Tornado ratings switched from the Fujita to the Enhanced Fujita scale on 2007-02-01
+EF_SCALE_START = np.datetime64('2007-02-01')
+
+KNOTS_TO_MPH = 1.15078
+
+STAGING_COLUMNS = [
+    ('report_date', 'DATE'),
+    ('report_type', 'VARCHAR(10)'),
+    ('time_utc', 'VARCHAR(4)'),
+    ('state', 'VARCHAR(2)'),
+    ('latitude', 'DOUBLE PRECISION'),
+    ('longitude', 'DOUBLE PRECISION'),
+    ('magnitude', 'JSONB'),
+    ('raw_csv_line', 'TEXT'),
+    ('row_hash', 'VARCHAR(64)'),
+]
+
+# Daily-ingested rows describing the same report: same SPC day, type and state, coordinates within tolerance
+RECONCILE_SQL = """
+UPDATE spc_wcm_staging s SET reconciled = true
+WHERE EXISTS (
+    SELECT 1 FROM spc_reports r
+    WHERE r.report_date = s.report_date
+      AND r.report_type = s.report_type
+      AND r.state = s.state
+      AND COALESCE(r.data_source, 'spc_daily') = 'spc_daily'
+      AND abs(r.latitude - s.latitude) <= :tolerance
+      AND abs(r.longitude - s.longitude) <= :tolerance
+)
+"""
+
+MERGE_SQL = """
+INSERT INTO spc_reports (report_date, report_type, time_utc, state, latitude, longitude, magnitude,
+                         raw_csv_line, row_hash, spc_enrichment, enhanced_context, spc_verified, data_source)
+SELECT report_date, report_type, time_utc, state, latitude, longitude, magnitude,
+       raw_csv_line, row_hash, '{}'::jsonb, '{}'::jsonb, false, 'spc_wcm'
+FROM spc_wcm_staging
+WHERE NOT reconciled
+ON CONFLICT (row_hash) DO NOTHING
+RETURNING id, report_date, report_type
+"""
+
+
+def detect_report_type(path: str, header: List[str]) -> str:
+    """Dataset type from the file name (e.g. 1950-2023_actual_tornadoes.csv) or its extra column"""
+    name = os.path.basename(path).lower()
+    for report_type, marker in (('tornado', 'torn'), ('wind', 'wind'), ('hail', 'hail')):
+        if marker in name:
+            return report_type
+    if 'fc' in header:
+        return 'tornado'
+    if 'mt' in header:
+        return 'wind'
+    raise ValueError(f"Cannot tell the report type of {path}; pass it explicitly")
+
+
+def _column(rows: List[List[str]], index: int) -> np.ndarray:
+    return np.array([row[index] if index < len(row) else '' for row in rows])
+
+
+def _numbers(values: np.ndarray) -> np.ndarray:
+    """Float column; blanks and junk become NaN"""
+    out = np.full(values.shape, np.nan)
+    valid = np.char.isnumeric(np.char.replace(np.char.replace(np.char.lstrip(values, '-'), '.', '', 1), ' ', ''))
+    out[valid] = values[valid].astype(float)
+    return out
+
+
+def parse_wcm_chunk(rows: List[List[str]], columns: Dict[str, int], report_type: str) -> Dict[str, np.ndarray]:
+    """
+    Vectorized parse of one chunk of WCM rows into staging columns
+    Times become HHMM UTC on the SPC convective day; coordinates of 0 become missing;
+    magnitudes are encoded as JSON in the shape the daily parser produces.
+    """
+    if report_type == 'tornado' and 'sg' in columns:
+        # sg=2 rows are per-state segments of a track already present as its sg=1 row
+        rows = [row for row in rows if row[columns['sg']].strip() != '2']
+    if not rows:
+        return {}
+
+    dates = np.char.strip(_column(rows, columns['date']))
+    times = np.char.strip(_column(rows, columns['time']))
+    tz = np.char.strip(_column(rows, columns['tz']))
+    state = np.char.upper(np.char.strip(_column(rows, columns['st'])))
+    mag = np.char.strip(_column(rows, columns['mag']))
+    lat = _numbers(np.char.strip(_column(rows, columns['slat'])))
+    lon = _numbers(np.char.strip(_column(rows, columns['slon'])))
+
+    clock = np.char.replace(times, ':', '')
+    valid = (np.char.str_len(dates) == 10) & np.isin(np.char.str_len(clock), (4, 6)) & np.char.isdigit(clock)
+    if not valid.all():
+        logger.warning(f"Skipping {int((~valid).sum())} WCM rows without a usable date/time")
+        keep = np.flatnonzero(valid)
+        rows = [rows[i] for i in keep]
+        dates, clock, tz, state, mag, lat, lon = (column[valid] for column in (dates, clock, tz, state, mag, lat, lon))
+        if not rows:
+            return {}
+
+    # Local time -> UTC -> convective day and HHMM
+    hhmmss = np.where(np.char.str_len(clock) == 4, clock.astype(int) * 100, clock.astype(int))
+    local_minutes = (hhmmss // 10000) * 60 + (hhmmss // 100) % 100
+    offsets = np.full(len(rows), CST_UTC_OFFSET_MINUTES)
+    for code, offset in TZ_UTC_OFFSET_MINUTES.items():
+        offsets[tz == code] = offset
+    day = dates.astype('datetime64[D]')
+    utc = day.astype('datetime64[m]') + (local_minutes + offsets).astype('timedelta64[m]')
+    report_date = (utc - SPC_DAY_START).astype('datetime64[D]')
+    utc_minutes = (utc - utc.astype('datetime64[D]')).astype(int)
+    time_utc = np.char.zfill(((utc_minutes // 60) * 100 + utc_minutes % 60).astype(str), 4)
+
+    lat[lat == 0] = np.nan
+    lon[lon == 0] = np.nan
+    lon = -np.abs(lon)  # early dataset versions store west longitude as positive
+
+    mag_value = _numbers(mag)
+    known = ~np.isnan(mag_value) & (mag_value >= 0)
+    mag_int = np.where(known, np.rint(mag_value), 0).astype(int).astype(str)
+    if report_type == 'tornado':
+        scale = np.where(day >= EF_SCALE_START, 'EF', 'F')
+        magnitude = np.where(known, np.char.add(np.char.add(np.char.add('{"f_scale": "', scale), mag_int), '"}'), '{}')
+    elif report_type == 'wind':
+        known &= mag_value > 0
+        mph = np.where(known, np.rint(np.nan_to_num(mag_value) * KNOTS_TO_MPH), 0).astype(int).astype(str)
+        magnitude = np.where(
+            known,
+            np.char.add(np.char.add(np.char.add(np.char.add('{"speed": ', mph), ', "speed_kt": '), mag_int), '}'),
+            '{"speed_text": "UNK", "speed": null}'
+        )
+    else:
+        hundredths = np.where(known, np.rint(np.nan_to_num(mag_value) * 100), 0).astype(int)
+        inches = np.char.mod('%.2f', hundredths / 100.0)
+        magnitude = np.where(
+            known & (hundredths > 0),
+            np.char.add(np.char.add(np.char.add(np.char.add('{"size_hundredths": ', hundredths.astype(str)),
+                                                ', "size_inches": '), inches), '}'),
+            '{}'
+        )
+
+    # The WCM line (om, yr, date, time, place, magnitude, ...) identifies the record; prefixed so
+    # it can never collide with a daily row_hash
+    raw_lines = np.array([','.join(row) for row in rows])
+    hash_keys = np.char.add(f"wcm|{report_type}|", raw_lines)
+    row_hash = np.array([hashlib.sha256(key.encode('utf-8')).hexdigest() for key in hash_keys.tolist()])
+
+    return {
+        'report_date': report_date.astype(str),
+        'report_type': np.full(len(rows), report_type),
+        'time_utc': time_utc,
+        'state': np.char.ljust(state, 2).astype('<U2'),
+        'latitude': lat,
+        'longitude': lon,
+        'magnitude': magnitude,
+        'raw_csv_line': raw_lines,
+        'row_hash': row_hash,
+    }
+
+
+def iter_wcm_chunks(path: str, chunk_size: int, report_type: Optional[str] = None) -> Iterator[Dict[str, np.ndarray]]:
+    """Stream a WCM CSV file as parsed column chunks of up to chunk_size rows"""
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        reader = csv.reader(f)
+        header = [name.strip().lower() for name in next(reader)]
+        columns = {name: index for index, name in enumerate(header)}
+        missing = {'date', 'time', 'tz', 'st', 'mag', 'slat', 'slon'} - set(columns)
+        if missing:
+            raise ValueError(f"{path} is not a WCM dataset (missing columns: {', '.join(sorted(missing))})")
+        report_type = report_type or detect_report_type(path, header)
+
+        while True:
+            rows = [row for row in itertools.islice(reader, chunk_size) if row]
+            if not rows:
+                break
+            chunk = parse_wcm_chunk(rows, columns, report_type)
+            if chunk:
+                yield chunk
+
+
+class SPCWCMLoader:
+    """
+    Bulk loader for the SPC WCM historical datasets (1950-present tornadoes, 1955-present hail/wind)
+    Each chunk is COPYed into a temp staging table, reconciled against daily-ingested rows and merged
+    with ON CONFLICT (row_hash) DO NOTHING in one transaction, so reruns and interrupted loads are safe.
+    """
+
+    def __init__(self, db_session, chunk_size: int = 50000, match_tolerance: float = 0.05):
+        self.db = db_session
+        self.chunk_size = chunk_size
+        self.match_tolerance = match_tolerance
+
+    def load_file(self, path: str, report_type: Optional[str] = None) -> Dict:
+        stats = {'file': path, 'rows': 0, 'inserted': 0, 'reconciled': 0, 'already_loaded': 0,
+                 'tornado': 0, 'wind': 0, 'hail': 0}
+        started = time.perf_counter()
+
+        for chunk in iter_wcm_chunks(path, self.chunk_size, report_type):
+            result = self._load_chunk(chunk)
+            stats['rows'] += result['rows']
+            stats['reconciled'] += result['reconciled']
+            stats['inserted'] += result['inserted']
+            stats['already_loaded'] += result['rows'] - result['reconciled'] - result['inserted']
+            for key in REPORT_TYPES:
+                stats[key] += result[key]
+            elapsed = time.perf_counter() - started
+            logger.info(f"{os.path.basename(path)}: {stats['rows']} rows in {elapsed:.1f}s "
+                        f"({stats['rows'] / elapsed:.0f} rows/s), {stats['inserted']} inserted, "
+                        f"{stats['reconciled']} matched daily reports")
+
+        stats['seconds'] = round(time.perf_counter() - started, 1)
+        return stats
+
+    def _load_chunk(self, chunk: Dict[str, np.ndarray]) -> Dict:
+        count = len(chunk['row_hash'])
+        column_defs = ', '.join(f'{name} {sql_type}' for name, sql_type in STAGING_COLUMNS)
+        column_names = ', '.join(name for name, _ in STAGING_COLUMNS)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        latitude, longitude = chunk['latitude'], chunk['longitude']
+        columns = [chunk[name].tolist() for name, _ in STAGING_COLUMNS]
+        lat_index = [name for name, _ in STAGING_COLUMNS].index('latitude')
+        columns[lat_index] = [None if np.isnan(value) else value for value in latitude.tolist()]
+        columns[lat_index + 1] = [None if np.isnan(value) else value for value in longitude.tolist()]
+        writer.writerows(zip(*columns))
+        buffer.seek(0)
+
+        try:
+            self.db.execute(text(f"CREATE TEMP TABLE spc_wcm_staging ({column_defs}, "
+                                 f"reconciled BOOLEAN NOT NULL DEFAULT false) ON COMMIT DROP"))
+            # COPY needs the raw DBAPI cursor of the connection bound to this session
+            cursor = self.db.connection().connection.cursor()
+            try:
+                cursor.copy_expert(f"COPY spc_wcm_staging ({column_names}) FROM STDIN WITH (FORMAT csv)", buffer)
+            finally:
+                cursor.close()
+
+            reconciled = self.db.execute(text(RECONCILE_SQL), {'tolerance': self.match_tolerance}).rowcount
+            merged = self.db.execute(text(MERGE_SQL)).fetchall()
+            enqueue_reports(self.db, merged)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+
+        inserted = [report_type for _, _, report_type in merged]
+        result = {'rows': count, 'reconciled': reconciled, 'inserted': len(inserted)}
+        for report_type in REPORT_TYPES:
+            result[report_type] = inserted.count(report_type)
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk load SPC WCM historical tornado/wind/hail CSV files")
+    parser.add_argument('files', nargs='+', help='e.g. 1950-2023_actual_tornadoes.csv 1955-2023_hail.csv 1955-2023_wind.csv')
+    parser.add_argument('--type', choices=REPORT_TYPES, help='report type when it cannot be read from the file name')
+    parser.add_argument('--chunk-size', type=int, default=50000, help='rows staged and merged per transaction')
+    parser.add_argument('--match-tolerance', type=float, default=0.05,
+                        help='max lat/lon difference (degrees) for a daily-ingested report to count as the same report')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from app import app, db
+    with app.app_context():
+        loader = SPCWCMLoader(db.session, chunk_size=args.chunk_size, match_tolerance=args.match_tolerance)
+        for path in args.files:
+            print(loader.load_file(path, report_type=args.type))
+
+
+if __name__ == '__main__':
+    main()
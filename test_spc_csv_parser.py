@@ -0,0 +1,37 @@
+"""
+SPC CSV parser record assembly: wrapped comment lines stay with their report
+"""
+
+from datetime import date
+
+from spc_csv_parser import spc_csv_parser
+
+REPORT_DATE = date(2024, 5, 6)
+
+
+def test_multiline_comment_after_complete_row():
+    csv_content = (
+        "Time,Size,Location,County,State,Lat,Lon,Comments\n"
+        "1830,175,2 N Wichita,Sedgwick,KS,37.72,-97.33,Golf ball hail reported\n"
+        "by trained spotter. Time estimated\n"
+        "from radar. (ICT)\n"
+        "1845,100,Derby,Sedgwick,KS,37.55,-97.27,Quarter size hail (ICT)\n"
+    )
+    reports = spc_csv_parser.parse(csv_content, REPORT_DATE)['reports']
+
+    assert len(reports) == 2
+    assert reports[0]['comments'] == 'Golf ball hail reported by trained spotter. Time estimated from radar. (ICT)'
+    assert reports[0]['longitude'] == -97.33
+    assert reports[1]['comments'] == 'Quarter size hail (ICT)'
+
+
+def test_comment_line_after_row_without_comments():
+    csv_content = (
+        "Time,Speed,Location,County,State,Lat,Lon,Comments\n"
+        "2015,65,Hays,Ellis,KS,38.88,-99.33\n"
+        "Measured gust at the airport. (DDC)\n"
+    )
+    report = spc_csv_parser.parse(csv_content, REPORT_DATE)['reports'][0]
+
+    assert report['longitude'] == -99.33
+    assert report['comments'] == 'Measured gust at the airport. (DDC)'
@@ -4,7 +4,7 @@ import requests
 import time
 from datetime import datetime
 from typing import Dict, List, Optional
-from models import WebhookRule, Alert, SPCReport, SchedulerLog, WebhookEvent, db
+from models import WebhookRule, Alert, SPCReport, SchedulerLog, WebhookEvent, db, hydrate_spc_reports
 
 logger = logging.getLogger(__name__)
 
@@ -38,6 +38,9 @@ class WebhookService:
                     Alert.ingested_at >= one_hour_ago
                 ).all()
             
+            # One join query for every alert's matched reports instead of one per alert and rule
+            hydrate_spc_reports([alert for alert in alerts if alert.spc_verified])
+            
             dispatched = 0
             failed = 0
             rules_evaluated = len(webhook_rules)